@@ -0,0 +1,363 @@
+"""
+BuyPrintz Admission Control
+Per-route-class concurrency limits, bounded wait queues and per-user token
+buckets for the expensive endpoints (OpenAI chat, Playwright shipping quotes,
+uploads). Requests over the limits are shed quickly with 429/503 and a
+Retry-After header instead of piling up and starving the node.
+
+Callers are identified by their verified user, else by client address. Behind
+a reverse proxy the direct peer is the proxy, so X-Forwarded-For is read when
+(and only when) the peer is one of ADMISSION_TRUSTED_PROXIES.
+"""
+
+import asyncio
+import ipaddress
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from .auth import auth_manager
+
+# Paths that are never subject to admission control
+EXEMPT_PATHS = {"/", "/health", "/metrics", "/api/status", "/api/admission/stats"}
+
+# Maximum number of (route class, user) token buckets kept in memory
+MAX_TRACKED_BUCKETS = int(os.getenv("ADMISSION_MAX_TRACKED_USERS", "10000"))
+
+# Addresses/networks of reverse proxies whose X-Forwarded-For is believed. The
+# default covers loopback, private and carrier-grade NAT ranges, which is where
+# hosted edge proxies (Railway included) connect from; public clients cannot
+# pose as one.
+TRUSTED_PROXIES = os.getenv(
+    "ADMISSION_TRUSTED_PROXIES",
+    "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,100.64.0.0/10,fc00::/7")
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+class RouteClassConfig:
+    """Limits for one class of routes"""
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float,
+                 rate_per_second: float, burst: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+
+    @classmethod
+    def from_env(cls, name: str, concurrency: int, queue_size: int, queue_timeout: float,
+                 rate_per_second: float, burst: int) -> "RouteClassConfig":
+        prefix = f"ADMISSION_{name.upper()}_"
+        return cls(
+            name=name,
+            concurrency=_env_int(prefix + "CONCURRENCY", concurrency),
+            queue_size=_env_int(prefix + "QUEUE", queue_size),
+            queue_timeout=_env_float(prefix + "QUEUE_TIMEOUT", queue_timeout),
+            rate_per_second=_env_float(prefix + "RATE", rate_per_second),
+            burst=_env_int(prefix + "BURST", burst)
+        )
+
+
+def default_route_classes() -> Dict[str, RouteClassConfig]:
+    """Route classes with production defaults, overridable via ADMISSION_<CLASS>_* env vars"""
+    return {
+        # OpenAI calls hold a connection for up to 120 s
+        "ai": RouteClassConfig.from_env("ai", concurrency=8, queue_size=16, queue_timeout=15.0,
+                                        rate_per_second=0.5, burst=5),
+        # Each shipping quote drives a headless Chromium instance
+        "shipping": RouteClassConfig.from_env("shipping", concurrency=2, queue_size=4, queue_timeout=30.0,
+                                              rate_per_second=0.1, burst=3),
+        "uploads": RouteClassConfig.from_env("uploads", concurrency=8, queue_size=16, queue_timeout=10.0,
+                                             rate_per_second=1.0, burst=10),
+        # Resumable upload chunks are small, streamed to disk and sent several at a time
+        "upload_chunks": RouteClassConfig.from_env("upload_chunks", concurrency=16, queue_size=32, queue_timeout=10.0,
+                                                   rate_per_second=10.0, burst=40),
+        # Everything else, static files and resized images included: a concurrency cap only.
+        # A page view fans out into dozens of requests, so a per-caller rate would shed real visitors.
+        "default": RouteClassConfig.from_env("default", concurrency=128, queue_size=256, queue_timeout=5.0,
+                                             rate_per_second=0.0, burst=60),
+    }
+
+
+# Ordered (prefix, route class) rules; the first match wins
+ROUTE_CLASS_RULES: List[Tuple[str, str]] = [
+    ("/api/ai/", "ai"),
+    ("/api/shipping-costs/get", "shipping"),
+    ("/api/upload-artwork", "uploads"),
+    ("/api/uploads", "upload_chunks"),
+    ("/api/creator-marketplace/templates/generate-thumbnail", "uploads"),
+    ("/api/creator-marketplace/templates/validate-image", "uploads"),
+]
+
+
+def classify_path(path: str) -> str:
+    """Map a request path to its route class"""
+    for prefix, route_class in ROUTE_CLASS_RULES:
+        if path.startswith(prefix):
+            return route_class
+    return "default"
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Counting semaphore with a bounded FIFO wait queue.
+
+    Waiters are plain futures on whichever loop is running, so one limiter can
+    be shared by apps started under different event loops (e.g. test clients).
+    """
+
+    def __init__(self, config: RouteClassConfig):
+        self.config = config
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.config.concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if self.queue_depth >= self.config.queue_size:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(503, "Server busy, please retry shortly", self.config.queue_timeout)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # Slots are handed over directly by release(), so in_flight is already counted
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.config.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot arrived just as we timed out; give it back
+                self.release()
+            else:
+                waiter.cancel()
+            self.rejected_timeout += 1
+            raise AdmissionRejected(503, "Server busy, please retry shortly", self.config.queue_timeout)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+        self.admitted += 1
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": self.config.concurrency,
+            "queue_limit": self.config.queue_size,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_queue_timeout": self.rejected_timeout
+        }
+
+
+class TokenBucket:
+    """Classic token bucket; refilled lazily on each take()"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def take(self) -> float:
+        """Take one token; return 0 on success or the seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        if self.rate <= 0:
+            return 60.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Holds the per-class limiters and per-user buckets plus rejection counters"""
+
+    def __init__(self, route_classes: Optional[Dict[str, RouteClassConfig]] = None,
+                 max_tracked_buckets: int = MAX_TRACKED_BUCKETS):
+        self.route_classes = route_classes or default_route_classes()
+        self.limiters = {name: ConcurrencyLimiter(config) for name, config in self.route_classes.items()}
+        self.max_tracked_buckets = max_tracked_buckets
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self.rate_limited: Dict[str, int] = {name: 0 for name in self.route_classes}
+
+    def check_rate(self, route_class: str, user_key: str) -> None:
+        config = self.route_classes[route_class]
+        if config.rate_per_second <= 0:
+            # ADMISSION_<CLASS>_RATE=0 turns the per-user rate limit off
+            return
+        key = (route_class, user_key)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(config.rate_per_second, config.burst)
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_tracked_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+
+        wait = bucket.take()
+        if wait > 0:
+            self.rate_limited[route_class] += 1
+            raise AdmissionRejected(429, "Too many requests, please slow down", wait)
+
+    async def admit(self, route_class: str, user_key: str) -> ConcurrencyLimiter:
+        self.check_rate(route_class, user_key)
+        limiter = self.limiters[route_class]
+        await limiter.acquire()
+        return limiter
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {**limiter.stats(), "rate_limited": self.rate_limited[name]}
+            for name, limiter in self.limiters.items()
+        }
+
+
+def parse_networks(spec: str) -> List[Any]:
+    """Parse 'addr,net/len,...' into ip networks, ignoring malformed entries"""
+    networks = []
+    for item in spec.split(","):
+        try:
+            networks.append(ipaddress.ip_network(item.strip(), strict=False))
+        except ValueError:
+            continue
+    return networks
+
+
+_trusted_networks = parse_networks(TRUSTED_PROXIES)
+
+
+def _is_trusted(address: str, networks: List[Any]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_address(scope: Dict[str, Any], trusted: Optional[List[Any]] = None) -> Optional[str]:
+    """
+    The caller's address: the direct peer, unless that peer is a trusted proxy,
+    in which case the nearest untrusted hop of X-Forwarded-For. The header is
+    read right to left, so entries a client prepends itself are never used.
+    """
+    trusted = _trusted_networks if trusted is None else trusted
+    client = scope.get("client")
+    address = client[0] if client else None
+    if address is None or not _is_trusted(address, trusted):
+        return address
+    forwarded = [value.decode("latin-1") for name, value in scope.get("headers", []) if name == b"x-forwarded-for"]
+    hops = [hop.strip() for hop in ",".join(forwarded).split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted):
+            return hop
+    return hops[0] if hops else address
+
+
+def _user_key(scope: Dict[str, Any]) -> str:
+    """
+    Identify the caller by the user behind an already verified bearer token,
+    falling back to client address. Unverified tokens are not trusted as an
+    identity: minting random ones would otherwise buy a fresh bucket each.
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                user = auth_manager.token_cache.peek(auth_manager.token_cache.key_for(token.strip()))
+                if user and user.get("user_id"):
+                    return f"u:{user['user_id']}"
+            break
+    address = client_address(scope)
+    return f"ip:{address}" if address else "anonymous"
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware applying admission control to every HTTP request.
+
+    The concurrency slot is held until the downstream app has sent the whole
+    response, so streaming responses count against their route class too.
+    """
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "OPTIONS" or scope.get("path") in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify_path(scope.get("path", ""))
+        try:
+            limiter = await self.controller.admit(route_class, _user_key(scope))
+        except AdmissionRejected as rejection:
+            response = JSONResponse(
+                {"detail": rejection.detail, "route_class": route_class},
+                status_code=rejection.status_code,
+                headers={"Retry-After": str(max(1, math.ceil(rejection.retry_after)))}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+# Global controller shared by the middleware and the stats endpoint
+admission_controller = AdmissionController()
@@ -5,21 +5,47 @@ MANDATORY pattern for AI agent integration with full MCP compliance.
 """
 
 import os
+import asyncio
 import json
 import logging
 import time
-from typing import Dict, Any, Optional, List
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, Any, Optional, List
 from datetime import datetime
 import httpx
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+from .ai_provider import CircuitBreaker, build_http_client
+from .ai_response_cache import ResponseCache, cache_key
+from .ai_tool_registry import ToolRegistry
+from .ai_usage import current_ai_tool, usage_tracker
+from .ai_tool_scheduler import ToolScheduler, tool_label
+from .design_ops import OPERATIONS, DesignOperationError, apply_operations
+from .design_session import design_session, tool_design_session
+from .icon_catalog import icon_catalog
+from .qr_service import QRSpec, qr_service
+from .metrics import openai_request_duration_seconds, timed
+
 # Load environment variables
 load_dotenv()
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+CHAT_MODEL = "gpt-5-mini-2025-08-07"
+# Part of every response cache key; bump when the system prompt or tool schemas change
+PROMPT_VERSION = "1"
+
+# Tools whose successful result means the current design changed
+DESIGN_MODIFYING_TOOLS = {
+    "modify_banner_design", "add_element_to_design", "generate_qr_code", "add_qr_code",
+    "add_text", "modify_text", "add_rectangle", "add_circle", "add_star", "add_triangle", "add_hexagon",
+    "add_icon", "move_element", "resize_element", "change_element_color", "delete_element",
+    "duplicate_element", "bring_to_front", "send_to_back", "change_canvas_size", "change_background_color",
+    "apply_design_operations"
+}
+
 class MCPCompliantServiceAdapter:
     """
     🌟 MANDATORY MCP-Compliant Adapter Base Class
@@ -57,6 +83,101 @@ class MCPCompliantServiceAdapter:
         if self.client:
             await self.client.aclose()
 
+# Static part of the system prompt; identical on every call so the provider can cache the prefix
+SYSTEM_PROMPT = """You are an AI assistant for BuyPrintz, a professional banner printing platform. You have FULL PROGRAMMATIC CONTROL of the banner editor and can use ALL sidebar tools that users have access to.
+
+You help users with:
+1. Banner design assistance and recommendations
+2. Order management and tracking
+3. Product selection and pricing
+4. General questions about banners and printing
+5. Creating new banner designs from text descriptions
+6. Modifying existing banner designs
+7. Adding elements to banners
+8. Generating QR codes for URLs or text
+
+You have access to COMPREHENSIVE SIDEBAR TOOLS that let you:
+
+=== CANVAS MANAGEMENT ===
+- create_new_design: Create new banner designs from scratch
+- change_canvas_size: Change canvas dimensions
+- change_background_color: Change canvas background color
+
+=== TEXT TOOLS ===
+- add_text: Add text elements with full formatting control
+- modify_text: Modify existing text properties (content, font, color, alignment)
+
+=== SHAPE TOOLS ===
+- add_rectangle: Add rectangle shapes
+- add_circle: Add circle shapes
+- add_star: Add star shapes with customizable points and radii
+- add_triangle: Add triangle shapes
+- add_hexagon: Add hexagon shapes
+
+=== ICON TOOLS ===
+- add_icon: Add icons from the comprehensive icon library
+- list_available_icons: Get available icons by category
+
+=== QR CODE TOOLS ===
+- add_qr_code: Generate and add QR codes with custom colors
+
+=== ELEMENT MANIPULATION ===
+- move_element: Move elements to new positions
+- resize_element: Resize elements
+- change_element_color: Change element colors
+- delete_element: Delete elements
+- duplicate_element: Duplicate elements
+
+=== LAYER MANAGEMENT ===
+- bring_to_front: Bring elements to front layer
+- send_to_back: Send elements to back layer
+
+=== BATCH EDITS ===
+- apply_design_operations: Apply several add/move/resize/recolor/delete/reorder/duplicate edits in one call (prefer this when making more than one change)
+
+=== DESIGN MANAGEMENT ===
+- get_user_designs: Get user's saved designs
+- save_design: Save current designs
+- generate_banner_from_prompt: Generate complete banners from text prompts
+
+=== ORDER & PRODUCT TOOLS ===
+- get_user_orders: Get order history and status
+- get_banner_products: Get available products
+- calculate_banner_pricing: Calculate pricing
+- get_design_recommendations: Get AI-powered recommendations
+
+CRITICAL INSTRUCTIONS:
+- You have FULL CONTROL of the banner editor - use the tools to perform actual actions
+- When users ask to "create a banner", "generate a banner", or "make a banner", you MUST call generate_banner_from_prompt
+- When users ask to "add text", "add shapes", "add icons", use the specific add_* tools
+            - When users ask to "add QR code", "generate QR code", "create QR code", you MUST call add_qr_code (NOT create_new_design)
+            - The add_qr_code tool will automatically create a new canvas if no design_id is provided
+            - For immediate canvas updates, use direct manipulation tools (add_text, add_qr_code, add_rectangle, etc.) which return canvas_data
+            - These tools work with or without existing design_id - they create new canvas data if needed
+            - The frontend will handle displaying the updated canvas immediately
+            - IMPORTANT: For QR codes, always use add_qr_code, never create_new_design
+- When users ask to "move", "resize", "delete", "duplicate" elements, use the element manipulation tools
+- When users ask to "change colors", "modify text", use the modification tools
+- NEVER just provide advice - ALWAYS use the tools to perform the actual actions
+- NEVER describe what you would do - ALWAYS call the appropriate tool function
+- DO NOT give generic responses like "I understand your request" - CALL THE TOOLS IMMEDIATELY
+- After using tools, ALWAYS provide a detailed response explaining what you accomplished
+- Be specific about what was created, modified, or added
+- Include relevant details like design IDs, dimensions, colors, or other specifications
+
+You are a POWERFUL AI that can manipulate the banner editor just like a human user. Use your tools to create amazing designs!
+
+IMPORTANT: You MUST call the appropriate tool function for every request. Do not just describe what you would do - actually call the tools. The tools are available and ready to use.
+
+Context about the user:"""
+
+# Sidebar tools the model can call; handlers register themselves with @sidebar_tools.tool()
+sidebar_tools = ToolRegistry()
+
+def _is_cacheable_response(result: Dict[str, Any]) -> bool:
+    """Only successful, read-only answers are reused; anything that touched a design is not"""
+    return bool(result.get("success")) and not result.get("design_created") and not result.get("design_modified")
+
 class AIAgentAdapter(MCPCompliantServiceAdapter):
     """
     🌟 SERVER_TEMPLATES_GUIDE.md Compliant AI Agent Adapter
@@ -77,572 +198,118 @@ class AIAgentAdapter(MCPCompliantServiceAdapter):
         self.openai_client = None
         self._initialized = False
         
+        # Passive provider health; opens after repeated outage-type failures
+        self.circuit_breaker = CircuitBreaker()
+        
+        # Answers for repeat recommendation / design assistance requests
+        self.response_cache = ResponseCache()
+        
         # Add AI agent capabilities
         self.add_capability("design_assistance", "AI-powered banner design assistance")
         self.add_capability("order_help", "AI assistance with order management")
         self.add_capability("banner_recommendations", "AI-powered banner recommendations")
         self.add_capability("general_chat", "General AI chat assistance")
-        
-        # Tool definitions for the AI agent
-        # Initialize with comprehensive sidebar tools
-        self.available_tools = self._initialize_sidebar_tools()
     
-    def _initialize_sidebar_tools(self):
-        """Initialize comprehensive sidebar tools that mirror all user capabilities"""
-        return [
-            # === CANVAS MANAGEMENT TOOLS ===
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_new_design",
-                    "description": "Create a new banner design from scratch",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "name": {"type": "string", "description": "Design name"},
-                            "width": {"type": "number", "description": "Canvas width in pixels"},
-                            "height": {"type": "number", "description": "Canvas height in pixels"},
-                            "background_color": {"type": "string", "description": "Background color (hex)"}
-                        },
-                        "required": ["user_id", "name"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "change_canvas_size",
-                    "description": "Change the canvas dimensions",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "width": {"type": "number", "description": "New width"},
-                            "height": {"type": "number", "description": "New height"}
-                        },
-                        "required": ["user_id", "design_id", "width", "height"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "change_background_color",
-                    "description": "Change the canvas background color",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "color": {"type": "string", "description": "Background color (hex)"}
-                        },
-                        "required": ["user_id", "design_id", "color"]
-                    }
-                }
-            },
-            
-            # === TEXT TOOLS ===
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_text",
-                    "description": "Add text element to the design",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "text": {"type": "string", "description": "Text content"},
-                            "x": {"type": "number", "description": "X position"},
-                            "y": {"type": "number", "description": "Y position"},
-                            "font_size": {"type": "number", "description": "Font size"},
-                            "font_family": {"type": "string", "description": "Font family"},
-                            "color": {"type": "string", "description": "Text color (hex)"},
-                            "align": {"type": "string", "enum": ["left", "center", "right"], "description": "Text alignment"}
-                        },
-                        "required": ["user_id", "design_id", "text"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "modify_text",
-                    "description": "Modify existing text element properties",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "element_id": {"type": "string", "description": "Text element ID"},
-                            "text": {"type": "string", "description": "New text content"},
-                            "font_size": {"type": "number", "description": "New font size"},
-                            "font_family": {"type": "string", "description": "New font family"},
-                            "color": {"type": "string", "description": "New text color (hex)"},
-                            "align": {"type": "string", "enum": ["left", "center", "right"], "description": "New text alignment"}
-                        },
-                        "required": ["user_id", "design_id", "element_id"]
-                    }
-                }
-            },
-            
-            # === SHAPE TOOLS ===
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_rectangle",
-                    "description": "Add rectangle shape to the design",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "x": {"type": "number", "description": "X position"},
-                            "y": {"type": "number", "description": "Y position"},
-                            "width": {"type": "number", "description": "Width"},
-                            "height": {"type": "number", "description": "Height"},
-                            "fill_color": {"type": "string", "description": "Fill color (hex)"},
-                            "stroke_color": {"type": "string", "description": "Stroke color (hex)"},
-                            "stroke_width": {"type": "number", "description": "Stroke width"}
-                        },
-                        "required": ["user_id", "design_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_circle",
-                    "description": "Add circle shape to the design",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "x": {"type": "number", "description": "X position"},
-                            "y": {"type": "number", "description": "Y position"},
-                            "radius": {"type": "number", "description": "Circle radius"},
-                            "fill_color": {"type": "string", "description": "Fill color (hex)"},
-                            "stroke_color": {"type": "string", "description": "Stroke color (hex)"},
-                            "stroke_width": {"type": "number", "description": "Stroke width"}
-                        },
-                        "required": ["user_id", "design_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_star",
-                    "description": "Add star shape to the design",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "x": {"type": "number", "description": "X position"},
-                            "y": {"type": "number", "description": "Y position"},
-                            "num_points": {"type": "number", "description": "Number of star points"},
-                            "inner_radius": {"type": "number", "description": "Inner radius"},
-                            "outer_radius": {"type": "number", "description": "Outer radius"},
-                            "fill_color": {"type": "string", "description": "Fill color (hex)"},
-                            "stroke_color": {"type": "string", "description": "Stroke color (hex)"},
-                            "stroke_width": {"type": "number", "description": "Stroke width"}
-                        },
-                        "required": ["user_id", "design_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_triangle",
-                    "description": "Add triangle shape to the design",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "x": {"type": "number", "description": "X position"},
-                            "y": {"type": "number", "description": "Y position"},
-                            "radius": {"type": "number", "description": "Triangle radius"},
-                            "fill_color": {"type": "string", "description": "Fill color (hex)"},
-                            "stroke_color": {"type": "string", "description": "Stroke color (hex)"},
-                            "stroke_width": {"type": "number", "description": "Stroke width"}
-                        },
-                        "required": ["user_id", "design_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_hexagon",
-                    "description": "Add hexagon shape to the design",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "x": {"type": "number", "description": "X position"},
-                            "y": {"type": "number", "description": "Y position"},
-                            "radius": {"type": "number", "description": "Hexagon radius"},
-                            "fill_color": {"type": "string", "description": "Fill color (hex)"},
-                            "stroke_color": {"type": "string", "description": "Stroke color (hex)"},
-                            "stroke_width": {"type": "number", "description": "Stroke width"}
-                        },
-                        "required": ["user_id", "design_id"]
-                    }
-                }
-            },
-            
-            # === ICON TOOLS ===
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_icon",
-                    "description": "Add an icon from the icon library to the design",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "icon_name": {"type": "string", "description": "Name of the icon to add"},
-                            "x": {"type": "number", "description": "X position"},
-                            "y": {"type": "number", "description": "Y position"},
-                            "width": {"type": "number", "description": "Icon width"},
-                            "height": {"type": "number", "description": "Icon height"}
-                        },
-                        "required": ["user_id", "design_id", "icon_name"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "list_available_icons",
-                    "description": "Get list of available icons by category",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "category": {"type": "string", "description": "Icon category (medical, business, technology, etc.)"}
-                        }
-                    }
-                }
-            },
-            
-            # === QR CODE TOOLS ===
-            {
-                "type": "function",
-                "function": {
-                    "name": "add_qr_code",
-                    "description": "Add QR code element to the design",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "url": {"type": "string", "description": "URL or text to encode"},
-                            "x": {"type": "number", "description": "X position"},
-                            "y": {"type": "number", "description": "Y position"},
-                            "width": {"type": "number", "description": "QR code width"},
-                            "height": {"type": "number", "description": "QR code height"},
-                            "qr_color": {"type": "string", "description": "QR code color (hex)"},
-                            "background_color": {"type": "string", "description": "Background color (hex)"}
-                        },
-                        "required": ["user_id", "design_id", "url"]
-                    }
-                }
-            },
-            
-            # === ELEMENT MANIPULATION TOOLS ===
-            {
-                "type": "function",
-                "function": {
-                    "name": "move_element",
-                    "description": "Move an element to a new position",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "element_id": {"type": "string", "description": "Element ID to move"},
-                            "x": {"type": "number", "description": "New X position"},
-                            "y": {"type": "number", "description": "New Y position"}
-                        },
-                        "required": ["user_id", "design_id", "element_id", "x", "y"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "resize_element",
-                    "description": "Resize an element",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "element_id": {"type": "string", "description": "Element ID to resize"},
-                            "width": {"type": "number", "description": "New width"},
-                            "height": {"type": "number", "description": "New height"}
-                        },
-                        "required": ["user_id", "design_id", "element_id", "width", "height"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "change_element_color",
-                    "description": "Change the color of an element",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "element_id": {"type": "string", "description": "Element ID"},
-                            "fill_color": {"type": "string", "description": "New fill color (hex)"},
-                            "stroke_color": {"type": "string", "description": "New stroke color (hex)"}
-                        },
-                        "required": ["user_id", "design_id", "element_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "delete_element",
-                    "description": "Delete an element from the design",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "element_id": {"type": "string", "description": "Element ID to delete"}
-                        },
-                        "required": ["user_id", "design_id", "element_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "duplicate_element",
-                    "description": "Duplicate an element",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "element_id": {"type": "string", "description": "Element ID to duplicate"},
-                            "x_offset": {"type": "number", "description": "X offset for duplicate"},
-                            "y_offset": {"type": "number", "description": "Y offset for duplicate"}
-                        },
-                        "required": ["user_id", "design_id", "element_id"]
-                    }
-                }
-            },
-            
-            # === LAYER MANAGEMENT TOOLS ===
-            {
-                "type": "function",
-                "function": {
-                    "name": "bring_to_front",
-                    "description": "Bring element to front layer",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "element_id": {"type": "string", "description": "Element ID"}
-                        },
-                        "required": ["user_id", "design_id", "element_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "send_to_back",
-                    "description": "Send element to back layer",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "element_id": {"type": "string", "description": "Element ID"}
-                        },
-                        "required": ["user_id", "design_id", "element_id"]
-                    }
-                }
-            },
-            
-            # === DESIGN MANAGEMENT TOOLS ===
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_user_designs",
-                    "description": "Get user's saved designs and templates",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"}
-                        },
-                        "required": ["user_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "save_design",
-                    "description": "Save the current design",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "design_id": {"type": "string", "description": "Design ID"},
-                            "name": {"type": "string", "description": "Design name"}
-                        },
-                        "required": ["user_id", "design_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "generate_banner_from_prompt",
-                    "description": "Generate a complete banner design from a text prompt",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "prompt": {"type": "string", "description": "Text description of the banner to create"},
-                            "style": {"type": "string", "description": "Design style (modern, vintage, corporate, creative)"},
-                            "width": {"type": "number", "description": "Banner width"},
-                            "height": {"type": "number", "description": "Banner height"}
-                        },
-                        "required": ["user_id", "prompt"]
-                    }
-                }
-            },
-            
-            # === ORDER AND PRODUCT TOOLS ===
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_user_orders",
-                    "description": "Get user's order history and status",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "user_id": {"type": "string", "description": "User ID"},
-                            "order_id": {"type": "string", "description": "Specific order ID (optional)"}
-                        },
-                        "required": ["user_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_banner_products",
-                    "description": "Get available banner products and specifications",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "product_type": {"type": "string", "description": "Type of product (banner, sign, sticker, etc.)"}
-                        }
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "calculate_banner_pricing",
-                    "description": "Calculate pricing for banner orders",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "product_type": {"type": "string", "description": "Type of product"},
-                            "quantity": {"type": "number", "description": "Quantity to order"},
-                            "dimensions": {"type": "object", "description": "Product dimensions"}
-                        },
-                        "required": ["product_type", "quantity", "dimensions"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_design_recommendations",
-                    "description": "Get AI-powered design recommendations",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "use_case": {"type": "string", "description": "Intended use case for the banner"},
-                            "industry": {"type": "string", "description": "Industry or business type"},
-                            "dimensions": {"type": "object", "description": "Banner dimensions"}
-                        },
-                        "required": ["use_case"]
-                    }
-                }
-            }
-        ]
+    @property
+    def available_tools(self) -> List[Dict[str, Any]]:
+        """OpenAI tool schemas, built once from the registered handlers"""
+        return sidebar_tools.schemas()
     
     async def initialize(self) -> bool:
-        """Initialize AI agent adapter with health check"""
-        # If already initialized, return success
+        """
+        Create the OpenAI client on first use. No test request is made: provider
+        health is tracked passively by the circuit breaker from real calls.
+        """
         if self._initialized and self.openai_client:
-            logger.info("AI Agent already initialized, skipping initialization")
             return True
-            
+        
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            self.initialization_error = "OpenAI API key not configured"
+            logger.error("OpenAI API key not found in environment variables")
+            return False
+        
         try:
-            # Check if OpenAI API key is configured
-            api_key = os.getenv("OPENAI_API_KEY")
-            logger.info(f"Environment check - OPENAI_API_KEY exists: {bool(api_key)}")
-            logger.info(f"Environment check - API key length: {len(api_key) if api_key else 0}")
-            logger.info(f"Environment check - API key prefix: {api_key[:10] if api_key else 'None'}...")
-            
-            # Debug: Show all OpenAI-related environment variables
-            openai_vars = {k: v for k, v in os.environ.items() if 'OPENAI' in k.upper()}
-            logger.info(f"All OpenAI environment variables: {list(openai_vars.keys())}")
-            
-            if not api_key:
-                self.initialization_error = "OpenAI API key not configured"
-                logger.error("OpenAI API key not found in environment variables")
-                return False
-            
-            # Initialize OpenAI client
-            self.openai_client = AsyncOpenAI(
-                api_key=api_key,
-                http_client=httpx.AsyncClient()
-            )
-            
-            # Test OpenAI API
-            test_response = await self.openai_client.chat.completions.create(
-                model="gpt-5-mini-2025-08-07",
-                messages=[{"role": "user", "content": "Hello"}],
-                max_completion_tokens=100
-            )
-            
-            if test_response.choices:
-                self._initialized = True
-                logger.info("✅ AI Agent Adapter initialized successfully")
-                return True
-            else:
-                self.initialization_error = "OpenAI API test failed"
-                return False
-                
+            # One pooled HTTP client, created inside the running event loop
+            self.openai_client = AsyncOpenAI(api_key=api_key, http_client=build_http_client())
+            self._initialized = True
+            self.initialization_error = None
+            logger.info("✅ AI Agent Adapter initialized")
+            return True
         except Exception as e:
             self.initialization_error = str(e)
             logger.error(f"❌ AI Agent Adapter initialization failed: {e}")
             return False
     
+    async def get_health(self) -> Dict[str, Any]:
+        """Passive health: configuration plus the circuit breaker's view of recent calls"""
+        provider = self.circuit_breaker.health()
+        if not os.getenv("OPENAI_API_KEY"):
+            status = "unhealthy"
+        elif provider["circuit"] == "closed":
+            status = "healthy"
+        else:
+            status = "degraded"
+        return {
+            **await super().get_health(),
+            "status": status,
+            "initialized": bool(self._initialized and self.openai_client),
+            "provider": provider
+        }
+    
+    async def cleanup(self):
+        """Close the shared OpenAI HTTP client"""
+        await super().cleanup()
+        if self.openai_client:
+            await self.openai_client.close()
+            self.openai_client = None
+            self._initialized = False
+    
+    async def _create_chat_completion(self, operation: str, attribute_to: Optional[List[str]] = None, **kwargs):
+        """
+        Call the OpenAI chat completions API, recording latency per operation and
+        token usage / cost for the current user. attribute_to names the tools the
+        call's usage is charged to (defaults to the tool currently running, if any).
+        """
+        model = kwargs.get("model", "")
+        if kwargs.get("stream"):
+            # Streams only report usage in a final chunk when asked to
+            kwargs.setdefault("stream_options", {"include_usage": True})
+        # Fail fast while the provider is down instead of waiting out a timeout
+        self.circuit_breaker.before_call()
+        start = time.perf_counter()
+        try:
+            with timed(openai_request_duration_seconds, operation=operation, model=model):
+                response = await self.openai_client.chat.completions.create(**kwargs)
+        except Exception as e:
+            self.circuit_breaker.record(e)
+            raise
+        except BaseException:
+            # Cancelled by a tool timeout or client disconnect: no outcome, but free a half-open trial
+            self.circuit_breaker.release_trial()
+            raise
+        self.circuit_breaker.record(None)
+        if kwargs.get("stream"):
+            return self._record_stream_usage(response, operation, model, start, attribute_to)
+        usage_tracker.record(operation, model, getattr(response, "usage", None),
+                             time.perf_counter() - start, tools=attribute_to)
+        return response
+    
+    async def _record_stream_usage(self, stream, operation: str, model: str, start: float,
+                                   attribute_to: Optional[List[str]]) -> AsyncIterator[Any]:
+        """Pass stream chunks through and record usage once the stream is consumed"""
+        usage = None
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                yield chunk
+        except Exception as e:
+            self.circuit_breaker.record(e)
+            raise
+        finally:
+            usage_tracker.record(operation, model, usage, time.perf_counter() - start, tools=attribute_to)
+    
     async def chat_with_ai(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         🌟 MCP Tool with automatic compliance
@@ -681,8 +348,9 @@ class AIAgentAdapter(MCPCompliantServiceAdapter):
             
             # Call OpenAI with function calling
             logger.info(f"Calling OpenAI with {len(self.available_tools)} tools available")
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-5-mini-2025-08-07",
+            response = await self._create_chat_completion(
+                "chat",
+                model=CHAT_MODEL,
                 messages=messages,
                 tools=self.available_tools,
                 tool_choice="auto",
@@ -690,13 +358,14 @@ class AIAgentAdapter(MCPCompliantServiceAdapter):
             )
             
             # Process the response
-            result = await self._process_ai_response(response, context)
+            result = await self._process_ai_response(response, context, system_message)
             
             # Handle structured response (with design data) or simple text response
             if isinstance(result, dict) and "response" in result:
                 # Structured response with design data
                 return {
-                    "success": True,
+                    "success": not result.get("error"),
+                    "error": result.get("error"),
                     "response": result["response"],
                     "design_created": result.get("design_created", False),
                     "design_modified": result.get("design_modified", False),
@@ -722,18 +391,168 @@ class AIAgentAdapter(MCPCompliantServiceAdapter):
                 "server_templates_guide_compliant": True
             }
     
-    async def get_design_assistance(self, design_type: str, requirements: Dict[str, Any], user_preferences: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Get AI-powered design assistance"""
+    async def chat_with_ai_stream(self, query: str, context: Dict[str, Any] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of chat_with_ai
+        
+        Yields {"event": name, "data": payload} dicts: "token" as reply text arrives,
+        "tool_start" / "tool_result" while tools run, "canvas" with the canvas after each
+        successful edit, then a final "done" (same payload as chat_with_ai) or "error".
+        """
         try:
             # Ensure OpenAI client is initialized
             if not self._initialized or not self.openai_client:
                 initialized = await self.initialize()
                 if not initialized:
-                    return {
+                    yield {"event": "error", "data": {
+                        "success": False,
                         "response": "AI Agent is not available. Please check configuration.",
                         "error": self.initialization_error
-                    }
+                    }}
+                    return
             
+            context = context or {}
+            system_message = self._build_system_message(context)
+            messages = [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": query}
+            ]
+            
+            stream = await self._create_chat_completion(
+                "chat_stream",
+                model=CHAT_MODEL,
+                messages=messages,
+                tools=self.available_tools,
+                tool_choice="auto",
+                max_completion_tokens=1500,
+                stream=True
+            )
+            
+            # Forward reply tokens and assemble tool calls from their streamed fragments
+            content_parts: List[str] = []
+            tool_call_parts: Dict[int, Dict[str, str]] = {}
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content_parts.append(delta.content)
+                    yield {"event": "token", "data": {"text": delta.content}}
+                for tool_call in delta.tool_calls or []:
+                    part = tool_call_parts.setdefault(tool_call.index, {"id": "", "name": "", "arguments": ""})
+                    if tool_call.id:
+                        part["id"] = tool_call.id
+                    if tool_call.function:
+                        part["name"] += tool_call.function.name or ""
+                        part["arguments"] += tool_call.function.arguments or ""
+            
+            if not tool_call_parts:
+                yield {"event": "done", "data": {
+                    "success": True,
+                    "response": "".join(content_parts),
+                    "mcp_compliant": True,
+                    "server_templates_guide_compliant": True
+                }}
+                return
+            
+            tool_calls = [
+                SimpleNamespace(id=part["id"], type="function",
+                                function=SimpleNamespace(name=part["name"], arguments=part["arguments"]))
+                for _, part in sorted(tool_call_parts.items())
+            ]
+            logger.info(f"AI wants to call {len(tool_calls)} tools (streaming)")
+            
+            # Run tools as in _process_ai_response, relaying scheduler events as they happen
+            events: asyncio.Queue = asyncio.Queue()
+            scheduler = ToolScheduler(self._execute_tool_function, known_tools=sidebar_tools,
+                                      on_event=lambda name, payload: events.put_nowait((name, payload)))
+            async with design_session() as session:
+                run = asyncio.ensure_future(scheduler.run(tool_calls, context))
+                run.add_done_callback(lambda _: events.put_nowait(None))
+                try:
+                    while True:
+                        item = await events.get()
+                        if item is None:
+                            break
+                        name, payload = item
+                        if name == "tool_start":
+                            yield {"event": "tool_start", "data": payload}
+                            continue
+                        result = payload["result"] if isinstance(payload["result"], dict) else {}
+                        yield {"event": "tool_result", "data": {
+                            "tool_call_id": payload["tool_call_id"],
+                            "function_name": payload["function_name"],
+                            "success": result.get("success", False),
+                            "message": result.get("message"),
+                            "error": result.get("error"),
+                            "duration": payload["duration"]
+                        }}
+                        if result.get("success") and result.get("canvas_data"):
+                            yield {"event": "canvas", "data": {
+                                "tool_call_id": payload["tool_call_id"],
+                                "design_data": result.get("design_data") or {"canvas_data": result["canvas_data"]}
+                            }}
+                    tool_results = run.result()
+                finally:
+                    if not run.done():
+                        run.cancel()
+                session_designs = session.modified()
+            save_error = self._mark_unsaved(tool_calls, tool_results, session.unsaved)
+            for tool_result in tool_results:
+                if tool_result.get("unsaved"):
+                    yield {"event": "tool_result", "data": {
+                        "tool_call_id": tool_result["tool_call_id"],
+                        "function_name": tool_result["function_name"],
+                        "success": False,
+                        "message": None,
+                        "error": tool_result["result"]["error"],
+                        "duration": tool_result["duration"]
+                    }}
+            
+            # Stream the follow-up reply describing what the tools did
+            final_stream = await self._create_chat_completion(
+                "chat_followup_stream",
+                attribute_to=[tool_label(r["function_name"], sidebar_tools) for r in tool_results],
+                model=CHAT_MODEL,
+                messages=self._build_followup_messages(system_message, "".join(content_parts), tool_calls, tool_results),
+                max_completion_tokens=1000,
+                stream=True
+            )
+            final_parts: List[str] = []
+            async for chunk in final_stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    final_parts.append(chunk.choices[0].delta.content)
+                    yield {"event": "token", "data": {"text": chunk.choices[0].delta.content}}
+            
+            final_content = "".join(final_parts)
+            if not final_content.strip():
+                final_content = self._fallback_tool_response(tool_results)
+                yield {"event": "token", "data": {"text": final_content}}
+            
+            design_created, design_modified, design_data = self._summarize_design_changes(tool_results, session_designs)
+            yield {"event": "done", "data": {
+                "success": not save_error,
+                "error": save_error,
+                "response": final_content,
+                "design_created": design_created,
+                "design_modified": design_modified,
+                "design_data": design_data,
+                "mcp_compliant": True,
+                "server_templates_guide_compliant": True
+            }}
+            
+        except Exception as e:
+            logger.error(f"AI Chat stream error: {e}")
+            yield {"event": "error", "data": {
+                "success": False,
+                "error": str(e),
+                "mcp_compliant": True,
+                "server_templates_guide_compliant": True
+            }}
+    
+    async def get_design_assistance(self, design_type: str, requirements: Dict[str, Any], user_preferences: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Get AI-powered design assistance (cached per normalized request)"""
+        try:
             if not user_preferences:
                 user_preferences = {}
             
@@ -754,7 +573,10 @@ class AIAgentAdapter(MCPCompliantServiceAdapter):
                 "user_preferences": user_preferences
             }
             
-            return await self.chat_with_ai(query, context)
+            key = cache_key("design_assistance", context, CHAT_MODEL, PROMPT_VERSION)
+            return await self.response_cache.get_or_compute(
+                "design_assistance", key, lambda: self.chat_with_ai(query, context), _is_cacheable_response
+            )
             
         except Exception as e:
             logger.error(f"Design assistance error: {e}")
@@ -801,17 +623,8 @@ class AIAgentAdapter(MCPCompliantServiceAdapter):
             }
     
     async def get_banner_recommendations(self, use_case: str, dimensions: Dict[str, Any] = None, budget: float = None) -> Dict[str, Any]:
-        """Get AI-powered banner recommendations"""
+        """Get AI-powered banner recommendations (cached per normalized request)"""
         try:
-            # Ensure OpenAI client is initialized
-            if not self._initialized or not self.openai_client:
-                initialized = await self.initialize()
-                if not initialized:
-                    return {
-                        "response": "AI Agent is not available. Please check configuration.",
-                        "error": self.initialization_error
-                    }
-            
             # Build recommendation query
             query = f"""
             I need banner recommendations for: {use_case}
@@ -831,7 +644,10 @@ class AIAgentAdapter(MCPCompliantServiceAdapter):
                 "budget": budget
             }
             
-            return await self.chat_with_ai(query, context)
+            key = cache_key("banner_recommendations", context, CHAT_MODEL, PROMPT_VERSION)
+            return await self.response_cache.get_or_compute(
+                "banner_recommendations", key, lambda: self.chat_with_ai(query, context), _is_cacheable_response
+            )
             
         except Exception as e:
             logger.error(f"Banner recommendations error: {e}")
@@ -843,97 +659,12 @@ class AIAgentAdapter(MCPCompliantServiceAdapter):
             }
     
     def _build_system_message(self, context: Dict[str, Any]) -> str:
-        """Build system message with context"""
-        system_message = """You are an AI assistant for BuyPrintz, a professional banner printing platform. You have FULL PROGRAMMATIC CONTROL of the banner editor and can use ALL sidebar tools that users have access to.
-
-You help users with:
-1. Banner design assistance and recommendations
-2. Order management and tracking
-3. Product selection and pricing
-4. General questions about banners and printing
-5. Creating new banner designs from text descriptions
-6. Modifying existing banner designs
-7. Adding elements to banners
-8. Generating QR codes for URLs or text
-
-You have access to COMPREHENSIVE SIDEBAR TOOLS that let you:
-
-=== CANVAS MANAGEMENT ===
-- create_new_design: Create new banner designs from scratch
-- change_canvas_size: Change canvas dimensions
-- change_background_color: Change canvas background color
-
-=== TEXT TOOLS ===
-- add_text: Add text elements with full formatting control
-- modify_text: Modify existing text properties (content, font, color, alignment)
-
-=== SHAPE TOOLS ===
-- add_rectangle: Add rectangle shapes
-- add_circle: Add circle shapes
-- add_star: Add star shapes with customizable points and radii
-- add_triangle: Add triangle shapes
-- add_hexagon: Add hexagon shapes
-
-=== ICON TOOLS ===
-- add_icon: Add icons from the comprehensive icon library
-- list_available_icons: Get available icons by category
-
-=== QR CODE TOOLS ===
-- add_qr_code: Generate and add QR codes with custom colors
-
-=== ELEMENT MANIPULATION ===
-- move_element: Move elements to new positions
-- resize_element: Resize elements
-- change_element_color: Change element colors
-- delete_element: Delete elements
-- duplicate_element: Duplicate elements
-
-=== LAYER MANAGEMENT ===
-- bring_to_front: Bring elements to front layer
-- send_to_back: Send elements to back layer
-
-=== DESIGN MANAGEMENT ===
-- get_user_designs: Get user's saved designs
-- save_design: Save current designs
-- generate_banner_from_prompt: Generate complete banners from text prompts
-
-=== ORDER & PRODUCT TOOLS ===
-- get_user_orders: Get order history and status
-- get_banner_products: Get available products
-- calculate_banner_pricing: Calculate pricing
-- get_design_recommendations: Get AI-powered recommendations
-
-CRITICAL INSTRUCTIONS:
-- You have FULL CONTROL of the banner editor - use the tools to perform actual actions
-- When users ask to "create a banner", "generate a banner", or "make a banner", you MUST call generate_banner_from_prompt
-- When users ask to "add text", "add shapes", "add icons", use the specific add_* tools
-            - When users ask to "add QR code", "generate QR code", "create QR code", you MUST call add_qr_code (NOT create_new_design)
-            - The add_qr_code tool will automatically create a new canvas if no design_id is provided
-            - For immediate canvas updates, use direct manipulation tools (add_text, add_qr_code, add_rectangle, etc.) which return canvas_data
-            - These tools work with or without existing design_id - they create new canvas data if needed
-            - The frontend will handle displaying the updated canvas immediately
-            - IMPORTANT: For QR codes, always use add_qr_code, never create_new_design
-- When users ask to "move", "resize", "delete", "duplicate" elements, use the element manipulation tools
-- When users ask to "change colors", "modify text", use the modification tools
-- NEVER just provide advice - ALWAYS use the tools to perform the actual actions
-- NEVER describe what you would do - ALWAYS call the appropriate tool function
-- DO NOT give generic responses like "I understand your request" - CALL THE TOOLS IMMEDIATELY
-- After using tools, ALWAYS provide a detailed response explaining what you accomplished
-- Be specific about what was created, modified, or added
-- Include relevant details like design IDs, dimensions, colors, or other specifications
-
-You are a POWERFUL AI that can manipulate the banner editor just like a human user. Use your tools to create amazing designs!
-
-IMPORTANT: You MUST call the appropriate tool function for every request. Do not just describe what you would do - actually call the tools. The tools are available and ready to use.
-
-Context about the user:"""
-        
+        """Build system message with context (static prompt prefix + compact context JSON)"""
         if context:
-            system_message += f"\n{json.dumps(context, indent=2)}"
-        
-        return system_message
+            return f"{SYSTEM_PROMPT}\n{json.dumps(context, separators=(',', ':'), default=str)}"
+        return SYSTEM_PROMPT
     
-    async def _process_ai_response(self, response, context: Dict[str, Any]) -> str:
+    async def _process_ai_response(self, response, context: Dict[str, Any], system_message: Optional[str] = None) -> str:
         """Process AI response and handle function calls"""
         try:
             message = response.choices[0].message
@@ -941,49 +672,23 @@ Context about the user:"""
             # Check if the AI wants to call a function
             if message.tool_calls:
                 logger.info(f"AI wants to call {len(message.tool_calls)} tools")
-                # Execute function calls
-                tool_results = []
-                for tool_call in message.tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-                    logger.info(f"Executing tool: {function_name}")
-                    
-                    # Execute the function
-                    result = await self._execute_tool_function(function_name, function_args, context)
-                    tool_results.append({
-                        "tool_call_id": tool_call.id,
-                        "function_name": function_name,
-                        "result": result
-                    })
-                
-                # Get final response with tool results
-                final_messages = [
-                    {"role": "system", "content": self._build_system_message(context)},
-                    {"role": "user", "content": "Please provide a detailed, helpful response about what you just accomplished with the tools. Be specific about what was created or modified. Include details about the design elements, colors, dimensions, and any other specifications."},
-                    {"role": "assistant", "content": message.content or "", "tool_calls": [
-                        {
-                            "id": tc.id,
-                            "type": tc.type,
-                            "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments
-                            }
-                        } for tc in message.tool_calls
-                    ]}
-                ]
-                
-                # Add tool results to messages
-                for tool_result in tool_results:
-                    final_messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_result["tool_call_id"],
-                        "content": json.dumps(tool_result["result"])
-                    })
+                # Execute function calls concurrently, in order per design. All tools in this
+                # turn share one design session, which persists each modified design once.
+                async with design_session() as session:
+                    tool_results = await ToolScheduler(self._execute_tool_function, known_tools=sidebar_tools).run(
+                        message.tool_calls, context)
+                    session_designs = session.modified()
+                save_error = self._mark_unsaved(message.tool_calls, tool_results, session.unsaved)
                 
                 # Get final response
-                final_response = await self.openai_client.chat.completions.create(
-                    model="gpt-5-mini-2025-08-07",
-                    messages=final_messages,
+                final_response = await self._create_chat_completion(
+                    "chat_followup",
+                    attribute_to=[tool_label(r["function_name"], sidebar_tools) for r in tool_results],
+                    model=CHAT_MODEL,
+                    messages=self._build_followup_messages(
+                        system_message or self._build_system_message(context),
+                        message.content, message.tool_calls, tool_results
+                    ),
                     max_completion_tokens=1000
                 )
                 
@@ -991,58 +696,18 @@ Context about the user:"""
                 
                 # If final content is empty, provide a fallback response
                 if not final_content or final_content.strip() == "":
-                    # Create a more specific fallback based on what tools were executed
-                    if tool_results:
-                        tool_names = [tr["function_name"] for tr in tool_results]
-                        if "add_qr_code" in tool_names:
-                            final_content = "I've successfully added a QR code to your canvas! The QR code has been generated and is now visible on your design."
-                        elif "add_text" in tool_names:
-                            final_content = "I've successfully added text to your canvas! The text element has been created and is now visible on your design."
-                        elif "generate_banner_from_prompt" in tool_names:
-                            final_content = "I've successfully generated your banner design! The complete banner has been created and is now ready for you to view and customize."
-                        else:
-                            final_content = "I've successfully completed your request! The design has been updated and is now ready for you to view and customize."
-                    else:
-                        final_content = "I've successfully completed your request! The design has been updated and is now ready for you to view and customize."
+                    final_content = self._fallback_tool_response(tool_results)
                 
-                # Check if any tool created or modified a design
-                design_created = False
-                design_modified = False
-                design_data = None
-                
-                for tool_result in tool_results:
-                    # Design creation tools
-                    if tool_result["function_name"] in ["generate_banner_from_prompt", "create_banner_design", "create_new_design"]:
-                        if tool_result["result"].get("success"):
-                            design_created = True
-                            design_data = tool_result["result"].get("canvas_data")
-                            break
-                    # Design modification tools
-                    elif tool_result["function_name"] in [
-                        "modify_banner_design", "add_element_to_design", "generate_qr_code", "add_qr_code",
-                        "add_text", "modify_text", "add_rectangle", "add_circle", "add_star", "add_triangle", "add_hexagon",
-                        "add_icon", "move_element", "resize_element", "change_element_color", "delete_element",
-                        "duplicate_element", "bring_to_front", "send_to_back", "change_canvas_size", "change_background_color"
-                    ]:
-                        if tool_result["result"].get("success"):
-                            design_modified = True
-                            # Try to get design_data first, then fallback to canvas_data
-                            design_data = tool_result["result"].get("design_data") or tool_result["result"].get("canvas_data")
-                            break
+                design_created, design_modified, design_data = self._summarize_design_changes(tool_results, session_designs)
                 
                 # Return structured response with design data if applicable
-                if design_created or design_modified:
-                    # Ensure design_data has the correct structure for frontend
-                    if design_data and not isinstance(design_data, dict):
-                        design_data = {"canvas_data": design_data}
-                    elif design_data and "canvas_data" not in design_data:
-                        design_data = {"canvas_data": design_data}
-                    
+                if design_created or design_modified or save_error:
                     return {
                         "response": final_content,
                         "design_created": design_created,
                         "design_modified": design_modified,
-                        "design_data": design_data
+                        "design_data": design_data,
+                        "error": save_error
                     }
                 else:
                     return final_content
@@ -1054,258 +719,119 @@ Context about the user:"""
             logger.error(f"Error processing AI response: {e}")
             return f"I apologize, but I encountered an error while processing your request: {str(e)}"
     
+    def _build_followup_messages(self, system_message: str, assistant_content: Optional[str], tool_calls: List[Any], tool_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Messages for the second completion that turns tool results into a reply"""
+        final_messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": "Please provide a detailed, helpful response about what you just accomplished with the tools. Be specific about what was created or modified. Include details about the design elements, colors, dimensions, and any other specifications."},
+            {"role": "assistant", "content": assistant_content or "", "tool_calls": [
+                {
+                    "id": tc.id,
+                    "type": tc.type,
+                    "function": {
+                        "name": tc.function.name,
+                        "arguments": tc.function.arguments
+                    }
+                } for tc in tool_calls
+            ]}
+        ]
+        
+        # Add tool results to messages
+        for tool_result in tool_results:
+            final_messages.append({
+                "role": "tool",
+                "tool_call_id": tool_result["tool_call_id"],
+                "content": json.dumps(tool_result["result"])
+            })
+        return final_messages
+    
+    def _fallback_tool_response(self, tool_results: List[Dict[str, Any]]) -> str:
+        """Reply used when the follow-up completion comes back empty"""
+        # Create a more specific fallback based on what tools were executed
+        tool_names = [tr["function_name"] for tr in tool_results]
+        if "add_qr_code" in tool_names:
+            return "I've successfully added a QR code to your canvas! The QR code has been generated and is now visible on your design."
+        elif "add_text" in tool_names:
+            return "I've successfully added text to your canvas! The text element has been created and is now visible on your design."
+        elif "generate_banner_from_prompt" in tool_names:
+            return "I've successfully generated your banner design! The complete banner has been created and is now ready for you to view and customize."
+        return "I've successfully completed your request! The design has been updated and is now ready for you to view and customize."
+    
+    def _mark_unsaved(self, tool_calls: List[Any], tool_results: List[Dict[str, Any]],
+                      unsaved: Dict[str, str]) -> Optional[str]:
+        """
+        Fail the successful results of tools whose design the turn's commit could
+        not write (the edits only ever existed in memory). Returns the error, if any.
+        """
+        if not unsaved:
+            return None
+        design_ids = {}
+        for tool_call in tool_calls:
+            try:
+                args = json.loads(tool_call.function.arguments or "{}")
+            except ValueError:
+                continue
+            if isinstance(args, dict):
+                design_ids[tool_call.id] = args.get("design_id")
+        for tool_result in tool_results:
+            error = unsaved.get(design_ids.get(tool_result["tool_call_id"]))
+            result = tool_result["result"]
+            if error and isinstance(result, dict) and result.get("success"):
+                tool_result["result"] = {"success": False, "error": f"Changes could not be saved: {error}"}
+                tool_result["unsaved"] = True
+        return "; ".join(f"Could not save design {design_id}: {error}" for design_id, error in unsaved.items())
+    
+    def _summarize_design_changes(self, tool_results: List[Dict[str, Any]], session_designs: List[Any]):
+        """Return (design_created, design_modified, design_data) for a turn's tool results"""
+        design_created = False
+        design_modified = False
+        design_data = None
+        
+        for tool_result in tool_results:
+            # Design creation tools
+            if tool_result["function_name"] in ["generate_banner_from_prompt", "create_banner_design", "create_new_design"]:
+                if tool_result["result"].get("success"):
+                    design_created = True
+                    design_data = tool_result["result"].get("canvas_data")
+                    break
+            # Design modification tools
+            elif tool_result["function_name"] in DESIGN_MODIFYING_TOOLS:
+                if tool_result["result"].get("success"):
+                    design_modified = True
+                    # Try to get design_data first, then fallback to canvas_data
+                    design_data = tool_result["result"].get("design_data") or tool_result["result"].get("canvas_data")
+                    break
+        
+        # The session holds the merged result of every edit made this turn
+        if design_modified and session_designs:
+            design_data = session_designs[-1].design_data()
+        
+        # Ensure design_data has the correct structure for frontend
+        if design_data and not isinstance(design_data, dict):
+            design_data = {"canvas_data": design_data}
+        elif design_data and "canvas_data" not in design_data:
+            design_data = {"canvas_data": design_data}
+        
+        return design_created, design_modified, design_data
+    
     async def _execute_tool_function(self, function_name: str, function_args: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute comprehensive sidebar tool functions"""
+        # OpenAI calls made inside the tool are charged to it (unregistered names to "unknown")
+        token = current_ai_tool.set(tool_label(function_name, sidebar_tools))
         try:
-            # === CANVAS MANAGEMENT TOOLS ===
-            if function_name == "create_new_design":
-                return await self._create_new_design(
-                    function_args.get("user_id"),
-                    function_args.get("name"),
-                    function_args.get("width"),
-                    function_args.get("height"),
-                    function_args.get("background_color")
-                )
-            elif function_name == "change_canvas_size":
-                return await self._change_canvas_size(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("width"),
-                    function_args.get("height")
-                )
-            elif function_name == "change_background_color":
-                return await self._change_background_color(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("color")
-                )
-            
-            # === TEXT TOOLS ===
-            elif function_name == "add_text":
-                return await self._add_text(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("text"),
-                    function_args.get("x"),
-                    function_args.get("y"),
-                    function_args.get("font_size"),
-                    function_args.get("font_family"),
-                    function_args.get("color"),
-                    function_args.get("align")
-                )
-            elif function_name == "modify_text":
-                return await self._modify_text(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("element_id"),
-                    function_args.get("text"),
-                    function_args.get("font_size"),
-                    function_args.get("font_family"),
-                    function_args.get("color"),
-                    function_args.get("align")
-                )
-            
-            # === SHAPE TOOLS ===
-            elif function_name == "add_rectangle":
-                return await self._add_rectangle(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("x"),
-                    function_args.get("y"),
-                    function_args.get("width"),
-                    function_args.get("height"),
-                    function_args.get("fill_color"),
-                    function_args.get("stroke_color"),
-                    function_args.get("stroke_width")
-                )
-            elif function_name == "add_circle":
-                return await self._add_circle(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("x"),
-                    function_args.get("y"),
-                    function_args.get("radius"),
-                    function_args.get("fill_color"),
-                    function_args.get("stroke_color"),
-                    function_args.get("stroke_width")
-                )
-            elif function_name == "add_star":
-                return await self._add_star(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("x"),
-                    function_args.get("y"),
-                    function_args.get("num_points"),
-                    function_args.get("inner_radius"),
-                    function_args.get("outer_radius"),
-                    function_args.get("fill_color"),
-                    function_args.get("stroke_color"),
-                    function_args.get("stroke_width")
-                )
-            elif function_name == "add_triangle":
-                return await self._add_triangle(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("x"),
-                    function_args.get("y"),
-                    function_args.get("radius"),
-                    function_args.get("fill_color"),
-                    function_args.get("stroke_color"),
-                    function_args.get("stroke_width")
-                )
-            elif function_name == "add_hexagon":
-                return await self._add_hexagon(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("x"),
-                    function_args.get("y"),
-                    function_args.get("radius"),
-                    function_args.get("fill_color"),
-                    function_args.get("stroke_color"),
-                    function_args.get("stroke_width")
-                )
-            
-            # === ICON TOOLS ===
-            elif function_name == "add_icon":
-                return await self._add_icon(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("icon_name"),
-                    function_args.get("x"),
-                    function_args.get("y"),
-                    function_args.get("width"),
-                    function_args.get("height")
-                )
-            elif function_name == "list_available_icons":
-                return await self._list_available_icons(function_args.get("category"))
-            
-            # === QR CODE TOOLS ===
-            elif function_name == "add_qr_code":
-                return await self._add_qr_code(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("url"),
-                    function_args.get("x"),
-                    function_args.get("y"),
-                    function_args.get("width"),
-                    function_args.get("height"),
-                    function_args.get("qr_color"),
-                    function_args.get("background_color")
-                )
-            
-            # === ELEMENT MANIPULATION TOOLS ===
-            elif function_name == "move_element":
-                return await self._move_element(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("element_id"),
-                    function_args.get("x"),
-                    function_args.get("y")
-                )
-            elif function_name == "resize_element":
-                return await self._resize_element(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("element_id"),
-                    function_args.get("width"),
-                    function_args.get("height")
-                )
-            elif function_name == "change_element_color":
-                return await self._change_element_color(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("element_id"),
-                    function_args.get("fill_color"),
-                    function_args.get("stroke_color")
-                )
-            elif function_name == "delete_element":
-                return await self._delete_element(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("element_id")
-                )
-            elif function_name == "duplicate_element":
-                return await self._duplicate_element(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("element_id"),
-                    function_args.get("x_offset"),
-                    function_args.get("y_offset")
-                )
-            
-            # === LAYER MANAGEMENT TOOLS ===
-            elif function_name == "bring_to_front":
-                return await self._bring_to_front(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("element_id")
-                )
-            elif function_name == "send_to_back":
-                return await self._send_to_back(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("element_id")
-                )
-            
-            # === DESIGN MANAGEMENT TOOLS ===
-            elif function_name == "get_user_designs":
-                return await self._get_user_designs(function_args.get("user_id"))
-            elif function_name == "save_design":
-                return await self._save_design(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("name")
-                )
-            elif function_name == "generate_banner_from_prompt":
-                return await self._generate_banner_from_prompt(
-                    function_args.get("user_id"),
-                    function_args.get("prompt"),
-                    function_args.get("style"),
-                    function_args.get("width"),
-                    function_args.get("height")
-                )
-            
-            # === ORDER AND PRODUCT TOOLS ===
-            elif function_name == "get_user_orders":
-                return await self._get_user_orders(function_args.get("user_id"), function_args.get("order_id"))
-            elif function_name == "get_banner_products":
-                return await self._get_banner_products()
-            elif function_name == "calculate_banner_pricing":
-                return await self._calculate_banner_pricing(
-                    function_args.get("product_type"),
-                    function_args.get("quantity"),
-                    function_args.get("dimensions")
-                )
-            elif function_name == "get_design_recommendations":
-                return await self._get_design_recommendations(
-                    function_args.get("use_case"),
-                    function_args.get("industry"),
-                    function_args.get("dimensions")
-                )
-            
-            # Legacy support for old tool names
-            elif function_name == "generate_qr_code":
-                return await self._add_qr_code(
-                    function_args.get("user_id"),
-                    function_args.get("design_id"),
-                    function_args.get("url"),
-                    function_args.get("position", {}).get("x") if function_args.get("position") else None,
-                    function_args.get("position", {}).get("y") if function_args.get("position") else None,
-                    function_args.get("size", {}).get("width") if function_args.get("size") else None,
-                    function_args.get("size", {}).get("height") if function_args.get("size") else None
-                )
-            else:
-                return {"error": f"Unknown function: {function_name}"}
-                
+            return await sidebar_tools.dispatch(self, function_name, function_args)
         except Exception as e:
             logger.error(f"Error executing tool function {function_name}: {e}")
             return {"error": str(e)}
+        finally:
+            current_ai_tool.reset(token)
     
+    @sidebar_tools.tool()
     async def _get_user_designs(self, user_id: str) -> Dict[str, Any]:
-        """Get user's designs from database"""
+        """Get user's saved designs and templates"""
         try:
             # Import here to avoid circular imports
-            from database import db_manager
+            from .database import db_manager
             
             designs = await db_manager.get_user_designs(user_id)
             return {
@@ -1321,11 +847,14 @@ Context about the user:"""
                 "count": 0
             }
     
+    @sidebar_tools.tool(params={
+        "order_id": "Specific order ID (optional)"
+    })
     async def _get_user_orders(self, user_id: str, order_id: str = None) -> Dict[str, Any]:
-        """Get user's orders from database"""
+        """Get user's order history and status"""
         try:
             # Import here to avoid circular imports
-            from database import db_manager
+            from .database import db_manager
             
             if order_id:
                 order = await db_manager.get_order(order_id)
@@ -1354,8 +883,9 @@ Context about the user:"""
                 "count": 0
             }
     
+    @sidebar_tools.tool()
     async def _get_banner_products(self) -> Dict[str, Any]:
-        """Get available banner products"""
+        """Get available banner products and specifications"""
         return {
             "products": [
                 {
@@ -1377,8 +907,13 @@ Context about the user:"""
             ]
         }
     
+    @sidebar_tools.tool(params={
+        "product_type": "Type of product",
+        "quantity": "Quantity to order",
+        "dimensions": "Product dimensions"
+    })
     async def _calculate_banner_pricing(self, product_type: str, quantity: int, dimensions: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Calculate banner pricing"""
+        """Calculate pricing for banner orders"""
         base_prices = {
             "banner": 25.00,
             "sign": 35.00,
@@ -1397,8 +932,13 @@ Context about the user:"""
             "dimensions": dimensions
         }
     
+    @sidebar_tools.tool(params={
+        "use_case": "Intended use case for the banner",
+        "industry": "Industry or business type",
+        "dimensions": "Banner dimensions"
+    })
     async def _get_design_recommendations(self, use_case: str, industry: str = None, dimensions: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Get design recommendations"""
+        """Get AI-powered design recommendations"""
         recommendations = {
             "use_case": use_case,
             "industry": industry,
@@ -1417,7 +957,7 @@ Context about the user:"""
         """Generate a QR code element for a banner design"""
         try:
             # Import here to avoid circular imports
-            from database import db_manager
+            from .database import db_manager
             
             # Get existing design
             design = await db_manager.get_design(design_id)
@@ -1495,7 +1035,7 @@ Context about the user:"""
         """Create a new banner design programmatically"""
         try:
             # Import here to avoid circular imports
-            from database import db_manager
+            from .database import db_manager
             
             # Convert design spec to canvas data format
             canvas_data = self._convert_design_spec_to_canvas_data(design_spec)
@@ -1535,7 +1075,7 @@ Context about the user:"""
         """Modify an existing banner design"""
         try:
             # Import here to avoid circular imports
-            from database import db_manager
+            from .database import db_manager
             
             # Get existing design
             design = await db_manager.get_design(design_id)
@@ -1588,7 +1128,7 @@ Context about the user:"""
         """Add a new element to a banner design"""
         try:
             # Import here to avoid circular imports
-            from database import db_manager
+            from .database import db_manager
             
             # Get existing design
             design = await db_manager.get_design(design_id)
@@ -1631,6 +1171,11 @@ Context about the user:"""
                 "error": f"Failed to add element: {str(e)}"
             }
     
+    @sidebar_tools.tool(params={
+        "prompt": "Text description of the banner to create",
+        "style": "Design style (modern, vintage, corporate, creative)",
+        "dimensions": "Banner dimensions in pixels, e.g. {\"width\": 800, \"height\": 400}"
+    })
     async def _generate_banner_from_prompt(self, user_id: str, prompt: str, style: str = None, dimensions: Dict[str, Any] = None) -> Dict[str, Any]:
         """Generate a complete banner design from a text prompt"""
         try:
@@ -1761,8 +1306,9 @@ Context about the user:"""
             """
             
             # Use OpenAI to interpret the prompt
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-5-mini-2025-08-07",
+            response = await self._create_chat_completion(
+                "interpret_prompt",
+                model=CHAT_MODEL,
                 messages=[
                     {"role": "system", "content": "You are a professional banner designer. Create detailed design specifications in JSON format."},
                     {"role": "user", "content": interpretation_prompt}
@@ -1822,10 +1368,15 @@ Context about the user:"""
 ai_agent_adapter = AIAgentAdapter()
 
 # Add comprehensive sidebar tool methods to the AIAgentAdapter class
+@sidebar_tools.tool(params={
+    "name": "Design name",
+    "width": "Canvas width in pixels",
+    "height": "Canvas height in pixels"
+})
 async def _create_new_design(self, user_id: str, name: str, width: int = 800, height: int = 400, background_color: str = "#ffffff") -> Dict[str, Any]:
     """Create a new banner design from scratch"""
     try:
-        from database import db_manager
+        from .database import db_manager
         canvas_data = {
             "version": "2.0",
             "width": width,
@@ -1850,467 +1401,326 @@ async def _create_new_design(self, user_id: str, name: str, width: int = 800, he
         logger.error(f"Error creating new design: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "width": "New width",
+    "height": "New height"
+})
 async def _change_canvas_size(self, user_id: str, design_id: str, width: int, height: int) -> Dict[str, Any]:
     """Change the canvas dimensions"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        canvas_data["width"] = width
-        canvas_data["height"] = height
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
-        if result.get("success"):
+        async with tool_design_session() as session:
+            design = await session.get(design_id)
+            if not design:
+                return {"success": False, "error": "Design not found"}
+            
+            design.set_canvas(width=width, height=height)
             return {
                 "success": True,
                 "message": f"Changed canvas size to {width}x{height}",
-                "canvas_data": canvas_data
+                "canvas_data": design.canvas_data
             }
-        else:
-            return {"success": False, "error": "Failed to update canvas size"}
     except Exception as e:
         logger.error(f"Error changing canvas size: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "color": "Background color (hex)"
+})
 async def _change_background_color(self, user_id: str, design_id: str, color: str) -> Dict[str, Any]:
     """Change the canvas background color"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        canvas_data["background"] = color
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
-        if result.get("success"):
+        async with tool_design_session() as session:
+            design = await session.get(design_id)
+            if not design:
+                return {"success": False, "error": "Design not found"}
+            
+            design.set_canvas(background=color)
             return {
                 "success": True,
                 "message": f"Changed background color to {color}",
-                "canvas_data": canvas_data
+                "canvas_data": design.canvas_data
             }
-        else:
-            return {"success": False, "error": "Failed to update background color"}
     except Exception as e:
         logger.error(f"Error changing background color: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "text": "Text content",
+    "font_size": "Font size",
+    "font_family": "Font family",
+    "color": "Text color (hex)",
+    "align": {"enum": ["left", "center", "right"], "description": "Text alignment"}
+})
 async def _add_text(self, user_id: str, design_id: str, text: str, x: int = None, y: int = None, font_size: int = 24, font_family: str = "Arial", color: str = "#000000", align: str = "left") -> Dict[str, Any]:
     """Add text element to the design"""
     try:
-        # If design_id is provided, try to get existing design
-        canvas_data = None
-        if design_id:
-            from database import db_manager
-            design = await db_manager.get_design(design_id)
-            if design:
-                canvas_data = design.get("canvas_data", {})
-        
-        # If no existing design or design_id not provided, create new canvas data
-        if not canvas_data:
-            canvas_data = {
-                "version": "2.0",
-                "width": 800,
-                "height": 400,
-                "background": "#ffffff",
-                "objects": []
-            }
-        
-        if not canvas_data.get("objects"):
-            canvas_data["objects"] = []
-        
-        # Default position to center if not provided
-        if x is None:
-            x = canvas_data.get("width", 800) // 2 - 100
-        if y is None:
-            y = canvas_data.get("height", 400) // 2 - 15
-        
-        text_element = {
-            "id": f"text_{int(time.time())}_{len(canvas_data['objects'])}",
-            "type": "text",
-            "x": x,
-            "y": y,
-            "text": text,
-            "fontSize": font_size,
-            "fontFamily": font_family,
-            "fill": color,
-            "align": align,
-            "verticalAlign": "top",
-            "fontStyle": "normal",
-            "textDecoration": "none",
-            "lineHeight": 1.2,
-            "letterSpacing": 0,
-            "padding": 0,
-            "width": 200,
-            "height": 30,
-            "rotation": 0
-        }
-        
-        canvas_data["objects"].append(text_element)
-        
-        # For direct canvas manipulation, we don't need to save to database immediately
-        return {
-            "success": True,
-            "message": f"Added text: {text}",
-            "canvas_data": canvas_data,
-            "design_data": {
-                "design_id": design_id or f"temp_{int(time.time())}",
-                "canvas_data": canvas_data
-            },
-            "element": text_element,
-            "direct_manipulation": True
-        }
+        async with tool_design_session() as session:
+            # Use the existing design when there is one, otherwise this turn's scratch canvas
+            design = await session.get_or_scratch(design_id)
+            canvas_data = design.canvas_data
+            
+            # Default position to center if not provided
+            if x is None:
+                x = canvas_data.get("width", 800) // 2 - 100
+            if y is None:
+                y = canvas_data.get("height", 400) // 2 - 15
+            
+            text_element = design.add({
+                "id": design.new_element_id("text"),
+                "type": "text",
+                "x": x,
+                "y": y,
+                "text": text,
+                "fontSize": font_size,
+                "fontFamily": font_family,
+                "fill": color,
+                "align": align,
+                "verticalAlign": "top",
+                "fontStyle": "normal",
+                "textDecoration": "none",
+                "lineHeight": 1.2,
+                "letterSpacing": 0,
+                "padding": 0,
+                "width": 200,
+                "height": 30,
+                "rotation": 0
+            })
+            
+            return {
+                "success": True,
+                "message": f"Added text: {text}",
+                "canvas_data": canvas_data,
+                "design_data": design.design_data(),
+                "element": text_element,
+                "direct_manipulation": True
+            }
     except Exception as e:
         logger.error(f"Error adding text: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "element_id": "Text element ID",
+    "text": "New text content",
+    "font_size": "New font size",
+    "font_family": "New font family",
+    "color": "New text color (hex)",
+    "align": {"enum": ["left", "center", "right"], "description": "New text alignment"}
+})
 async def _modify_text(self, user_id: str, design_id: str, element_id: str, text: str = None, font_size: int = None, font_family: str = None, color: str = None, align: str = None) -> Dict[str, Any]:
     """Modify existing text element properties"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        objects = canvas_data.get("objects", [])
-        
-        # Find the element
-        element_index = None
-        for i, obj in enumerate(objects):
-            if obj.get("id") == element_id and obj.get("type") == "text":
-                element_index = i
-                break
-        
-        if element_index is None:
-            return {"success": False, "error": "Text element not found"}
-        
-        # Update properties
-        if text is not None:
-            objects[element_index]["text"] = text
-        if font_size is not None:
-            objects[element_index]["fontSize"] = font_size
-        if font_family is not None:
-            objects[element_index]["fontFamily"] = font_family
-        if color is not None:
-            objects[element_index]["fill"] = color
-        if align is not None:
-            objects[element_index]["align"] = align
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
-        if result.get("success"):
+        async with tool_design_session() as session:
+            design = await session.get(design_id)
+            if not design:
+                return {"success": False, "error": "Design not found"}
+            
+            element = design.find(element_id, "text")
+            if element is None:
+                return {"success": False, "error": "Text element not found"}
+            
+            design.update(element, text=text, fontSize=font_size, fontFamily=font_family, fill=color, align=align)
             return {
                 "success": True,
                 "message": f"Modified text element: {element_id}",
-                "canvas_data": canvas_data,
-                "element": objects[element_index]
+                "canvas_data": design.canvas_data,
+                "element": element
             }
-        else:
-            return {"success": False, "error": "Failed to modify text"}
     except Exception as e:
         logger.error(f"Error modifying text: {e}")
         return {"success": False, "error": str(e)}
 
+async def _add_shape(design_id: str, prefix: str, build_element) -> Dict[str, Any]:
+    """Shared body of the add-shape tools: load the design, build and append the element"""
+    async with tool_design_session() as session:
+        design = await session.get(design_id)
+        if not design:
+            return {"success": False, "error": "Design not found"}
+        
+        element = build_element(design.canvas_data)
+        element = design.add({"id": design.new_element_id(prefix), **element})
+        return {"success": True, "canvas_data": design.canvas_data, "element": element}
+
 # Add placeholder methods for all comprehensive sidebar tools
+@sidebar_tools.tool()
 async def _add_rectangle(self, user_id: str, design_id: str, x: int = None, y: int = None, width: int = 200, height: int = 100, fill_color: str = "#6B7280", stroke_color: str = "#374151", stroke_width: int = 2) -> Dict[str, Any]:
     """Add rectangle shape to the design"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        if not canvas_data.get("objects"):
-            canvas_data["objects"] = []
-        
-        # Default position to center if not provided
-        if x is None:
-            x = canvas_data.get("width", 800) // 2 - width // 2
-        if y is None:
-            y = canvas_data.get("height", 400) // 2 - height // 2
-        
-        rectangle_element = {
-            "id": f"rect_{int(time.time())}_{len(canvas_data['objects'])}",
-            "type": "rect",
-            "x": x,
-            "y": y,
-            "width": width,
-            "height": height,
-            "fill": fill_color,
-            "stroke": stroke_color,
-            "strokeWidth": stroke_width,
-            "rotation": 0
-        }
-        
-        canvas_data["objects"].append(rectangle_element)
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
-        if result.get("success"):
+        def build(canvas_data):
+            # Default position to center if not provided
             return {
-                "success": True,
-                "message": f"Added rectangle: {width}x{height}",
-                "canvas_data": canvas_data,
-                "element": rectangle_element
+                "type": "rect",
+                "x": x if x is not None else canvas_data.get("width", 800) // 2 - width // 2,
+                "y": y if y is not None else canvas_data.get("height", 400) // 2 - height // 2,
+                "width": width,
+                "height": height,
+                "fill": fill_color,
+                "stroke": stroke_color,
+                "strokeWidth": stroke_width,
+                "rotation": 0
             }
-        else:
-            return {"success": False, "error": "Failed to add rectangle"}
+        
+        result = await _add_shape(design_id, "rect", build)
+        if result.get("success"):
+            result["message"] = f"Added rectangle: {width}x{height}"
+        return result
     except Exception as e:
         logger.error(f"Error adding rectangle: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "radius": "Circle radius"
+})
 async def _add_circle(self, user_id: str, design_id: str, x: int = None, y: int = None, radius: int = 60, fill_color: str = "#6B7280", stroke_color: str = "#374151", stroke_width: int = 2) -> Dict[str, Any]:
     """Add circle shape to the design"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        if not canvas_data.get("objects"):
-            canvas_data["objects"] = []
-        
-        # Default position to center if not provided
-        if x is None:
-            x = canvas_data.get("width", 800) // 2 - radius
-        if y is None:
-            y = canvas_data.get("height", 400) // 2 - radius
-        
-        circle_element = {
-            "id": f"circle_{int(time.time())}_{len(canvas_data['objects'])}",
-            "type": "circle",
-            "x": x,
-            "y": y,
-            "radius": radius,
-            "fill": fill_color,
-            "stroke": stroke_color,
-            "strokeWidth": stroke_width,
-            "rotation": 0
-        }
-        
-        canvas_data["objects"].append(circle_element)
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
-        if result.get("success"):
+        def build(canvas_data):
             return {
-                "success": True,
-                "message": f"Added circle: radius {radius}",
-                "canvas_data": canvas_data,
-                "element": circle_element
+                "type": "circle",
+                "x": x if x is not None else canvas_data.get("width", 800) // 2 - radius,
+                "y": y if y is not None else canvas_data.get("height", 400) // 2 - radius,
+                "radius": radius,
+                "fill": fill_color,
+                "stroke": stroke_color,
+                "strokeWidth": stroke_width,
+                "rotation": 0
             }
-        else:
-            return {"success": False, "error": "Failed to add circle"}
+        
+        result = await _add_shape(design_id, "circle", build)
+        if result.get("success"):
+            result["message"] = f"Added circle: radius {radius}"
+        return result
     except Exception as e:
         logger.error(f"Error adding circle: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "num_points": "Number of star points",
+    "inner_radius": "Inner radius",
+    "outer_radius": "Outer radius"
+})
 async def _add_star(self, user_id: str, design_id: str, x: int = None, y: int = None, num_points: int = 5, inner_radius: int = 40, outer_radius: int = 80, fill_color: str = "#6B7280", stroke_color: str = "#374151", stroke_width: int = 2) -> Dict[str, Any]:
     """Add star shape to the design"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        if not canvas_data.get("objects"):
-            canvas_data["objects"] = []
-        
-        # Default position to center if not provided
-        if x is None:
-            x = canvas_data.get("width", 800) // 2 - outer_radius
-        if y is None:
-            y = canvas_data.get("height", 400) // 2 - outer_radius
-        
-        star_element = {
-            "id": f"star_{int(time.time())}_{len(canvas_data['objects'])}",
-            "type": "star",
-            "x": x,
-            "y": y,
-            "numPoints": num_points,
-            "innerRadius": inner_radius,
-            "outerRadius": outer_radius,
-            "fill": fill_color,
-            "stroke": stroke_color,
-            "strokeWidth": stroke_width,
-            "rotation": 0
-        }
-        
-        canvas_data["objects"].append(star_element)
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
-        if result.get("success"):
+        def build(canvas_data):
             return {
-                "success": True,
-                "message": f"Added star: {num_points} points, inner {inner_radius}, outer {outer_radius}",
-                "canvas_data": canvas_data,
-                "element": star_element
+                "type": "star",
+                "x": x if x is not None else canvas_data.get("width", 800) // 2 - outer_radius,
+                "y": y if y is not None else canvas_data.get("height", 400) // 2 - outer_radius,
+                "numPoints": num_points,
+                "innerRadius": inner_radius,
+                "outerRadius": outer_radius,
+                "fill": fill_color,
+                "stroke": stroke_color,
+                "strokeWidth": stroke_width,
+                "rotation": 0
             }
-        else:
-            return {"success": False, "error": "Failed to add star"}
+        
+        result = await _add_shape(design_id, "star", build)
+        if result.get("success"):
+            result["message"] = f"Added star: {num_points} points, inner {inner_radius}, outer {outer_radius}"
+        return result
     except Exception as e:
         logger.error(f"Error adding star: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "radius": "Triangle radius"
+})
 async def _add_triangle(self, user_id: str, design_id: str, x: int = None, y: int = None, radius: int = 60, fill_color: str = "#6B7280", stroke_color: str = "#374151", stroke_width: int = 2) -> Dict[str, Any]:
     """Add triangle shape to the design"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        if not canvas_data.get("objects"):
-            canvas_data["objects"] = []
-        
-        # Default position to center if not provided
-        if x is None:
-            x = canvas_data.get("width", 800) // 2 - radius
-        if y is None:
-            y = canvas_data.get("height", 400) // 2 - radius
-        
-        triangle_element = {
-            "id": f"triangle_{int(time.time())}_{len(canvas_data['objects'])}",
-            "type": "triangle",
-            "x": x,
-            "y": y,
-            "sides": 3,
-            "radius": radius,
-            "fill": fill_color,
-            "stroke": stroke_color,
-            "strokeWidth": stroke_width,
-            "rotation": 0
-        }
-        
-        canvas_data["objects"].append(triangle_element)
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
-        if result.get("success"):
+        def build(canvas_data):
             return {
-                "success": True,
-                "message": f"Added triangle: radius {radius}",
-                "canvas_data": canvas_data,
-                "element": triangle_element
+                "type": "triangle",
+                "x": x if x is not None else canvas_data.get("width", 800) // 2 - radius,
+                "y": y if y is not None else canvas_data.get("height", 400) // 2 - radius,
+                "sides": 3,
+                "radius": radius,
+                "fill": fill_color,
+                "stroke": stroke_color,
+                "strokeWidth": stroke_width,
+                "rotation": 0
             }
-        else:
-            return {"success": False, "error": "Failed to add triangle"}
+        
+        result = await _add_shape(design_id, "triangle", build)
+        if result.get("success"):
+            result["message"] = f"Added triangle: radius {radius}"
+        return result
     except Exception as e:
         logger.error(f"Error adding triangle: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "radius": "Hexagon radius"
+})
 async def _add_hexagon(self, user_id: str, design_id: str, x: int = None, y: int = None, radius: int = 60, fill_color: str = "#6B7280", stroke_color: str = "#374151", stroke_width: int = 2) -> Dict[str, Any]:
     """Add hexagon shape to the design"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        if not canvas_data.get("objects"):
-            canvas_data["objects"] = []
-        
-        # Default position to center if not provided
-        if x is None:
-            x = canvas_data.get("width", 800) // 2 - radius
-        if y is None:
-            y = canvas_data.get("height", 400) // 2 - radius
-        
-        hexagon_element = {
-            "id": f"hexagon_{int(time.time())}_{len(canvas_data['objects'])}",
-            "type": "hexagon",
-            "x": x,
-            "y": y,
-            "sides": 6,
-            "radius": radius,
-            "fill": fill_color,
-            "stroke": stroke_color,
-            "strokeWidth": stroke_width,
-            "rotation": 0
-        }
-        
-        canvas_data["objects"].append(hexagon_element)
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
-        if result.get("success"):
+        def build(canvas_data):
             return {
-                "success": True,
-                "message": f"Added hexagon: radius {radius}",
-                "canvas_data": canvas_data,
-                "element": hexagon_element
+                "type": "hexagon",
+                "x": x if x is not None else canvas_data.get("width", 800) // 2 - radius,
+                "y": y if y is not None else canvas_data.get("height", 400) // 2 - radius,
+                "sides": 6,
+                "radius": radius,
+                "fill": fill_color,
+                "stroke": stroke_color,
+                "strokeWidth": stroke_width,
+                "rotation": 0
             }
-        else:
-            return {"success": False, "error": "Failed to add hexagon"}
+        
+        result = await _add_shape(design_id, "hexagon", build)
+        if result.get("success"):
+            result["message"] = f"Added hexagon: radius {radius}"
+        return result
     except Exception as e:
         logger.error(f"Error adding hexagon: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "icon_name": "Name of the icon to add",
+    "width": "Icon width",
+    "height": "Icon height"
+})
 async def _add_icon(self, user_id: str, design_id: str, icon_name: str, x: int = None, y: int = None, width: int = 60, height: int = 60) -> Dict[str, Any]:
     """Add an icon from the icon library to the design"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        if not canvas_data.get("objects"):
-            canvas_data["objects"] = []
-        
-        # Default position to center if not provided
-        if x is None:
-            x = canvas_data.get("width", 800) // 2 - width // 2
-        if y is None:
-            y = canvas_data.get("height", 400) // 2 - height // 2
-        
-        # Find the icon in our library
+        # Find the icon in our library; loose names like "fb logo" resolve fuzzily
         icon_info = _find_icon_by_name(icon_name)
         if not icon_info:
             return {"success": False, "error": f"Icon '{icon_name}' not found in library"}
+        icon_name = icon_info["name"]
         
-        icon_element = {
-            "id": f"icon_{int(time.time())}_{len(canvas_data['objects'])}",
-            "type": "image",
-            "x": x,
-            "y": y,
-            "width": width,
-            "height": height,
-            "image": icon_info["imagePath"],
-            "rotation": 0,
-            "assetName": icon_name,
-            "iconName": icon_name,
-            "category": icon_info["category"]
-        }
-        
-        canvas_data["objects"].append(icon_element)
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
-        if result.get("success"):
+        def build(canvas_data):
             return {
-                "success": True,
-                "message": f"Added icon: {icon_name}",
-                "canvas_data": canvas_data,
-                "element": icon_element
+                "type": "image",
+                "x": x if x is not None else canvas_data.get("width", 800) // 2 - width // 2,
+                "y": y if y is not None else canvas_data.get("height", 400) // 2 - height // 2,
+                "width": width,
+                "height": height,
+                "image": icon_info["imagePath"],
+                "rotation": 0,
+                "assetName": icon_name,
+                "iconName": icon_name,
+                "category": icon_info["category"]
             }
-        else:
-            return {"success": False, "error": "Failed to add icon"}
+        
+        result = await _add_shape(design_id, "icon", build)
+        if result.get("success"):
+            result["message"] = f"Added icon: {icon_name}"
+        return result
     except Exception as e:
         logger.error(f"Error adding icon: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "category": "Icon category (medical, business, technology, etc.)"
+})
 async def _list_available_icons(self, category: str = None) -> Dict[str, Any]:
     """Get list of available icons by category"""
     try:
-        icon_library = _get_icon_library()
-        
         if category:
-            filtered_icons = [icon for icon in icon_library if icon["category"] == category]
+            filtered_icons = icon_catalog.by_category(category)
             return {
                 "success": True,
                 "message": f"Found {len(filtered_icons)} icons in category '{category}'",
@@ -2319,14 +1729,8 @@ async def _list_available_icons(self, category: str = None) -> Dict[str, Any]:
                 "count": len(filtered_icons)
             }
         else:
-            # Group by category
-            categories = {}
-            for icon in icon_library:
-                cat = icon["category"]
-                if cat not in categories:
-                    categories[cat] = []
-                categories[cat].append(icon)
-            
+            icon_library = icon_catalog.icons
+            categories = icon_catalog.categories()
             return {
                 "success": True,
                 "message": f"Found {len(icon_library)} icons across {len(categories)} categories",
@@ -2338,29 +1742,27 @@ async def _list_available_icons(self, category: str = None) -> Dict[str, Any]:
         logger.error(f"Error listing icons: {e}")
         return {"success": False, "error": str(e)}
 
-    async def _add_qr_code(self, user_id: str, design_id: str, url: str, x: int = None, y: int = None, width: int = 200, height: int = 200, qr_color: str = "#000000", background_color: str = "#ffffff") -> Dict[str, Any]:
-        """Add QR code element to the design - generates real QR code like sidebar"""
-        try:
-            # If design_id is provided, try to get existing design
-            canvas_data = None
-            if design_id:
-                from database import db_manager
-                design = await db_manager.get_design(design_id)
-                if design:
-                    canvas_data = design.get("canvas_data", {})
-            
-            # If no existing design or design_id not provided, create new canvas data
-            if not canvas_data:
-                canvas_data = {
-                    "version": "2.0",
-                    "width": 800,
-                    "height": 400,
-                    "background": "#ffffff",
-                    "objects": []
-                }
-            
-            if not canvas_data.get("objects"):
-                canvas_data["objects"] = []
+@sidebar_tools.tool(params={
+    "url": "URL or text to encode",
+    "width": "QR code width",
+    "height": "QR code height",
+    "qr_color": "QR code color (hex)"
+})
+async def _add_qr_code(self, user_id: str, design_id: str, url: str, x: int = None, y: int = None, width: int = 200, height: int = 200, qr_color: str = "#000000", background_color: str = "#ffffff") -> Dict[str, Any]:
+    """Add QR code element to the design
+    
+    Generates a real QR code image, like the sidebar does. Rendering happens in
+    a worker thread and identical codes come from the QR service cache.
+    """
+    try:
+        image_source = await qr_service.element_source(
+            QRSpec(data=url, fill_color=qr_color, back_color=background_color)
+        )
+        
+        async with tool_design_session() as session:
+            # Use the existing design when there is one, otherwise this turn's scratch canvas
+            design = await session.get_or_scratch(design_id)
+            canvas_data = design.canvas_data
             
             # Default position to center if not provided
             if x is None:
@@ -2368,36 +1770,13 @@ async def _list_available_icons(self, category: str = None) -> Dict[str, Any]:
             if y is None:
                 y = canvas_data.get("height", 400) // 2 - height // 2
             
-            # Generate QR code using qrcode library (Python backend)
-            import qrcode
-            from io import BytesIO
-            import base64
-            
-            # Create QR code
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_M,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(url)
-            qr.make(fit=True)
-            
-            # Create QR code image
-            qr_img = qr.make_image(fill_color=qr_color, back_color=background_color)
-            
-            # Convert to base64 data URL
-            buffer = BytesIO()
-            qr_img.save(buffer, format='PNG')
-            qr_data_url = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
-            
             # Create QR code element as image type (same as sidebar implementation)
-            qr_element = {
-                "id": f"qrcode_{int(time.time())}_{len(canvas_data['objects'])}",
-                "type": "image", # Use 'image' type like sidebar
-                "x": x, 
-                "y": y, 
-                "width": width, 
+            qr_element = design.add({
+                "id": design.new_element_id("qrcode"),
+                "type": "image",  # Use 'image' type like sidebar
+                "x": x,
+                "y": y,
+                "width": width,
                 "height": height,
                 "rotation": 0,
                 "assetName": "QR Code",
@@ -2406,304 +1785,198 @@ async def _list_available_icons(self, category: str = None) -> Dict[str, Any]:
                     "color": qr_color,
                     "backgroundColor": background_color
                 },
-                "imageDataUrl": qr_data_url # Store the generated QR code image
-            }
-            
-            canvas_data["objects"].append(qr_element)
+                "imageDataUrl": image_source  # Data URL, or a /api/qr URL when QR_OUTPUT=url
+            })
             
-            # For direct canvas manipulation, we don't need to save to database immediately
-            # The frontend will handle the canvas update
             return {
                 "success": True,
                 "message": f"Generated QR code for: {url}",
                 "canvas_data": canvas_data,
-                "design_data": {
-                    "design_id": design_id or f"temp_{int(time.time())}",
-                    "canvas_data": canvas_data
-                },
+                "design_data": design.design_data(),
                 "element": qr_element,
                 "direct_manipulation": True  # Flag to indicate this is direct canvas manipulation
             }
-        except Exception as e:
-            logger.error(f"Error generating QR code: {e}")
-            return {"success": False, "error": str(e)}
+    except Exception as e:
+        logger.error(f"Error generating QR code: {e}")
+        return {"success": False, "error": str(e)}
 
-async def _move_element(self, user_id: str, design_id: str, element_id: str, x: int, y: int) -> Dict[str, Any]:
-    """Move an element to a new position"""
-    try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
+async def _update_element(design_id: str, element_id: str, apply) -> Dict[str, Any]:
+    """Shared body of the element tools: O(1) lookup in the session's element index, then apply"""
+    async with tool_design_session() as session:
+        design = await session.get(design_id)
         if not design:
             return {"success": False, "error": "Design not found"}
         
-        canvas_data = design.get("canvas_data", {})
-        objects = canvas_data.get("objects", [])
-        
-        # Find the element
-        element_index = None
-        for i, obj in enumerate(objects):
-            if obj.get("id") == element_id:
-                element_index = i
-                break
-        
-        if element_index is None:
+        element = design.find(element_id)
+        if element is None:
             return {"success": False, "error": "Element not found"}
         
-        # Update position
-        objects[element_index]["x"] = x
-        objects[element_index]["y"] = y
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
+        result = apply(design, element) or {}
+        return {"success": True, "canvas_data": design.canvas_data, "element": element, **result}
+
+@sidebar_tools.tool(params={
+    "element_id": "Element ID to move",
+    "x": "New X position",
+    "y": "New Y position"
+})
+async def _move_element(self, user_id: str, design_id: str, element_id: str, x: int, y: int) -> Dict[str, Any]:
+    """Move an element to a new position"""
+    try:
+        result = await _update_element(design_id, element_id, lambda design, element: design.update(element, x=x, y=y))
         if result.get("success"):
-            return {
-                "success": True,
-                "message": f"Moved element to ({x}, {y})",
-                "canvas_data": canvas_data,
-                "element": objects[element_index]
-            }
-        else:
-            return {"success": False, "error": "Failed to move element"}
+            result["message"] = f"Moved element to ({x}, {y})"
+        return result
     except Exception as e:
         logger.error(f"Error moving element: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "element_id": "Element ID to resize",
+    "width": "New width",
+    "height": "New height"
+})
 async def _resize_element(self, user_id: str, design_id: str, element_id: str, width: int, height: int) -> Dict[str, Any]:
     """Resize an element"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        objects = canvas_data.get("objects", [])
-        
-        # Find the element
-        element_index = None
-        for i, obj in enumerate(objects):
-            if obj.get("id") == element_id:
-                element_index = i
-                break
-        
-        if element_index is None:
-            return {"success": False, "error": "Element not found"}
-        
-        # Update size
-        objects[element_index]["width"] = width
-        objects[element_index]["height"] = height
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
+        result = await _update_element(design_id, element_id, lambda design, element: design.update(element, width=width, height=height))
         if result.get("success"):
-            return {
-                "success": True,
-                "message": f"Resized element to {width}x{height}",
-                "canvas_data": canvas_data,
-                "element": objects[element_index]
-            }
-        else:
-            return {"success": False, "error": "Failed to resize element"}
+            result["message"] = f"Resized element to {width}x{height}"
+        return result
     except Exception as e:
         logger.error(f"Error resizing element: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "fill_color": "New fill color (hex)",
+    "stroke_color": "New stroke color (hex)"
+})
 async def _change_element_color(self, user_id: str, design_id: str, element_id: str, fill_color: str = None, stroke_color: str = None) -> Dict[str, Any]:
     """Change the color of an element"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        objects = canvas_data.get("objects", [])
-        
-        # Find the element
-        element_index = None
-        for i, obj in enumerate(objects):
-            if obj.get("id") == element_id:
-                element_index = i
-                break
-        
-        if element_index is None:
-            return {"success": False, "error": "Element not found"}
-        
-        # Update colors
-        if fill_color is not None:
-            objects[element_index]["fill"] = fill_color
-        if stroke_color is not None:
-            objects[element_index]["stroke"] = stroke_color
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
+        result = await _update_element(design_id, element_id, lambda design, element: design.update(element, fill=fill_color, stroke=stroke_color))
         if result.get("success"):
-            return {
-                "success": True,
-                "message": f"Changed element colors",
-                "canvas_data": canvas_data,
-                "element": objects[element_index]
-            }
-        else:
-            return {"success": False, "error": "Failed to change element color"}
+            result["message"] = "Changed element colors"
+        return result
     except Exception as e:
         logger.error(f"Error changing element color: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "element_id": "Element ID to delete"
+})
 async def _delete_element(self, user_id: str, design_id: str, element_id: str) -> Dict[str, Any]:
     """Delete an element from the design"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        objects = canvas_data.get("objects", [])
-        
-        # Find and remove the element
-        original_count = len(objects)
-        objects[:] = [obj for obj in objects if obj.get("id") != element_id]
-        
-        if len(objects) == original_count:
-            return {"success": False, "error": "Element not found"}
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
-        if result.get("success"):
+        async with tool_design_session() as session:
+            design = await session.get(design_id)
+            if not design:
+                return {"success": False, "error": "Design not found"}
+            
+            if design.remove(element_id) is None:
+                return {"success": False, "error": "Element not found"}
+            
             return {
                 "success": True,
                 "message": f"Deleted element: {element_id}",
-                "canvas_data": canvas_data
+                "canvas_data": design.canvas_data
             }
-        else:
-            return {"success": False, "error": "Failed to delete element"}
     except Exception as e:
         logger.error(f"Error deleting element: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "element_id": "Element ID to duplicate",
+    "x_offset": "X offset for duplicate",
+    "y_offset": "Y offset for duplicate"
+})
 async def _duplicate_element(self, user_id: str, design_id: str, element_id: str, x_offset: int = 20, y_offset: int = 20) -> Dict[str, Any]:
     """Duplicate an element"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        objects = canvas_data.get("objects", [])
-        
-        # Find the element to duplicate
-        original_element = None
-        for obj in objects:
-            if obj.get("id") == element_id:
-                original_element = obj
-                break
-        
-        if not original_element:
-            return {"success": False, "error": "Element not found"}
-        
-        # Create duplicate with new ID and offset position
-        duplicate_element = original_element.copy()
-        duplicate_element["id"] = f"{element_id}_copy_{int(time.time())}"
-        duplicate_element["x"] = original_element.get("x", 0) + x_offset
-        duplicate_element["y"] = original_element.get("y", 0) + y_offset
-        
-        objects.append(duplicate_element)
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
+        def duplicate(design, original_element):
+            # Create duplicate with new ID and offset position
+            duplicate_element = original_element.copy()
+            duplicate_element["id"] = design.new_element_id(f"{element_id}_copy")
+            duplicate_element["x"] = original_element.get("x", 0) + x_offset
+            duplicate_element["y"] = original_element.get("y", 0) + y_offset
+            return {"element": design.add(duplicate_element)}
+        
+        result = await _update_element(design_id, element_id, duplicate)
         if result.get("success"):
-            return {
-                "success": True,
-                "message": f"Duplicated element: {element_id}",
-                "canvas_data": canvas_data,
-                "element": duplicate_element
-            }
-        else:
-            return {"success": False, "error": "Failed to duplicate element"}
+            result["message"] = f"Duplicated element: {element_id}"
+        return result
     except Exception as e:
         logger.error(f"Error duplicating element: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool()
 async def _bring_to_front(self, user_id: str, design_id: str, element_id: str) -> Dict[str, Any]:
     """Bring element to front layer"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        objects = canvas_data.get("objects", [])
-        
-        # Find the element
-        element_index = None
-        for i, obj in enumerate(objects):
-            if obj.get("id") == element_id:
-                element_index = i
-                break
-        
-        if element_index is None:
-            return {"success": False, "error": "Element not found"}
-        
-        # Move element to the end (front layer)
-        element = objects.pop(element_index)
-        objects.append(element)
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
+        result = await _update_element(design_id, element_id, lambda design, element: design.bring_to_front(element))
         if result.get("success"):
-            return {
-                "success": True,
-                "message": f"Brought element to front",
-                "canvas_data": canvas_data,
-                "element": element
-            }
-        else:
-            return {"success": False, "error": "Failed to bring element to front"}
+            result["message"] = "Brought element to front"
+        return result
     except Exception as e:
         logger.error(f"Error bringing element to front: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool()
 async def _send_to_back(self, user_id: str, design_id: str, element_id: str) -> Dict[str, Any]:
     """Send element to back layer"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
-        if not design:
-            return {"success": False, "error": "Design not found"}
-        
-        canvas_data = design.get("canvas_data", {})
-        objects = canvas_data.get("objects", [])
-        
-        # Find the element
-        element_index = None
-        for i, obj in enumerate(objects):
-            if obj.get("id") == element_id:
-                element_index = i
-                break
-        
-        if element_index is None:
-            return {"success": False, "error": "Element not found"}
-        
-        # Move element to the beginning (back layer)
-        element = objects.pop(element_index)
-        objects.insert(0, element)
-        
-        result = await db_manager.update_design(design_id, {"canvas_data": canvas_data})
+        result = await _update_element(design_id, element_id, lambda design, element: design.send_to_back(element))
         if result.get("success"):
+            result["message"] = "Sent element to back"
+        return result
+    except Exception as e:
+        logger.error(f"Error sending element to back: {e}")
+        return {"success": False, "error": str(e)}
+
+@sidebar_tools.tool(params={
+    "operations": {
+        "items": {
+            "type": "object",
+            "properties": {"op": {"type": "string", "enum": list(OPERATIONS)}},
+            "required": ["op"]
+        },
+        "description": (
+            "Ordered edits. add: {op, element}; move: {op, element_id, x, y} or dx/dy; "
+            "resize: {op, element_id, width, height}; recolor: {op, element_id, fill, stroke}; "
+            "delete: {op, element_id}; reorder: {op, element_id, position: front|back|forward|backward|index}; "
+            "duplicate: {op, element_id, x_offset, y_offset}"
+        )
+    }
+})
+async def _apply_design_operations(self, user_id: str, design_id: str, operations: list) -> Dict[str, Any]:
+    """Apply a batch of element edits to a design in one step; all succeed or none are applied"""
+    try:
+        async with tool_design_session() as session:
+            design = await session.get(design_id)
+            if not design:
+                return {"success": False, "error": "Design not found"}
+            
+            results = apply_operations(design, operations or [])
             return {
                 "success": True,
-                "message": f"Sent element to back",
-                "canvas_data": canvas_data,
-                "element": element
+                "message": f"Applied {len(results)} operations",
+                "canvas_data": design.canvas_data,
+                "results": results
             }
-        else:
-            return {"success": False, "error": "Failed to send element to back"}
+    except DesignOperationError as e:
+        return {"success": False, "error": str(e), "index": e.index}
     except Exception as e:
-        logger.error(f"Error sending element to back: {e}")
+        logger.error(f"Error applying design operations: {e}")
         return {"success": False, "error": str(e)}
 
+@sidebar_tools.tool(params={
+    "name": "Design name"
+})
 async def _save_design(self, user_id: str, design_id: str, name: str = None) -> Dict[str, Any]:
     """Save the current design"""
     try:
-        from database import db_manager
-        design = await db_manager.get_design(design_id)
+        from .database import db_manager
+        async with tool_design_session() as session:
+            design = await session.get(design_id)
         if not design:
             return {"success": False, "error": "Design not found"}
         
@@ -2719,7 +1992,7 @@ async def _save_design(self, user_id: str, design_id: str, name: str = None) ->
         if result.get("success"):
             return {
                 "success": True,
-                "message": f"Saved design: {name or design.get('name', 'Untitled')}",
+                "message": f"Saved design: {name or design.record.get('name', 'Untitled')}",
                 "design_id": design_id
             }
         else:
@@ -2731,84 +2004,11 @@ async def _save_design(self, user_id: str, design_id: str, name: str = None) ->
 # Helper methods for icon library
 def _get_icon_library() -> List[Dict[str, Any]]:
     """Get the complete icon library"""
-    return [
-        # Medical & Healthcare
-        {"name": "Doctor", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Doctor.svg"},
-        {"name": "Nurse", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Nurse.svg"},
-        {"name": "Hospital Building", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Hospital.svg"},
-        {"name": "Medical Kit", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Medical Kit.svg"},
-        {"name": "Stethoscope", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Phonendoscope.svg"},
-        {"name": "Thermometer", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Thermometer.svg"},
-        {"name": "Syringe", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Syringe.svg"},
-        {"name": "Pills", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Medicine.svg"},
-        {"name": "Capsule", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Capsule.svg"},
-        {"name": "Microscope", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Microscope.svg"},
-        
-        # Social Media
-        {"name": "X (Twitter)", "category": "social", "imagePath": "/assets/images/social icons/X.png"},
-        {"name": "Twitter", "category": "social", "imagePath": "/assets/images/social icons/Twitter.png"},
-        {"name": "Meta (Facebook)", "category": "social", "imagePath": "/assets/images/social icons/Facebook.png"},
-        {"name": "LinkedIn", "category": "social", "imagePath": "/assets/images/social icons/LinkedIn.png"},
-        {"name": "Reddit", "category": "social", "imagePath": "/assets/images/social icons/Reddit.png"},
-        {"name": "Pinterest", "category": "social", "imagePath": "/assets/images/social icons/Pinterest.png"},
-        {"name": "Instagram", "category": "social", "imagePath": "/assets/images/social icons/Instagram.png"},
-        {"name": "Snapchat", "category": "social", "imagePath": "/assets/images/social icons/Snapchat.png"},
-        {"name": "Telegram", "category": "social", "imagePath": "/assets/images/social icons/Telegram.png"},
-        {"name": "WhatsApp", "category": "social", "imagePath": "/assets/images/social icons/Whatsapp.png"},
-        {"name": "Twitch", "category": "social", "imagePath": "/assets/images/social icons/Twitch.png"},
-        {"name": "YouTube", "category": "social", "imagePath": "/assets/images/social icons/Youtube.png"},
-        {"name": "TikTok", "category": "social", "imagePath": "/assets/images/social icons/Tiktok.png"},
-        {"name": "Discord", "category": "social", "imagePath": "/assets/images/social icons/Discord.png"},
-        {"name": "Slack", "category": "social", "imagePath": "/assets/images/social icons/Slack.png"},
-        {"name": "Zoom", "category": "social", "imagePath": "/assets/images/social icons/Zoom.png"},
-        
-        # Technology & Business
-        {"name": "Technology", "category": "technology", "imagePath": "/assets/images/icons/Technology.svg"},
-        {"name": "Data Analytics", "category": "technology", "imagePath": "/assets/images/icons/Data Analytic.svg"},
-        {"name": "User Experience", "category": "technology", "imagePath": "/assets/images/icons/User Experience.svg"},
-        {"name": "Passive Income", "category": "technology", "imagePath": "/assets/images/icons/Passive Income.svg"},
-        {"name": "Valuations", "category": "technology", "imagePath": "/assets/images/icons/Valuations.svg"},
-        {"name": "Blue Print", "category": "technology", "imagePath": "/assets/images/icons/Blue Print.svg"},
-        {"name": "Anti Virus", "category": "technology", "imagePath": "/assets/images/icons/Anti Virus.svg"},
-        {"name": "Manager", "category": "technology", "imagePath": "/assets/images/icons/Manager.svg"},
-        {"name": "Digital Agreement", "category": "technology", "imagePath": "/assets/images/icons/Digital Agreement.svg"},
-        {"name": "Growth", "category": "technology", "imagePath": "/assets/images/icons/Growth.svg"},
-        {"name": "Sync Data", "category": "technology", "imagePath": "/assets/images/icons/Sync Data.svg"},
-        {"name": "Project Management", "category": "technology", "imagePath": "/assets/images/icons/Project Management.svg"},
-        {"name": "Startup", "category": "technology", "imagePath": "/assets/images/icons/Startup.svg"},
-        {"name": "Development", "category": "technology", "imagePath": "/assets/images/icons/Development.svg"},
-        {"name": "Digital Marketing", "category": "technology", "imagePath": "/assets/images/icons/Digital Marketing.svg"},
-        {"name": "User Security", "category": "technology", "imagePath": "/assets/images/icons/User Security.svg"},
-        {"name": "Affiliate", "category": "technology", "imagePath": "/assets/images/icons/Affiliate.svg"},
-        {"name": "Registration", "category": "technology", "imagePath": "/assets/images/icons/Registration.svg"},
-        {"name": "Budget", "category": "technology", "imagePath": "/assets/images/icons/Budget.svg"},
-        {"name": "SEO", "category": "technology", "imagePath": "/assets/images/icons/SEO.svg"},
-        {"name": "Teamwork", "category": "technology", "imagePath": "/assets/images/icons/Teamwork.svg"},
-        
-        # Food & Dining
-        {"name": "Lollipop", "category": "food", "imagePath": "/assets/images/food/Lollipop.svg"},
-        {"name": "Tart", "category": "food", "imagePath": "/assets/images/food/Tart.svg"},
-        {"name": "Pancake", "category": "food", "imagePath": "/assets/images/food/Pancake.svg"},
-        {"name": "Ramen", "category": "food", "imagePath": "/assets/images/food/Ramen.svg"},
-        {"name": "Dimsum", "category": "food", "imagePath": "/assets/images/food/Dimsum.svg"},
-        {"name": "Cheese", "category": "food", "imagePath": "/assets/images/food/Cheese.svg"},
-        {"name": "Baguette", "category": "food", "imagePath": "/assets/images/food/Baguette.svg"},
-        {"name": "Sausage", "category": "food", "imagePath": "/assets/images/food/Sausage.svg"},
-        {"name": "Muffin", "category": "food", "imagePath": "/assets/images/food/Muffin.svg"},
-        {"name": "Sushi", "category": "food", "imagePath": "/assets/images/food/Sushi.svg"},
-        {"name": "Fries", "category": "food", "imagePath": "/assets/images/food/Fries.svg"},
-        {"name": "Banana", "category": "food", "imagePath": "/assets/images/food/Banana.svg"},
-        {"name": "Pizza", "category": "food", "imagePath": "/assets/images/food/Pizza.svg"},
-        {"name": "Boba", "category": "food", "imagePath": "/assets/images/food/Boba.svg"}
-    ]
+    return icon_catalog.icons
 
 def _find_icon_by_name(icon_name: str) -> Dict[str, Any]:
-    """Find an icon by name in the library"""
-    icon_library = _get_icon_library()
-    for icon in icon_library:
-        if icon["name"].lower() == icon_name.lower():
-            return icon
-    return None
+    """Find an icon by name in the library (exact, then fuzzy)"""
+    return icon_catalog.find(icon_name)
 
 # Add the methods to the class
 AIAgentAdapter._create_new_design = _create_new_design
@@ -2823,8 +2023,8 @@ AIAgentAdapter._add_triangle = _add_triangle
 AIAgentAdapter._add_hexagon = _add_hexagon
 AIAgentAdapter._add_icon = _add_icon
 AIAgentAdapter._list_available_icons = _list_available_icons
-AIAgentAdapter._get_icon_library = _get_icon_library
-AIAgentAdapter._find_icon_by_name = _find_icon_by_name
+AIAgentAdapter._get_icon_library = staticmethod(_get_icon_library)
+AIAgentAdapter._find_icon_by_name = staticmethod(_find_icon_by_name)
 AIAgentAdapter._move_element = _move_element
 AIAgentAdapter._resize_element = _resize_element
 AIAgentAdapter._change_element_color = _change_element_color
@@ -2832,22 +2032,22 @@ AIAgentAdapter._delete_element = _delete_element
 AIAgentAdapter._duplicate_element = _duplicate_element
 AIAgentAdapter._bring_to_front = _bring_to_front
 AIAgentAdapter._send_to_back = _send_to_back
+AIAgentAdapter._apply_design_operations = _apply_design_operations
 AIAgentAdapter._save_design = _save_design
+AIAgentAdapter._add_qr_code = _add_qr_code
 
-# Initialize OpenAI client at module import time (like Supabase)
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if openai_api_key:
-    try:
-        ai_agent_adapter.openai_client = AsyncOpenAI(
-            api_key=openai_api_key,
-            http_client=httpx.AsyncClient()
-        )
-        ai_agent_adapter._initialized = True
-        logger.info("✅ OpenAI client initialized successfully at startup")
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize OpenAI client at startup: {e}")
-        ai_agent_adapter._initialized = False
-else:
+# Legacy tool name from before add_qr_code; position/size objects map onto x/y/width/height
+sidebar_tools.alias("generate_qr_code", "add_qr_code", lambda args: {
+    "user_id": args.get("user_id"),
+    "design_id": args.get("design_id"),
+    "url": args.get("url"),
+    "x": (args.get("position") or {}).get("x"),
+    "y": (args.get("position") or {}).get("y"),
+    "width": (args.get("size") or {}).get("width"),
+    "height": (args.get("size") or {}).get("height")
+})
+
+# The OpenAI client itself is created lazily by initialize() on the first AI request
+if not os.getenv("OPENAI_API_KEY"):
     logger.warning("⚠️ OPENAI_API_KEY environment variable not set. AI features will be disabled.")
     logger.warning("Server will start but AI operations will fail gracefully.")
-    ai_agent_adapter._initialized = False
@@ -0,0 +1,156 @@
+"""
+AI Provider Connection
+The one HTTP client the OpenAI SDK uses (pooled keep-alive connections, HTTP/2
+when the h2 package is installed) and a circuit breaker fed by the outcome of
+real calls. There is no startup probe: health is whatever the last calls saw.
+After OPENAI_CIRCUIT_FAILURES consecutive provider failures the breaker opens
+and calls fail immediately; after OPENAI_CIRCUIT_RESET seconds a single trial
+call is let through and its outcome closes or re-opens the circuit.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+import openai
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "true").lower() == "true"
+OPENAI_CIRCUIT_FAILURES = int(os.getenv("OPENAI_CIRCUIT_FAILURES", "5"))
+OPENAI_CIRCUIT_RESET = float(os.getenv("OPENAI_CIRCUIT_RESET", "30"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+openai_circuit_state = registry.gauge(
+    "buyprintz_openai_circuit_state", "OpenAI circuit breaker state (0 closed, 1 half-open, 2 open)")
+openai_circuit_rejections_total = registry.counter(
+    "buyprintz_openai_circuit_rejections_total", "OpenAI calls rejected while the circuit was open")
+
+
+def build_http_client() -> httpx.AsyncClient:
+    """Shared pooled client for the OpenAI SDK; HTTP/2 only if h2 is available"""
+    http2 = OPENAI_HTTP2 and importlib.util.find_spec("h2") is not None
+    if OPENAI_HTTP2 and not http2:
+        logger.info("h2 is not installed; OpenAI client falls back to HTTP/1.1")
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+    )
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    """Outages and overload count against the breaker; our own bad requests do not"""
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, asyncio.TimeoutError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with passive health counters"""
+
+    def __init__(self, failure_threshold: int = OPENAI_CIRCUIT_FAILURES, reset_timeout: float = OPENAI_CIRCUIT_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._trial_started_at: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+        self.last_success_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning("OpenAI circuit %s -> %s", self.state, state)
+        self.state = state
+        openai_circuit_state.set(_STATE_VALUES[state])
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go to the provider now"""
+        with self._lock:
+            now = time.time()
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+                self._trial_in_flight = False
+            if self.state == CLOSED:
+                return
+            # A trial whose outcome never arrived (e.g. a lost task) must not hold the circuit half-open
+            if self._trial_in_flight and now - self._trial_started_at >= self.reset_timeout:
+                logger.warning("OpenAI circuit trial call expired without an outcome")
+                self._trial_in_flight = False
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._trial_started_at = now
+                return
+            retry_in = max(self.reset_timeout - (time.time() - self.opened_at), 0)
+        openai_circuit_rejections_total.inc()
+        raise CircuitOpenError(f"AI provider unavailable; retrying in {retry_in:.0f}s (last error: {self.last_error})")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self.last_success_at = time.time()
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+            self._set_state(CLOSED)
+
+    def record_failure(self, exc: BaseException) -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_failure_at = time.time()
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.time()
+                self._set_state(OPEN)
+
+    def release_trial(self) -> None:
+        """A call ended without an outcome (cancelled); let the next call be the trial"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record(self, exc: Optional[BaseException]) -> None:
+        """Feed a call outcome; errors that are not provider failures still prove it is reachable"""
+        if exc is not None and is_provider_failure(exc):
+            self.record_failure(exc)
+        else:
+            self.record_success()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "successes": self.successes,
+            "failures": self.failures,
+            "last_success_at": self.last_success_at,
+            "last_failure_at": self.last_failure_at,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,227 @@
+"""
+AI Response Cache
+Caches answers from the deterministic AI endpoints (banner recommendations,
+design assistance). The key is a SHA-256 over the normalized request, the model
+and the prompt version, so "Trade Show Booth " and "trade show booth" share an
+entry and a prompt or model change never serves a stale answer.
+
+Entries expire after a TTL and the in-memory set is LRU-bounded. When
+AI_CACHE_DIR is set, entries are also written there as JSON so a restart does
+not start cold. Identical concurrent misses share one upstream call.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", "3600"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "512"))
+# Empty disables disk persistence
+AI_CACHE_DIR = os.getenv("AI_CACHE_DIR", "")
+
+ai_cache_requests_total = registry.counter(
+    "buyprintz_ai_cache_requests_total", "AI response cache lookups", ("kind", "result"))
+ai_cache_entries = registry.gauge(
+    "buyprintz_ai_cache_entries", "Entries in the in-memory AI response cache")
+
+# Everything except letters, digits, "$" and decimal points inside numbers
+_WORD_SEPARATORS = re.compile(r"[^a-z0-9.$]|(?<![0-9])\.|\.(?![0-9])")
+
+
+def normalize_value(value: Any) -> Any:
+    """
+    Reduce a request value to its semantic content: strings are lowercased with
+    punctuation and whitespace collapsed, whole floats become ints, dict keys are
+    sorted and None/empty entries dropped.
+    """
+    if isinstance(value, str):
+        return " ".join(_WORD_SEPARATORS.sub(" ", value.lower()).split())
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        rounded = round(float(value), 2)
+        return int(rounded) if rounded.is_integer() else rounded
+    if isinstance(value, dict):
+        normalized = {str(k).lower(): normalize_value(v) for k, v in value.items()}
+        return {k: normalized[k] for k in sorted(normalized) if normalized[k] not in (None, "", {}, [])}
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(v) for v in value]
+    return str(value)
+
+
+def cache_key(kind: str, request: Dict[str, Any], model: str, prompt_version: str) -> str:
+    payload = json.dumps({
+        "kind": kind,
+        "model": model,
+        "prompt_version": prompt_version,
+        "request": normalize_value(request)
+    }, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """TTL + LRU cache of AI responses with optional JSON-file persistence"""
+
+    def __init__(self, ttl: float = AI_CACHE_TTL, max_entries: int = AI_CACHE_MAX_ENTRIES,
+                 cache_dir: str = AI_CACHE_DIR):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir or None
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_from_disk(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            return float(stored["expires_at"]), stored["value"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable AI cache file %s: %s", key, e)
+            return None
+
+    def _write_to_disk(self, key: str, expires_at: float, value: Dict[str, Any]) -> None:
+        tmp_path = f"{self._path(key)}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": expires_at, "value": value}, f, default=str)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Failed to persist AI cache entry %s: %s", key, e)
+
+    def _remove_from_disk(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a live entry from memory or disk, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now < entry[0]:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                del self._entries[key]
+        if not self.cache_dir:
+            return None
+        entry = self._load_from_disk(key)
+        if entry is None:
+            return None
+        if now >= entry[0]:
+            self._remove_from_disk(key)
+            return None
+        self._store(key, entry)
+        return entry[1]
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl
+        self._store(key, (expires_at, value))
+        if self.cache_dir:
+            self._write_to_disk(key, expires_at, value)
+
+    def _store(self, key: str, entry: Tuple[float, Dict[str, Any]]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                if self.cache_dir:
+                    self._remove_from_disk(evicted)
+            ai_cache_entries.set(len(self._entries))
+
+    async def get_or_compute(self, kind: str, key: str,
+                             compute: Callable[[], Awaitable[Dict[str, Any]]],
+                             cacheable: Callable[[Dict[str, Any]], bool]) -> Dict[str, Any]:
+        """
+        Return the cached response for key, or run compute() and cache the result
+        when cacheable(result) is true. Concurrent misses on one key share a call.
+        """
+        if not self.enabled:
+            return await compute()
+
+        value = self.get(key) if not self.cache_dir else await asyncio.to_thread(self.get, key)
+        if value is not None:
+            self.hits += 1
+            ai_cache_requests_total.inc(kind=kind, result="hit")
+            return {**value, "cached": True}
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            ai_cache_requests_total.inc(kind=kind, result="coalesced")
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        ai_cache_requests_total.inc(kind=kind, result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+            if cacheable(result):
+                if self.cache_dir:
+                    await asyncio.to_thread(self.set, key, result)
+                else:
+                    self.set(key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark retrieved so an unawaited future does not warn
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            keys = list(self._entries)
+            self._entries.clear()
+            ai_cache_entries.set(0)
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".json"):
+                    self._remove_from_disk(name[:-len(".json")])
+        logger.info("Cleared AI response cache (%d in memory)", len(keys))
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "persistent": bool(self.cache_dir),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
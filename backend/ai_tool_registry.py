@@ -0,0 +1,148 @@
+"""
+AI Tool Registry
+Tools register their handler with a decorator; the registry builds each tool's
+OpenAI function schema from the handler's signature (annotations give the JSON
+type, parameters without a default are required) and dispatches calls through
+a dict lookup. Schemas are built once on first use and reused for every
+request, so the tools payload is byte-identical from turn to turn.
+"""
+
+import inspect
+import logging
+import typing
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Descriptions shared by most tools; per-tool `params` override these
+COMMON_PARAM_DESCRIPTIONS = {
+    "user_id": "User ID",
+    "design_id": "Design ID",
+    "element_id": "Element ID",
+    "x": "X position",
+    "y": "Y position",
+    "width": "Width",
+    "height": "Height",
+    "fill_color": "Fill color (hex)",
+    "stroke_color": "Stroke color (hex)",
+    "stroke_width": "Stroke width",
+    "background_color": "Background color (hex)",
+}
+
+_JSON_TYPES = {str: "string", int: "number", float: "number", bool: "boolean", dict: "object", list: "array"}
+
+
+def json_type(annotation: Any) -> Optional[str]:
+    """JSON schema type for a parameter annotation (Optional[X] is treated as X)"""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return json_type(args[0]) if len(args) == 1 else None
+    return _JSON_TYPES.get(origin or annotation)
+
+
+class ToolSpec:
+    """One registered tool: its handler, call signature and model-facing schema"""
+
+    def __init__(self, name: str, handler: Callable, description: str,
+                 params: Dict[str, Any], required: Optional[List[str]] = None):
+        self.name = name
+        self.handler = handler
+        self.description = description
+        self.params = params
+        signature = inspect.signature(handler)
+        self.parameters = [p for p in signature.parameters.values() if p.name != "self"]
+        self.required = required if required is not None else [
+            p.name for p in self.parameters if p.default is inspect.Parameter.empty
+        ]
+        self.accepted = {p.name for p in self.parameters}
+
+    def schema(self) -> Dict[str, Any]:
+        properties = {}
+        for param in self.parameters:
+            override = self.params.get(param.name, {})
+            if isinstance(override, str):
+                override = {"description": override}
+            prop = {}
+            param_type = json_type(param.annotation)
+            if param_type:
+                prop["type"] = param_type
+            prop.update({k: v for k, v in override.items() if k != "description"})
+            description = override.get("description") or COMMON_PARAM_DESCRIPTIONS.get(param.name)
+            if description:
+                prop["description"] = description
+            properties[param.name] = prop
+        parameters = {"type": "object", "properties": properties}
+        if self.required:
+            parameters["required"] = list(self.required)
+        return {
+            "type": "function",
+            "function": {"name": self.name, "description": self.description, "parameters": parameters}
+        }
+
+    def bind(self, function_args: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Keyword arguments for the handler: required parameters are always passed
+        (None when the model omitted them), optional ones only when given, so the
+        handler's own defaults apply. Unknown arguments are dropped.
+        """
+        kwargs = {}
+        for param in self.parameters:
+            value = function_args.get(param.name)
+            if value is not None or param.default is inspect.Parameter.empty:
+                kwargs[param.name] = value
+        return kwargs
+
+
+class ToolRegistry:
+    """Name -> ToolSpec table with cached schemas"""
+
+    def __init__(self):
+        self._tools: Dict[str, ToolSpec] = {}
+        self._aliases: Dict[str, tuple] = {}
+        self._schemas: Optional[List[Dict[str, Any]]] = None
+
+    def tool(self, name: Optional[str] = None, description: Optional[str] = None,
+             params: Optional[Dict[str, Any]] = None, required: Optional[List[str]] = None):
+        """
+        Register the decorated coroutine as a tool. The name defaults to the
+        function name without its leading underscore and the description to the
+        first docstring line; `params` adds per-parameter descriptions/enums.
+        """
+        def decorator(handler: Callable) -> Callable:
+            tool_name = name or handler.__name__.lstrip("_")
+            tool_description = description or (inspect.getdoc(handler) or tool_name).splitlines()[0]
+            if tool_name in self._tools:
+                raise ValueError(f"Tool {tool_name} is already registered")
+            self._tools[tool_name] = ToolSpec(tool_name, handler, tool_description, params or {}, required)
+            self._schemas = None
+            return handler
+        return decorator
+
+    def alias(self, name: str, target: str, translate: Callable[[Dict[str, Any]], Dict[str, Any]]) -> None:
+        """Accept calls to a legacy tool name without advertising it in the schemas"""
+        self._aliases[name] = (target, translate)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools or name in self._aliases
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def schemas(self) -> List[Dict[str, Any]]:
+        if self._schemas is None:
+            self._schemas = [spec.schema() for spec in self._tools.values()]
+        return self._schemas
+
+    async def dispatch(self, owner: Any, name: str, function_args: Dict[str, Any]) -> Dict[str, Any]:
+        """Call a tool handler bound to owner; unknown names produce an error result"""
+        if name in self._aliases:
+            name, translate = self._aliases[name]
+            function_args = translate(function_args)
+        spec = self._tools.get(name)
+        if spec is None:
+            return {"error": f"Unknown function: {name}"}
+        return await spec.handler(owner, **spec.bind(function_args))
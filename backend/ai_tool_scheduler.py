@@ -0,0 +1,145 @@
+"""
+AI Tool Scheduler
+Runs the tool calls from one model turn concurrently while keeping calls that
+touch the same design in the order the model issued them. Each design gets a
+dependency chain: a call waits only for the previous call on the same design,
+so independent work (icon lookups, pricing, other designs) overlaps and a
+multi-tool turn takes roughly as long as its slowest chain.
+
+Every call is timed and isolated: a bad argument payload, an exception or a
+timeout becomes an error result for that call only. A call that times out is
+cancelled wherever it happens to be, so its design in the turn's DesignSession
+is put back to the state it had before the call; the partial edit is never
+committed.
+
+Tool names come from the model. Metrics label calls to names outside the
+registry as "unknown" so a hallucinated name cannot add a label series.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Container, Dict, List, Optional
+
+from .design_session import current_design_session
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for a single tool call; the chat request itself allows 120 s
+TOOL_TIMEOUT = float(os.getenv("AI_TOOL_TIMEOUT", "60"))
+
+ai_tool_duration_seconds = registry.histogram(
+    "buyprintz_ai_tool_duration_seconds", "AI agent tool call latency", ("tool", "outcome"))
+
+# Label / usage key for tool names the registry does not know
+UNKNOWN_TOOL = "unknown"
+
+ToolExecutor = Callable[[str, Dict[str, Any], Dict[str, Any]], Awaitable[Dict[str, Any]]]
+# Called with ("tool_start", payload) / ("tool_result", payload) as calls progress
+ToolEventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def ordering_key(function_args: Dict[str, Any]) -> Optional[str]:
+    """Calls sharing a key run sequentially; None means the call is independent"""
+    design_id = function_args.get("design_id")
+    return f"design:{design_id}" if design_id else None
+
+
+def tool_label(function_name: str, known_tools: Optional[Container[str]] = None) -> str:
+    """The name to record a call under: itself if registered (or no registry is given), else UNKNOWN_TOOL"""
+    if known_tools is None or function_name in known_tools:
+        return function_name
+    return UNKNOWN_TOOL
+
+
+class ToolScheduler:
+    """Schedules one turn's tool calls with per-design ordering"""
+
+    def __init__(self, executor: ToolExecutor, timeout: float = TOOL_TIMEOUT,
+                 on_event: Optional[ToolEventCallback] = None, known_tools: Optional[Container[str]] = None):
+        self.executor = executor
+        self.timeout = timeout
+        self.on_event = on_event
+        self.known_tools = known_tools
+
+    async def run(self, tool_calls: List[Any], context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Execute OpenAI tool calls and return results in the original call order.
+
+        Each result is {"tool_call_id", "function_name", "result", "duration"}.
+        """
+        chains: Dict[str, asyncio.Task] = {}
+        tasks: List[asyncio.Task] = []
+        for tool_call in tool_calls:
+            function_name = tool_call.function.name
+            try:
+                function_args = json.loads(tool_call.function.arguments or "{}")
+            except (TypeError, ValueError) as e:
+                function_args = None
+                parse_error = f"Invalid arguments for {function_name}: {e}"
+            else:
+                parse_error = None
+
+            key = ordering_key(function_args) if isinstance(function_args, dict) else None
+            previous = chains.get(key) if key else None
+            task = asyncio.ensure_future(
+                self._run_one(tool_call.id, function_name, function_args, parse_error, context, previous)
+            )
+            if key:
+                chains[key] = task
+            tasks.append(task)
+
+        return list(await asyncio.gather(*tasks))
+
+    async def _run_one(self, tool_call_id: str, function_name: str, function_args: Optional[Dict[str, Any]],
+                       parse_error: Optional[str], context: Dict[str, Any],
+                       previous: Optional[asyncio.Task]) -> Dict[str, Any]:
+        if previous is not None:
+            # Wait for the earlier call on the same design; its failure does not block us
+            await asyncio.wait([previous])
+
+        if self.on_event:
+            self.on_event("tool_start", {"tool_call_id": tool_call_id, "function_name": function_name})
+
+        start = time.perf_counter()
+        outcome = "success"
+        if parse_error:
+            outcome = "invalid_arguments"
+            result = {"success": False, "error": parse_error}
+        elif not isinstance(function_args, dict):
+            outcome = "invalid_arguments"
+            result = {"success": False, "error": f"Arguments for {function_name} must be an object"}
+        else:
+            session = current_design_session()
+            design_id = function_args.get("design_id")
+            restore = session.checkpoint(design_id) if session is not None and design_id else None
+            try:
+                result = await asyncio.wait_for(self.executor(function_name, function_args, context), self.timeout)
+                if isinstance(result, dict) and result.get("success") is False:
+                    outcome = "failed"
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                if restore is not None:
+                    restore()
+                result = {"success": False, "error": f"{function_name} timed out after {self.timeout:.0f}s"}
+            except Exception as e:
+                outcome = "error"
+                logger.exception("Tool %s raised", function_name)
+                result = {"success": False, "error": str(e)}
+
+        duration = time.perf_counter() - start
+        ai_tool_duration_seconds.observe(duration, tool=tool_label(function_name, self.known_tools),
+                                         outcome=outcome)
+        logger.info("Tool %s finished in %.0f ms (%s)", function_name, duration * 1000, outcome)
+        entry = {
+            "tool_call_id": tool_call_id,
+            "function_name": function_name,
+            "result": result,
+            "duration": duration
+        }
+        if self.on_event:
+            self.on_event("tool_result", entry)
+        return entry
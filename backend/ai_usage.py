@@ -0,0 +1,263 @@
+"""
+AI Usage Accounting
+Records prompt, completion and cached tokens, estimated cost and latency for
+every OpenAI call the AI agent makes, aggregated per user, per tool and per
+operation. Per-user spend is tracked over a rolling window and AI endpoints
+reject new requests with 429 once a user's budget is used up.
+
+Totals are exported on /metrics (without per-user labels, to keep cardinality
+bounded); the per-user view is on the admin route /api/admin/ai-usage.
+
+Memory stays bounded too: lifetime per-user totals keep only the most recently
+active AI_USAGE_MAX_USERS users, and a user's rolling window is dropped once it
+has no calls left in it. Tool and operation keys come from fixed sets (tools
+outside the registry are recorded as "unknown").
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from .ai_tool_scheduler import ai_tool_duration_seconds
+from .auth import get_current_user, require_admin_token
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M tokens; defaults are gpt-5-mini list prices
+AI_PRICE_INPUT_PER_1M = float(os.getenv("AI_PRICE_INPUT_PER_1M", "0.25"))
+AI_PRICE_CACHED_INPUT_PER_1M = float(os.getenv("AI_PRICE_CACHED_INPUT_PER_1M", "0.025"))
+AI_PRICE_OUTPUT_PER_1M = float(os.getenv("AI_PRICE_OUTPUT_PER_1M", "2.00"))
+# Per-user spend allowed within the rolling window; 0 disables the budget
+AI_USER_BUDGET_USD = float(os.getenv("AI_USER_BUDGET_USD", "0"))
+AI_USER_BUDGET_WINDOW = float(os.getenv("AI_USER_BUDGET_WINDOW", "86400"))
+# Users whose lifetime totals are kept; the least recently active are dropped first
+AI_USAGE_MAX_USERS = int(os.getenv("AI_USAGE_MAX_USERS", "10000"))
+
+ai_tokens_total = registry.counter(
+    "buyprintz_ai_tokens_total", "OpenAI tokens used by the AI agent", ("kind", "operation", "model"))
+ai_cost_usd_total = registry.counter(
+    "buyprintz_ai_cost_usd_total", "Estimated OpenAI spend in USD", ("operation", "model"))
+ai_tool_cost_usd_total = registry.counter(
+    "buyprintz_ai_tool_cost_usd_total", "Estimated OpenAI spend attributed to each tool", ("tool",))
+ai_budget_rejections_total = registry.counter(
+    "buyprintz_ai_budget_rejections_total", "AI requests rejected because the user's budget was exhausted")
+
+# User the current request's OpenAI calls are billed to (set by require_ai_budget)
+current_ai_user: ContextVar[Optional[str]] = ContextVar("current_ai_user", default=None)
+# Tool whose handler is running, so nested OpenAI calls are attributed to it
+current_ai_tool: ContextVar[Optional[str]] = ContextVar("current_ai_tool", default=None)
+
+
+def usage_counts(usage: Any) -> Tuple[int, int, int]:
+    """(prompt, completion, cached) tokens from an OpenAI usage object or dict"""
+    if usage is None:
+        return 0, 0, 0
+    get = usage.get if isinstance(usage, dict) else lambda name, default=None: getattr(usage, name, default)
+    details = get("prompt_tokens_details")
+    if isinstance(details, dict):
+        cached = details.get("cached_tokens")
+    else:
+        cached = getattr(details, "cached_tokens", None)
+    return int(get("prompt_tokens", 0) or 0), int(get("completion_tokens", 0) or 0), int(cached or 0)
+
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int, cached_tokens: int) -> float:
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (uncached * AI_PRICE_INPUT_PER_1M
+            + cached_tokens * AI_PRICE_CACHED_INPUT_PER_1M
+            + completion_tokens * AI_PRICE_OUTPUT_PER_1M) / 1_000_000
+
+
+class _Totals:
+    __slots__ = ("calls", "prompt_tokens", "completion_tokens", "cached_tokens", "cost", "latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.cost = 0.0
+        self.latency = 0.0
+
+    def add(self, prompt: float, completion: float, cached: float, cost: float, latency: float,
+            calls: float = 1) -> None:
+        self.calls += calls
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.cached_tokens += cached
+        self.cost += cost
+        self.latency += latency
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": round(self.calls, 2),
+            "prompt_tokens": round(self.prompt_tokens),
+            "completion_tokens": round(self.completion_tokens),
+            "cached_tokens": round(self.cached_tokens),
+            "cost_usd": round(self.cost, 6),
+            "mean_latency": round(self.latency / self.calls, 4) if self.calls else None
+        }
+
+
+class UsageTracker:
+    """Lifetime totals per user/tool/operation plus each user's rolling-window spend"""
+
+    def __init__(self, budget_usd: float = AI_USER_BUDGET_USD, window: float = AI_USER_BUDGET_WINDOW,
+                 max_users: int = AI_USAGE_MAX_USERS):
+        self.budget_usd = budget_usd
+        self.window = window
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._users: "OrderedDict[str, _Totals]" = OrderedDict()
+        self._tools: Dict[str, _Totals] = {}
+        self._operations: Dict[str, _Totals] = {}
+        self._recent: Dict[str, Deque[Tuple[float, float, int]]] = {}
+        self._next_sweep = 0.0
+
+    def record(self, operation: str, model: str, usage: Any, latency: float, user_id: Optional[str] = None,
+               tools: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Account one OpenAI call. user_id and tools default to the current request's
+        user and running tool; usage shared by several tools is split evenly.
+        """
+        prompt, completion, cached = usage_counts(usage)
+        cost = estimate_cost(prompt, completion, cached)
+        user_id = user_id or current_ai_user.get() or "anonymous"
+        if tools is None:
+            tools = [current_ai_tool.get()] if current_ai_tool.get() else []
+        tools = list(tools)
+
+        ai_tokens_total.inc(prompt, kind="prompt", operation=operation, model=model)
+        ai_tokens_total.inc(completion, kind="completion", operation=operation, model=model)
+        ai_tokens_total.inc(cached, kind="cached", operation=operation, model=model)
+        ai_cost_usd_total.inc(cost, operation=operation, model=model)
+
+        now = time.time()
+        with self._lock:
+            totals = self._users.get(user_id)
+            if totals is None:
+                totals = self._users[user_id] = _Totals()
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            else:
+                self._users.move_to_end(user_id)
+            totals.add(prompt, completion, cached, cost, latency)
+            self._operations.setdefault(operation, _Totals()).add(prompt, completion, cached, cost, latency)
+            share = 1 / len(tools) if tools else 0
+            for tool in tools:
+                self._tools.setdefault(tool, _Totals()).add(
+                    prompt * share, completion * share, cached * share, cost * share, latency * share, calls=share)
+                ai_tool_cost_usd_total.inc(cost * share, tool=tool)
+            recent = self._recent.setdefault(user_id, deque())
+            recent.append((now, cost, prompt + completion))
+            self._expire(recent, now)
+            if now >= self._next_sweep:
+                self._sweep(now)
+
+        logger.debug("OpenAI %s for %s: %d prompt (%d cached) + %d completion tokens, $%.6f, %.0f ms",
+                     operation, user_id, prompt, cached, completion, cost, latency * 1000)
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "cached_tokens": cached, "cost_usd": cost}
+
+    def _expire(self, recent: Deque[Tuple[float, float, int]], now: float) -> None:
+        cutoff = now - self.window
+        while recent and recent[0][0] < cutoff:
+            recent.popleft()
+
+    def _sweep(self, now: float) -> None:
+        """Drop the windows of users with no calls left in them (once per window)"""
+        for user_id in list(self._recent):
+            recent = self._recent[user_id]
+            self._expire(recent, now)
+            if not recent:
+                del self._recent[user_id]
+        self._next_sweep = now + self.window
+
+    def window_usage(self, user_id: str) -> Dict[str, Any]:
+        """Spend and tokens for a user within the rolling budget window"""
+        with self._lock:
+            recent = self._recent.get(user_id)
+            if recent is not None:
+                self._expire(recent, time.time())
+                if not recent:
+                    del self._recent[user_id]
+            entries = list(recent or ())
+        spent = sum(cost for _, cost, _ in entries)
+        return {
+            "window_seconds": self.window,
+            "resets_in_seconds": round(max(entries[0][0] + self.window - time.time(), 0), 1) if entries else 0,
+            "cost_usd": round(spent, 6),
+            "tokens": sum(tokens for _, _, tokens in entries),
+            "budget_usd": self.budget_usd or None,
+            "remaining_usd": round(max(self.budget_usd - spent, 0.0), 6) if self.budget_usd else None
+        }
+
+    def over_budget(self, user_id: str) -> bool:
+        if self.budget_usd <= 0:
+            return False
+        return self.window_usage(user_id)["cost_usd"] >= self.budget_usd
+
+    def snapshot(self, top: int = 50) -> Dict[str, Any]:
+        with self._lock:
+            users = sorted(self._users.items(), key=lambda item: item[1].cost, reverse=True)[:top]
+            users = [(user_id, totals.as_dict()) for user_id, totals in users]
+            tools = {name: totals.as_dict() for name, totals in self._tools.items()}
+            operations = {name: totals.as_dict() for name, totals in self._operations.items()}
+        return {
+            "users": [{"user_id": user_id, **totals, "window": self.window_usage(user_id)} for user_id, totals in users],
+            "tools": tools,
+            "operations": operations,
+            "budget": {"budget_usd": self.budget_usd or None, "window_seconds": self.window}
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._users.clear()
+            self._tools.clear()
+            self._operations.clear()
+            self._recent.clear()
+            self._next_sweep = 0.0
+
+
+usage_tracker = UsageTracker()
+
+
+async def require_ai_budget(current_user: dict = Depends(get_current_user)) -> dict:
+    """get_current_user for AI endpoints: rejects users over budget and bills the request to them"""
+    user_id = current_user["user_id"]
+    if usage_tracker.over_budget(user_id):
+        ai_budget_rejections_total.inc()
+        window = usage_tracker.window_usage(user_id)
+        logger.warning("AI budget exhausted for %s ($%.4f in window)", user_id, window["cost_usd"])
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="AI usage budget exhausted, please try again later",
+            headers={"Retry-After": str(max(int(window["resets_in_seconds"]), 1))}
+        )
+    current_ai_user.set(user_id)
+    return current_user
+
+
+router = APIRouter(prefix="/api/admin/ai-usage", tags=["Admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("")
+async def get_ai_usage(top: int = 50) -> Dict[str, Any]:
+    """Token, cost and latency totals per user, tool and operation"""
+    return {
+        "success": True,
+        **usage_tracker.snapshot(top),
+        "tool_latency": ai_tool_duration_seconds.summary()
+    }
+
+
+@router.get("/users/{user_id}")
+async def get_ai_user_usage(user_id: str) -> Dict[str, Any]:
+    """One user's rolling-window spend against the budget"""
+    return {"success": True, "user_id": user_id, "window": usage_tracker.window_usage(user_id)}
@@ -0,0 +1,533 @@
+"""
+Artwork Preflight
+Print-readiness checks for uploaded artwork. Opening a 200-megapixel upload to
+read its size and colour mode takes seconds, so each distinct file (by its
+content hash) is analysed once, in a process pool, as soon as it is stored:
+pixel size, embedded DPI, colour mode, ICC profile and whether any pixel is
+actually transparent. The analysis is cached in memory and as
+<PREFLIGHT_CACHE_DIR>/<sha256>.json, so it survives restarts and is shared by
+every design that uses the file.
+
+Everything that depends on how the artwork is used is cheap arithmetic on that
+cached analysis, done on request:
+
+  resolution    effective DPI at the printed size (an image stretched across a
+                4 ft banner has far fewer pixels per inch than its file says)
+  colour        products printed from CMYK specs (business card tins) warn on
+                RGB artwork, which is converted and can shift bright colours
+  transparency  vinyl stickers print nothing under transparent pixels
+  bleed/safe    artwork that reaches the trim line, sits in the safe margin,
+                or has to be cropped past the safe zone to fill the print
+
+Order creation and checkout read only the cache; artwork whose analysis has
+not finished yet is reported as pending instead of being decoded in the request.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from PIL import Image
+
+from . import artwork_storage
+from .artwork_storage import find_artwork
+from .canvas_renderer import canvas_elements, canvas_size
+from .generate_thumbnails import validate_image_file
+from .metrics import registry
+from .print_export import ORDER_EXPORT_DPI, PrintSpec
+
+logger = logging.getLogger(__name__)
+
+PREFLIGHT_CACHE_DIR = os.getenv("PREFLIGHT_CACHE_DIR", "cache/preflight")
+PREFLIGHT_WORKERS = int(os.getenv("PREFLIGHT_WORKERS", "1"))
+PREFLIGHT_MEMORY_ENTRIES = int(os.getenv("PREFLIGHT_MEMORY_ENTRIES", "2048"))
+ANALYSIS_VERSION = 1
+PDF_SCAN_BYTES = 8 * 1024 * 1024
+EDGE_TOLERANCE_IN = 0.01
+
+# Per product: lowest acceptable DPI (the export DPI is the recommended one),
+# required colour mode, whether transparency survives printing, bleed and safe margin in inches
+PRINT_REQUIREMENTS = {
+    "banner": {"min_dpi": 100, "color_mode": None, "transparency": True, "bleed_in": 0.5, "safe_in": 1.0},
+    "business_card_tin": {"min_dpi": 200, "color_mode": "CMYK", "transparency": False,
+                          "bleed_in": 0.0625, "safe_in": 0.125},
+}
+SEVERITY = {"pass": 0, "pending": 1, "warn": 2, "fail": 3}
+
+preflight_analyses_total = registry.counter(
+    "buyprintz_preflight_analyses_total", "Artwork preflight analyses by outcome", ("result",))
+preflight_lookups_total = registry.counter(
+    "buyprintz_preflight_lookups_total", "Preflight analysis lookups by where they were found", ("result",))
+preflight_analysis_seconds = registry.histogram(
+    "buyprintz_preflight_analysis_seconds", "Time to analyse one artwork file in a worker", ())
+
+_MEDIA_BOX = re.compile(rb"/MediaBox\s*\[\s*(-?[\d.]+)\s+(-?[\d.]+)\s+(-?[\d.]+)\s+(-?[\d.]+)\s*\]")
+_PDF_PAGE = re.compile(rb"/Type\s*/Page(?!s)")
+_UPLOAD_NAME = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]+$")
+_SIZE = re.compile(r"^\s*([\d.]+)\s*(?:ft|in|\")?\s*[x×]\s*([\d.]+)\s*(ft|in|\"|px)?", re.IGNORECASE)
+
+
+# ---------------------------------------------------------------- analysis (worker process)
+
+def _color_mode(mode: str) -> str:
+    if mode == "CMYK":
+        return "CMYK"
+    if mode in ("RGB", "RGBA", "RGBX"):
+        return "RGB"
+    if mode in ("1", "L", "LA", "I", "I;16", "F"):
+        return "grayscale"
+    if mode in ("P", "PA"):
+        return "indexed"
+    return mode
+
+
+def _has_transparent_pixels(img: Image.Image) -> bool:
+    if img.mode in ("RGBA", "LA", "PA"):
+        alpha = img.getchannel("A")
+    elif "transparency" in img.info:
+        alpha = img.convert("RGBA").getchannel("A")
+    else:
+        return False
+    return alpha.getextrema()[0] < 255
+
+
+def _analyze_raster(path: str) -> Dict[str, Any]:
+    valid, message = validate_image_file(path)
+    if not valid:
+        return {"valid": False, "error": message}
+    with Image.open(path) as img:
+        dpi = img.info.get("dpi")
+        return {
+            "valid": True,
+            "format": img.format,
+            "vector": False,
+            "width": img.width,
+            "height": img.height,
+            "mode": img.mode,
+            "color_mode": _color_mode(img.mode),
+            "icc_profile": bool(img.info.get("icc_profile")),
+            "embedded_dpi": [round(float(d), 2) for d in dpi] if dpi else None,
+            "has_alpha": img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info,
+            "transparent": _has_transparent_pixels(img),
+        }
+
+
+def _analyze_pdf(path: str) -> Dict[str, Any]:
+    """Page size and colour spaces from the first PDF_SCAN_BYTES; pages are vector, so no pixel size"""
+    with open(path, "rb") as f:
+        data = f.read(PDF_SCAN_BYTES)
+    if not data.startswith(b"%PDF-"):
+        return {"valid": False, "error": "Not a PDF file"}
+    box = _MEDIA_BOX.search(data)
+    width_in = height_in = None
+    if box:
+        x0, y0, x1, y1 = (float(v) for v in box.groups())
+        width_in, height_in = round(abs(x1 - x0) / 72, 3), round(abs(y1 - y0) / 72, 3)
+    if b"/DeviceCMYK" in data:
+        color_mode = "CMYK"
+    elif b"/DeviceRGB" in data or b"/ICCBased" in data:
+        color_mode = "RGB"
+    else:
+        color_mode = "unknown"
+    return {"valid": True, "format": "PDF", "vector": True, "pages": len(_PDF_PAGE.findall(data)) or None,
+            "width_in": width_in, "height_in": height_in, "color_mode": color_mode,
+            "has_alpha": b"/SMask" in data, "transparent": b"/SMask" in data}
+
+
+def analyze_artwork(path: str) -> Dict[str, Any]:
+    """Usage-independent facts about one artwork file (runs in a worker process)"""
+    started = time.perf_counter()
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        result = _analyze_pdf(path)
+    elif extension == ".svg":
+        result = {"valid": True, "format": "SVG", "vector": True, "color_mode": "RGB",
+                  "has_alpha": True, "transparent": True}
+    else:
+        result = _analyze_raster(path)
+    result.update(version=ANALYSIS_VERSION, bytes=os.path.getsize(path),
+                  seconds=round(time.perf_counter() - started, 4))
+    return result
+
+
+# ---------------------------------------------------------------- cache and worker pool
+
+class ArtworkPreflightService:
+    """Analyses each content hash once in a process pool; memory LRU in front of JSON files"""
+
+    def __init__(self, directory: Optional[str] = None, workers: int = PREFLIGHT_WORKERS,
+                 memory_entries: int = PREFLIGHT_MEMORY_ENTRIES):
+        self._directory = directory
+        self.workers = workers
+        self.memory_entries = memory_entries
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Results arrive on the pool's callback thread
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+
+    @property
+    def directory(self) -> str:
+        return self._directory or PREFLIGHT_CACHE_DIR
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Started on first upload so importing the app does not start workers; spawned rather
+        # than forked from the threaded API process (see PrintExportService.pool)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _submit(self, path: str) -> Future:
+        pool = self.pool
+        try:
+            return pool.submit(analyze_artwork, path)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); the executor never recovers, so replace it
+            logger.warning("Preflight worker pool is broken; starting a new one")
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            return self.pool.submit(analyze_artwork, path)
+
+    def _path(self, sha256: str, directory: Optional[str] = None) -> str:
+        return os.path.join(directory or self.directory, f"{sha256}.json")
+
+    def _remember(self, sha256: str, analysis: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[sha256] = analysis
+            self._memory.move_to_end(sha256)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def cached(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """The stored analysis for a hash without computing anything"""
+        with self._lock:
+            analysis = self._memory.get(sha256)
+            if analysis is not None:
+                self._memory.move_to_end(sha256)
+        if analysis is not None:
+            preflight_lookups_total.inc(result="memory")
+            return analysis
+        try:
+            with open(self._path(sha256), encoding="utf-8") as f:
+                analysis = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if analysis.get("version") != ANALYSIS_VERSION:
+            return None
+        self._remember(sha256, analysis)
+        preflight_lookups_total.inc(result="disk")
+        return analysis
+
+    def _store(self, sha256: str, analysis: Dict[str, Any], directory: Optional[str] = None) -> None:
+        self._remember(sha256, analysis)
+        path = self._path(sha256, directory)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(analysis, f)
+        os.replace(temp_path, path)
+
+    def _finished(self, sha256: str, directory: str, analysed: Future, cached: Future) -> None:
+        """Cache a worker's result, then complete the future callers wait on"""
+        if analysed.cancelled() or analysed.exception() is not None:
+            error = analysed.exception() if not analysed.cancelled() else RuntimeError("Preflight cancelled")
+            preflight_analyses_total.inc(result="error")
+            logger.warning("Preflight of %s failed: %s", sha256, error)
+            with self._lock:
+                self._inflight.pop(sha256, None)
+            cached.set_exception(error)
+            return
+        analysis = analysed.result()
+        preflight_analyses_total.inc(result="valid" if analysis.get("valid") else "invalid")
+        preflight_analysis_seconds.observe(analysis["seconds"])
+        try:
+            self._store(sha256, analysis, directory)
+        except OSError as e:
+            logger.warning("Could not cache preflight of %s: %s", sha256, e)
+        with self._lock:
+            self._inflight.pop(sha256, None)
+        cached.set_result(analysis)
+
+    def schedule(self, sha256: str, path: str) -> Optional[Future]:
+        """Start analysing a stored file unless it is cached or already running"""
+        with self._lock:
+            if sha256 in self._inflight:
+                return self._inflight[sha256]
+        if self.cached(sha256) is not None:
+            return None
+        cached: Future = Future()
+        with self._lock:
+            if sha256 in self._inflight:
+                return self._inflight[sha256]
+            self._inflight[sha256] = cached
+        directory = self.directory
+        try:
+            analysed = self._submit(path)
+        except RuntimeError as e:  # shutting down: checkout reports the artwork as pending
+            logger.warning("Could not queue preflight of %s: %s", sha256, e)
+            with self._lock:
+                self._inflight.pop(sha256, None)
+            return None
+        analysed.add_done_callback(lambda f: self._finished(sha256, directory, f, cached))
+        return cached
+
+    def schedule_stored(self, stored: Dict[str, Any]) -> Optional[Future]:
+        """Queue the analysis of a file just returned by store_upload / commit_part"""
+        return self.schedule(stored["sha256"], os.path.join(artwork_storage.UPLOAD_DIR, stored["filename"]))
+
+    async def analysis(self, sha256: str, compute: bool = True) -> Optional[Dict[str, Any]]:
+        """Cached analysis, waiting for a running one; with compute, analyse stored artwork not seen yet"""
+        analysis = self.cached(sha256)
+        if analysis is not None:
+            return analysis
+        with self._lock:
+            future = self._inflight.get(sha256)
+        if future is None and compute:
+            stored = find_artwork(sha256)
+            if stored is not None:
+                future = self.schedule_stored(stored)
+        if future is None:
+            return self.cached(sha256)
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception as e:
+            # A worker died or the analysis raised; nothing was cached, so a later request retries
+            return {"valid": False, "error": f"Artwork could not be analysed: {str(e) or type(e).__name__}"}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"memory_entries": len(self._memory), "max_memory_entries": self.memory_entries,
+                    "in_flight": len(self._inflight), "workers": self.workers}
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+preflight_service = ArtworkPreflightService()
+
+
+# ---------------------------------------------------------------- checks (request time, no image I/O)
+
+def _num(value: Any, default: float) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return number if math.isfinite(number) else default
+
+
+def _check(check: str, status: str, message: str, **details) -> Dict[str, Any]:
+    return {"check": check, "status": status, "message": message, **details}
+
+
+def _worst(statuses: Iterable[str]) -> str:
+    return max(statuses, key=SEVERITY.__getitem__, default="pass")
+
+
+def requirements_for(product_type: Optional[str]) -> Dict[str, Any]:
+    return PRINT_REQUIREMENTS.get(product_type or "banner", PRINT_REQUIREMENTS["banner"])
+
+
+def parse_print_size(banner_size: Optional[str], default_unit: str = "ft") -> Optional[Tuple[float, float]]:
+    """
+    '2x4', '2ft x 4ft' or '24x36in' -> inches. None for pixel sizes ('800x400px'),
+    which say nothing about print size, and for sizes that are not positive.
+    """
+    match = _SIZE.match(banner_size or "")
+    if not match:
+        return None
+    unit = (match.group(3) or default_unit).lower()
+    if unit == "px":
+        return None
+    factor = 12 if unit == "ft" else 1
+    width, height = float(match.group(1)) * factor, float(match.group(2)) * factor
+    return (width, height) if width > 0 and height > 0 else None
+
+
+def _resolution(analysis: Dict[str, Any], width_in: float, height_in: float,
+                min_dpi: int, recommended_dpi: int) -> Dict[str, Any]:
+    if width_in <= 0 or height_in <= 0:
+        raise ValueError(f"Print size must be positive, got {width_in:g}x{height_in:g} in")
+    if analysis.get("vector"):
+        return _check("resolution", "pass", "Vector artwork prints sharp at any size", effective_dpi=None)
+    dpi = round(min(analysis["width"] / width_in, analysis["height"] / height_in), 1)
+    if dpi < min_dpi:
+        return _check("resolution", "fail", f"{dpi:g} DPI at {width_in:g}x{height_in:g} in is below the "
+                      f"{min_dpi} DPI minimum and will print blurry", effective_dpi=dpi)
+    if dpi < recommended_dpi:
+        return _check("resolution", "warn", f"{dpi:g} DPI at {width_in:g}x{height_in:g} in; "
+                      f"{recommended_dpi} DPI is recommended", effective_dpi=dpi)
+    return _check("resolution", "pass", f"{dpi:g} DPI at {width_in:g}x{height_in:g} in", effective_dpi=dpi)
+
+
+def _color(analysis: Dict[str, Any], requirements: Dict[str, Any]) -> Dict[str, Any]:
+    required, actual = requirements["color_mode"], analysis.get("color_mode")
+    if not required or actual == required:
+        return _check("color_mode", "pass", f"{actual} artwork", color_mode=actual)
+    return _check("color_mode", "warn", f"{actual} artwork will be converted to {required} for print; "
+                  f"bright colours may shift", color_mode=actual)
+
+
+def _transparency(analysis: Dict[str, Any], requirements: Dict[str, Any]) -> Dict[str, Any]:
+    if not analysis.get("transparent"):
+        return _check("transparency", "pass", "No transparent areas")
+    if requirements["transparency"]:
+        return _check("transparency", "pass", "Transparent areas are flattened onto the design background")
+    return _check("transparency", "warn", "Transparent areas are not printed; the material shows through")
+
+
+def _cover_fit(analysis: Dict[str, Any], width_in: float, height_in: float,
+               requirements: Dict[str, Any]) -> Dict[str, Any]:
+    """Artwork scaled to cover the trim plus bleed: how much is cropped past the edges"""
+    if analysis.get("vector") and not analysis.get("width_in"):
+        return _check("bleed", "pass", "Vector artwork; page size unknown")
+    art_w = analysis.get("width_in") or analysis["width"]
+    art_h = analysis.get("height_in") or analysis["height"]
+    bleed, safe = requirements["bleed_in"], requirements["safe_in"]
+    full_w, full_h = width_in + 2 * bleed, height_in + 2 * bleed
+    scale = max(full_w / art_w, full_h / art_h)
+    crop_x, crop_y = (art_w * scale - full_w) / 2, (art_h * scale - full_h) / 2
+    crop = round(max(crop_x, crop_y), 3)
+    if crop <= safe:
+        return _check("bleed", "pass", f"Fills the {bleed:g} in bleed", crop_in=crop)
+    sides = "left and right" if crop_x > crop_y else "top and bottom"
+    return _check("bleed", "warn", f"Aspect ratio differs from the print: {crop:g} in is cropped from the {sides} "
+                  f"edges, past the {safe:g} in safe zone", crop_in=crop)
+
+
+def _placement_fit(bounds: Tuple[float, float, float, float], width_in: float, height_in: float,
+                   requirements: Dict[str, Any]) -> Dict[str, Any]:
+    """An image placed on the design: does it stop at the trim line, or sit in the safe margin"""
+    left, top, right, bottom = bounds
+    gaps = {"left": left, "top": top, "right": width_in - right, "bottom": height_in - bottom}
+    safe = requirements["safe_in"]
+    at_trim = [side for side, gap in gaps.items() if gap <= EDGE_TOLERANCE_IN]
+    in_margin = [side for side, gap in gaps.items() if EDGE_TOLERANCE_IN < gap < safe]
+    if in_margin:
+        return _check("bleed", "warn", f"Inside the {safe:g} in safe margin on the {', '.join(in_margin)} edge; "
+                      f"extend it past the edge or move it in", edges=in_margin)
+    if at_trim:
+        return _check("bleed", "warn", f"Runs to the trim line on the {', '.join(at_trim)} edge with no bleed; "
+                      f"a slight mis-cut can leave a thin border", edges=at_trim)
+    return _check("bleed", "pass", "Clear of the trim and safe margin")
+
+
+def _report(checks: List[Dict[str, Any]], **extra) -> Dict[str, Any]:
+    status = _worst(check["status"] for check in checks)
+    effective = [c["effective_dpi"] for c in checks if c.get("effective_dpi") is not None]
+    return {"status": status, "ready": status != "fail", "effective_dpi": min(effective) if effective else None,
+            "checks": checks, **extra}
+
+
+def evaluate_artwork(analysis: Dict[str, Any], width_in: float, height_in: float,
+                     product_type: Optional[str] = None, dpi: Optional[int] = None) -> Dict[str, Any]:
+    """Preflight report for artwork printed on its own, filling a width_in x height_in print"""
+    if not analysis.get("valid"):
+        return _report([_check("file", "fail", analysis.get("error") or "Unreadable artwork")])
+    requirements = requirements_for(product_type)
+    art_w = analysis.get("width_in") or analysis.get("width") or width_in
+    art_h = analysis.get("height_in") or analysis.get("height") or height_in
+    # Product sizes are orientation-agnostic; follow the artwork's orientation like PrintSpec does
+    if (art_w >= art_h) != (width_in >= height_in):
+        width_in, height_in = height_in, width_in
+    recommended = dpi or ORDER_EXPORT_DPI
+    return _report([
+        _resolution(analysis, width_in, height_in, requirements["min_dpi"], max(recommended, requirements["min_dpi"])),
+        _color(analysis, requirements),
+        _transparency(analysis, requirements),
+        _cover_fit(analysis, width_in, height_in, requirements),
+    ], width_in=width_in, height_in=height_in)
+
+
+# ---------------------------------------------------------------- designs and orders
+
+def uploaded_artwork_hash(element: Dict[str, Any]) -> Optional[str]:
+    """Content hash of the /uploads/<sha256>.<ext> file an image element shows, if any"""
+    for field in ("image", "src", "imagePath"):
+        source = element.get(field)
+        if isinstance(source, str) and source:
+            path = unquote(urlparse(source).path)
+            if path.startswith("/uploads/"):
+                match = _UPLOAD_NAME.match(path[len("/uploads/"):])
+                return match.group(1) if match else None
+    return None
+
+
+def placed_artwork(canvas_data: Dict[str, Any], spec: PrintSpec) -> List[Dict[str, Any]]:
+    """Uploaded artwork on a design with its printed position and size in inches"""
+    design_size = canvas_size(canvas_data)
+    width_px, height_px, scale = spec.output_size(design_size)
+    inches = scale / spec.dpi  # inches per design unit
+    placed = []
+    for element in canvas_elements(canvas_data):
+        sha256 = uploaded_artwork_hash(element)
+        if sha256 is None or element.get("visible") is False:
+            continue
+        x, y = _num(element.get("x"), 0) * inches, _num(element.get("y"), 0) * inches
+        w = max(_num(element.get("width"), 100), 1e-6) * inches
+        h = max(_num(element.get("height"), 100), 1e-6) * inches
+        placed.append({"element_id": element.get("id"), "sha256": sha256, "width_in": w, "height_in": h,
+                       "bounds": None if _num(element.get("rotation"), 0) % 360 else (x, y, x + w, y + h),
+                       "trim": (width_px / spec.dpi, height_px / spec.dpi)})
+    return placed
+
+
+def evaluate_placement(analysis: Dict[str, Any], placement: Dict[str, Any], spec: PrintSpec,
+                       product_type: Optional[str] = None) -> Dict[str, Any]:
+    if not analysis.get("valid"):
+        return _report([_check("file", "fail", analysis.get("error") or "Unreadable artwork")])
+    requirements = requirements_for(product_type)
+    width_in, height_in = placement["width_in"], placement["height_in"]
+    checks = [
+        _resolution(analysis, width_in, height_in, requirements["min_dpi"], max(spec.dpi, requirements["min_dpi"])),
+        _color(analysis, requirements),
+        _transparency(analysis, requirements),
+    ]
+    if placement["bounds"] is not None:
+        checks.append(_placement_fit(placement["bounds"], *placement["trim"], requirements))
+    return _report(checks)
+
+
+def preflight_jobs(jobs: List[Tuple[str, Any, PrintSpec]], product_type: Optional[str] = None,
+                         service: Optional[ArtworkPreflightService] = None) -> Dict[str, Any]:
+    """
+    Preflight every uploaded image on the (label, canvas_data, spec) jobs of an
+    order (print_export.order_print_jobs / tin_print_jobs). Reads cached analyses
+    only: artwork still being analysed is 'pending' and its analysis is queued.
+    """
+    service = service or preflight_service
+    items = []
+    for label, canvas_data, spec in jobs:
+        for placement in placed_artwork(canvas_data, spec):
+            sha256 = placement["sha256"]
+            analysis = service.cached(sha256)
+            if analysis is None:
+                preflight_lookups_total.inc(result="pending")
+                stored = find_artwork(sha256)
+                if stored is not None:
+                    service.schedule_stored(stored)
+                    report = _report([_check("analysis", "pending", "Artwork is still being analysed")])
+                else:
+                    report = _report([_check("file", "fail", "Artwork file is missing")])
+            else:
+                report = evaluate_placement(analysis, placement, spec, product_type)
+            items.append({"label": label, "element_id": placement["element_id"], "sha256": sha256, **report})
+    status = _worst(item["status"] for item in items)
+    return {"status": status, "ready": status != "fail", "items": items}
@@ -0,0 +1,130 @@
+"""
+Artwork Storage
+Content-addressed storage for uploaded artwork. Uploads are streamed to disk in
+fixed-size chunks while a SHA-256 is computed incrementally, so memory per
+upload stays constant and a size cap is enforced as bytes arrive. Files are
+stored as uploads/<sha256>.<ext>: uploading the same artwork again keeps the
+existing file instead of writing a copy, and a client that already knows the
+hash can ask for the stored URL without sending the file at all.
+"""
+
+import glob
+import hashlib
+import logging
+import os
+import re
+import uuid
+from typing import Optional
+
+import aiofiles
+from fastapi import UploadFile
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Allowed content types and the extension stored for each
+ARTWORK_TYPES = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/svg+xml": "svg",
+    "application/pdf": "pdf",
+}
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+artwork_uploads_total = registry.counter(
+    "buyprintz_artwork_uploads_total", "Artwork uploads by outcome", ("result",))
+artwork_upload_bytes_total = registry.counter(
+    "buyprintz_artwork_upload_bytes_total", "Artwork bytes received and bytes actually written", ("kind",))
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeded max_bytes; nothing was kept"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+        self.max_bytes = max_bytes
+
+
+def artwork_url(filename: str) -> str:
+    return f"/uploads/{filename}"
+
+
+def find_artwork(sha256: str, upload_dir: Optional[str] = None) -> Optional[dict]:
+    """The stored file for a content hash (same shape as store_upload), if uploaded before"""
+    upload_dir = upload_dir or UPLOAD_DIR
+    sha256 = sha256.lower()
+    if not _SHA256.match(sha256):
+        return None
+    for path in glob.glob(os.path.join(upload_dir, f"{sha256}.*")):
+        if not path.endswith(".part"):
+            return {"sha256": sha256, "filename": os.path.basename(path), "size": os.path.getsize(path),
+                    "deduplicated": True}
+    return None
+
+
+async def store_upload(file: UploadFile, extension: str, upload_dir: Optional[str] = None,
+                       max_bytes: Optional[int] = None) -> dict:
+    """
+    Stream an upload into content-addressed storage.
+    Returns sha256, filename, size and whether an identical file already existed.
+    Raises UploadTooLarge (after removing the partial file) when over max_bytes.
+    """
+    upload_dir = upload_dir or UPLOAD_DIR
+    max_bytes = max_bytes or MAX_FILE_SIZE
+    os.makedirs(upload_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    part_path = os.path.join(upload_dir, f"{uuid.uuid4()}.part")
+    try:
+        async with aiofiles.open(part_path, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        if size > max_bytes:
+            artwork_uploads_total.inc(result="too_large")
+        raise
+
+    return commit_part(part_path, digest.hexdigest(), size, extension, upload_dir)
+
+
+def store_bytes(data: bytes, extension: str, upload_dir: Optional[str] = None) -> dict:
+    """Content-addressed storage for a file made in memory (order proofs and thumbnails)"""
+    upload_dir = upload_dir or UPLOAD_DIR
+    os.makedirs(upload_dir, exist_ok=True)
+    part_path = os.path.join(upload_dir, f"{uuid.uuid4()}.part")
+    with open(part_path, "wb") as f:
+        f.write(data)
+    return commit_part(part_path, hashlib.sha256(data).hexdigest(), len(data), extension, upload_dir)
+
+
+def commit_part(part_path: str, sha256: str, size: int, extension: str, upload_dir: Optional[str] = None) -> dict:
+    """Move a fully written .part file to its content address, or drop it if that exists"""
+    filename = f"{sha256}.{extension}"
+    final_path = os.path.join(upload_dir or UPLOAD_DIR, filename)
+    artwork_upload_bytes_total.inc(size, kind="received")
+    if os.path.exists(final_path):
+        os.remove(part_path)
+        artwork_uploads_total.inc(result="duplicate")
+        deduplicated = True
+    else:
+        os.replace(part_path, final_path)
+        artwork_uploads_total.inc(result="stored")
+        artwork_upload_bytes_total.inc(size, kind="written")
+        deduplicated = False
+    logger.info("Artwork %s (%d bytes)%s", filename, size, " already stored" if deduplicated else "")
+    return {"sha256": sha256, "filename": filename, "size": size, "deduplicated": deduplicated}
@@ -1,9 +1,15 @@
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Header, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Dict, Any, Tuple
+from collections import OrderedDict
+import hashlib
+import hmac
+import logging
+import threading
+import time
 import os
 from supabase import create_client, Client
 from dotenv import load_dotenv
@@ -11,6 +17,8 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Initialize Supabase auth client for user authentication
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_anon_key = os.getenv("SUPABASE_ANON_KEY")  # Use the anon key from Railway
@@ -18,15 +26,15 @@ supabase_anon_key = os.getenv("SUPABASE_ANON_KEY")  # Use the anon key from Rail
 if supabase_url and supabase_anon_key:
     try:
         supabase_auth: Client = create_client(supabase_url, supabase_anon_key)
-        print("✅ Supabase auth client initialized successfully")
+        logger.info("✅ Supabase auth client initialized successfully")
     except Exception as e:
-        print(f"❌ Failed to initialize Supabase auth client: {e}")
+        logger.error("❌ Failed to initialize Supabase auth client: %s", e)
         supabase_auth = None
 else:
-    print("⚠️ Supabase auth environment variables not found.")
-    print(f"SUPABASE_URL: {'✓' if supabase_url else '✗'}")
-    print(f"SUPABASE_ANON_KEY: {'✓' if supabase_anon_key else '✗'}")
-    print("Auth features will be disabled.")
+    logger.warning("⚠️ Supabase auth environment variables not found.")
+    logger.info("SUPABASE_URL: %s", '✓' if supabase_url else '✗')
+    logger.info("SUPABASE_ANON_KEY: %s", '✓' if supabase_anon_key else '✗')
+    logger.info("Auth features will be disabled.")
     supabase_auth = None
 
 # JWT Configuration
@@ -34,15 +42,106 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 
+# Verified-token cache configuration
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))
+TOKEN_NEGATIVE_CACHE_TTL = float(os.getenv("AUTH_TOKEN_NEGATIVE_TTL", "30"))
+
+# Algorithms accepted for bearer tokens: our own JWTs and Supabase (HS256) tokens
+ACCEPTED_ALGORITHMS = {ALGORITHM, "HS256"}
+
+# Shared secret for operator-only endpoints (profiling, usage reports); unset disables them
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Security scheme
 security = HTTPBearer()
 
+# Challenge sent with every 401 for a bearer token (RFC 6750)
+BEARER_CHALLENGE = {"WWW-Authenticate": "Bearer"}
+
+# A cached verification failure: the 401's detail and headers
+TokenError = Tuple[str, Optional[Dict[str, str]]]
+
+class TokenCache:
+    """
+    Small LRU cache of verified token claims keyed by a SHA-256 of the token.
+    
+    Positive entries live until the token's own `exp`; failed verifications are
+    cached negatively for a short TTL so repeated bad tokens are rejected cheaply,
+    with the same detail and headers as the first rejection.
+    """
+    
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE, negative_ttl: float = TOKEN_NEGATIVE_CACHE_TTL):
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]], Optional[TokenError]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key_for(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[Tuple[Optional[Dict[str, Any]], Optional[TokenError]]]:
+        """Return (user, (detail, headers) of the error) for a live entry, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user, error = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return user, error
+    
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Claims of a live, verified entry without touching the LRU order or hit counters"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[1] is None or time.time() >= entry[0]:
+            return None
+        return entry[1]
+    
+    def set_valid(self, key: str, user: Dict[str, Any], expires_at: float) -> None:
+        self._set(key, (expires_at, user, None))
+    
+    def set_invalid(self, key: str, error: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self._set(key, (time.time() + self.negative_ttl, None, (error, headers)))
+    
+    def _set(self, key: str, entry: Tuple[float, Optional[Dict[str, Any]], Optional[TokenError]]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
 class AuthManager:
     def __init__(self):
         self.supabase = supabase_auth
+        self.token_cache = TokenCache()
         
     def is_available(self):
         """Check if Supabase auth is available"""
@@ -96,53 +195,82 @@ class AuthManager:
                 }
             return None
         except Exception as e:
-            print(f"Authentication error: {e}")
+            logger.error("Authentication error: %s", e)
             return None
 
+    def _verify_bearer_token(self, token: str) -> Tuple[Dict[str, Any], float]:
+        """
+        Verify a bearer token in a single pass.
+        
+        Our own JWTs and Supabase tokens are both signed with JWT_SECRET_KEY, so the
+        header is read once to pick the algorithm and the signature is checked once.
+        Audience checks stay off because Supabase tokens carry an `aud` claim.
+        Returns the user dict and the time until which it may be cached.
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid token", headers=BEARER_CHALLENGE)
+        
+        algorithm = header.get("alg")
+        if algorithm not in ACCEPTED_ALGORITHMS:
+            raise HTTPException(status_code=401, detail="Invalid token", headers=BEARER_CHALLENGE)
+        
+        try:
+            payload = jwt.decode(
+                token,
+                SECRET_KEY,
+                algorithms=[algorithm],
+                options={"verify_aud": False}  # Supabase tokens carry audience claims
+            )
+        except JWTError as e:
+            logger.debug("JWT verification failed: %s", e)
+            raise HTTPException(status_code=401, detail="Invalid token", headers=BEARER_CHALLENGE)
+        
+        user_id = payload.get("sub")
+        if not user_id:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers=BEARER_CHALLENGE,
+            )
+        
+        # Supabase tokens carry an audience; tokens we mint only carry sub/exp
+        token_type = "supabase_verified" if "aud" in payload else "jwt"
+        
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            # Without an expiry claim, fall back to our own token lifetime
+            expires_at = time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        
+        return {"user_id": user_id, "token_type": token_type}, float(expires_at)
+
     async def get_current_user(self, credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
         """Get current user from JWT token"""
         token = credentials.credentials
         
-        # First try to verify with our JWT
-        payload = self.verify_token(token)
-        if payload:
-            user_id = payload.get("sub")
-            if user_id:
-                return {"user_id": user_id, "token_type": "jwt"}
+        if not SECRET_KEY:
+            logger.error("JWT_SECRET_KEY not found in environment")
+            raise HTTPException(status_code=401, detail="Authentication configuration error")
+        
+        cache_key = self.token_cache.key_for(token)
+        cached = self.token_cache.get(cache_key)
+        if cached is not None:
+            user, error = cached
+            if user is None:
+                detail, headers = error
+                raise HTTPException(status_code=401, detail=detail, headers=headers)
+            return dict(user)
         
-        # Try to verify Supabase JWT token with proper JWT secret
         try:
-            from jose import jwt
-            # Get the JWT secret from environment (Supabase Legacy JWT Secret)
-            jwt_secret = os.getenv("JWT_SECRET_KEY")
-            if jwt_secret:
-                try:
-                    # Verify the token with the correct JWT secret
-                    # Note: Supabase tokens may have audience claims that we need to handle
-                    payload = jwt.decode(
-                        token, 
-                        jwt_secret, 
-                        algorithms=["HS256"],
-                        options={"verify_aud": False}  # Disable audience verification for Supabase tokens
-                    )
-                    if payload and payload.get('sub'):
-                        print(f"✅ JWT token verified for user: {payload.get('sub')}")
-                        return {"user_id": payload.get('sub'), "token_type": "supabase_verified"}
-                except jwt.JWTError as e:
-                    print(f"❌ JWT verification failed: {e}")
-                    raise HTTPException(status_code=401, detail="Invalid token")
-            else:
-                print("❌ JWT_SECRET_KEY not found in environment")
-                raise HTTPException(status_code=401, detail="Authentication configuration error")
-        except Exception as e:
-            print(f"❌ Token verification error: {e}")
-            raise HTTPException(status_code=401, detail="Invalid token")
+            user, expires_at = self._verify_bearer_token(token)
+        except HTTPException as e:
+            self.token_cache.set_invalid(cache_key, e.detail, e.headers)
+            raise
         
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        self.token_cache.set_valid(cache_key, user, expires_at)
+        logger.debug("Token verified for user: %s", user["user_id"])
+        return dict(user)
 
     async def refresh_token(self, refresh_token: str) -> Optional[dict]:
         """Refresh access token using Supabase"""
@@ -158,7 +286,7 @@ class AuthManager:
                 }
             return None
         except Exception as e:
-            print(f"Token refresh error: {e}")
+            logger.error("Token refresh error: %s", e)
             return None
 
     async def sign_out(self, access_token: str) -> bool:
@@ -170,7 +298,7 @@ class AuthManager:
             self.supabase.auth.sign_out()
             return True
         except Exception as e:
-            print(f"Sign out error: {e}")
+            logger.error("Sign out error: %s", e)
             return False
 
 # Initialize auth manager
@@ -179,3 +307,16 @@ auth_manager = AuthManager()
 # Dependency for getting current user
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     return await auth_manager.get_current_user(credentials)
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Constant-time check of an operator token against ADMIN_API_TOKEN"""
+    if not ADMIN_API_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_API_TOKEN.encode())
+
+# Dependency for operator-only endpoints
+async def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
@@ -12,6 +12,8 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 from playwright.async_api import async_playwright, Browser, Page, BrowserContext
 
+from .metrics import b2sign_step_duration_seconds, timed
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -210,8 +212,9 @@ class B2SignPlaywrightIntegration:
             
             # Navigate to specific banner product page
             logger.info(f"🌐 Navigating to {product_url}")
-            await self.page.goto(product_url, wait_until='networkidle')
-            await self.page.wait_for_timeout(3000)
+            with timed(b2sign_step_duration_seconds, step="open_product_page"):
+                await self.page.goto(product_url, wait_until='networkidle')
+                await self.page.wait_for_timeout(3000)
             
             # Use the complete proven banner workflow
             shipping_options = await self._fill_banner_quote_form(order_data)
@@ -279,22 +282,28 @@ class B2SignPlaywrightIntegration:
             logger.info(f"📋 Banner specs: {width}x{height}, qty: {quantity}, zip: {zip_code}")
             
             # Step 1: Fill dimensions using MUI selectors
-            await self._fill_banner_dimensions(width, height)
+            with timed(b2sign_step_duration_seconds, step="fill_dimensions"):
+                await self._fill_banner_dimensions(width, height)
             
             # Step 2: Fill job details
-            await self._fill_banner_job_details(width, height, quantity)
+            with timed(b2sign_step_duration_seconds, step="fill_job_details"):
+                await self._fill_banner_job_details(width, height, quantity)
             
             # Step 3: Fill banner options (2 Sides, No Pole Pockets, etc.)
-            await self._fill_banner_options_workflow(print_options)
+            with timed(b2sign_step_duration_seconds, step="fill_banner_options"):
+                await self._fill_banner_options_workflow(print_options)
             
             # Step 4: Select Blind Drop Ship
-            await self._select_blind_drop_ship()
+            with timed(b2sign_step_duration_seconds, step="select_blind_drop_ship"):
+                await self._select_blind_drop_ship()
             
             # Step 5: Open address modal and fill customer address
-            await self._open_and_fill_address_modal(zip_code, customer_info)
+            with timed(b2sign_step_duration_seconds, step="fill_address_modal"):
+                await self._open_and_fill_address_modal(zip_code, customer_info)
             
             # Step 6: Extract all shipping options
-            shipping_options = await self._extract_all_shipping_options_workflow()
+            with timed(b2sign_step_duration_seconds, step="extract_shipping_options"):
+                shipping_options = await self._extract_all_shipping_options_workflow()
             
             return shipping_options
             
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Thumbnail Pipeline Benchmark
+Compares the upload thumbnail paths on synthetic images:
+
+  temp-file  - the previous endpoint body: write the upload to temp_{uuid}_{name},
+               validate_image_file, process_single_image (which validates and
+               opens the file again), delete the temp file; run on the event loop
+  in-memory  - process_image_bytes: decode once from the upload buffer (JPEG
+               DCT-scaled decode), validate and thumbnail from that image;
+               run in a worker thread
+
+Usage: python -m backend.benchmark_thumbnails [--rounds 5] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+from io import BytesIO
+
+from PIL import Image
+
+from .generate_thumbnails import process_image_bytes, process_single_image, validate_image_file
+
+SAMPLES = [
+    ("photo_1200x800.jpg", (1200, 800), "RGB", "JPEG"),
+    ("poster_4000x3000.jpg", (4000, 3000), "RGB", "JPEG"),
+    ("logo_2000x2000.png", (2000, 2000), "RGBA", "PNG"),
+]
+
+
+def make_sample(size, mode, fmt) -> bytes:
+    """A gradient, so encoders and decoders do realistic work"""
+    width, height = size
+    gradient = Image.linear_gradient("L").resize(size)
+    bands = [gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT), gradient.rotate(90).resize(size)]
+    if mode == "RGBA":
+        bands.append(gradient)
+    img = Image.merge(mode, bands)
+    buffer = BytesIO()
+    img.save(buffer, fmt, quality=90) if fmt == "JPEG" else img.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def temp_file_path(data: bytes, filename: str, output_dir: str) -> dict:
+    temp_path = os.path.join(output_dir, f"temp_{uuid.uuid4()}_{filename}")
+    try:
+        with open(temp_path, "wb") as buffer:
+            buffer.write(data)
+        is_valid, message = validate_image_file(temp_path)
+        if not is_valid:
+            raise ValueError(message)
+        return process_single_image(temp_path, output_dir)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+async def run_concurrent(handler, data, filename, output_dir, count, concurrency, threaded):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            if threaded:
+                return await asyncio.to_thread(handler, data, filename, output_dir)
+            return handler(data, filename, output_dir)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="timed runs per image and path")
+    parser.add_argument("--concurrency", type=int, default=8, help="simultaneous uploads in the throughput run")
+    args = parser.parse_args()
+
+    paths = {"temp-file": (temp_file_path, False), "in-memory": (process_image_bytes, True)}
+    output_dir = tempfile.mkdtemp(prefix="thumb_bench_")
+    try:
+        print(f"{'image':<24}{'path':<12}{'median ms':>12}{'uploads/s':>12}")
+        for filename, size, mode, fmt in SAMPLES:
+            data = make_sample(size, mode, fmt)
+            for name, (handler, threaded) in paths.items():
+                assert handler(data, filename, output_dir)["success"]
+                timings = []
+                for _ in range(args.rounds):
+                    start = time.perf_counter()
+                    handler(data, filename, output_dir)
+                    timings.append(time.perf_counter() - start)
+                throughput = asyncio.run(run_concurrent(
+                    handler, data, filename, output_dir, args.rounds * 4, args.concurrency, threaded))
+                print(f"{filename:<24}{name:<12}{statistics.median(timings) * 1000:>12.1f}{throughput:>12.1f}")
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,762 @@
+"""
+Canvas Renderer
+Rasterizes design canvas JSON (the Konva-style objects the editor and the AI
+tools create) to a PNG proof with Pillow, so templates, orders and AI results
+get a preview without a browser round-trip.
+
+Supported elements: text, rect, circle, star, triangle, hexagon, line, image
+(file, data URL, /api/qr URL or qrData), icon and the legacy qr_code element.
+Geometry follows Konva: rects, text and images are positioned by their top-left
+corner and rotate around it; circles, stars and polygons are centred on x/y.
+Shapes are drawn through supersampled masks for anti-aliased edges.
+
+Fonts are indexed once and loaded per (family, weight, style, size) from an
+LRU cache; decoded images are kept in a size-bounded LRU cache, so re-rendering
+a design (or many designs sharing artwork) decodes each source once.
+Sources that cannot be read locally (remote URLs, SVG) render as a placeholder.
+"""
+
+import base64
+import bisect
+import hashlib
+import itertools
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont, ImageOps
+
+from . import artwork_storage
+from .design_session import parse_canvas_data
+from .generate_thumbnails import MAX_UPLOAD_PIXELS
+from .metrics import registry
+from .qr_service import QRSpec, render_png as render_qr_png
+
+logger = logging.getLogger(__name__)
+
+CANVAS_FONT_DIRS = os.getenv("CANVAS_FONT_DIRS", os.pathsep.join(["fonts", "/usr/share/fonts"]))
+CANVAS_IMAGE_CACHE_BYTES = int(os.getenv("CANVAS_IMAGE_CACHE_BYTES", str(256 * 1024 * 1024)))
+CANVAS_MAX_PIXELS = int(os.getenv("CANVAS_MAX_PIXELS", str(40_000_000)))
+# Largest text (font size in output pixels) a proof will draw; glyph masks grow with its square
+CANVAS_MAX_FONT_PX = int(os.getenv("CANVAS_MAX_FONT_PX", "2000"))
+PUBLIC_DIR = "../frontend/public"
+SUPERSAMPLE = 4
+MAX_MASK_PIXELS = 16_000_000  # supersampling is reduced for shapes that would exceed this
+MAX_SCALE = 16.0
+MIN_TILE, MAX_TILE = 256, 2048  # canvas tiles rotated elements are rasterized in
+
+# Browser font families -> families likely installed on the server, in order
+FONT_ALIASES = {
+    "arial": ("Arial", "Liberation Sans", "Helvetica", "DejaVu Sans"),
+    "helvetica": ("Helvetica", "Arial", "Liberation Sans", "DejaVu Sans"),
+    "sans-serif": ("DejaVu Sans", "Liberation Sans"),
+    "times new roman": ("Times New Roman", "Liberation Serif", "DejaVu Serif"),
+    "georgia": ("Georgia", "DejaVu Serif"),
+    "serif": ("DejaVu Serif", "Liberation Serif"),
+    "courier new": ("Courier New", "Liberation Mono", "DejaVu Sans Mono"),
+    "monospace": ("DejaVu Sans Mono", "Liberation Mono"),
+}
+DEFAULT_FAMILIES = ("DejaVu Sans", "Liberation Sans")
+PLACEHOLDER_FILL = (229, 231, 235, 255)
+PLACEHOLDER_OUTLINE = (156, 163, 175, 255)
+
+canvas_renders_total = registry.counter(
+    "buyprintz_canvas_renders_total", "Canvas proofs rendered", ("result",))
+canvas_render_seconds = registry.histogram(
+    "buyprintz_canvas_render_seconds", "Canvas proof render time in the worker thread")
+
+Point = Tuple[float, float]
+
+
+def _num(value: Any, default: float) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return number if math.isfinite(number) else default
+
+
+def parse_color(value: Any, opacity: float = 1.0) -> Optional[Tuple[int, int, int, int]]:
+    """CSS-ish colour -> RGBA, or None for empty/transparent/unknown"""
+    if not isinstance(value, str) or not value.strip() or value.strip().lower() in ("transparent", "none"):
+        return None
+    value = value.strip()
+    alpha = 1.0
+    if value.lower().startswith("rgba(") and value.endswith(")"):
+        parts = [p.strip() for p in value[5:-1].split(",")]
+        if len(parts) != 4:
+            return None
+        value, alpha = f"rgb({','.join(parts[:3])})", _num(parts[3], 1.0)
+    try:
+        r, g, b, a = ImageColor.getcolor(value, "RGBA")
+    except ValueError:
+        return None
+    return r, g, b, round(a * max(0.0, min(alpha, 1.0)) * max(0.0, min(opacity, 1.0)))
+
+
+def _rotate(point: Point, degrees: float) -> Point:
+    """Clockwise on screen (y points down), like Konva's rotation"""
+    if not degrees:
+        return point
+    theta = math.radians(degrees)
+    x, y = point
+    return x * math.cos(theta) - y * math.sin(theta), x * math.sin(theta) + y * math.cos(theta)
+
+
+# ---------------------------------------------------------------- fonts
+
+@lru_cache(maxsize=1)
+def font_index() -> Dict[Tuple[str, str], str]:
+    """(family, style) -> font file, lower-cased, from every CANVAS_FONT_DIRS directory"""
+    index: Dict[Tuple[str, str], str] = {}
+    for directory in CANVAS_FONT_DIRS.split(os.pathsep):
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                if not name.lower().endswith((".ttf", ".otf")):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    family, style = ImageFont.truetype(path, 12).getname()
+                except OSError:
+                    continue
+                index.setdefault(((family or "").lower(), (style or "").lower()), path)
+    return index
+
+
+def _style_names(bold: bool, italic: bool) -> Tuple[str, ...]:
+    if bold and italic:
+        return ("bold italic", "bold oblique")
+    if bold:
+        return ("bold",)
+    if italic:
+        return ("italic", "oblique")
+    return ("regular", "book", "roman", "normal")
+
+
+@lru_cache(maxsize=256)
+def load_font(family: str, bold: bool, italic: bool, size: int) -> ImageFont.FreeTypeFont:
+    """Closest installed face for a CSS font family; Pillow's default font when none match"""
+    index = font_index()
+    requested = (family or "").split(",")[0].strip().strip("'\"")
+    candidates = (requested,) + FONT_ALIASES.get(requested.lower(), ()) + DEFAULT_FAMILIES
+    for styles in (_style_names(bold, italic), _style_names(False, False)):
+        for candidate in candidates:
+            for style in styles:
+                path = index.get((candidate.lower(), style))
+                if path:
+                    return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size)
+
+
+# ---------------------------------------------------------------- images
+
+class DecodedImageCache:
+    """RGBA images by source key, evicted least-recently-used once over max_bytes"""
+
+    def __init__(self, max_bytes: int = CANVAS_IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Image.Image]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key: str, load: Callable[[], Image.Image]) -> Image.Image:
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+        image = load()
+        size = image.width * image.height * 4
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = image
+                self.total_bytes += size
+                while self.total_bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.total_bytes -= evicted.width * evicted.height * 4
+        return image
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+image_cache = DecodedImageCache()
+
+
+def _decode(data: bytes) -> Image.Image:
+    img = Image.open(BytesIO(data))
+    if img.width * img.height > MAX_UPLOAD_PIXELS:
+        raise ValueError(f"Image too large: {img.width}x{img.height}")
+    img = ImageOps.exif_transpose(img)
+    return img.convert("RGBA")
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _local_path(url_path: str) -> Optional[str]:
+    """/uploads/... or /assets/... -> file on disk, confined to its directory"""
+    url_path = unquote(url_path)
+    if url_path.startswith("/uploads/"):
+        root, rest = artwork_storage.UPLOAD_DIR, url_path[len("/uploads/"):]
+    elif url_path.startswith("/assets/"):
+        root, rest = PUBLIC_DIR, url_path.lstrip("/")
+    else:
+        return None
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, rest))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return path
+
+
+def _qr_image(spec: QRSpec) -> Image.Image:
+    spec = spec._replace(fmt="png").validate()
+    return image_cache.get_or_load(f"qr:{spec.key}", lambda: _decode(render_qr_png(spec)))
+
+
+def load_source(source: str) -> Optional[Image.Image]:
+    """Decoded RGBA image for an element's image source, or None if it can't be read locally"""
+    if not isinstance(source, str) or not source:
+        return None
+    if source.startswith("data:"):
+        header, _, payload = source.partition(",")
+        if "svg" in header or ";base64" not in header:
+            return None
+        key = "data:" + hashlib.sha256(source.encode("utf-8")).hexdigest()
+        return image_cache.get_or_load(key, lambda: _decode(base64.b64decode(payload)))
+
+    parsed = urlparse(source)
+    if parsed.path == "/api/qr":
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        return _qr_image(QRSpec(data=query.get("data", ""), fill_color=query.get("fill", "#000000"),
+                                back_color=query.get("back", "#ffffff"), error_correction=query.get("ec", "M"),
+                                box_size=int(query.get("box_size", 10)), border=int(query.get("border", 4))))
+    if parsed.scheme or parsed.path.lower().endswith(".svg"):
+        return None
+    path = _local_path(parsed.path)
+    if path is None:
+        return None
+    stat = os.stat(path)
+    key = f"file:{path}:{stat.st_mtime_ns}:{stat.st_size}"
+    return image_cache.get_or_load(key, lambda: _decode(_read_file(path)))
+
+
+def _element_image(element: Dict[str, Any]) -> Tuple[Optional[Image.Image], bool]:
+    """(image, is_qr) for an image/icon/qr_code element"""
+    qr = element.get("qrData")
+    if element.get("type") == "qr_code" and element.get("url"):
+        qr = {"url": element["url"], "color": element.get("fill") or "#000000"}
+    if isinstance(qr, dict) and qr.get("url"):
+        spec = QRSpec(data=str(qr["url"]), fill_color=qr.get("color") or "#000000",
+                      back_color=qr.get("backgroundColor") or "#ffffff")
+        return _qr_image(spec), True
+    for field in ("imageDataUrl", "image", "src", "imagePath"):
+        if isinstance(element.get(field), str) and element[field]:
+            return load_source(element[field]), False
+    return None, False
+
+
+# ---------------------------------------------------------------- drawing
+
+def _composite(canvas: Image.Image, layer: Image.Image, left: int, top: int) -> None:
+    """alpha_composite that tolerates layers hanging off the canvas edges"""
+    x0, y0 = max(left, 0), max(top, 0)
+    x1, y1 = min(left + layer.width, canvas.width), min(top + layer.height, canvas.height)
+    if x0 < x1 and y0 < y1:
+        canvas.alpha_composite(layer, (x0, y0), (x0 - left, y0 - top, x1 - left, y1 - top))
+
+
+def _visible(canvas: Image.Image, x: float, y: float, w: float, h: float) -> Optional[Tuple[int, int, int, int]]:
+    """The part of an unrotated box that lands on the canvas, in whole canvas pixels"""
+    left, top = max(round(x), 0), max(round(y), 0)
+    right, bottom = min(round(x + w), canvas.width), min(round(y + h), canvas.height)
+    return (left, top, right, bottom) if left < right and top < bottom else None
+
+
+def _fade(layer: Image.Image, opacity: float) -> Image.Image:
+    if opacity < 1:
+        layer.putalpha(layer.getchannel("A").point(lambda a: round(a * max(opacity, 0.0))))
+    return layer
+
+
+def _place(canvas: Image.Image, w: int, h: int, x: float, y: float, rotation: float, opacity: float,
+           render_region: Callable[[float, float, int, int], Image.Image]) -> None:
+    """
+    Composite a w x h element-local layer whose top-left sits at (x, y), rotated
+    around that corner. render_region(left, top, width, height) draws part of the
+    layer in element-local pixels; only the parts that land on the canvas (or
+    print band) are requested, so memory follows the canvas, not the element.
+    Rotated layers are mapped onto the canvas tile by tile through the inverse
+    rotation, each tile asking for just the layer pixels behind it.
+    """
+    if not rotation % 360:
+        visible = _visible(canvas, x, y, w, h)
+        if visible:
+            layer = render_region(visible[0] - x, visible[1] - y, visible[2] - visible[0], visible[3] - visible[1])
+            _composite(canvas, _fade(layer, opacity), visible[0], visible[1])
+        return
+
+    corners = [_rotate(c, rotation) for c in ((0, 0), (w, 0), (w, h), (0, h))]
+    left, top = min(c[0] for c in corners), min(c[1] for c in corners)
+    visible = _visible(canvas, x + left, y + top, max(c[0] for c in corners) - left, max(c[1] for c in corners) - top)
+    if visible is None:
+        return
+    theta = math.radians(rotation)
+    cos, sin = math.cos(theta), math.sin(theta)
+    # Square tiles keep the layer part behind each one to about twice the tile's area
+    tile = min(max(visible[3] - visible[1], MIN_TILE), MAX_TILE)
+    for tile_top in range(visible[1], visible[3], tile):
+        for tile_left in range(visible[0], visible[2], tile):
+            size = (min(tile, visible[2] - tile_left), min(tile, visible[3] - tile_top))
+            dx, dy = tile_left - x, tile_top - y
+            local = [_rotate((dx + u, dy + v), -rotation) for u, v in ((0, 0), (size[0], 0), size, (0, size[1]))]
+            # Two pixels of margin for the bicubic kernel
+            lx0 = max(math.floor(min(p[0] for p in local)) - 2, 0)
+            ly0 = max(math.floor(min(p[1] for p in local)) - 2, 0)
+            lx1 = min(math.ceil(max(p[0] for p in local)) + 2, w)
+            ly1 = min(math.ceil(max(p[1] for p in local)) + 2, h)
+            if lx0 >= lx1 or ly0 >= ly1:
+                continue
+            layer = render_region(lx0, ly0, lx1 - lx0, ly1 - ly0)
+            # Tile pixel (u, v) -> layer pixel, i.e. the inverse rotation shifted to the layer part
+            matrix = (cos, sin, cos * dx + sin * dy - lx0, -sin, cos, -sin * dx + cos * dy - ly0)
+            part = layer.transform(size, Image.Transform.AFFINE, matrix, resample=Image.Resampling.BICUBIC,
+                                   fillcolor=(0, 0, 0, 0))
+            _composite(canvas, _fade(part, opacity), tile_left, tile_top)
+
+
+def _paint(canvas: Image.Image, points: List[Point], fill, stroke, stroke_width: float,
+           ellipse: bool = False, closed: bool = True) -> None:
+    """
+    Fill and/or stroke a polygon, polyline or (bounding-box) ellipse in canvas pixels.
+    Drawn at up to SUPERSAMPLE x into masks the size of the shape's visible bounds,
+    then reduced; large shapes use less supersampling so masks stay under MAX_MASK_PIXELS.
+    """
+    if fill is None and (stroke is None or stroke_width <= 0):
+        return
+    pad = stroke_width / 2 + 1
+    left = max(math.floor(min(p[0] for p in points) - pad), 0)
+    top = max(math.floor(min(p[1] for p in points) - pad), 0)
+    right = min(math.ceil(max(p[0] for p in points) + pad), canvas.width)
+    bottom = min(math.ceil(max(p[1] for p in points) + pad), canvas.height)
+    if left >= right or top >= bottom:
+        return
+    size = (right - left, bottom - top)
+    ss = max(1, min(SUPERSAMPLE, int(math.sqrt(MAX_MASK_PIXELS / (size[0] * size[1])))))
+    local = [((px - left) * ss, (py - top) * ss) for px, py in points]
+
+    for color, is_stroke in ((fill, False), (stroke, True)):
+        if color is None or (is_stroke and stroke_width <= 0) or (not is_stroke and not closed):
+            continue
+        mask = Image.new("L", (size[0] * ss, size[1] * ss), 0)
+        draw = ImageDraw.Draw(mask)
+        width = max(1, round(stroke_width * ss))
+        if ellipse:
+            box = [local[0], local[1]]
+            draw.ellipse(box, outline=255, width=width) if is_stroke else draw.ellipse(box, fill=255)
+        elif is_stroke:
+            draw.line(local + local[:1] if closed else local, fill=255, width=width, joint="curve")
+        else:
+            draw.polygon(local, fill=255)
+        if ss > 1:
+            mask = mask.resize(size, Image.Resampling.BOX)
+        layer = Image.new("RGBA", size, color[:3] + (0,))
+        layer.putalpha(mask.point(lambda a, alpha=color[3]: a * alpha // 255))
+        canvas.alpha_composite(layer, (left, top))
+
+
+def _colors(element: Dict[str, Any], default_fill: Optional[str], default_stroke: Optional[str]):
+    opacity = _num(element.get("opacity"), 1.0)
+    fill = parse_color(element.get("fill", default_fill), opacity)
+    stroke = parse_color(element.get("stroke", default_stroke), opacity)
+    return fill, stroke
+
+
+def _radial_points(cx: float, cy: float, radii: List[float], rotation: float) -> List[Point]:
+    """Vertices starting at 12 o'clock, evenly spaced clockwise (Konva's polygon/star layout)"""
+    step = 2 * math.pi / len(radii)
+    points = []
+    for i, r in enumerate(radii):
+        px, py = _rotate((r * math.sin(i * step), -r * math.cos(i * step)), rotation)
+        points.append((cx + px, cy + py))
+    return points
+
+
+def _draw_rect(canvas, element, s):
+    x, y = _num(element.get("x"), 0) * s, _num(element.get("y"), 0) * s
+    w, h = _num(element.get("width"), 100) * s, _num(element.get("height"), 100) * s
+    rotation = _num(element.get("rotation"), 0)
+    corners = [_rotate(c, rotation) for c in ((0, 0), (w, 0), (w, h), (0, h))]
+    fill, stroke = _colors(element, "#ff0000", "#000000")
+    _paint(canvas, [(x + cx, y + cy) for cx, cy in corners], fill, stroke, _num(element.get("strokeWidth"), 1) * s)
+
+
+def _draw_circle(canvas, element, s):
+    x, y = _num(element.get("x"), 0) * s, _num(element.get("y"), 0) * s
+    r = _num(element.get("radius"), 50) * s
+    fill, stroke = _colors(element, "#00ff00", "#000000")
+    _paint(canvas, [(x - r, y - r), (x + r, y + r)], fill, stroke, _num(element.get("strokeWidth"), 1) * s,
+           ellipse=True)
+
+
+def _draw_star(canvas, element, s):
+    x, y = _num(element.get("x"), 0) * s, _num(element.get("y"), 0) * s
+    outer, inner = _num(element.get("outerRadius"), 50) * s, _num(element.get("innerRadius"), 30) * s
+    points = max(2, int(_num(element.get("numPoints"), 5)))
+    fill, stroke = _colors(element, "#ffff00", "#000000")
+    vertices = _radial_points(x, y, [outer, inner] * points, _num(element.get("rotation"), 0))
+    # strokeScaleEnabled=false in the editor: the stroke width does not follow the scale
+    _paint(canvas, vertices, fill, stroke, _num(element.get("strokeWidth"), 1))
+
+
+def _draw_polygon(canvas, element, s):
+    x, y = _num(element.get("x"), 0) * s, _num(element.get("y"), 0) * s
+    sides = 3 if element.get("type") == "triangle" else 6
+    r = _num(element.get("radius"), 50) * s
+    fill, stroke = _colors(element, "#0000ff", "#000000")
+    vertices = _radial_points(x, y, [r] * sides, _num(element.get("rotation"), 0))
+    _paint(canvas, vertices, fill, stroke, _num(element.get("strokeWidth"), 1) * s)
+
+
+def _draw_line(canvas, element, s):
+    raw = element.get("points") or [0, 0, 100, 100]
+    if len(raw) < 4:
+        return
+    x, y = _num(element.get("x"), 0) * s, _num(element.get("y"), 0) * s
+    rotation = _num(element.get("rotation"), 0)
+    points = []
+    for i in range(0, len(raw) - 1, 2):
+        px, py = _rotate((_num(raw[i], 0) * s, _num(raw[i + 1], 0) * s), rotation)
+        points.append((x + px, y + py))
+    closed = bool(element.get("closed"))
+    fill, stroke = _colors(element, "#000000", "#000000")
+    _paint(canvas, points, fill if closed else None, stroke, _num(element.get("strokeWidth"), 2) * s, closed=closed)
+
+
+def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: float) -> List[str]:
+    """Word-wrap like Konva's wrap="word"; words wider than a line are broken by character"""
+    lines: List[str] = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if font.getlength(candidate) <= max_width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            line = ""
+            for char in word:
+                if line and font.getlength(line + char) > max_width:
+                    lines.append(line)
+                    line = ""
+                line += char
+        lines.append(line)
+    return lines
+
+
+def _clip_line(font: ImageFont.FreeTypeFont, line: str, advances: List[float], x: float, width: int,
+               margin: float) -> Tuple[str, float]:
+    """
+    The characters of a line whose left edge is at x that can reach columns
+    [0, width), and the x of their left edge. advances are the line's cumulative
+    per-character advances (kerning ignored, hence the caller's margin). Pillow
+    rasterizes a whole line into one mask, so an unwrapped line thousands of
+    glyphs long is cut down to the region first.
+    """
+    first = max(bisect.bisect_right(advances, -margin - x) - 1, 0)
+    end = min(bisect.bisect_left(advances, width + margin - x) + 1, len(line))
+    return line[first:end], x + font.getlength(line[:first])
+
+
+def _draw_text(canvas, element, s, text: Optional[str] = None):
+    text = str(element.get("text", "Text") if text is None else text)
+    size = max(1, round(_num(element.get("fontSize"), 24) * s))
+    style = str(element.get("fontStyle") or "").lower()
+    bold = "bold" in style or str(element.get("fontWeight") or "").lower() in ("bold", "600", "700", "800", "900")
+    font = load_font(str(element.get("fontFamily") or "Arial"), bold, "italic" in style, size)
+
+    padding = _num(element.get("padding"), 0) * s
+    width = _num(element.get("width"), 0) * s
+    height = _num(element.get("height"), 0) * s
+    line_height = size * _num(element.get("lineHeight"), 1.2)
+    lines = wrap_text(text, font, width - 2 * padding) if width > 2 * padding else text.split("\n")
+    if height:
+        # Konva drops lines that would overflow a fixed height (always keeping the first)
+        fits = max(1, int((height - 2 * padding) // line_height))
+        lines = lines[:fits]
+    if not width:
+        width = max(font.getlength(line) for line in lines) + 2 * padding
+    content_height = len(lines) * line_height
+    box_height = max(height, content_height + 2 * padding)
+
+    vertical = element.get("verticalAlign") or "top"
+    top = {"middle": (box_height - content_height) / 2,
+           "bottom": box_height - padding - content_height}.get(vertical, padding)
+    align = element.get("align") or "left"
+    x_pos, anchor = {"center": (width / 2, "mm"), "right": (width - padding, "rm")}.get(align, (padding, "lm"))
+
+    fill = parse_color(element.get("fill") or "#000000")
+    stroke = parse_color(element.get("stroke"))
+    stroke_width = round(_num(element.get("strokeWidth"), 0) * s) if stroke else 0
+    decoration = str(element.get("textDecoration") or "")
+
+    x, y = _num(element.get("x"), 0) * s, _num(element.get("y"), 0) * s
+    rotation, opacity = _num(element.get("rotation"), 0), _num(element.get("opacity"), 1.0)
+    lengths = [font.getlength(line) for line in lines]
+    advances: Dict[int, List[float]] = {}  # per line, for lines that overflow a region
+
+    def render_region(left: float, region_top: float, region_width: int, region_height: int) -> Image.Image:
+        layer = Image.new("RGBA", (region_width, region_height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        for i, line in enumerate(lines):
+            y_mid = top + i * line_height + line_height / 2 - region_top
+            if y_mid + line_height < 0 or y_mid - line_height > layer.height:
+                continue
+            line_x = x_pos - left - {"m": lengths[i] / 2, "r": lengths[i]}.get(anchor[0], 0)
+            margin = size + stroke_width
+            if line_x < -margin or line_x + lengths[i] > region_width + margin:
+                if i not in advances:
+                    advances[i] = list(itertools.accumulate((font.getlength(c) for c in line), initial=0))
+                line, line_x = _clip_line(font, line, advances[i], line_x, region_width,
+                                          margin + abs(advances[i][-1] - lengths[i]))
+                if not line:
+                    continue
+            position = (line_x, y_mid)
+            draw.text(position, line, font=font, fill=fill, anchor="l" + anchor[1], stroke_width=stroke_width,
+                      stroke_fill=stroke)
+            if decoration in ("underline", "line-through") and fill:
+                line_left, _, line_right, _ = draw.textbbox(position, line, font=font, anchor="l" + anchor[1])
+                y_line = y_mid + size * 0.45 if decoration == "underline" else y_mid
+                draw.line([(line_left, y_line), (line_right, y_line)], fill=fill, width=max(1, round(size / 15)))
+        return layer
+
+    _place(canvas, max(1, math.ceil(width)), max(1, math.ceil(box_height)), x, y, rotation, opacity, render_region)
+
+
+def _draw_image(canvas, element, s):
+    default = 200 if element.get("imageDataUrl") or element.get("qrData") else 100
+    w = max(1, round(_num(element.get("width"), default) * s))
+    h = max(1, round(_num(element.get("height"), default) * s))
+    try:
+        source, is_qr = _element_image(element)
+    except (OSError, ValueError) as e:
+        logger.warning("Canvas image %s could not be decoded: %s", element.get("id"), e)
+        source, is_qr = None, False
+
+    x, y = _num(element.get("x"), 0) * s, _num(element.get("y"), 0) * s
+    rotation, opacity = _num(element.get("rotation"), 0), _num(element.get("opacity"), 1.0)
+    if source is None:
+        outline = max(1, round(s))
+
+        def render_region(left: float, top: float, region_width: int, region_height: int) -> Image.Image:
+            layer = Image.new("RGBA", (region_width, region_height), PLACEHOLDER_FILL)
+            ImageDraw.Draw(layer).rectangle([-left, -top, w - 1 - left, h - 1 - top], outline=PLACEHOLDER_OUTLINE,
+                                            width=outline)
+            return layer
+    else:
+        # Modules of QR codes stay crisp: nearest-neighbour, never smoothed
+        resample = Image.Resampling.NEAREST if is_qr else Image.Resampling.LANCZOS
+        fx, fy = source.width / w, source.height / h
+
+        def render_region(left: float, top: float, region_width: int, region_height: int) -> Image.Image:
+            # Resample just the source pixels behind the region, so a print-size
+            # image never materializes at full output size
+            box = (max(0.0, left * fx), max(0.0, top * fy),
+                   min(source.width, (left + region_width) * fx), min(source.height, (top + region_height) * fy))
+            return source.resize((region_width, region_height), resample, box=box)
+
+    _place(canvas, w, h, x, y, rotation, opacity, render_region)
+
+
+def _font_size(element: Dict[str, Any]) -> Optional[float]:
+    """Font size in design units of a text element or symbol icon; None for other elements"""
+    if element.get("type") == "text":
+        return _num(element.get("fontSize"), 24)
+    if element.get("type") == "icon" and element.get("symbol") and not element.get("imagePath"):
+        return max(12, min(_num(element.get("width"), 60), _num(element.get("height"), 60)) * 0.6)
+    return None
+
+
+def _draw_icon(canvas, element, s):
+    size = _font_size(element)
+    if size is not None:
+        _draw_text(canvas, {**element, "fontSize": size, "fontFamily": "Arial", "fill": "#000000",
+                            "width": element.get("width") or 60, "height": element.get("height") or 60,
+                            "align": "center", "verticalAlign": "middle"}, s, text=element["symbol"])
+    else:
+        _draw_image(canvas, {"width": 60, "height": 60, **element}, s)
+
+
+DRAWERS: Dict[str, Callable[[Image.Image, Dict[str, Any], float], None]] = {
+    "text": _draw_text,
+    "rect": _draw_rect,
+    "circle": _draw_circle,
+    "star": _draw_star,
+    "triangle": _draw_polygon,
+    "hexagon": _draw_polygon,
+    "line": _draw_line,
+    "image": _draw_image,
+    "qr_code": _draw_image,
+    "icon": _draw_icon,
+}
+
+
+# ---------------------------------------------------------------- canvas
+
+def canvas_elements(canvas_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Backend designs keep elements in 'objects', editor-saved ones in 'elements'"""
+    elements = canvas_data.get("objects")
+    if not isinstance(elements, list) or not elements:
+        elements = canvas_data.get("elements")
+    return [e for e in elements if isinstance(e, dict)] if isinstance(elements, list) else []
+
+
+def canvas_size(canvas_data: Dict[str, Any]) -> Tuple[float, float]:
+    size = canvas_data.get("canvasSize") if isinstance(canvas_data.get("canvasSize"), dict) else canvas_data
+    return _num(size.get("width"), 800), _num(size.get("height"), 400)
+
+
+def element_bounds(element: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    """Conservative (left, top, right, bottom) of an element in design units, for culling"""
+    x, y = _num(element.get("x"), 0), _num(element.get("y"), 0)
+    pad = _num(element.get("strokeWidth"), 0)
+    kind = element.get("type")
+    if kind in ("circle", "triangle", "hexagon", "star"):
+        r = _num(element.get("outerRadius" if kind == "star" else "radius"), 50) + pad
+        return x - r, y - r, x + r, y + r
+    if kind == "line":
+        raw = [_num(v, 0) for v in element.get("points") or [0, 0, 100, 100]]
+        reach = max((abs(v) for v in raw), default=0) + pad
+        return x - reach, y - reach, x + reach, y + reach
+
+    w, h = _num(element.get("width"), 200), _num(element.get("height"), 0)
+    if kind == "text":
+        line_height = _num(element.get("fontSize"), 24) * _num(element.get("lineHeight"), 1.2)
+        if h:
+            h = max(h, line_height) + 2 * _num(element.get("padding"), 0)
+        else:
+            # Auto height: at worst one line per character
+            h = line_height * (len(str(element.get("text", ""))) + 1)
+    h = h or 200
+    if _num(element.get("rotation"), 0) % 360:
+        r = math.hypot(w, h) + pad
+        return x - r, y - r, x + r, y + r
+    return x - pad, y - pad, x + w + pad, y + h + pad
+
+
+def _draw_elements(canvas: Image.Image, elements: List[Dict[str, Any]], scale: float) -> None:
+    for element in elements:
+        if element.get("visible") is False:
+            continue
+        drawer = DRAWERS.get(element.get("type"))
+        if drawer is None:
+            logger.debug("Skipping unsupported canvas element type %r", element.get("type"))
+            continue
+        try:
+            drawer(canvas, element, scale)
+        except Exception as e:
+            # One malformed element should not cost the whole proof
+            logger.warning("Could not render canvas element %s: %s", element.get("id"), e)
+
+
+def _background(canvas_data: Dict[str, Any]) -> Tuple[int, int, int, int]:
+    color = parse_color(canvas_data.get("background") or canvas_data.get("backgroundColor") or "#ffffff")
+    return color or (255, 255, 255, 255)
+
+
+def render_canvas(canvas_data: Any, scale: float = 1.0) -> Image.Image:
+    """
+    Rasterize canvas JSON (dict or JSON string) at `scale` x its design size.
+    Returns an RGB image. Raises ValueError for an out-of-range scale or size.
+    Blocking; run it in a worker thread.
+    """
+    canvas_data = parse_canvas_data(canvas_data)
+    width, height = canvas_size(canvas_data)
+    if not 0 < scale <= MAX_SCALE:
+        raise ValueError(f"scale must be between 0 and {MAX_SCALE:g}")
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if size[0] * size[1] > CANVAS_MAX_PIXELS:
+        raise ValueError(f"Render of {size[0]}x{size[1]} exceeds {CANVAS_MAX_PIXELS} pixels")
+
+    elements = canvas_elements(canvas_data)
+    for element in elements:
+        font_size = _font_size(element)
+        if font_size is not None and font_size * scale > CANVAS_MAX_FONT_PX:
+            raise ValueError(f"Text of {font_size * scale:.0f} px exceeds {CANVAS_MAX_FONT_PX} px")
+
+    canvas = Image.new("RGBA", size, _background(canvas_data))
+    _draw_elements(canvas, elements, scale)
+    return canvas.convert("RGB")
+
+
+def render_band(canvas_data: Dict[str, Any], scale: float, top: int, rows: int) -> Image.Image:
+    """
+    Rows [top, top + rows) of the canvas rendered at `scale`, as an RGB image the
+    full output width. Only elements overlapping the band are drawn, shifted up by
+    `top`; memory is one band plus the visible parts of its elements, however
+    large the whole output is. Blocking.
+    """
+    width = max(1, round(canvas_size(canvas_data)[0] * scale))
+    band_top, band_bottom = top / scale, (top + rows) / scale
+    shift = top / scale
+    elements = []
+    for element in canvas_elements(canvas_data):
+        _, element_top, _, element_bottom = element_bounds(element)
+        if element_bottom >= band_top and element_top <= band_bottom:
+            elements.append({**element, "y": _num(element.get("y"), 0) - shift})
+    canvas = Image.new("RGBA", (width, rows), _background(canvas_data))
+    _draw_elements(canvas, elements, scale)
+    return canvas.convert("RGB")
+
+
+def render_proof_png(canvas_data: Any, scale: float = 1.0, max_width: Optional[int] = None) -> bytes:
+    """PNG bytes of the canvas; max_width lowers the scale so the proof is at most that wide"""
+    canvas_data = parse_canvas_data(canvas_data)
+    if max_width:
+        scale = min(scale, max_width / canvas_size(canvas_data)[0])
+    try:
+        with canvas_render_seconds.time():
+            image = render_canvas(canvas_data, scale)
+    except ValueError:
+        canvas_renders_total.inc(result="rejected")
+        raise
+    canvas_renders_total.inc(result="rendered")
+    buffer = BytesIO()
+    image.save(buffer, "PNG", optimize=False, compress_level=6)
+    return buffer.getvalue()
+
+
+def proof_data_url(canvas_data: Any, scale: float = 1.0, max_width: Optional[int] = None) -> str:
+    """Same image as render_proof_png, as the data URL orders store in canvas_image"""
+    return f"data:image/png;base64,{base64.b64encode(render_proof_png(canvas_data, scale, max_width)).decode()}"
+
+
+def renderer_stats() -> Dict[str, Any]:
+    return {"decoded_images": image_cache.stats(), "fonts": load_font.cache_info()._asdict()}
@@ -7,13 +7,15 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, R
 from pydantic import BaseModel, Field, validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+import asyncio
 import json
 import uuid
 import os
 import stripe
 from .database import DatabaseManager
 from .auth import get_current_user
-from .generate_thumbnails import process_single_image, validate_image_file
+from .generate_thumbnails import process_image_bytes, validate_image_bytes
+from .image_derivatives import responsive_image
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -412,9 +414,14 @@ async def get_marketplace_templates(
     max_price: Optional[float] = None,
     search: Optional[str] = None,
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    image_width: Optional[int] = None
 ):
-    """Get approved templates from the marketplace"""
+    """
+    Get approved templates from the marketplace. With image_width, templates that
+    have derivatives get preview_image_url pointing at the smallest WebP at least
+    that wide, plus srcsets and a blur placeholder in preview_image.
+    """
     try:
         # Build filters
         filters = {
@@ -448,6 +455,12 @@ async def get_marketplace_templates(
             # Add template_data field from canvas_data for frontend compatibility
             if template.get('canvas_data'):
                 transformed_template['template_data'] = template['canvas_data']
+            derivatives = transformed_template.pop('image_derivatives', None)
+            if image_width:
+                image = responsive_image(derivatives, image_width)
+                if image:
+                    transformed_template['preview_image'] = image
+                    transformed_template['preview_image_url'] = image['src']
             transformed_templates.append(transformed_template)
         
         return {
@@ -897,38 +910,21 @@ async def generate_template_thumbnail(
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Create temporary file to process
-        temp_path = f"temp_{uuid.uuid4()}_{file.filename}"
+        # Decode, validate and thumbnail straight from the upload buffer, off the event loop
+        content = await file.read()
+        result = await asyncio.to_thread(process_image_bytes, content, file.filename)
         
-        try:
-            # Save uploaded file temporarily
-            with open(temp_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-            
-            # Validate the image
-            is_valid, message = validate_image_file(temp_path)
-            if not is_valid:
-                raise HTTPException(status_code=400, detail=f"Invalid image: {message}")
-            
-            # Generate thumbnail
-            result = process_single_image(temp_path)
-            
-            if result['success']:
-                return {
-                    "success": True,
-                    "thumbnail_url": result['thumbnail_url'],
-                    "file_size": result['file_size'],
-                    "thumbnail_size": result['thumbnail_size'],
-                    "message": "Thumbnail generated successfully"
-                }
-            else:
-                raise HTTPException(status_code=500, detail=f"Failed to generate thumbnail: {result['error']}")
-        
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+        if result['success']:
+            return {
+                "success": True,
+                "thumbnail_url": result['thumbnail_url'],
+                "file_size": result['file_size'],
+                "thumbnail_size": result['thumbnail_size'],
+                "message": "Thumbnail generated successfully"
+            }
+        if not result['valid']:
+            raise HTTPException(status_code=400, detail=f"Invalid image: {result['error']}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate thumbnail: {result['error']}")
         
     except HTTPException:
         raise
@@ -946,32 +942,17 @@ async def validate_template_image(
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Create temporary file to validate
-        temp_path = f"temp_{uuid.uuid4()}_{file.filename}"
+        content = await file.read()
+        is_valid, message = await asyncio.to_thread(validate_image_bytes, content, file.filename)
         
-        try:
-            # Save uploaded file temporarily
-            with open(temp_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-            
-            # Validate the image
-            is_valid, message = validate_image_file(temp_path)
-            file_size = os.path.getsize(temp_path)
-            
-            return {
-                "success": True,
-                "valid": is_valid,
-                "message": message,
-                "file_size": file_size,
-                "filename": file.filename,
-                "content_type": file.content_type
-            }
-        
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+        return {
+            "success": True,
+            "valid": is_valid,
+            "message": message,
+            "file_size": len(content),
+            "filename": file.filename,
+            "content_type": file.content_type
+        }
         
     except HTTPException:
         raise
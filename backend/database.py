@@ -3,22 +3,28 @@ import os
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 import json
+import logging
 import uuid
 from dotenv import load_dotenv
 
+from .logging_config import truncate
+from .metrics import db_operation_duration_seconds, instrument_async_methods
+
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Initialize Supabase client with error handling for deployment
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 supabase_anon_key = os.getenv("SUPABASE_KEY")
 
-# Debug: Print what keys we found
-print(f"🔍 Environment check:")
-print(f"SUPABASE_URL: {'✓' if supabase_url else '✗'}")
-print(f"SUPABASE_SERVICE_ROLE_KEY: {'✓' if supabase_service_role_key else '✗'}")
-print(f"SUPABASE_KEY: {'✓' if supabase_anon_key else '✗'}")
+# Debug: Log what keys we found
+logger.info("🔍 Environment check:")
+logger.info("SUPABASE_URL: %s", '✓' if supabase_url else '✗')
+logger.info("SUPABASE_SERVICE_ROLE_KEY: %s", '✓' if supabase_service_role_key else '✗')
+logger.info("SUPABASE_KEY: %s", '✓' if supabase_anon_key else '✗')
 
 # Use service role key (required for backend operations)
 supabase_key = supabase_service_role_key
@@ -29,18 +35,18 @@ supabase = None
 if supabase_url and supabase_key:
     try:
         supabase: Client = create_client(supabase_url, supabase_key)
-        print("✅ Supabase client initialized successfully")
+        logger.info("✅ Supabase client initialized successfully")
         # More reliable key type detection
         key_type = "Service Role" if supabase_service_role_key else "Anon Key"
-        print(f"Using key type: {key_type}")
+        logger.info("Using key type: %s", key_type)
     except Exception as e:
-        print(f"❌ Failed to initialize Supabase client: {e}")
+        logger.error("❌ Failed to initialize Supabase client: %s", e)
         supabase = None
 else:
-    print("⚠️ Supabase environment variables not set. Database features will be disabled.")
-    print(f"SUPABASE_URL: {'✓' if supabase_url else '✗'}")
-    print(f"SUPABASE_KEY: {'✓' if supabase_key else '✗'}")
-    print("Server will start but database operations will fail gracefully.")
+    logger.warning("⚠️ Supabase environment variables not set. Database features will be disabled.")
+    logger.info("SUPABASE_URL: %s", '✓' if supabase_url else '✗')
+    logger.info("SUPABASE_KEY: %s", '✓' if supabase_key else '✗')
+    logger.info("Server will start but database operations will fail gracefully.")
 
 class DatabaseManager:
     def __init__(self):
@@ -110,7 +116,7 @@ class DatabaseManager:
                 return response.data[0]
             return None
         except Exception as e:
-            print(f"Error getting user profile: {e}")
+            logger.error("Error getting user profile: %s", e)
             return None
 
     async def update_user_profile(self, user_id: str, profile_data: Dict[str, Any]) -> bool:
@@ -120,7 +126,7 @@ class DatabaseManager:
             response = self.supabase.table("user_profiles").update(profile_data).eq("id", user_id).execute()
             return True
         except Exception as e:
-            print(f"Error updating user profile: {e}")
+            logger.error("Error updating user profile: %s", e)
             return False
 
     async def mark_tour_completed(self, user_id: str) -> bool:
@@ -132,7 +138,7 @@ class DatabaseManager:
             }).eq("id", user_id).execute()
             return True
         except Exception as e:
-            print(f"Error marking tour as completed: {e}")
+            logger.error("Error marking tour as completed: %s", e)
             return False
 
     async def is_tour_completed(self, user_id: str) -> bool:
@@ -143,16 +149,15 @@ class DatabaseManager:
                 return response.data[0].get("tour_completed", False)
             return False
         except Exception as e:
-            print(f"Error checking tour completion: {e}")
+            logger.error("Error checking tour completion: %s", e)
             return False
 
     # Order Management
     async def create_order(self, user_id: str, order_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new order"""
         try:
-            # Create order_details that includes canvas_image
+            # canvas_data is stored once, in its own column; canvas_image_url is filled in by the order pipeline
             order_details = {
-                "canvas_image": order_data.get("canvas_image"),
                 "banner_size": order_data.get("banner_size"),
                 "banner_type": order_data.get("banner_type"),
                 "banner_material": order_data.get("banner_material"),
@@ -161,7 +166,7 @@ class DatabaseManager:
                 "background_color": order_data.get("background_color"),
                 "print_options": order_data.get("print_options", {}),
                 "dimensions": order_data["dimensions"],
-                "canvas_data": order_data["canvas_data"]
+                "processing": order_data.get("processing")
             }
             
             order_record = {
@@ -200,7 +205,7 @@ class DatabaseManager:
             response = self.supabase.table("orders").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
             return response.data or []
         except Exception as e:
-            print(f"Error getting user orders: {e}")
+            logger.error("Error getting user orders: %s", e)
             return []
 
     async def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
@@ -211,7 +216,7 @@ class DatabaseManager:
                 return response.data[0]
             return None
         except Exception as e:
-            print(f"Error getting order: {e}")
+            logger.error("Error getting order: %s", e)
             return None
 
     async def update_order_status(self, order_id: str, status: str, stripe_payment_intent_id: str = None) -> bool:
@@ -228,7 +233,23 @@ class DatabaseManager:
             response = self.supabase.table("orders").update(update_data).eq("id", order_id).execute()
             return True
         except Exception as e:
-            print(f"Error updating order status: {e}")
+            logger.error("Error updating order status: %s", e)
+            return False
+
+    async def update_order_details(self, order_id: str, updates: Dict[str, Any]) -> bool:
+        """
+        Merge keys into an order's order_details in one server-side UPDATE
+        (jsonb ||, see supabase_merge_order_details.sql), so concurrent updates
+        of other keys are not lost. False if the order does not exist.
+        """
+        try:
+            response = self.supabase.rpc("merge_order_details", {
+                "order_uuid": order_id,
+                "updates": updates
+            }).execute()
+            return bool(response.data)
+        except Exception as e:
+            logger.error("Error updating order details: %s", e)
             return False
 
     async def update_order_customer_info(self, order_id: str, customer_info: Dict[str, str]) -> bool:
@@ -242,7 +263,7 @@ class DatabaseManager:
             response = self.supabase.table("orders").update(update_data).eq("id", order_id).execute()
             return True
         except Exception as e:
-            print(f"Error updating order customer info: {e}")
+            logger.error("Error updating order customer info: %s", e)
             return False
 
     # Canvas Data Management
@@ -252,7 +273,7 @@ class DatabaseManager:
             return {"success": False, "error": "Database not connected. Please check your connection."}
         
         try:
-            print(f"Attempting to save design for user: {user_id}")
+            logger.debug("Attempting to save design for user: %s", user_id)
             
             # Get current design count using database function
             count_response = self.supabase.rpc("get_user_design_count", {"user_uuid": user_id}).execute()
@@ -267,7 +288,7 @@ class DatabaseManager:
                         "design_limit": count_info["design_limit"]
                     }
             else:
-                print("Warning: Could not get design count, proceeding with save")
+                logger.warning("Warning: Could not get design count, proceeding with save")
             
             # Ensure canvas_data is properly formatted
             canvas_data = design_data.get("canvas_data", {})
@@ -291,21 +312,21 @@ class DatabaseManager:
                 "updated_at": datetime.utcnow().isoformat()
             }
             
-            print(f"Saving design record: {design_record['name']}")
-            print(f"Design record data: {design_record}")
+            logger.debug("Saving design record: %s", design_record['name'])
+            logger.debug("Design record data: %s", truncate(design_record))
             
             # Use banner_templates table instead of canvas_designs
             response = self.supabase.table("banner_templates").insert(design_record).execute()
             
             if response.data:
-                print(f"Design saved successfully with ID: {response.data[0]['id']}")
+                logger.debug("Design saved successfully with ID: %s", response.data[0]['id'])
                 
                 # Get updated design count after insert
                 try:
                     updated_count_response = self.supabase.rpc("get_user_design_count", {"user_uuid": user_id}).execute()
                     count_info = updated_count_response.data if updated_count_response.data else {"design_count": 1, "design_limit": 10}
                 except Exception as count_error:
-                    print(f"Warning: Could not get updated count: {count_error}")
+                    logger.warning("Warning: Could not get updated count: %s", count_error)
                     count_info = {"design_count": 1, "design_limit": 10}
                 
                 return {
@@ -315,12 +336,12 @@ class DatabaseManager:
                     "success": True
                 }
             else:
-                print("Error: No data returned from insert operation")
+                logger.error("Error: No data returned from insert operation")
                 return {"success": False, "error": "Failed to save design - no data returned"}
                 
         except Exception as e:
             error_msg = str(e)
-            print(f"Error saving canvas design: {error_msg}")
+            logger.error("Error saving canvas design: %s", error_msg)
             # Handle database-enforced limit error
             if "Design limit reached" in error_msg:
                 return {
@@ -334,22 +355,22 @@ class DatabaseManager:
     async def get_user_designs(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all saved designs for a user"""
         if not self.is_connected():
-            print("Database not connected, returning empty designs list")
+            logger.warning("Database not connected, returning empty designs list")
             return []
         
         try:
-            print(f"Fetching designs for user: {user_id}")
+            logger.debug("Fetching designs for user: %s", user_id)
             response = self.supabase.table("banner_templates").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
             
             if response.data:
-                print(f"Found {len(response.data)} designs for user")
+                logger.debug("Found %s designs for user", len(response.data))
                 return response.data
             else:
-                print("No designs found for user")
+                logger.debug("No designs found for user")
                 return []
                 
         except Exception as e:
-            print(f"Error getting user designs: {e}")
+            logger.error("Error getting user designs: %s", e)
             return []
 
     async def get_design_count_info(self, user_id: str) -> Dict[str, Any]:
@@ -370,7 +391,7 @@ class DatabaseManager:
                 "near_limit": False
             }
         except Exception as e:
-            print(f"Error getting design count info: {e}")
+            logger.error("Error getting design count info: %s", e)
             return {
                 "success": False,
                 "error": str(e),
@@ -388,39 +409,44 @@ class DatabaseManager:
             }).execute()
             
             if response.data and response.data.get("success"):
-                print(f"Successfully deleted design {design_id} for user {user_id}")
+                logger.debug("Successfully deleted design %s for user %s", design_id, user_id)
                 return True
             else:
                 error_msg = response.data.get("error", "Unknown error") if response.data else "Database function failed"
-                print(f"Failed to delete design {design_id}: {error_msg}")
+                logger.error("Failed to delete design %s: %s", design_id, error_msg)
                 return False
                 
         except Exception as e:
-            print(f"Error deleting design: {e}")
+            logger.error("Error deleting design: %s", e)
             return False
 
     async def get_design(self, design_id: str) -> Optional[Dict[str, Any]]:
         """Get specific design by ID"""
         if not self.is_connected():
-            print(f"❌ Database not connected when getting design {design_id}")
+            logger.error("❌ Database not connected when getting design %s", design_id)
             return None
             
         try:
-            print(f"🔍 Getting design {design_id}")
+            logger.debug("🔍 Getting design %s", design_id)
             response = self.supabase.table("banner_templates").select("*").eq("id", design_id).execute()
-            print(f"🔍 Design query response: {response}")
+            logger.debug("🔍 Design query response: %s", truncate(response))
             if response.data:
-                print(f"✅ Found design: {response.data[0].get('name', 'unnamed')}")
+                logger.debug("✅ Found design: %s", response.data[0].get('name', 'unnamed'))
                 return response.data[0]
             else:
-                print(f"❌ No design found with ID: {design_id}")
+                logger.warning("❌ No design found with ID: %s", design_id)
                 return None
         except Exception as e:
-            print(f"❌ Error getting design {design_id}: {e}")
+            logger.error("❌ Error getting design %s: %s", design_id, e)
             return None
 
-    async def update_design(self, design_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Update an existing design"""
+    async def update_design(self, design_id: str, update_data: Dict[str, Any],
+                            expected_version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Update an existing design. With expected_version (the updated_at that was
+        read) the write only applies if the row is unchanged since; otherwise the
+        result has success False and conflict True.
+        """
         try:
             # Convert canvas_data to JSON if it's a dict
             if "canvas_data" in update_data and isinstance(update_data["canvas_data"], dict):
@@ -429,7 +455,10 @@ class DatabaseManager:
             # Add updated timestamp
             update_data["updated_at"] = datetime.utcnow().isoformat()
             
-            response = self.supabase.table("banner_templates").update(update_data).eq("id", design_id).execute()
+            query = self.supabase.table("banner_templates").update(update_data).eq("id", design_id)
+            if expected_version is not None:
+                query = query.eq("updated_at", expected_version)
+            response = query.execute()
             
             if response.data:
                 return {
@@ -437,6 +466,8 @@ class DatabaseManager:
                     "design_id": design_id,
                     "updated_data": response.data[0]
                 }
+            if expected_version is not None:
+                return {"success": False, "conflict": True, "error": "Design was modified since it was read"}
             return {"success": False, "error": "Failed to update design"}
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -467,7 +498,7 @@ class DatabaseManager:
             response = self.supabase.table("user_addresses").insert(address_record).execute()
             return True
         except Exception as e:
-            print(f"Error saving user address: {e}")
+            logger.error("Error saving user address: %s", e)
             return False
 
     async def get_user_addresses(self, user_id: str) -> List[Dict[str, Any]]:
@@ -476,7 +507,7 @@ class DatabaseManager:
             response = self.supabase.table("user_addresses").select("*").eq("user_id", user_id).order("is_default", desc=True).execute()
             return response.data or []
         except Exception as e:
-            print(f"Error getting user addresses: {e}")
+            logger.error("Error getting user addresses: %s", e)
             return []
 
     # User Preferences Management
@@ -488,7 +519,7 @@ class DatabaseManager:
                 return response.data[0]
             return None
         except Exception as e:
-            print(f"Error getting user preferences: {e}")
+            logger.error("Error getting user preferences: %s", e)
             return None
 
     async def save_user_preferences(self, user_id: str, preferences: Dict[str, Any]) -> bool:
@@ -520,7 +551,7 @@ class DatabaseManager:
             
             return True
         except Exception as e:
-            print(f"Error saving user preferences: {e}")
+            logger.error("Error saving user preferences: %s", e)
             return False
 
     # Banner Templates Management
@@ -530,14 +561,14 @@ class DatabaseManager:
             return {"success": False, "error": "Database not connected. Please check your connection."}
         
         try:
-            print(f"Attempting to save template for user: {user_id}")
+            logger.debug("Attempting to save template for user: %s", user_id)
             
             # Check for duplicate template names for this user
             template_name = template_data["name"]
             existing_templates = self.supabase.table("banner_templates").select("id,name").eq("user_id", user_id).eq("name", template_name).execute()
             
             if existing_templates.data:
-                print(f"Template name '{template_name}' already exists for user {user_id}")
+                logger.debug("Template name '%s' already exists for user %s", template_name, user_id)
                 return {"success": False, "error": f"Template name '{template_name}' already exists. Please choose a different name."}
             
             # Ensure canvas_data is properly formatted
@@ -557,24 +588,24 @@ class DatabaseManager:
                 "updated_at": datetime.utcnow().isoformat()
             }
             
-            print(f"Saving template record: {template_record['name']}")
-            print(f"Template record data: {template_record}")
+            logger.debug("Saving template record: %s", template_record['name'])
+            logger.debug("Template record data: %s", truncate(template_record))
             
             response = self.supabase.table("banner_templates").insert(template_record).execute()
             
             if response.data:
-                print(f"Template saved successfully with ID: {response.data[0]['id']}")
+                logger.debug("Template saved successfully with ID: %s", response.data[0]['id'])
                 return {
                     "template_id": response.data[0]["id"],
                     "success": True
                 }
             else:
-                print("Error: No data returned from template insert operation")
+                logger.error("Error: No data returned from template insert operation")
                 return {"success": False, "error": "Failed to save template - no data returned"}
                 
         except Exception as e:
             error_msg = str(e)
-            print(f"Error saving custom template: {error_msg}")
+            logger.error("Error saving custom template: %s", error_msg)
             
             # Handle table doesn't exist error
             if "relation \"banner_templates\" does not exist" in error_msg:
@@ -588,91 +619,91 @@ class DatabaseManager:
     async def get_user_templates(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all custom templates for a user"""
         if not self.is_connected():
-            print("Database not connected, returning empty templates list")
+            logger.warning("Database not connected, returning empty templates list")
             return []
         
         try:
-            print(f"Fetching templates for user: {user_id}")
+            logger.debug("Fetching templates for user: %s", user_id)
             response = self.supabase.table("banner_templates").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
             
             if response.data:
-                print(f"Found {len(response.data)} templates for user")
+                logger.debug("Found %s templates for user", len(response.data))
                 return response.data
             else:
-                print("No templates found for user")
+                logger.debug("No templates found for user")
                 return []
                 
         except Exception as e:
-            print(f"Error getting user templates: {e}")
+            logger.error("Error getting user templates: %s", e)
             # If table doesn't exist, return empty list
             if "relation \"banner_templates\" does not exist" in str(e):
-                print("banner_templates table does not exist. Please run the SQL setup.")
+                logger.warning("banner_templates table does not exist. Please run the SQL setup.")
                 return []
             return []
 
     async def get_template(self, template_id: str) -> Optional[Dict[str, Any]]:
         """Get specific template by ID"""
         if not self.is_connected():
-            print("Database not connected, returning None for template")
+            logger.warning("Database not connected, returning None for template")
             return None
         
         try:
-            print(f"Fetching template with ID: {template_id}")
+            logger.debug("Fetching template with ID: %s", template_id)
             response = self.supabase.table("banner_templates").select("*").eq("id", template_id).execute()
             
             if response.data:
-                print(f"Found template: {response.data[0]['name']}")
+                logger.debug("Found template: %s", response.data[0]['name'])
                 return response.data[0]
             else:
-                print("Template not found")
+                logger.debug("Template not found")
                 return None
                 
         except Exception as e:
-            print(f"Error getting template: {e}")
+            logger.error("Error getting template: %s", e)
             # If table doesn't exist, return None
             if "relation \"banner_templates\" does not exist" in str(e):
-                print("banner_templates table does not exist. Please run the SQL setup.")
+                logger.warning("banner_templates table does not exist. Please run the SQL setup.")
                 return None
             return None
 
     async def delete_template(self, template_id: str) -> bool:
         """Delete a template by ID"""
         if not self.is_connected():
-            print("Database not connected, cannot delete template")
+            logger.warning("Database not connected, cannot delete template")
             return False
         
         try:
-            print(f"Deleting template with ID: {template_id}")
+            logger.debug("Deleting template with ID: %s", template_id)
             response = self.supabase.table("banner_templates").delete().eq("id", template_id).execute()
             
             if response.data:
-                print(f"Successfully deleted template: {template_id}")
+                logger.debug("Successfully deleted template: %s", template_id)
                 return True
             else:
-                print("Template not found for deletion")
+                logger.debug("Template not found for deletion")
                 return False
                 
         except Exception as e:
-            print(f"Error deleting template: {e}")
+            logger.error("Error deleting template: %s", e)
             # If table doesn't exist, return False
             if "relation \"banner_templates\" does not exist" in str(e):
-                print("banner_templates table does not exist. Please run the SQL setup.")
+                logger.warning("banner_templates table does not exist. Please run the SQL setup.")
                 return False
             return False
 
     async def get_user_template_count(self, user_id: str) -> int:
         """Get the number of templates a user has"""
         if not self.is_connected():
-            print("Database not connected, returning 0 for template count")
+            logger.warning("Database not connected, returning 0 for template count")
             return 0
         
         try:
             response = self.supabase.table("banner_templates").select("id", count="exact").eq("user_id", user_id).execute()
             count = response.count if response.count is not None else 0
-            print(f"User {user_id} has {count} templates")
+            logger.debug("User %s has %s templates", user_id, count)
             return count
         except Exception as e:
-            print(f"Error getting template count: {e}")
+            logger.error("Error getting template count: %s", e)
             return 0
 
     async def check_template_limit(self, user_id: str, limit: int = 20) -> Dict[str, Any]:
@@ -688,7 +719,7 @@ class DatabaseManager:
                 "remaining": max(0, limit - current_count)
             }
         except Exception as e:
-            print(f"Error checking template limit: {e}")
+            logger.error("Error checking template limit: %s", e)
             return {
                 "current_count": 0,
                 "limit": limit,
@@ -699,25 +730,25 @@ class DatabaseManager:
     async def get_public_templates(self) -> List[Dict[str, Any]]:
         """Get all public templates"""
         if not self.is_connected():
-            print("Database not connected, returning empty public templates list")
+            logger.warning("Database not connected, returning empty public templates list")
             return []
         
         try:
-            print("Fetching public templates")
+            logger.debug("Fetching public templates")
             response = self.supabase.table("banner_templates").select("*").eq("is_public", True).order("created_at", desc=True).execute()
             
             if response.data:
-                print(f"Found {len(response.data)} public templates")
+                logger.debug("Found %s public templates", len(response.data))
                 return response.data
             else:
-                print("No public templates found")
+                logger.debug("No public templates found")
                 return []
                 
         except Exception as e:
-            print(f"Error getting public templates: {e}")
+            logger.error("Error getting public templates: %s", e)
             # If table doesn't exist, return empty list
             if "relation \"banner_templates\" does not exist" in str(e):
-                print("banner_templates table does not exist. Please run the SQL setup.")
+                logger.warning("banner_templates table does not exist. Please run the SQL setup.")
                 return []
             return []
 
@@ -744,7 +775,7 @@ class DatabaseManager:
             response = self.supabase.table("design_history").insert(version_record).execute()
             return True
         except Exception as e:
-            print(f"Error saving design version: {e}")
+            logger.error("Error saving design version: %s", e)
             return False
 
     async def get_design_history(self, design_id: str) -> List[Dict[str, Any]]:
@@ -753,7 +784,7 @@ class DatabaseManager:
             response = self.supabase.table("design_history").select("*").eq("design_id", design_id).order("version_number", desc=True).execute()
             return response.data or []
         except Exception as e:
-            print(f"Error getting design history: {e}")
+            logger.error("Error getting design history: %s", e)
             return []
 
     # Analytics and Tracking
@@ -781,7 +812,7 @@ class DatabaseManager:
                 "success": True
             }
         except Exception as e:
-            print(f"Error getting user stats: {e}")
+            logger.error("Error getting user stats: %s", e)
             return {"success": False, "error": str(e)}
 
     async def get_pending_orders(self, user_id: str) -> List[Dict[str, Any]]:
@@ -791,13 +822,13 @@ class DatabaseManager:
             response = self.supabase.table("pending_orders").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
             return response.data or []
         except Exception as e:
-            print(f"Error getting pending orders: {e}")
+            logger.error("Error getting pending orders: %s", e)
             # Fallback to old logic if pending_orders table doesn't exist yet
             try:
                 response = self.supabase.table("orders").select("*").eq("user_id", user_id).in_("status", ["pending", "payment_failed", "incomplete"]).order("created_at", desc=True).execute()
                 return response.data or []
             except Exception as fallback_error:
-                print(f"Fallback error getting pending orders: {fallback_error}")
+                logger.error("Fallback error getting pending orders: %s", fallback_error)
                 return []
 
     async def create_pending_order(self, user_id: str, order_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -813,7 +844,7 @@ class DatabaseManager:
             else:
                 return {"success": False, "error": "Failed to create pending order"}
         except Exception as e:
-            print(f"Error creating pending order: {e}")
+            logger.error("Error creating pending order: %s", e)
             return {"success": False, "error": str(e)}
 
     async def move_pending_to_orders(self, pending_order_id: str) -> Dict[str, Any]:
@@ -826,7 +857,7 @@ class DatabaseManager:
             else:
                 return {"success": False, "error": "Failed to move pending order"}
         except Exception as e:
-            print(f"Error moving pending order to orders: {e}")
+            logger.error("Error moving pending order to orders: %s", e)
             return {"success": False, "error": str(e)}
 
     async def update_pending_order(self, pending_order_id: str, update_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -838,7 +869,7 @@ class DatabaseManager:
             else:
                 return {"success": False, "error": "Failed to update pending order"}
         except Exception as e:
-            print(f"Error updating pending order: {e}")
+            logger.error("Error updating pending order: %s", e)
             return {"success": False, "error": str(e)}
 
     async def delete_pending_order(self, pending_order_id: str) -> Dict[str, Any]:
@@ -847,7 +878,7 @@ class DatabaseManager:
             response = self.supabase.table("pending_orders").delete().eq("id", pending_order_id).execute()
             return {"success": True}
         except Exception as e:
-            print(f"Error deleting pending order: {e}")
+            logger.error("Error deleting pending order: %s", e)
             return {"success": False, "error": str(e)}
 
     async def get_completed_designs(self, user_id: str) -> List[Dict[str, Any]]:
@@ -859,7 +890,7 @@ class DatabaseManager:
             completed_designs = []
             processed_designs = set()  # Track processed designs to avoid duplicates
             
-            print(f"Found {len(response.data or [])} completed orders for user {user_id}")
+            logger.debug("Found %s completed orders for user %s", len(response.data or []), user_id)
             
             for order in response.data or []:
                 order_details = order.get("order_details")
@@ -875,17 +906,18 @@ class DatabaseManager:
                         "status": order["status"],
                         "created_at": order["created_at"],
                         "canvas_image": order_details.get("canvas_image") if order_details else None,
+                        "canvas_image_url": order_details.get("canvas_image_url") if order_details else None,
                         "design_preview": order_details.get("canvas_image") if order_details else None,
                         "title": f"Banner Design - {order_details.get('banner_size', 'Unknown Size') if order_details else 'Unknown Size'}"
                     }
                     completed_designs.append(design_data)
                     processed_designs.add(order_id)
-                    print(f"Added design for order {order_id} with canvas_image: {'Yes' if order_details and order_details.get('canvas_image') else 'No'}")
+                    logger.debug("Added design for order %s with canvas_image: %s", order_id, 'Yes' if order_details and order_details.get('canvas_image') else 'No')
             
-            print(f"Returning {len(completed_designs)} unique completed designs")
+            logger.debug("Returning %s unique completed designs", len(completed_designs))
             return completed_designs
         except Exception as e:
-            print(f"Error getting completed designs: {e}")
+            logger.error("Error getting completed designs: %s", e)
             return []
 
     # Canvas State Management
@@ -931,15 +963,15 @@ class DatabaseManager:
                     .execute()
             
             if hasattr(response, 'data') and response.data:
-                print(f"Canvas state saved successfully: {len(response.data)} records affected")
+                logger.debug("Canvas state saved successfully: %s records affected", len(response.data))
                 return True
             else:
-                print(f"Canvas state save returned unexpected response: {response}")
+                logger.debug("Canvas state save returned unexpected response: %s", truncate(response))
                 return False
             
         except Exception as e:
-            print(f"Error saving canvas state: {e}")
-            print(f"Canvas state data that failed: {canvas_state_data}")
+            logger.error("Error saving canvas state: %s", e)
+            logger.debug("Canvas state data that failed: %s", truncate(canvas_state_data))
             return False
 
     async def load_canvas_state(self, user_id: str, session_id: str = None, is_checkout_session: bool = None) -> Dict[str, Any]:
@@ -975,7 +1007,7 @@ class DatabaseManager:
             return None
             
         except Exception as e:
-            print(f"Error loading canvas state: {e}")
+            logger.error("Error loading canvas state: %s", e)
             return None
 
     async def clear_canvas_state(self, user_id: str, session_id: str = None) -> bool:
@@ -994,7 +1026,7 @@ class DatabaseManager:
             return True
             
         except Exception as e:
-            print(f"Error clearing canvas state: {e}")
+            logger.error("Error clearing canvas state: %s", e)
             return False
 
     async def cleanup_expired_canvas_states(self) -> int:
@@ -1008,12 +1040,12 @@ class DatabaseManager:
             
             deleted_count = len(response.data) if response.data else 0
             if deleted_count > 0:
-                print(f"Cleaned up {deleted_count} expired canvas states")
+                logger.info("Cleaned up %s expired canvas states", deleted_count)
             
             return deleted_count
             
         except Exception as e:
-            print(f"Error cleaning up expired canvas states: {e}")
+            logger.error("Error cleaning up expired canvas states: %s", e)
             return 0
 
     async def delete_user_account(self, user_id: str) -> bool:
@@ -1045,11 +1077,11 @@ class DatabaseManager:
             # Delete user profile (this should cascade due to foreign key)
             self.supabase.table("user_profiles").delete().eq("id", user_id).execute()
             
-            print(f"Successfully deleted all data for user: {user_id}")
+            logger.info("Successfully deleted all data for user: %s", user_id)
             return True
             
         except Exception as e:
-            print(f"Error deleting user account: {e}")
+            logger.error("Error deleting user account: %s", e)
             return False
 
     # Business Card Tins Management
@@ -1097,7 +1129,7 @@ class DatabaseManager:
                 "notes": tin_data.get('notes', '')
             }
             
-            print(f"Creating business card tin order: {tin_record}")
+            logger.debug("Creating business card tin order: %s", truncate(tin_record))
             
             response = self.supabase.table("business_card_tins").insert(tin_record).execute()
             
@@ -1111,7 +1143,7 @@ class DatabaseManager:
                 return {"success": False, "error": "Failed to create tin order"}
                 
         except Exception as e:
-            print(f"Error creating business card tin order: {e}")
+            logger.error("Error creating business card tin order: %s", e)
             return {"success": False, "error": str(e)}
 
     async def get_business_card_tin(self, tin_id: str) -> Optional[Dict[str, Any]]:
@@ -1122,7 +1154,7 @@ class DatabaseManager:
                 return response.data[0]
             return None
         except Exception as e:
-            print(f"Error getting business card tin: {e}")
+            logger.error("Error getting business card tin: %s", e)
             return None
 
     async def get_user_business_card_tins(self, user_id: str) -> List[Dict[str, Any]]:
@@ -1131,7 +1163,7 @@ class DatabaseManager:
             response = self.supabase.table("business_card_tins").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
             return response.data or []
         except Exception as e:
-            print(f"Error getting user business card tins: {e}")
+            logger.error("Error getting user business card tins: %s", e)
             return []
 
     async def update_business_card_tin_design(self, tin_id: str, surface_designs: Dict[str, Any]) -> bool:
@@ -1145,7 +1177,7 @@ class DatabaseManager:
             response = self.supabase.table("business_card_tins").update(update_data).eq("id", tin_id).execute()
             return bool(response.data)
         except Exception as e:
-            print(f"Error updating business card tin design: {e}")
+            logger.error("Error updating business card tin design: %s", e)
             return False
 
     async def update_business_card_tin_status(self, tin_id: str, status: str, notes: str = "") -> bool:
@@ -1162,7 +1194,7 @@ class DatabaseManager:
             response = self.supabase.table("business_card_tins").update(update_data).eq("id", tin_id).execute()
             return bool(response.data)
         except Exception as e:
-            print(f"Error updating business card tin status: {e}")
+            logger.error("Error updating business card tin status: %s", e)
             return False
 
     async def delete_business_card_tin(self, tin_id: str) -> bool:
@@ -1171,7 +1203,7 @@ class DatabaseManager:
             response = self.supabase.table("business_card_tins").delete().eq("id", tin_id).execute()
             return bool(response.data)
         except Exception as e:
-            print(f"Error deleting business card tin: {e}")
+            logger.error("Error deleting business card tin: %s", e)
             return False
 
     async def get_business_card_tin_by_order(self, order_id: str) -> Optional[Dict[str, Any]]:
@@ -1182,7 +1214,7 @@ class DatabaseManager:
                 return response.data[0]
             return None
         except Exception as e:
-            print(f"Error getting business card tin by order: {e}")
+            logger.error("Error getting business card tin by order: %s", e)
             return None
 
     # =============================================
@@ -1199,7 +1231,7 @@ class DatabaseManager:
             return response.data is not None
             
         except Exception as e:
-            print(f"Error creating creator: {e}")
+            logger.error("Error creating creator: %s", e)
             return False
     
     async def get_creator_by_id(self, creator_id: str) -> Optional[Dict[str, Any]]:
@@ -1214,7 +1246,7 @@ class DatabaseManager:
             return None
             
         except Exception as e:
-            print(f"Error getting creator by ID: {e}")
+            logger.error("Error getting creator by ID: %s", e)
             return None
     
     async def get_creator_by_user_id(self, user_id: str) -> Optional[Dict[str, Any]]:
@@ -1229,7 +1261,7 @@ class DatabaseManager:
             return None
             
         except Exception as e:
-            print(f"Error getting creator by user ID: {e}")
+            logger.error("Error getting creator by user ID: %s", e)
             return None
     
     async def update_creator(self, creator_id: str, update_data: Dict[str, Any]) -> bool:
@@ -1242,7 +1274,7 @@ class DatabaseManager:
             return response.data is not None
             
         except Exception as e:
-            print(f"Error updating creator: {e}")
+            logger.error("Error updating creator: %s", e)
             return False
     
     async def create_creator_template(self, template_data: Dict[str, Any]) -> bool:
@@ -1255,7 +1287,7 @@ class DatabaseManager:
             return response.data is not None
             
         except Exception as e:
-            print(f"Error creating creator template: {e}")
+            logger.error("Error creating creator template: %s", e)
             return False
     
     async def get_creator_template(self, template_id: str) -> Optional[Dict[str, Any]]:
@@ -1270,7 +1302,7 @@ class DatabaseManager:
             return None
             
         except Exception as e:
-            print(f"Error getting creator template: {e}")
+            logger.error("Error getting creator template: %s", e)
             return None
     
     async def get_creator_templates(self, creator_id: str) -> List[Dict[str, Any]]:
@@ -1283,7 +1315,7 @@ class DatabaseManager:
             return response.data or []
             
         except Exception as e:
-            print(f"Error getting creator templates: {e}")
+            logger.error("Error getting creator templates: %s", e)
             return []
     
     async def get_marketplace_templates(self, filters: Dict[str, Any] = None, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
@@ -1334,7 +1366,7 @@ class DatabaseManager:
             }
             
         except Exception as e:
-            print(f"Error getting marketplace templates: {e}")
+            logger.error("Error getting marketplace templates: %s", e)
             return {"templates": [], "total": 0}
     
     async def increment_template_views(self, template_id: str) -> bool:
@@ -1355,7 +1387,7 @@ class DatabaseManager:
             return response.data is not None
             
         except Exception as e:
-            print(f"Error incrementing template views: {e}")
+            logger.error("Error incrementing template views: %s", e)
             return False
     
     async def approve_template(self, template_id: str, approved_by: str) -> bool:
@@ -1376,7 +1408,7 @@ class DatabaseManager:
             return response.data is not None
             
         except Exception as e:
-            print(f"Error approving template: {e}")
+            logger.error("Error approving template: %s", e)
             return False
     
     async def reject_template(self, template_id: str, reason: str, rejected_by: str) -> bool:
@@ -1395,7 +1427,7 @@ class DatabaseManager:
             return response.data is not None
             
         except Exception as e:
-            print(f"Error rejecting template: {e}")
+            logger.error("Error rejecting template: %s", e)
             return False
     
     async def get_pending_templates(self) -> List[Dict[str, Any]]:
@@ -1408,7 +1440,7 @@ class DatabaseManager:
             return response.data or []
             
         except Exception as e:
-            print(f"Error getting pending templates: {e}")
+            logger.error("Error getting pending templates: %s", e)
             return []
     
     async def get_creator_analytics(self, creator_id: str) -> Dict[str, Any]:
@@ -1456,7 +1488,7 @@ class DatabaseManager:
             }
             
         except Exception as e:
-            print(f"Error getting creator analytics: {e}")
+            logger.error("Error getting creator analytics: %s", e)
             return {}
     
     # =============================================
@@ -1473,7 +1505,7 @@ class DatabaseManager:
             return response.data is not None
             
         except Exception as e:
-            print(f"Error creating template purchase: {e}")
+            logger.error("Error creating template purchase: %s", e)
             return False
     
     async def get_user_purchases(self, user_id: str) -> List[Dict[str, Any]]:
@@ -1486,7 +1518,7 @@ class DatabaseManager:
             return response.data or []
             
         except Exception as e:
-            print(f"Error getting user purchases: {e}")
+            logger.error("Error getting user purchases: %s", e)
             return []
     
     async def get_creator_earnings(self, creator_id: str) -> Dict[str, Any]:
@@ -1511,7 +1543,7 @@ class DatabaseManager:
             }
             
         except Exception as e:
-            print(f"Error getting creator earnings: {e}")
+            logger.error("Error getting creator earnings: %s", e)
             return {}
 
     async def get_template_by_id(self, template_id: str) -> Dict[str, Any]:
@@ -1524,7 +1556,7 @@ class DatabaseManager:
             return response.data[0] if response.data else None
             
         except Exception as e:
-            print(f"Error getting template by ID: {e}")
+            logger.error("Error getting template by ID: %s", e)
             return None
 
     async def increment_template_downloads(self, template_id: str, user_id: str) -> bool:
@@ -1547,8 +1579,11 @@ class DatabaseManager:
             return False
             
         except Exception as e:
-            print(f"Error incrementing template downloads: {e}")
+            logger.error("Error incrementing template downloads: %s", e)
             return False
 
+# Record per-operation latency for every DatabaseManager call
+instrument_async_methods(DatabaseManager, db_operation_duration_seconds)
+
 # Initialize database manager
 db_manager = DatabaseManager()
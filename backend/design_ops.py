@@ -0,0 +1,153 @@
+"""
+Design Operations
+Applies an ordered batch of canvas edits (add, move, resize, recolor, delete,
+reorder, duplicate) to a design in one pass over its element index. The batch
+runs against a copy of the canvas and is swapped in only if every operation
+succeeds, so a failed batch leaves the design untouched and nothing is
+persisted; a successful one is written back with a single update.
+"""
+
+import copy
+import logging
+from typing import Any, Dict, List, Optional
+
+from .design_session import SessionDesign
+
+logger = logging.getLogger(__name__)
+
+MAX_OPERATIONS = 500
+
+# Property names each operation may set, mapped from their request keys
+_MOVE_FIELDS = {"x": "x", "y": "y"}
+_RESIZE_FIELDS = {"width": "width", "height": "height", "radius": "radius", "scale_x": "scaleX", "scale_y": "scaleY"}
+_RECOLOR_FIELDS = {"fill": "fill", "fill_color": "fill", "stroke": "stroke", "stroke_color": "stroke",
+                   "stroke_width": "strokeWidth", "opacity": "opacity"}
+_REORDER_POSITIONS = ("front", "back", "forward", "backward")
+
+
+class DesignOperationError(ValueError):
+    """An operation in a batch could not be applied; index is its position in the batch"""
+
+    def __init__(self, index: int, message: str):
+        super().__init__(f"Operation {index}: {message}")
+        self.index = index
+
+
+def _changes(operation: Dict[str, Any], fields: Dict[str, str]) -> Dict[str, Any]:
+    return {prop: operation[key] for key, prop in fields.items() if operation.get(key) is not None}
+
+
+def _op_add(design: SessionDesign, operation: Dict[str, Any]) -> Dict[str, Any]:
+    element = operation.get("element")
+    if not isinstance(element, dict) or not element.get("type"):
+        raise ValueError("add needs an element with a type")
+    element = copy.deepcopy(element)
+    if not element.get("id") or design.find(element["id"]) is not None:
+        element["id"] = design.new_element_id(element["type"])
+    design.add(element)
+    index = operation.get("index")
+    if index is not None:
+        design.move_to(element, int(index))
+    return {"element_id": element["id"]}
+
+
+def _op_move(design: SessionDesign, element: Dict[str, Any], operation: Dict[str, Any]) -> None:
+    changes = _changes(operation, _MOVE_FIELDS)
+    # dx/dy nudge relative to the current position
+    for delta, axis in (("dx", "x"), ("dy", "y")):
+        if operation.get(delta) is not None:
+            changes[axis] = changes.get(axis, element.get(axis, 0)) + operation[delta]
+    if not changes:
+        raise ValueError("move needs x, y, dx or dy")
+    design.update(element, **changes)
+
+
+def _op_resize(design: SessionDesign, element: Dict[str, Any], operation: Dict[str, Any]) -> None:
+    changes = _changes(operation, _RESIZE_FIELDS)
+    if not changes:
+        raise ValueError("resize needs width, height, radius or scale_x/scale_y")
+    design.update(element, **changes)
+
+
+def _op_recolor(design: SessionDesign, element: Dict[str, Any], operation: Dict[str, Any]) -> None:
+    changes = _changes(operation, _RECOLOR_FIELDS)
+    if not changes:
+        raise ValueError("recolor needs fill, stroke, stroke_width or opacity")
+    design.update(element, **changes)
+
+
+def _op_delete(design: SessionDesign, element: Dict[str, Any], operation: Dict[str, Any]) -> None:
+    design.remove(element["id"])
+
+
+def _op_reorder(design: SessionDesign, element: Dict[str, Any], operation: Dict[str, Any]) -> None:
+    position = operation.get("position")
+    if position == "front":
+        design.bring_to_front(element)
+    elif position == "back":
+        design.send_to_back(element)
+    elif position in ("forward", "backward"):
+        step = 1 if position == "forward" else -1
+        design.move_to(element, max(design.position(element) + step, 0))
+    elif isinstance(position, int) and not isinstance(position, bool):
+        design.move_to(element, position)
+    else:
+        raise ValueError(f"reorder position must be one of {', '.join(_REORDER_POSITIONS)} or an index")
+
+
+def _op_duplicate(design: SessionDesign, element: Dict[str, Any], operation: Dict[str, Any]) -> Dict[str, Any]:
+    duplicate = copy.deepcopy(element)
+    duplicate["id"] = design.new_element_id(f"{element['id']}_copy")
+    duplicate["x"] = element.get("x", 0) + operation.get("x_offset", 20)
+    duplicate["y"] = element.get("y", 0) + operation.get("y_offset", 20)
+    design.add(duplicate)
+    return {"element_id": duplicate["id"]}
+
+
+_ELEMENT_OPERATIONS = {
+    "move": _op_move,
+    "resize": _op_resize,
+    "recolor": _op_recolor,
+    "delete": _op_delete,
+    "reorder": _op_reorder,
+    "duplicate": _op_duplicate,
+}
+OPERATIONS = ("add",) + tuple(_ELEMENT_OPERATIONS)
+
+
+def apply_operations(design: SessionDesign, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Apply operations in order and return one result per operation (element ids
+    created by add/duplicate are reported so later edits can target them).
+    Raises DesignOperationError without modifying the design if any fails.
+    """
+    if len(operations) > MAX_OPERATIONS:
+        raise DesignOperationError(MAX_OPERATIONS, f"at most {MAX_OPERATIONS} operations per batch")
+
+    working = SessionDesign(design.design_id, design.record, copy.deepcopy(design.canvas_data), design.persisted)
+    results = []
+    for index, operation in enumerate(operations):
+        op = operation.get("op") if isinstance(operation, dict) else None
+        try:
+            if op == "add":
+                result = _op_add(working, operation)
+            elif op in _ELEMENT_OPERATIONS:
+                element_id = operation.get("element_id")
+                element = working.find(element_id) if element_id else None
+                if element is None:
+                    raise ValueError(f"element {element_id!r} not found")
+                result = _ELEMENT_OPERATIONS[op](working, element, operation) or {"element_id": element_id}
+            else:
+                raise ValueError(f"unknown op {op!r}; expected one of {', '.join(OPERATIONS)}")
+        except (ValueError, TypeError) as e:
+            raise DesignOperationError(index, str(e)) from None
+        results.append({"op": op, **result})
+
+    if operations:
+        design.replace_canvas(working.canvas_data)
+    return results
+
+
+def design_version(record: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Version token for optimistic concurrency: the row's last update time"""
+    return (record or {}).get("updated_at")
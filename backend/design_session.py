@@ -0,0 +1,276 @@
+"""
+Design Session
+Per-chat-turn working copy of the designs the AI tools operate on. Each design
+is loaded from the database once, its elements are indexed by id, every tool in
+the turn mutates the same in-memory canvas, and the merged result is persisted
+with a single update per design when the turn ends.
+"""
+
+import copy
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Key used for the scratch canvas when a tool runs without a design_id
+SCRATCH_KEY = "__scratch__"
+
+
+class DesignPersistError(Exception):
+    """A standalone tool session could not write its design back"""
+
+
+def blank_canvas(width: int = 800, height: int = 400, background: str = "#ffffff") -> Dict[str, Any]:
+    return {
+        "version": "2.0",
+        "width": width,
+        "height": height,
+        "background": background,
+        "objects": []
+    }
+
+
+def parse_canvas_data(canvas_data: Any) -> Dict[str, Any]:
+    """canvas_data is stored as a JSON string; accept either form"""
+    if isinstance(canvas_data, str):
+        try:
+            canvas_data = json.loads(canvas_data)
+        except ValueError:
+            logger.warning("Ignoring unparseable canvas_data")
+            canvas_data = None
+    return canvas_data if isinstance(canvas_data, dict) else {}
+
+
+class SessionDesign:
+    """One design's canvas plus an element-id index"""
+
+    def __init__(self, design_id: Optional[str], record: Optional[Dict[str, Any]], canvas_data: Dict[str, Any],
+                 persisted: bool):
+        self.design_id = design_id
+        self.record = record or {}
+        self.canvas_data = canvas_data
+        self.persisted = persisted
+        self.dirty = False
+        if not isinstance(self.canvas_data.get("objects"), list):
+            self.canvas_data["objects"] = []
+        self._by_id: Dict[str, Dict[str, Any]] = {
+            obj["id"]: obj for obj in self.canvas_data["objects"] if isinstance(obj, dict) and obj.get("id")
+        }
+
+    @property
+    def objects(self) -> List[Dict[str, Any]]:
+        return self.canvas_data["objects"]
+
+    def find(self, element_id: str, element_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        element = self._by_id.get(element_id)
+        if element is None or (element_type and element.get("type") != element_type):
+            return None
+        return element
+
+    def new_element_id(self, prefix: str) -> str:
+        """Unique id in the same shape the tools have always used"""
+        element_id = f"{prefix}_{int(time.time())}_{len(self.objects)}"
+        suffix = 1
+        while element_id in self._by_id:
+            element_id = f"{prefix}_{int(time.time())}_{len(self.objects)}_{suffix}"
+            suffix += 1
+        return element_id
+
+    def add(self, element: Dict[str, Any]) -> Dict[str, Any]:
+        self.objects.append(element)
+        self._by_id[element["id"]] = element
+        self.dirty = True
+        return element
+
+    def position(self, element: Dict[str, Any]) -> int:
+        for i, obj in enumerate(self.objects):
+            if obj is element:
+                return i
+        raise ValueError("element is not on this canvas")
+
+    def remove(self, element_id: str) -> Optional[Dict[str, Any]]:
+        element = self._by_id.pop(element_id, None)
+        if element is not None:
+            del self.objects[self.position(element)]
+            self.dirty = True
+        return element
+
+    def bring_to_front(self, element: Dict[str, Any]) -> None:
+        self.objects.append(self.objects.pop(self.position(element)))
+        self.dirty = True
+
+    def send_to_back(self, element: Dict[str, Any]) -> None:
+        self.objects.insert(0, self.objects.pop(self.position(element)))
+        self.dirty = True
+
+    def move_to(self, element: Dict[str, Any], index: int) -> None:
+        """Move an element to a stacking position (negative counts from the top)"""
+        self.objects.pop(self.position(element))
+        if index < 0:
+            index += len(self.objects) + 1
+        self.objects.insert(max(0, min(index, len(self.objects))), element)
+        self.dirty = True
+
+    def update(self, element: Dict[str, Any], **changes) -> None:
+        """Apply non-None property changes to an element"""
+        for key, value in changes.items():
+            if value is not None:
+                element[key] = value
+        self.dirty = True
+
+    def replace_canvas(self, canvas_data: Dict[str, Any]) -> None:
+        """Swap in a new canvas (e.g. a batch applied to a copy) and rebuild the index"""
+        self.canvas_data = canvas_data
+        self._by_id = {obj["id"]: obj for obj in self.objects if isinstance(obj, dict) and obj.get("id")}
+        self.dirty = True
+
+    def set_canvas(self, **changes) -> None:
+        self.canvas_data.update({key: value for key, value in changes.items() if value is not None})
+        self.dirty = True
+
+    def design_data(self) -> Dict[str, Any]:
+        return {
+            "design_id": self.design_id or f"temp_{int(time.time())}",
+            "canvas_data": self.canvas_data
+        }
+
+
+class DesignSession:
+    """
+    Working set of designs for one chat turn.
+
+    Tools call get() / scratch() and mutate the returned SessionDesign; commit()
+    writes each dirty design back once. Outside a chat turn, tools open a
+    standalone session that commits right after the tool runs.
+    """
+
+    def __init__(self, db=None):
+        self._db = db
+        self._designs: Dict[str, Optional[SessionDesign]] = {}
+        # design_id -> error of each design the last commit failed to write
+        self.unsaved: Dict[str, str] = {}
+
+    @property
+    def db(self):
+        if self._db is None:
+            from .database import db_manager
+            self._db = db_manager
+        return self._db
+
+    async def get(self, design_id: str) -> Optional[SessionDesign]:
+        """Load a design once per session; later calls reuse the same canvas"""
+        if design_id in self._designs:
+            return self._designs[design_id]
+        record = await self.db.get_design(design_id)
+        design = None
+        if record:
+            design = SessionDesign(design_id, record, parse_canvas_data(record.get("canvas_data")), persisted=True)
+        self._designs[design_id] = design
+        return design
+
+    async def get_or_scratch(self, design_id: Optional[str]) -> SessionDesign:
+        """The stored design when it exists, otherwise the turn's scratch canvas"""
+        if design_id:
+            design = await self.get(design_id)
+            if design is not None:
+                return design
+        return self.scratch(design_id)
+
+    def scratch(self, design_id: Optional[str] = None) -> SessionDesign:
+        design = self._designs.get(SCRATCH_KEY)
+        if design is None:
+            design = SessionDesign(design_id, None, blank_canvas(), persisted=False)
+            self._designs[SCRATCH_KEY] = design
+        return design
+
+    def checkpoint(self, design_id: str) -> Callable[[], None]:
+        """
+        Capture a design's current state and return a function that restores it,
+        for undoing a tool call cancelled part-way through an edit. A design not
+        loaded yet is simply forgotten again, so the next get() reloads it.
+        """
+        if design_id not in self._designs:
+            return lambda: self._designs.pop(design_id, None)
+        design = self._designs[design_id]
+        if design is None:
+            return lambda: None
+        canvas_data, dirty = copy.deepcopy(design.canvas_data), design.dirty
+
+        def restore() -> None:
+            design.replace_canvas(canvas_data)
+            design.dirty = dirty
+        return restore
+
+    def modified(self) -> List[SessionDesign]:
+        return [design for design in self._designs.values() if design is not None and design.dirty]
+
+    async def commit(self, if_unmodified: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Persist each dirty stored design with a single update. With if_unmodified
+        each write is conditional on the row's updated_at being the one loaded, and
+        a design changed by someone else in between comes back with conflict True.
+        """
+        results = {}
+        for design in self.modified():
+            if not design.persisted:
+                continue
+            version = design.record.get("updated_at") if if_unmodified else None
+            if version is not None:
+                result = await self.db.update_design(design.design_id, {"canvas_data": design.canvas_data},
+                                                     expected_version=version)
+            else:
+                result = await self.db.update_design(design.design_id, {"canvas_data": design.canvas_data})
+            if result.get("success"):
+                design.dirty = False
+                design.record.update(result.get("updated_data") or {})
+                self.unsaved.pop(design.design_id, None)
+            else:
+                logger.error("Failed to persist design %s: %s", design.design_id, result.get("error"))
+                self.unsaved[design.design_id] = result.get("error") or "Failed to update design"
+            results[design.design_id] = result
+        return results
+
+
+_current_session: ContextVar[Optional[DesignSession]] = ContextVar("design_session", default=None)
+
+
+def current_design_session() -> Optional[DesignSession]:
+    return _current_session.get()
+
+
+@asynccontextmanager
+async def design_session(db=None):
+    """
+    Run a chat turn against one DesignSession and commit it at the end. Tool
+    results are already out by then; callers check session.unsaved afterwards.
+    """
+    session = DesignSession(db)
+    token = _current_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_session.reset(token)
+        await session.commit()
+
+
+@asynccontextmanager
+async def tool_design_session():
+    """
+    The chat turn's session, or a standalone one that commits when the tool
+    returns. A failed standalone commit raises DesignPersistError, which the
+    tool's own error handling turns into {"success": False}.
+    """
+    session = current_design_session()
+    if session is not None:
+        yield session
+        return
+    session = DesignSession()
+    yield session
+    await session.commit()
+    if session.unsaved:
+        raise DesignPersistError("; ".join(f"Could not save design {design_id}: {error}"
+                                           for design_id, error in session.unsaved.items()))
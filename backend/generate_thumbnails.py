@@ -7,17 +7,26 @@ Supports both bulk generation and single image processing
 
 import os
 import sys
+import hashlib
+from io import BytesIO
 from PIL import Image
 import asyncio
-from .database import db_manager
 
 # Thumbnail configuration
 THUMBNAIL_SIZE = (300, 300)  # Square thumbnails for consistent grid layout
 THUMBNAIL_QUALITY = 85
 THUMBNAIL_DIR = "../frontend/public/assets/images/Marketplace/thumbnails"
+PROOF_DIR = "../frontend/public/assets/images/Marketplace/proofs"
+PROOF_WIDTH = 1200
 
 # Supported image formats
 SUPPORTED_FORMATS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
+# Pillow format names for uploads decoded from memory
+SUPPORTED_IMAGE_TYPES = {'JPEG', 'PNG', 'GIF', 'BMP', 'WEBP', 'MPO'}
+# Largest upload we will decode (about a 10ft x 4ft banner at 200 DPI)
+MAX_UPLOAD_PIXELS = 200_000_000
+# Decode/box-reduce to at least this multiple of the thumbnail size before the LANCZOS pass
+REDUCING_GAP = 2
 
 def create_thumbnail_directories():
     """Create thumbnail directories if they don't exist"""
@@ -43,35 +52,56 @@ def validate_image_file(image_path: str) -> tuple[bool, str]:
     except Exception as e:
         return False, f"Invalid image file: {e}"
 
+def draft_for_thumbnail(img: Image.Image) -> None:
+    """Have JPEGs decode at the smallest DCT scale (1/2, 1/4, 1/8) that still covers the thumbnail"""
+    img.draft('RGB', (THUMBNAIL_SIZE[0] * REDUCING_GAP, THUMBNAIL_SIZE[1] * REDUCING_GAP))
+
+def reduce_for_thumbnail(img: Image.Image) -> Image.Image:
+    """Cheap integer box reduction to near REDUCING_GAP x the thumbnail size"""
+    factor = min(img.width // (THUMBNAIL_SIZE[0] * REDUCING_GAP), img.height // (THUMBNAIL_SIZE[1] * REDUCING_GAP))
+    if factor < 2:
+        return img
+    if img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'CMYK'):
+        img = img.convert('RGBA')
+    return img.reduce(factor)
+
+def square_thumbnail(img: Image.Image) -> Image.Image:
+    """Flatten onto white, shrink to fit THUMBNAIL_SIZE and center on a square canvas"""
+    # Shrink first so mode conversion works on a small image
+    img = reduce_for_thumbnail(img)
+    
+    # Convert to RGB if necessary (handles PNG with transparency)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        # Create a white background
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1])
+        img = background
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+    
+    # Calculate thumbnail size maintaining aspect ratio
+    img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    
+    # Create a square thumbnail with white background
+    thumbnail = Image.new('RGB', THUMBNAIL_SIZE, (255, 255, 255))
+    
+    # Calculate position to center the image
+    x = (THUMBNAIL_SIZE[0] - img.size[0]) // 2
+    y = (THUMBNAIL_SIZE[1] - img.size[1]) // 2
+    thumbnail.paste(img, (x, y))
+    return thumbnail
+
 def generate_thumbnail(image_path: str, thumbnail_path: str) -> bool:
     """Generate a thumbnail for an image"""
     try:
-        # Increase PIL's image size limit to handle large images
-        Image.MAX_IMAGE_PIXELS = None
-        
         # Open the original image
         with Image.open(image_path) as img:
-            # Convert to RGB if necessary (handles PNG with transparency)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # Create a white background
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Calculate thumbnail size maintaining aspect ratio
-            img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
-            
-            # Create a square thumbnail with white background
-            thumbnail = Image.new('RGB', THUMBNAIL_SIZE, (255, 255, 255))
-            
-            # Calculate position to center the image
-            x = (THUMBNAIL_SIZE[0] - img.size[0]) // 2
-            y = (THUMBNAIL_SIZE[1] - img.size[1]) // 2
-            thumbnail.paste(img, (x, y))
+            if img.width * img.height > MAX_UPLOAD_PIXELS:
+                raise ValueError(f"Image too large: {img.width}x{img.height}")
+            draft_for_thumbnail(img)
+            thumbnail = square_thumbnail(img)
             
             # Save the thumbnail
             thumbnail.save(thumbnail_path, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
@@ -81,6 +111,95 @@ def generate_thumbnail(image_path: str, thumbnail_path: str) -> bool:
         print(f"❌ Error generating thumbnail for {image_path}: {e}")
         return False
 
+def decode_image_bytes(data: bytes, filename: str) -> Image.Image:
+    """
+    Decode an uploaded image from memory, exactly once.
+    JPEGs are decoded at the smallest DCT scale that still covers the thumbnail,
+    and a successful load() doubles as validation (truncated or corrupt data
+    raises). Raises ValueError with a user-facing message.
+    """
+    _, ext = os.path.splitext((filename or '').lower())
+    if ext not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported format: {ext or 'none'}. Supported formats: {', '.join(SUPPORTED_FORMATS)}")
+    try:
+        img = Image.open(BytesIO(data))
+    except Exception as e:
+        raise ValueError(f"Invalid image file: {e}")
+    if img.format not in SUPPORTED_IMAGE_TYPES:
+        raise ValueError(f"Unsupported image type: {img.format}")
+    if img.width * img.height > MAX_UPLOAD_PIXELS:
+        raise ValueError(f"Image too large: {img.width}x{img.height}")
+    try:
+        draft_for_thumbnail(img)
+        img.load()
+    except Exception as e:
+        raise ValueError(f"Invalid image file: {e}")
+    return img
+
+def validate_image_bytes(data: bytes, filename: str) -> tuple[bool, str]:
+    """validate_image_file for an upload held in memory"""
+    try:
+        decode_image_bytes(data, filename)
+        return True, "Valid image file"
+    except ValueError as e:
+        return False, str(e)
+
+def thumbnail_filename_for(data: bytes, filename: str) -> str:
+    """Web-safe thumbnail name; the content hash keeps same-named uploads apart"""
+    name, _ = os.path.splitext(os.path.basename(filename or 'upload'))
+    name = name.replace(' ', '_').replace('(', '').replace(')', '').replace('-', '_')
+    return f"{hashlib.sha256(data).hexdigest()[:12]}_{name}_thumb.jpg"
+
+def process_image_bytes(data: bytes, filename: str, output_dir: str = None) -> dict:
+    """
+    process_single_image for an upload held in memory: decode once, validate and
+    thumbnail from that image, write only the thumbnail. Blocking - call it from
+    a worker thread.
+    """
+    result = {
+        'success': False,
+        'original_path': None,
+        'thumbnail_path': None,
+        'thumbnail_url': None,
+        'error': None,
+        'file_size': len(data),
+        'thumbnail_size': 0,
+        'valid': False
+    }
+    
+    try:
+        img = decode_image_bytes(data, filename)
+    except ValueError as e:
+        result['error'] = str(e)
+        return result
+    result['valid'] = True
+    
+    try:
+        if output_dir is None:
+            output_dir = THUMBNAIL_DIR
+        os.makedirs(output_dir, exist_ok=True)
+        
+        buffer = BytesIO()
+        square_thumbnail(img).save(buffer, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+        thumbnail_filename = thumbnail_filename_for(data, filename)
+        thumbnail_path = os.path.join(output_dir, thumbnail_filename)
+        with open(thumbnail_path, 'wb') as f:
+            f.write(buffer.getvalue())
+        
+        result['success'] = True
+        result['thumbnail_path'] = thumbnail_path
+        result['thumbnail_size'] = buffer.tell()
+        if output_dir == THUMBNAIL_DIR:
+            result['thumbnail_url'] = f"/assets/images/Marketplace/thumbnails/{thumbnail_filename}"
+        else:
+            result['thumbnail_url'] = f"/assets/images/{os.path.basename(output_dir)}/{thumbnail_filename}"
+    except Exception as e:
+        result['error'] = f"Unexpected error: {e}"
+    finally:
+        img.close()
+    
+    return result
+
 def process_single_image(image_path: str, output_dir: str = None) -> dict:
     """
     Process a single image and generate its thumbnail
@@ -142,8 +261,59 @@ def process_single_image(image_path: str, output_dir: str = None) -> dict:
     
     return result
 
+def template_image_path(template: dict) -> str:
+    """Local path of a template's source image (from canvas_data.template_file), or ''"""
+    canvas_data = template.get('canvas_data', {})
+    
+    # Extract image path from canvas_data
+    if isinstance(canvas_data, dict):
+        image_path = canvas_data.get('template_file', '')
+    else:
+        # Handle case where canvas_data might be a string
+        try:
+            import json
+            canvas_data_dict = json.loads(canvas_data) if isinstance(canvas_data, str) else canvas_data
+            image_path = canvas_data_dict.get('template_file', '')
+        except:
+            image_path = ''
+    
+    if not image_path:
+        return ''
+    
+    # Convert relative path to absolute path
+    if image_path.startswith('/assets/'):
+        return f"../frontend/public{image_path}"
+    elif not image_path.startswith('/'):
+        return f"../frontend/public/assets/images/Marketplace/{image_path}"
+    return image_path
+
+def render_template_proof(template: dict) -> str:
+    """
+    Render a template without a source image from its canvas elements.
+    Returns the proof's path, or '' when there is nothing to render. The file is
+    only rewritten when the render changes, so unchanged proofs stay skipped.
+    """
+    from .canvas_renderer import canvas_elements, render_proof_png
+    from .design_session import parse_canvas_data
+    
+    canvas_data = parse_canvas_data(template.get('canvas_data'))
+    if not canvas_elements(canvas_data):
+        return ''
+    content = render_proof_png(canvas_data, max_width=PROOF_WIDTH)
+    os.makedirs(PROOF_DIR, exist_ok=True)
+    proof_path = os.path.join(PROOF_DIR, f"{template['id']}.png")
+    if not os.path.exists(proof_path) or _read_bytes(proof_path) != content:
+        with open(proof_path, 'wb') as f:
+            f.write(content)
+    return proof_path
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
 async def get_marketplace_templates():
     """Get all marketplace templates from database"""
+    from .database import db_manager
     try:
         templates = await db_manager.get_marketplace_templates({'is_approved': True, 'is_active': True}, limit=100)
         return templates
@@ -153,6 +323,7 @@ async def get_marketplace_templates():
 
 async def update_template_thumbnail(template_id: str, thumbnail_url: str) -> bool:
     """Update template with thumbnail URL"""
+    from .database import db_manager
     try:
         # Update the preview_image_url in the database
         response = db_manager.supabase.table("creator_templates").update({
@@ -183,73 +354,70 @@ async def main():
     print(f"📊 Found {len(templates)} templates to process")
     print("=" * 60)
     
-    successful_thumbnails = 0
+    from .thumbnail_batch import ThumbnailJob, run_batch, thumbnail_name
+    
     failed_thumbnails = 0
     updated_database = 0
+    jobs = []
+    templates_by_source = {}
     
-    # Process each template
-    for i, template in enumerate(templates, 1):
+    # Resolve each template's source image
+    for template in templates:
         template_name = template['name']
-        canvas_data = template.get('canvas_data', {})
-        
-        # Extract image path from canvas_data
-        if isinstance(canvas_data, dict):
-            image_path = canvas_data.get('template_file', '')
-        else:
-            # Handle case where canvas_data might be a string
+        image_path = template_image_path(template)
+        if not image_path:
+            # Editor-built templates have elements instead of an uploaded file
             try:
-                import json
-                canvas_data_dict = json.loads(canvas_data) if isinstance(canvas_data, str) else canvas_data
-                image_path = canvas_data_dict.get('template_file', '')
-            except:
-                image_path = ''
+                image_path = render_template_proof(template)
+            except ValueError as e:
+                print(f"⚠️  Could not render template {template_name}: {e}")
         
         if not image_path:
             print(f"⚠️  No image path found for template: {template_name}")
             failed_thumbnails += 1
             continue
         
-        # Convert relative path to absolute path
-        if image_path.startswith('/assets/'):
-            image_path = f"../frontend/public{image_path}"
-        elif not image_path.startswith('/'):
-            image_path = f"../frontend/public/assets/images/Marketplace/{image_path}"
-        
         # Check if original image exists
         if not os.path.exists(image_path):
             print(f"⚠️  Original image not found: {image_path}")
             failed_thumbnails += 1
             continue
         
-        # Generate thumbnail filename
-        original_filename = os.path.basename(image_path)
-        name, ext = os.path.splitext(original_filename)
-        # Clean filename for Windows compatibility
-        name = name.replace(' ', '_').replace('(', '').replace(')', '').replace('-', '_')
-        thumbnail_filename = f"{name}_thumb.jpg"
-        thumbnail_path = os.path.join(THUMBNAIL_DIR, thumbnail_filename)
-        
-        # Generate thumbnail
-        print(f"[{i:2d}/{len(templates)}] Processing: {template_name}")
-        
-        if generate_thumbnail(image_path, thumbnail_path):
-            print(f"    ✅ Generated thumbnail: {thumbnail_filename}")
-            successful_thumbnails += 1
-            
-            # Update database with thumbnail URL
-            thumbnail_url = f"/assets/images/Marketplace/thumbnails/{thumbnail_filename}"
+        if image_path not in templates_by_source:
+            jobs.append(ThumbnailJob(image_path, os.path.join(THUMBNAIL_DIR, thumbnail_name(image_path))))
+        templates_by_source.setdefault(image_path, []).append(template)
+    
+    def report(done, total, result):
+        names = ", ".join(t['name'] for t in templates_by_source[result['source_path']])
+        if result.get('skipped'):
+            status = "⏭️  up to date"
+        elif result['success']:
+            status = f"✅ generated in {result['seconds']:.2f}s"
+        else:
+            status = f"❌ {result['error']}"
+        print(f"[{done:2d}/{total}] {names}: {status}")
+    
+    # Thumbnail across all cores; unchanged sources are skipped via the manifest
+    summary = run_batch(jobs, THUMBNAIL_DIR, progress=report)
+    successful_thumbnails = summary['success'] + summary['skipped']
+    failed_thumbnails += summary['failed']
+    
+    # Point templates at their thumbnails where they don't already
+    for result in summary['results']:
+        if not result['success']:
+            continue
+        thumbnail_url = f"/assets/images/Marketplace/thumbnails/{os.path.basename(result['thumbnail_path'])}"
+        for template in templates_by_source[result['source_path']]:
+            if template.get('preview_image_url') == thumbnail_url:
+                continue
             if await update_template_thumbnail(template['id'], thumbnail_url):
-                print(f"    ✅ Updated database with thumbnail URL")
                 updated_database += 1
             else:
-                print(f"    ⚠️  Failed to update database")
-        else:
-            print(f"    ❌ Failed to generate thumbnail")
-            failed_thumbnails += 1
+                print(f"    ⚠️  Failed to update database for {template['name']}")
     
     print("\n" + "=" * 60)
     print("📊 Thumbnail Generation Summary:")
-    print(f"✅ Successfully generated: {successful_thumbnails} thumbnails")
+    print(f"✅ Thumbnails ready: {successful_thumbnails} ({summary['skipped']} already up to date)")
     print(f"❌ Failed generations: {failed_thumbnails} thumbnails")
     print(f"🗄️  Database updates: {updated_database} templates")
     print(f"📁 Thumbnail directory: {THUMBNAIL_DIR}")
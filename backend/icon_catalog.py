@@ -0,0 +1,188 @@
+"""
+Icon Catalog
+The editor's icon library, indexed once at import: icons by category, a
+normalized-name map for exact lookups, and a trigram index for fuzzy matches.
+find("fb logo") and find("stethoscope") resolve with a dict lookup or a scan
+of the few icons sharing a trigram with the query, never the whole library.
+"""
+
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+ICON_LIBRARY: List[Dict[str, str]] = [
+    # Medical & Healthcare
+    {"name": "Doctor", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Doctor.svg"},
+    {"name": "Nurse", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Nurse.svg"},
+    {"name": "Hospital Building", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Hospital.svg"},
+    {"name": "Medical Kit", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Medical Kit.svg"},
+    {"name": "Stethoscope", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Phonendoscope.svg"},
+    {"name": "Thermometer", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Thermometer.svg"},
+    {"name": "Syringe", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Syringe.svg"},
+    {"name": "Pills", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Medicine.svg"},
+    {"name": "Capsule", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Capsule.svg"},
+    {"name": "Microscope", "category": "medical", "imagePath": "/assets/images/medical assets/DrawKit Vector Medical Health Icons/DrawKit Medical - Color/SVG/Microscope.svg"},
+    
+    # Social Media
+    {"name": "X (Twitter)", "category": "social", "imagePath": "/assets/images/social icons/X.png"},
+    {"name": "Twitter", "category": "social", "imagePath": "/assets/images/social icons/Twitter.png"},
+    {"name": "Meta (Facebook)", "category": "social", "imagePath": "/assets/images/social icons/Facebook.png"},
+    {"name": "LinkedIn", "category": "social", "imagePath": "/assets/images/social icons/LinkedIn.png"},
+    {"name": "Reddit", "category": "social", "imagePath": "/assets/images/social icons/Reddit.png"},
+    {"name": "Pinterest", "category": "social", "imagePath": "/assets/images/social icons/Pinterest.png"},
+    {"name": "Instagram", "category": "social", "imagePath": "/assets/images/social icons/Instagram.png"},
+    {"name": "Snapchat", "category": "social", "imagePath": "/assets/images/social icons/Snapchat.png"},
+    {"name": "Telegram", "category": "social", "imagePath": "/assets/images/social icons/Telegram.png"},
+    {"name": "WhatsApp", "category": "social", "imagePath": "/assets/images/social icons/Whatsapp.png"},
+    {"name": "Twitch", "category": "social", "imagePath": "/assets/images/social icons/Twitch.png"},
+    {"name": "YouTube", "category": "social", "imagePath": "/assets/images/social icons/Youtube.png"},
+    {"name": "TikTok", "category": "social", "imagePath": "/assets/images/social icons/Tiktok.png"},
+    {"name": "Discord", "category": "social", "imagePath": "/assets/images/social icons/Discord.png"},
+    {"name": "Slack", "category": "social", "imagePath": "/assets/images/social icons/Slack.png"},
+    {"name": "Zoom", "category": "social", "imagePath": "/assets/images/social icons/Zoom.png"},
+    
+    # Technology & Business
+    {"name": "Technology", "category": "technology", "imagePath": "/assets/images/icons/Technology.svg"},
+    {"name": "Data Analytics", "category": "technology", "imagePath": "/assets/images/icons/Data Analytic.svg"},
+    {"name": "User Experience", "category": "technology", "imagePath": "/assets/images/icons/User Experience.svg"},
+    {"name": "Passive Income", "category": "technology", "imagePath": "/assets/images/icons/Passive Income.svg"},
+    {"name": "Valuations", "category": "technology", "imagePath": "/assets/images/icons/Valuations.svg"},
+    {"name": "Blue Print", "category": "technology", "imagePath": "/assets/images/icons/Blue Print.svg"},
+    {"name": "Anti Virus", "category": "technology", "imagePath": "/assets/images/icons/Anti Virus.svg"},
+    {"name": "Manager", "category": "technology", "imagePath": "/assets/images/icons/Manager.svg"},
+    {"name": "Digital Agreement", "category": "technology", "imagePath": "/assets/images/icons/Digital Agreement.svg"},
+    {"name": "Growth", "category": "technology", "imagePath": "/assets/images/icons/Growth.svg"},
+    {"name": "Sync Data", "category": "technology", "imagePath": "/assets/images/icons/Sync Data.svg"},
+    {"name": "Project Management", "category": "technology", "imagePath": "/assets/images/icons/Project Management.svg"},
+    {"name": "Startup", "category": "technology", "imagePath": "/assets/images/icons/Startup.svg"},
+    {"name": "Development", "category": "technology", "imagePath": "/assets/images/icons/Development.svg"},
+    {"name": "Digital Marketing", "category": "technology", "imagePath": "/assets/images/icons/Digital Marketing.svg"},
+    {"name": "User Security", "category": "technology", "imagePath": "/assets/images/icons/User Security.svg"},
+    {"name": "Affiliate", "category": "technology", "imagePath": "/assets/images/icons/Affiliate.svg"},
+    {"name": "Registration", "category": "technology", "imagePath": "/assets/images/icons/Registration.svg"},
+    {"name": "Budget", "category": "technology", "imagePath": "/assets/images/icons/Budget.svg"},
+    {"name": "SEO", "category": "technology", "imagePath": "/assets/images/icons/SEO.svg"},
+    {"name": "Teamwork", "category": "technology", "imagePath": "/assets/images/icons/Teamwork.svg"},
+    
+    # Food & Dining
+    {"name": "Lollipop", "category": "food", "imagePath": "/assets/images/food/Lollipop.svg"},
+    {"name": "Tart", "category": "food", "imagePath": "/assets/images/food/Tart.svg"},
+    {"name": "Pancake", "category": "food", "imagePath": "/assets/images/food/Pancake.svg"},
+    {"name": "Ramen", "category": "food", "imagePath": "/assets/images/food/Ramen.svg"},
+    {"name": "Dimsum", "category": "food", "imagePath": "/assets/images/food/Dimsum.svg"},
+    {"name": "Cheese", "category": "food", "imagePath": "/assets/images/food/Cheese.svg"},
+    {"name": "Baguette", "category": "food", "imagePath": "/assets/images/food/Baguette.svg"},
+    {"name": "Sausage", "category": "food", "imagePath": "/assets/images/food/Sausage.svg"},
+    {"name": "Muffin", "category": "food", "imagePath": "/assets/images/food/Muffin.svg"},
+    {"name": "Sushi", "category": "food", "imagePath": "/assets/images/food/Sushi.svg"},
+    {"name": "Fries", "category": "food", "imagePath": "/assets/images/food/Fries.svg"},
+    {"name": "Banana", "category": "food", "imagePath": "/assets/images/food/Banana.svg"},
+    {"name": "Pizza", "category": "food", "imagePath": "/assets/images/food/Pizza.svg"},
+    {"name": "Boba", "category": "food", "imagePath": "/assets/images/food/Boba.svg"}
+]
+
+# Query words that say nothing about which icon is meant
+STOPWORDS = {"a", "an", "the", "icon", "icons", "logo", "logos", "symbol", "image", "of", "for"}
+# Common shorthand -> words that appear in icon names
+SYNONYMS = {
+    "fb": "facebook", "ig": "instagram", "insta": "instagram", "yt": "youtube", "tw": "twitter",
+    "li": "linkedin", "wa": "whatsapp", "doc": "doctor", "medicine": "pills", "seo": "seo",
+    "analytics": "data analytics", "security": "user security", "ux": "user experience",
+}
+# Minimum trigram similarity for a fuzzy match to count
+MIN_SCORE = 0.4
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase words with punctuation removed, stopwords dropped and synonyms expanded"""
+    words = []
+    for word in _NON_WORD.sub(" ", (text or "").lower()).split():
+        if word in STOPWORDS:
+            continue
+        words.extend(SYNONYMS.get(word, word).split())
+    return " ".join(words)
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IconCatalog:
+    """Read-only icon library with category, exact-name and trigram indexes"""
+
+    def __init__(self, icons: List[Dict[str, str]]):
+        self.icons = icons
+        self._by_category: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+        self._by_name: Dict[str, Dict[str, str]] = {}
+        # Searchable keys per icon: its name plus the asset file name ("Phonendoscope")
+        self._keys: List[List[Tuple[str, Set[str]]]] = []
+        self._trigram_index: Dict[str, Set[int]] = defaultdict(set)
+
+        for position, icon in enumerate(icons):
+            self._by_category[icon["category"]].append(icon)
+            file_stem = os.path.splitext(os.path.basename(icon.get("imagePath", "")))[0]
+            keys = []
+            for key in dict.fromkeys(filter(None, (normalize(icon["name"]), normalize(file_stem)))):
+                self._by_name.setdefault(key, icon)
+                grams = trigrams(key)
+                keys.append((key, grams))
+                for gram in grams:
+                    self._trigram_index[gram].add(position)
+            # "Meta (Facebook)" is also reachable as just "facebook"
+            for word in normalize(icon["name"]).split():
+                self._by_name.setdefault(word, icon)
+            self._keys.append(keys)
+
+    def categories(self) -> Dict[str, List[Dict[str, str]]]:
+        return dict(self._by_category)
+
+    def by_category(self, category: str) -> List[Dict[str, str]]:
+        return list(self._by_category.get(category, ()))
+
+    def search(self, query: str, category: Optional[str] = None, limit: int = 10) -> List[Tuple[Dict[str, str], float]]:
+        """Icons ranked by similarity to query (1.0 for an exact normalized name)"""
+        key = normalize(query)
+        if not key:
+            return []
+        query_grams = trigrams(key)
+        query_words = key.split()
+        candidates: Dict[int, int] = defaultdict(int)
+        for gram in query_grams:
+            for position in self._trigram_index.get(gram, ()):
+                candidates[position] += 1
+
+        scored = []
+        for position in candidates:
+            icon = self.icons[position]
+            if category and icon["category"] != category:
+                continue
+            best = 0.0
+            for name, grams in self._keys[position]:
+                if name == key:
+                    best = 1.0
+                    break
+                # Dice coefficient over trigrams, nudged up when a query word prefixes a name word
+                score = 2 * len(query_grams & grams) / (len(query_grams) + len(grams))
+                name_words = name.split()
+                if any(nw.startswith(qw) for qw in query_words for nw in name_words):
+                    score = min(score + 0.2, 0.99)
+                best = max(best, score)
+            if best >= MIN_SCORE:
+                scored.append((icon, round(best, 3)))
+        scored.sort(key=lambda item: (-item[1], item[0]["name"]))
+        return scored[:limit]
+
+    def find(self, name: str, category: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """Best match for an icon name: exact normalized hit first, then fuzzy"""
+        icon = self._by_name.get(normalize(name))
+        if icon is not None and (not category or icon["category"] == category):
+            return icon
+        matches = self.search(name, category=category, limit=1)
+        return matches[0][0] if matches else None
+
+
+icon_catalog = IconCatalog(ICON_LIBRARY)
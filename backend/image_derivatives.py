@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+BuyPrintz Responsive Image Derivatives
+Builds several widths of each marketplace template image in WebP (and AVIF
+when Pillow has an AVIF encoder), plus a tiny blurred placeholder. The
+manifest describing them is stored on the template (creator_templates.
+image_derivatives) and written next to the files, so listings can ask for the
+width they display instead of the full-size original.
+
+Run as a script to (re)build derivatives for every approved template; sources
+whose content hash matches the stored manifest are skipped.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageFilter, features
+
+from .generate_thumbnails import get_marketplace_templates, template_image_path
+from .thumbnail_batch import file_sha256
+
+DERIVATIVE_WIDTHS = (160, 320, 640, 1280)
+DERIVATIVE_DIR = "../frontend/public/assets/images/Marketplace/derivatives"
+DERIVATIVE_URL = "/assets/images/Marketplace/derivatives"
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+PLACEHOLDER_WIDTH = 16
+MANIFEST_VERSION = 1
+
+
+def available_formats() -> Tuple[str, ...]:
+    """Modern formats first; AVIF only when this Pillow build can encode it"""
+    return ("avif", "webp") if features.check("avif") else ("webp",)
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """RGB or RGBA; transparency is kept (both formats support alpha)"""
+    if img.mode in ("RGB", "RGBA"):
+        return img
+    has_alpha = img.mode in ("LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+    return img.convert("RGBA" if has_alpha else "RGB")
+
+
+def _encode(img: Image.Image, fmt: str) -> bytes:
+    buffer = BytesIO()
+    if fmt == "avif":
+        img.save(buffer, "AVIF", quality=AVIF_QUALITY, speed=6)
+    else:
+        img.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def placeholder_data_url(img: Image.Image) -> str:
+    """A ~16px blurred WebP, inlined so cards paint something before the real image"""
+    height = max(1, round(img.height * PLACEHOLDER_WIDTH / img.width))
+    small = img.resize((PLACEHOLDER_WIDTH, height), Image.Resampling.BOX).filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    small.save(buffer, "WEBP", quality=30)
+    return f"data:image/webp;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+
+def build_derivatives(source_path: str, output_dir: str, url_prefix: str,
+                      widths: Tuple[int, ...] = DERIVATIVE_WIDTHS) -> Dict[str, Any]:
+    """
+    Write every width/format of one image into output_dir and return its manifest.
+    Widths larger than the original are skipped (never upscale). Blocking; meant
+    for a worker process.
+    """
+    with open(source_path, "rb") as f:
+        data = f.read()
+    img = Image.open(BytesIO(data))
+    original_size = img.size
+    widths = sorted({w for w in widths if w <= original_size[0]} or {original_size[0]}, reverse=True)
+    # JPEG: decode at the smallest DCT scale still >= the largest derivative
+    img.draft("RGB", (widths[0], max(1, round(original_size[1] * widths[0] / original_size[0]))))
+    img = _flatten(img)
+    img.load()
+
+    os.makedirs(output_dir, exist_ok=True)
+    formats = available_formats()
+    variants = []
+    current = img
+    # Largest first so each step resizes from the previous, smaller, image
+    for width in widths:
+        height = max(1, round(original_size[1] * width / original_size[0]))
+        if current.size != (width, height):
+            current = current.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        for fmt in formats:
+            encoded = _encode(current, fmt)
+            filename = f"{width}.{fmt}"
+            with open(os.path.join(output_dir, filename), "wb") as f:
+                f.write(encoded)
+            variants.append({"width": width, "height": height, "format": fmt,
+                             "url": f"{url_prefix}/{filename}", "bytes": len(encoded)})
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "width": original_size[0],
+        "height": original_size[1],
+        "placeholder": placeholder_data_url(current),
+        "formats": list(formats),
+        "variants": sorted(variants, key=lambda v: (v["format"], v["width"]))
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def choose_variant(manifest: Dict[str, Any], width: int, fmt: str = "webp") -> Optional[Dict[str, Any]]:
+    """Smallest variant at least `width` wide in fmt, else the largest there is"""
+    variants = [v for v in manifest.get("variants", []) if v["format"] == fmt]
+    if not variants:
+        return None
+    wide_enough = [v for v in variants if v["width"] >= width]
+    return min(wide_enough, key=lambda v: v["width"]) if wide_enough else max(variants, key=lambda v: v["width"])
+
+
+def srcset(manifest: Dict[str, Any], fmt: str) -> str:
+    return ", ".join(f"{v['url']} {v['width']}w" for v in manifest.get("variants", []) if v["format"] == fmt)
+
+
+def responsive_image(manifest: Optional[Dict[str, Any]], width: int) -> Optional[Dict[str, Any]]:
+    """What a listing needs to render one image at `width` CSS pixels"""
+    if not manifest or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    chosen = choose_variant(manifest, width)
+    if chosen is None:
+        return None
+    return {
+        "src": chosen["url"],
+        "width": chosen["width"],
+        "height": chosen["height"],
+        "srcset": {fmt: srcset(manifest, fmt) for fmt in manifest.get("formats", [])},
+        "placeholder": manifest.get("placeholder")
+    }
+
+
+def _build_for_template(template_id: str, source_path: str) -> Tuple[str, Dict[str, Any]]:
+    output_dir = os.path.join(DERIVATIVE_DIR, template_id)
+    return template_id, build_derivatives(source_path, output_dir, f"{DERIVATIVE_URL}/{template_id}")
+
+
+async def update_template_derivatives(template_id: str, manifest: Dict[str, Any]) -> bool:
+    """Store the derivative manifest on the template"""
+    from .database import db_manager
+    try:
+        response = db_manager.supabase.table("creator_templates").update({
+            "image_derivatives": manifest
+        }).eq("id", template_id).execute()
+        return response.data is not None
+    except Exception as e:
+        print(f"❌ Error updating template {template_id}: {e}")
+        return False
+
+
+async def main(force: bool = False) -> None:
+    print("🖼️  Building responsive image derivatives")
+    print(f"📐 Widths: {', '.join(map(str, DERIVATIVE_WIDTHS))}  Formats: {', '.join(available_formats())}")
+    print("=" * 60)
+
+    templates = await get_marketplace_templates()
+    jobs: List[Tuple[str, str]] = []
+    skipped = 0
+    for template in templates:
+        source_path = template_image_path(template)
+        if not source_path or not os.path.exists(source_path):
+            print(f"⚠️  No source image for template: {template['name']}")
+            continue
+        existing = template.get("image_derivatives") or {}
+        if not force and existing.get("version") == MANIFEST_VERSION and existing.get("sha256") == file_sha256(source_path):
+            skipped += 1
+            continue
+        jobs.append((template["id"], source_path))
+
+    built = failed = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(jobs))) as pool:
+            futures = [pool.submit(_build_for_template, template_id, source) for template_id, source in jobs]
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    template_id, manifest = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"[{done:2d}/{len(jobs)}] ❌ {e}")
+                    continue
+                if await update_template_derivatives(template_id, manifest):
+                    built += 1
+                    total = sum(v["bytes"] for v in manifest["variants"])
+                    print(f"[{done:2d}/{len(jobs)}] ✅ {template_id}: {len(manifest['variants'])} files, {total // 1024} KB")
+                else:
+                    failed += 1
+
+    print("=" * 60)
+    print(f"✅ Built: {built}  ⏭️  Up to date: {skipped}  ❌ Failed: {failed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(force="--force" in sys.argv))
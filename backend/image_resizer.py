@@ -0,0 +1,275 @@
+"""
+Image Resizer
+On-demand resized derivatives of uploads and marketplace assets, served by
+GET /api/images/{asset}?w=&fmt=. The first request for a derivative renders
+it in a worker thread with the thumbnail pipeline's Pillow code; the result is
+kept in a size-bounded LRU cache on disk and every later request is a file
+read. Concurrent first requests for the same derivative share one render.
+
+Widths are snapped up to a fixed ladder so arbitrary ?w= values cannot fill
+the cache, and the cache key includes the source's mtime and size, so an
+edited source gets a new derivative instead of a stale one. Only
+content-addressed uploads (uploads/<sha256>.<ext>) can be cached by browsers
+forever; other assets keep their URL when edited, so clients revalidate them
+against the ETag (the cache key).
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from PIL import Image, features
+
+from .artwork_storage import UPLOAD_DIR
+from .generate_thumbnails import MAX_UPLOAD_PIXELS
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "cache/images")
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Asset prefix -> directory it is served from
+ASSET_ROOTS = {
+    "uploads": UPLOAD_DIR,
+    "marketplace": "../frontend/public/assets/images/Marketplace",
+}
+# uploads/<sha256>.<ext> never changes content, so its derivatives never change either
+CONTENT_ADDRESSED_ASSET = re.compile(r"^uploads/[0-9a-f]{64}\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+WIDTHS = (64, 128, 160, 240, 320, 480, 640, 800, 960, 1280, 1600, 1920, 2560)
+FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+if features.check("avif"):
+    FORMATS["avif"] = "image/avif"
+SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"}
+QUALITY = {"webp": 80, "jpeg": 85, "avif": 55}
+RENDER_VERSION = "1"
+
+image_cache_requests_total = registry.counter(
+    "buyprintz_image_cache_requests_total", "Resized image cache lookups", ("result",))
+image_render_seconds = registry.histogram(
+    "buyprintz_image_render_seconds", "Resized image render time in the worker thread", ("format",))
+image_cache_bytes = registry.gauge(
+    "buyprintz_image_cache_bytes", "Bytes held in the resized image disk cache")
+
+
+class ImageNotFound(LookupError):
+    """The asset does not exist or is outside the served directories"""
+
+
+def snap_width(width: int) -> int:
+    """Smallest ladder width >= width (the largest for anything bigger)"""
+    if width < 1:
+        raise ValueError("w must be positive")
+    for candidate in WIDTHS:
+        if candidate >= width:
+            return candidate
+    return WIDTHS[-1]
+
+
+def cache_control(asset: str) -> str:
+    """Cache-Control for a derivative of asset: immutable only when the asset URL is content-addressed"""
+    return IMMUTABLE_CACHE_CONTROL if CONTENT_ADDRESSED_ASSET.match(asset) else REVALIDATE_CACHE_CONTROL
+
+
+def resolve_asset(asset: str) -> str:
+    """'uploads/<file>' or 'marketplace/<path>' -> absolute source path"""
+    prefix, _, rest = asset.partition("/")
+    root = ASSET_ROOTS.get(prefix)
+    if root is None or not rest:
+        raise ImageNotFound(asset)
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, rest))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise ImageNotFound(asset)
+    if os.path.splitext(path)[1].lower() not in SOURCE_EXTENSIONS:
+        raise ImageNotFound(asset)
+    return path
+
+
+class Derivative(NamedTuple):
+    source_path: str
+    width: int
+    fmt: str
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.fmt]
+
+    def key(self) -> str:
+        stat = os.stat(self.source_path)
+        raw = f"{RENDER_VERSION}|{self.source_path}|{stat.st_mtime_ns}|{stat.st_size}|{self.width}|{self.fmt}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:40]
+
+
+def render_derivative(derivative: Derivative) -> bytes:
+    """Resize to the requested width (never upscaling) and encode. Blocking."""
+    try:
+        img = Image.open(derivative.source_path)
+    except Image.DecompressionBombError as e:
+        raise ValueError(f"Image too large: {e}")
+    with img:
+        if img.width * img.height > MAX_UPLOAD_PIXELS:
+            raise ValueError(f"Image too large: {img.width}x{img.height}")
+        width = min(derivative.width, img.width)
+        height = max(1, round(img.height * width / img.width))
+        # JPEG sources decode at the smallest DCT scale that still covers the target
+        img.draft("RGB", (width, height))
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+        if img.size != (width, height):
+            img = img.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    if derivative.fmt == "jpeg" and img.mode == "RGBA":
+        # JPEG has no alpha: flatten onto white like the thumbnails do
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        img = background
+
+    buffer = BytesIO()
+    if derivative.fmt == "png":
+        img.save(buffer, "PNG", optimize=True)
+    elif derivative.fmt == "jpeg":
+        img.save(buffer, "JPEG", quality=QUALITY["jpeg"], optimize=True, progressive=True)
+    elif derivative.fmt == "avif":
+        img.save(buffer, "AVIF", quality=QUALITY["avif"], speed=6)
+    else:
+        img.save(buffer, "WEBP", quality=QUALITY["webp"], method=4)
+    return buffer.getvalue()
+
+
+class DiskLRUCache:
+    """Files under one directory, evicted least-recently-used once over max_bytes"""
+
+    def __init__(self, directory: str = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        # Rebuild recency from access times so the LRU order survives restarts
+        files = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_atime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.total_bytes += size
+        image_cache_bytes.set(self.total_bytes)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def get(self, name: str) -> Optional[bytes]:
+        """The cached content, or None. Read here rather than streamed later, since a
+        concurrent put() may evict the file as soon as the lock is released."""
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        try:
+            with open(self.path(name), "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            # Evicted (or deleted) since the check above
+            with self._lock:
+                if name in self._entries:
+                    self.total_bytes -= self._entries.pop(name)
+                    image_cache_bytes.set(self.total_bytes)
+            return None
+        try:
+            os.utime(self.path(name))
+        except OSError:
+            pass
+        return content
+
+    def put(self, name: str, content: bytes) -> str:
+        temp_path = f"{self.path(name)}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(content)
+        os.replace(temp_path, self.path(name))
+        with self._lock:
+            self.total_bytes += len(content) - self._entries.pop(name, 0)
+            self._entries[name] = len(content)
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted, size = self._entries.popitem(last=False)
+                self.total_bytes -= size
+                try:
+                    os.remove(self.path(evicted))
+                except OSError:
+                    pass
+            image_cache_bytes.set(self.total_bytes)
+        return self.path(name)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self.total_bytes, "max_bytes": self.max_bytes}
+
+
+class ImageResizer:
+    """Resolve, render-once and cache resized derivatives"""
+
+    def __init__(self, cache: Optional[DiskLRUCache] = None):
+        self._cache = cache
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def cache(self) -> DiskLRUCache:
+        # Created on first use so importing the app does not touch the disk
+        if self._cache is None:
+            self._cache = DiskLRUCache()
+        return self._cache
+
+    def describe(self, asset: str, width: int, fmt: str = "webp") -> Tuple[Derivative, str]:
+        """(derivative, etag) without rendering or reading it; raises ImageNotFound or ValueError"""
+        if fmt not in FORMATS:
+            raise ValueError(f"fmt must be one of {', '.join(FORMATS)}")
+        derivative = Derivative(resolve_asset(asset), snap_width(width), fmt)
+        return derivative, derivative.key()
+
+    async def get(self, asset: str, width: int, fmt: str = "webp") -> Tuple[bytes, Derivative, str]:
+        """(encoded derivative, derivative, etag); raises ImageNotFound or ValueError"""
+        derivative, key = self.describe(asset, width, fmt)
+        name = f"{key}.{fmt}"
+
+        content = await asyncio.to_thread(self.cache.get, name)
+        if content is not None:
+            image_cache_requests_total.inc(result="hit")
+            return content, derivative, key
+
+        pending = self._inflight.get(name)
+        if pending is not None:
+            image_cache_requests_total.inc(result="coalesced")
+            return await asyncio.shield(pending), derivative, key
+
+        image_cache_requests_total.inc(result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[name] = future
+        try:
+            with image_render_seconds.time(format=fmt):
+                content = await asyncio.to_thread(render_derivative, derivative)
+            await asyncio.to_thread(self.cache.put, name, content)
+            future.set_result(content)
+            return content, derivative, key
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(name, None)
+
+
+image_resizer = ImageResizer()
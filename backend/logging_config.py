@@ -0,0 +1,207 @@
+"""
+BuyPrintz Logging Configuration
+Structured, leveled logging for the API process. Records are handed to a
+background thread through a bounded queue, so request handlers never block on
+stdout. Every record carries the current request id, oversized messages are
+truncated, and levels can be tuned per module:
+
+    LOG_LEVEL=INFO
+    LOG_LEVELS=backend.database=DEBUG,backend.auth=WARNING
+    LOG_FORMAT=json
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from .metrics import registry
+
+# Load environment variables
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Noisy client libraries log every outbound request at INFO; keep them quiet by default
+LOG_LEVELS = os.getenv("LOG_LEVELS", "httpx=WARNING,httpcore=WARNING,hpack=WARNING")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "2000"))
+LOG_PAYLOAD_CHARS = int(os.getenv("LOG_PAYLOAD_CHARS", "500"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s"
+
+REQUEST_ID_HEADER = b"x-request-id"
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+log_records_dropped = registry.counter(
+    "buyprintz_log_records_dropped_total", "Log records dropped because the log queue was full")
+
+_listener: Optional[QueueListener] = None
+
+
+class Truncated:
+    """
+    Lazy, length-limited repr of a payload for log arguments.
+
+    Nothing is rendered unless the record is actually emitted, so
+    `logger.debug("Saving %s", truncate(record))` costs almost nothing when
+    DEBUG is off.
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: int = LOG_PAYLOAD_CHARS):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        text = self.value if isinstance(self.value, str) else repr(self.value)
+        if len(text) <= self.limit:
+            return text
+        return f"{text[:self.limit]}... [{len(text) - self.limit} more chars]"
+
+    __repr__ = __str__
+
+
+def truncate(value: Any, limit: int = LOG_PAYLOAD_CHARS) -> Truncated:
+    return Truncated(value, limit)
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that renders the message in the caller (args may be mutated
+    later) but leaves formatting and I/O to the listener thread. When the queue
+    is full the record is dropped and counted instead of blocking the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue, max_message_chars: int = LOG_MAX_MESSAGE_CHARS):
+        super().__init__(log_queue)
+        self.max_message_chars = max_message_chars
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if record.exc_info:
+            message = f"{message}\n{self._exception_formatter.formatException(record.exc_info)}"
+        if len(message) > self.max_message_chars:
+            message = f"{message[:self.max_message_chars]}... [truncated {len(message) - self.max_message_chars} chars]"
+        record = copy.copy(record)
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line for log aggregation"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage()
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """Parse 'module=LEVEL,module=LEVEL' into a dict, ignoring malformed entries"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: str = LOG_LEVEL, module_levels: str = LOG_LEVELS,
+                      log_format: str = LOG_FORMAT, stream=None) -> QueueListener:
+    """Install the queue-based handler on the root logger (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    # Replace handlers installed by earlier basicConfig() calls in imported modules
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    for name, module_level in parse_module_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+class RequestIdMiddleware:
+    """ASGI middleware that assigns each request an id, exposes it to logs and echoes it back"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == REQUEST_ID_HEADER:
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_PATTERN.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -1,23 +1,46 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 import stripe
+import asyncio
+import hashlib
 import os
 import json
-import uuid
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
-import aiofiles
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import time
 
-# Import our modules
+# Import our modules. Logging is configured first so the records backend modules
+# emit while importing reach the handler instead of being dropped.
+from backend.logging_config import RequestIdMiddleware, configure_logging
+configure_logging()
 from backend.database import db_manager
-from backend.auth import auth_manager, get_current_user
+from backend.auth import auth_manager, get_current_user, require_admin_token
 from backend.ai_agent_adapter import ai_agent_adapter
+from backend.admission_control import AdmissionControlMiddleware, admission_controller
+from backend.profiling import ProfilingMiddleware, profiling_available, router as profiling_router
+from backend.ai_usage import require_ai_budget, router as ai_usage_router
+from backend.icon_catalog import icon_catalog
+from backend.design_ops import DesignOperationError, apply_operations, design_version
+from backend.design_session import DesignSession
+from backend.qr_service import QRSpec, qr_service
+from backend.image_resizer import ImageNotFound, cache_control as image_cache_control, image_resizer
+from backend.artwork_storage import ARTWORK_TYPES, UPLOAD_DIR, UploadTooLarge, artwork_url, find_artwork, store_upload
+from backend.resumable_uploads import router as resumable_uploads_router
+from backend.canvas_renderer import render_proof_png, renderer_stats
+from backend.print_export import order_print_jobs, router as print_export_router, tin_print_jobs
+from backend.artwork_preflight import evaluate_artwork, parse_print_size, preflight_jobs, preflight_service
+from backend.order_pipeline import order_pipeline, router as order_pipeline_router
+from backend.metrics import (
+    CONTENT_TYPE_LATEST,
+    MetricsMiddleware,
+    http_request_duration_seconds,
+    registry as metrics_registry,
+)
 
 # Import creator marketplace routes
 try:
@@ -93,8 +116,7 @@ cache = SimpleCache()
 # Load environment variables
 load_dotenv()
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging (handlers are installed by configure_logging above)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -140,6 +162,20 @@ app = FastAPI(
     ]
 )
 
+@app.on_event("startup")
+async def startup_event():
+    """Make sure the queue-based log handler is installed (a no-op after the import-time call)"""
+    configure_logging()
+
+# Opt-in request profiling (innermost, so profiles cover only the application itself).
+# Only installed when enabled so normal requests never pass through it.
+if profiling_available():
+    app.add_middleware(ProfilingMiddleware)
+
+# Admission control - per-route-class concurrency limits and per-user rate limits.
+# Added before CORS so CORS stays outermost and 429/503 responses keep CORS headers.
+app.add_middleware(AdmissionControlMiddleware, controller=admission_controller)
+
 # CORS middleware - Allow both local development and production frontend
 frontend_url = os.getenv("FRONTEND_URL", "")
 allowed_origins = [
@@ -165,6 +201,19 @@ app.add_middleware(
     allow_origin_regex=r"https://.*\.vercel\.app$"
 )
 
+# Request ids for log correlation - wraps everything below so all request logs carry the id
+app.add_middleware(RequestIdMiddleware)
+
+# Request metrics - outermost so latency includes admission queueing and CORS handling
+app.add_middleware(MetricsMiddleware)
+
+# Stored request profiles (operator-only, requires X-Admin-Token)
+app.include_router(profiling_router)
+app.include_router(ai_usage_router)
+app.include_router(resumable_uploads_router)
+app.include_router(print_export_router)
+app.include_router(order_pipeline_router)
+
 # Include creator marketplace routes if available
 if CREATOR_MARKETPLACE_AVAILABLE:
     app.include_router(creator_marketplace_router)
@@ -182,7 +231,7 @@ else:
     logger.warning("Shipping Costs API routes not available - module not found")
 
 # Mount static files - create uploads directory if it doesn't exist
-uploads_dir = "uploads"
+uploads_dir = UPLOAD_DIR
 if not os.path.exists(uploads_dir):
     os.makedirs(uploads_dir, exist_ok=True)
     print(f"✅ Created uploads directory: {uploads_dir}")
@@ -315,6 +364,15 @@ class ElementAdditionRequest(BaseModel):
     design_id: str
     element: Dict[str, Any]
 
+class DesignOperationsRequest(BaseModel):
+    operations: List[Dict[str, Any]]
+    base_version: Optional[str] = None
+
+class ProofRequest(BaseModel):
+    canvas_data: Dict[str, Any]
+    scale: float = 1.0
+    max_width: Optional[int] = None
+
 # Authentication endpoints
 @app.post("/api/auth/register")
 async def register_user(user_data: UserRegistration):
@@ -552,35 +610,95 @@ async def upload_artwork(
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user)
 ):
-    """Upload artwork file"""
+    """Upload artwork file (streamed, size-limited, stored once per distinct content)"""
     if not file:
         raise HTTPException(status_code=400, detail="No file provided")
     
     # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/gif", "image/svg+xml", "application/pdf"]
-    if file.content_type not in allowed_types:
+    extension = ARTWORK_TYPES.get(file.content_type)
+    if extension is None:
         raise HTTPException(status_code=400, detail="Invalid file type")
     
-    # Generate unique filename
-    file_id = str(uuid.uuid4())
-    file_extension = file.filename.split(".")[-1] if "." in file.filename else "jpg"
-    filename = f"{file_id}.{file_extension}"
-    filepath = f"uploads/{filename}"
+    try:
+        stored = await store_upload(file, extension)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    # Save file
-    async with aiofiles.open(filepath, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
+    # Print-readiness analysis runs in the preflight worker pool; checkout reads its cached result
+    preflight_service.schedule_stored(stored)
     
     return {
-        "file_id": file_id,
-        "filename": filename,
+        "file_id": stored["sha256"],
+        "filename": stored["filename"],
         "original_name": file.filename,
-        "file_url": f"/uploads/{filename}",
-        "size": len(content),
-        "content_type": file.content_type
+        "file_url": artwork_url(stored["filename"]),
+        "size": stored["size"],
+        "content_type": file.content_type,
+        "sha256": stored["sha256"],
+        "deduplicated": stored["deduplicated"],
+        "preflight_url": f"/api/upload-artwork/{stored['sha256']}/preflight"
     }
 
+@app.get("/api/upload-artwork/{sha256}")
+async def find_uploaded_artwork(sha256: str, current_user: dict = Depends(get_current_user)):
+    """Fast path: the stored URL for artwork whose SHA-256 the client already computed"""
+    stored = find_artwork(sha256)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Artwork not uploaded yet")
+    return {
+        "file_id": stored["sha256"],
+        "filename": stored["filename"],
+        "file_url": artwork_url(stored["filename"]),
+        "size": stored["size"],
+        "sha256": stored["sha256"],
+        "deduplicated": True
+    }
+
+@app.get("/api/upload-artwork/{sha256}/preflight")
+async def get_artwork_preflight(
+    sha256: str,
+    product_type: str = "banner",
+    banner_size: Optional[str] = None,
+    width_in: Optional[float] = None,
+    height_in: Optional[float] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Print-readiness of uploaded artwork, optionally for a print size ('2x4' ft, '24x36in' or width_in/height_in)"""
+    analysis = await preflight_service.analysis(sha256.lower())
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="Artwork not uploaded yet")
+    
+    if width_in is not None or height_in is not None:
+        if not (width_in and height_in and width_in > 0 and height_in > 0):
+            raise HTTPException(status_code=400, detail="width_in and height_in must both be positive")
+        size = (width_in, height_in)
+    else:
+        size = parse_print_size(banner_size)
+        if size is None and banner_size:
+            raise HTTPException(status_code=400,
+                                detail="Give a positive banner_size in ft or in (e.g. 2x4) or width_in and height_in")
+    return {
+        "success": True,
+        "sha256": sha256.lower(),
+        "analysis": analysis,
+        "preflight": evaluate_artwork(analysis, *size, product_type=product_type) if size else None
+    }
+
+class OrderPreflightRequest(BaseModel):
+    canvas_data: Dict[str, Any]
+    dimensions: Dict[str, Any]
+    product_type: str = "banner"
+    print_options: Optional[Dict[str, Any]] = {}
+
+@app.post("/api/orders/preflight")
+async def preflight_order(request: OrderPreflightRequest, current_user: dict = Depends(get_current_user)):
+    """Checkout check of every uploaded image in a design at the ordered size, from cached analyses"""
+    try:
+        jobs = order_print_jobs(request.model_dump())
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid design or dimensions: {e}")
+    return {"success": True, "preflight": preflight_jobs(jobs, request.product_type)}
+
 # Order management
 @app.post("/api/orders/create")
 async def create_order(
@@ -611,13 +729,12 @@ async def create_order(
         
         total_amount += marketplace_cost
         
-        # Create comprehensive order data
+        # Phase one: a light row. The preview image, thumbnail and preflight are
+        # produced by the order pipeline after this returns (see order_pipeline.py)
         order_payload = {
             "product_type": order_data.product_type,
             "quantity": order_data.quantity,
             "dimensions": order_data.dimensions,
-            "canvas_data": order_data.canvas_data,
-            "canvas_image": order_data.canvas_image,  # Include canvas_image
             "banner_type": order_data.banner_type,
             "banner_material": order_data.banner_material,
             "banner_finish": order_data.banner_finish,
@@ -628,26 +745,39 @@ async def create_order(
             "marketplace_templates": order_data.marketplace_templates,
             "marketplace_cost": marketplace_cost,
             "total_amount": total_amount,
+            "processing": {"status": "queued"},
             "status": "pending"
         }
         
         # Create order in database
         order_result = await db_manager.create_order(
             current_user["user_id"],
-            order_payload
+            {**order_payload, "canvas_data": order_data.canvas_data}
         )
         
         if order_result["success"]:
+            order_id = order_result["order_id"]
+            job = order_pipeline.submit(
+                order_id,
+                current_user["user_id"],
+                {**order_payload, "canvas_data": order_data.canvas_data},
+                order_data.canvas_image,
+                db_manager
+            )
             return {
                 "success": True,
-                "order_id": order_result["order_id"],
+                "order_id": order_id,
                 "total_amount": total_amount,
                 "base_amount": base_price * order_data.quantity,
                 "marketplace_cost": marketplace_cost,
-                "order_details": order_payload
+                "order_details": order_payload,
+                "processing": job.status(),
+                "processing_url": f"/api/orders/{order_id}/processing"
             }
         else:
             raise HTTPException(status_code=500, detail=order_result["error"])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -672,6 +802,26 @@ async def get_order(order_id: str, current_user: dict = Depends(get_current_user
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/orders/{order_id}/processing")
+async def get_order_processing(order_id: str, current_user: dict = Depends(get_current_user)):
+    """Progress of an order's background image processing; canvas_image_url and thumbnail_url once done"""
+    order = await db_manager.get_order(order_id)
+    if not order or order["user_id"] != current_user["user_id"]:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    order_details = order.get("order_details") or {}
+    if isinstance(order_details, str):
+        order_details = json.loads(order_details or "{}")
+    return {
+        "success": True,
+        "order_id": order_id,
+        # The in-memory job is current while it runs; the row has the outcome (also after a restart)
+        "processing": order_pipeline.status(order_id) or order_details.get("processing") or {"status": "unknown"},
+        "canvas_image_url": order_details.get("canvas_image_url"),
+        "thumbnail_url": order_details.get("thumbnail_url"),
+        "preflight": order_details.get("preflight")
+    }
+
 @app.post("/api/orders/{order_id}/customer-info")
 async def save_order_customer_info(
     order_id: str,
@@ -1077,6 +1227,80 @@ async def save_enhanced_canvas_design(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Batched design edits: many operations, one load and one write
+@app.post("/api/designs/{design_id}/ops")
+async def apply_design_operations(
+    design_id: str,
+    request: DesignOperationsRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Apply an ordered list of add/move/resize/recolor/delete/reorder/duplicate operations"""
+    session = DesignSession(db_manager)
+    design = await session.get(design_id)
+    if not design or design.record.get("user_id") != current_user["user_id"]:
+        raise HTTPException(status_code=404, detail="Design not found")
+    
+    current_version = design_version(design.record)
+    if request.base_version and request.base_version != current_version:
+        raise HTTPException(
+            status_code=409,
+            detail={"error": "Design was modified since base_version", "version": current_version}
+        )
+    
+    try:
+        results = apply_operations(design, request.operations)
+    except DesignOperationError as e:
+        raise HTTPException(status_code=400, detail={"error": str(e), "index": e.index})
+    
+    # Conditional on the version read above, so a concurrent batch cannot be silently overwritten
+    committed = await session.commit(if_unmodified=True)
+    result = committed.get(design_id)
+    if result is not None and result.get("conflict"):
+        raise HTTPException(status_code=409, detail={"error": "Design was modified by another request, reload it"})
+    if result is not None and not result.get("success"):
+        raise HTTPException(status_code=500, detail=result.get("error", "Failed to save design"))
+    
+    return {
+        "success": True,
+        "design_id": design_id,
+        "version": design_version(result.get("updated_data")) if result else current_version,
+        "results": results,
+        "canvas_data": design.canvas_data
+    }
+
+@app.get("/api/designs/{design_id}/proof.png")
+async def get_design_proof(
+    design_id: str,
+    request: Request,
+    scale: float = 1.0,
+    max_width: Optional[int] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Server-rendered PNG proof of a saved design"""
+    design = await DesignSession(db_manager).get(design_id)
+    if not design or design.record.get("user_id") != current_user["user_id"]:
+        raise HTTPException(status_code=404, detail="Design not found")
+    
+    version_key = f"{design_id}|{design_version(design.record)}|{scale}|{max_width}"
+    etag = f'"{hashlib.sha256(version_key.encode()).hexdigest()[:32]}"'
+    headers = {"Cache-Control": "private, no-cache", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    try:
+        content = await asyncio.to_thread(render_proof_png, design.canvas_data, scale, max_width)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=content, media_type="image/png", headers=headers)
+
+@app.post("/api/render/proof")
+async def render_canvas_proof(request: ProofRequest, current_user: dict = Depends(get_current_user)):
+    """Render unsaved canvas JSON (e.g. an AI tool result) to a PNG proof"""
+    try:
+        content = await asyncio.to_thread(render_proof_png, request.canvas_data, request.scale, request.max_width)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=content, media_type="image/png", headers={"Cache-Control": "no-store"})
+
 # Analytics endpoints
 @app.get("/api/user/stats")
 async def get_user_stats(current_user: dict = Depends(get_current_user)):
@@ -1157,7 +1381,7 @@ async def delete_pending_order(pending_order_id: str, current_user: dict = Depen
 
 # AI Agent Endpoints
 @app.post("/api/ai/chat")
-async def ai_chat_endpoint(request: AIQuery, current_user: dict = Depends(get_current_user)):
+async def ai_chat_endpoint(request: AIQuery, current_user: dict = Depends(require_ai_budget)):
     """AI Chat endpoint for general assistance"""
     try:
         # Initialize AI agent adapter if not already done
@@ -1177,8 +1401,31 @@ async def ai_chat_endpoint(request: AIQuery, current_user: dict = Depends(get_cu
         logger.error(f"AI Chat error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def format_sse_event(event: str, data: Any) -> str:
+    """Encode one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/api/ai/chat/stream")
+async def ai_chat_stream_endpoint(request: AIQuery, current_user: dict = Depends(require_ai_budget)):
+    """AI Chat endpoint streaming tokens, tool progress and canvas updates as SSE"""
+    # Add user context to the request
+    request.context["user_id"] = current_user["user_id"]
+    request.context["user_email"] = current_user.get("email", "")
+    
+    async def event_stream():
+        # Flush headers and a first frame immediately, before the model responds
+        yield format_sse_event("start", {"query": request.query})
+        async for event in ai_agent_adapter.chat_with_ai_stream(request.query, request.context):
+            yield format_sse_event(event["event"], event["data"])
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/ai/design-assistance")
-async def design_assistance_endpoint(request: DesignAssistanceRequest, current_user: dict = Depends(get_current_user)):
+async def design_assistance_endpoint(request: DesignAssistanceRequest, current_user: dict = Depends(require_ai_budget)):
     """Design assistance endpoint"""
     try:
         # Initialize AI agent adapter if not already done
@@ -1204,7 +1451,7 @@ async def design_assistance_endpoint(request: DesignAssistanceRequest, current_u
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/ai/order-assistance")
-async def order_assistance_endpoint(request: OrderQuery, current_user: dict = Depends(get_current_user)):
+async def order_assistance_endpoint(request: OrderQuery, current_user: dict = Depends(require_ai_budget)):
     """Order assistance endpoint"""
     try:
         # Initialize AI agent adapter if not already done
@@ -1229,7 +1476,7 @@ async def order_assistance_endpoint(request: OrderQuery, current_user: dict = De
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/ai/banner-recommendations")
-async def banner_recommendations_endpoint(request: BannerRecommendationRequest, current_user: dict = Depends(get_current_user)):
+async def banner_recommendations_endpoint(request: BannerRecommendationRequest, current_user: dict = Depends(require_ai_budget)):
     """Banner recommendations endpoint"""
     try:
         # Initialize AI agent adapter if not already done
@@ -1262,9 +1509,67 @@ async def ai_agent_health():
             "service": "ai_agent_adapter"
         }
 
+# Icon library search (public; same index the AI add_icon tool uses)
+@app.get("/api/icons/search")
+async def search_icons(q: str = "", category: Optional[str] = None, limit: int = 20):
+    """Fuzzy icon search by name; without a query, lists a category (or everything)"""
+    limit = max(1, min(limit, 100))
+    if q.strip():
+        icons = [{**icon, "score": score} for icon, score in icon_catalog.search(q, category=category, limit=limit)]
+    else:
+        icons = (icon_catalog.by_category(category) if category else icon_catalog.icons)[:limit]
+    return {
+        "success": True,
+        "query": q,
+        "category": category,
+        "icons": icons,
+        "count": len(icons),
+        "categories": sorted(icon_catalog.categories())
+    }
+
+# Resized uploads/marketplace assets, rendered on first request and cached on disk
+@app.get("/api/images/{asset:path}")
+async def get_resized_image(asset: str, request: Request, w: int, fmt: str = "webp"):
+    """Serve `asset` (uploads/<file> or marketplace/<path>) resized to width w as fmt"""
+    try:
+        derivative, etag = image_resizer.describe(asset, w, fmt.lower())
+        headers = {"Cache-Control": image_cache_control(asset), "ETag": f'"{etag}"'}
+        # Revalidations (every view of a non content-addressed asset) need neither a render nor a read
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        content, derivative, etag = await image_resizer.get(asset, w, fmt.lower())
+    except ImageNotFound:
+        raise HTTPException(status_code=404, detail="Image not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OSError as e:
+        logger.warning(f"Could not resize {asset}: {e}")
+        raise HTTPException(status_code=422, detail="Image could not be decoded")
+    
+    headers["ETag"] = f'"{etag}"'
+    return Response(content, media_type=derivative.media_type, headers=headers)
+
+# QR codes referenced by canvas elements (QR_OUTPUT=url); the query string fully describes the image
+@app.get("/api/qr")
+async def get_qr_code(data: str, fmt: str = "svg", fill: str = "#000000", back: str = "#ffffff",
+                      ec: str = "M", box_size: int = 10, border: int = 4):
+    """Render (or serve from cache) a QR code as SVG or PNG"""
+    spec = QRSpec(data=data, fill_color=fill, back_color=back, error_correction=ec.upper(),
+                  box_size=box_size, border=border, fmt=fmt.lower())
+    try:
+        image = await qr_service.render(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    etag = f'"{spec.key}"'
+    return Response(
+        content=image.content,
+        media_type=image.media_type,
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "ETag": etag}
+    )
+
 # AI Banner Generation Endpoints
 @app.post("/api/ai/generate-banner")
-async def generate_banner_endpoint(request: BannerGenerationRequest, current_user: dict = Depends(get_current_user)):
+async def generate_banner_endpoint(request: BannerGenerationRequest, current_user: dict = Depends(require_ai_budget)):
     """Generate a complete banner design from a text prompt"""
     try:
         # Initialize AI agent adapter if not already done
@@ -1641,6 +1946,12 @@ async def get_cache_stats():
     return {
         "success": True,
         "stats": cache.stats(),
+        "ai_response_cache": ai_agent_adapter.response_cache.stats(),
+        "qr_cache": qr_service.stats(),
+        "image_cache": image_resizer.cache.stats(),
+        "canvas_renderer": renderer_stats(),
+        "artwork_preflight": preflight_service.stats(),
+        "order_pipeline": order_pipeline.stats(),
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -1648,6 +1959,7 @@ async def get_cache_stats():
 async def clear_cache():
     """Clear all cache entries"""
     cache.clear()
+    ai_agent_adapter.response_cache.clear()
     return {
         "success": True,
         "message": "Cache cleared successfully",
@@ -1676,6 +1988,52 @@ async def invalidate_cache_key(cache_key: str):
         "timestamp": datetime.utcnow().isoformat()
     }
 
+# Admission control endpoints
+@app.get("/api/admission/stats", tags=["Health"], dependencies=[Depends(require_admin_token)])
+async def get_admission_stats():
+    """Get admission control queue depths, in-flight counts and rejection counters"""
+    return {
+        "success": True,
+        "route_classes": admission_controller.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+# Metrics endpoints
+admission_gauge = metrics_registry.gauge(
+    "buyprintz_admission", "Admission control state and counters per route class", ("route_class", "field"))
+token_cache_gauge = metrics_registry.gauge(
+    "buyprintz_auth_token_cache", "Verified bearer token cache statistics", ("field",))
+response_cache_gauge = metrics_registry.gauge(
+    "buyprintz_response_cache_entries", "Entries in the in-memory response cache")
+
+
+def _collect_runtime_stats():
+    """Copy admission, token cache and response cache stats into gauges at scrape time"""
+    for route_class, stats in admission_controller.stats().items():
+        for field, value in stats.items():
+            admission_gauge.set(value, route_class=route_class, field=field)
+    for field, value in auth_manager.token_cache.stats().items():
+        token_cache_gauge.set(value, field=field)
+    response_cache_gauge.set(len(cache.cache))
+
+
+metrics_registry.add_collector(_collect_runtime_stats)
+
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False, dependencies=[Depends(require_admin_token)])
+async def metrics():
+    """Prometheus scrape endpoint (send X-Admin-Token)"""
+    return Response(content=metrics_registry.render(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/api/metrics/latency", tags=["Health"], dependencies=[Depends(require_admin_token)])
+async def get_latency_summary():
+    """Get per-route request counts with p50/p95/p99 latency estimates in seconds"""
+    return {
+        "success": True,
+        "routes": http_request_duration_seconds.summary(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 # Business Card Tins API Endpoints
 
 class BusinessCardTinRequest(BaseModel):
@@ -1744,11 +2102,14 @@ async def create_business_card_tin_order(
         # Update the order with the calculated total
         await db_manager.update_order_status(order_id, "pending", tin_result["total_price"])
         
+        preflight = preflight_jobs(tin_print_jobs(tin_data), "business_card_tin")
+        
         return {
             "success": True,
             "order_id": order_id,
             "tin_id": tin_result["tin_id"],
             "total_price": tin_result["total_price"],
+            "preflight": preflight,
             "message": "Business card tin order created successfully"
         }
         
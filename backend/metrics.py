@@ -0,0 +1,345 @@
+"""
+BuyPrintz Metrics
+Minimal in-process metrics registry (counters, gauges, histograms) exported in
+the Prometheus text exposition format on /metrics, plus the HTTP middleware and
+timing helpers used to instrument routes, database calls, OpenAI calls and the
+B2Sign Playwright workflow.
+"""
+
+import asyncio
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from fast DB reads up to 2-minute OpenAI/Playwright calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[key] = series
+            counts, total = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside buckets (like histogram_quantile)"""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            if series is None:
+                return None
+            counts = list(series[0])
+        return self._quantile_from_counts(q, counts)
+
+    def _quantile_from_counts(self, q: float, counts: List[int]) -> Optional[float]:
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for i, bound in enumerate(self.buckets):
+            previous = cumulative
+            cumulative += counts[i]
+            if cumulative >= rank:
+                if counts[i] == 0:
+                    return bound
+                return lower + (bound - lower) * (rank - previous) / counts[i]
+            lower = bound
+        # Observations above the highest bucket: report the highest finite bound
+        return self.buckets[-1]
+
+    def summary(self, quantiles: Iterable[float] = (0.5, 0.95, 0.99)) -> List[Dict[str, Any]]:
+        """Per-label-set count, mean and quantile estimates, for JSON views"""
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._series.items()]
+        rows = []
+        for key, counts, total in sorted(items):
+            count = sum(counts)
+            row = dict(zip(self.labelnames, key))
+            row["count"] = count
+            row["mean"] = total / count if count else None
+            for q in quantiles:
+                row[f"p{int(q * 100)}"] = self._quantile_from_counts(q, counts)
+            rows.append(row)
+        return rows
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts), total[0]) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families plus callbacks that refresh gauges at scrape time"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Register a callback run before each scrape (e.g. to copy cache stats into gauges)"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception:
+                # A broken collector must never take the metrics endpoint down
+                pass
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            body = metric.render()
+            if body:
+                lines.extend(metric.header())
+                lines.extend(body)
+        return "\n".join(lines) + "\n"
+
+
+# Global registry used across the backend
+registry = MetricsRegistry()
+
+# HTTP layer
+http_requests_total = registry.counter(
+    "buyprintz_http_requests_total", "HTTP requests by route, method and status code",
+    ("method", "route", "status"))
+http_request_duration_seconds = registry.histogram(
+    "buyprintz_http_request_duration_seconds", "HTTP request latency by route",
+    ("method", "route"))
+http_requests_in_flight = registry.gauge(
+    "buyprintz_http_requests_in_flight", "HTTP requests currently being served",
+    ("method",))
+
+# Backend dependencies
+db_operation_duration_seconds = registry.histogram(
+    "buyprintz_db_operation_duration_seconds", "DatabaseManager call latency", ("operation",))
+openai_request_duration_seconds = registry.histogram(
+    "buyprintz_openai_request_duration_seconds", "OpenAI API call latency",
+    ("operation", "model", "outcome"))
+b2sign_step_duration_seconds = registry.histogram(
+    "buyprintz_b2sign_step_duration_seconds", "B2Sign Playwright workflow step latency",
+    ("step", "outcome"))
+
+
+def _route_label(scope: Dict[str, Any]) -> str:
+    """Use the matched route template to keep label cardinality bounded"""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status codes and in-flight requests per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "GET")
+        status_holder = {"status": 500}
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        # The matched route is only known after routing, so in-flight is tracked per method
+        http_requests_in_flight.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec(method=method)
+            route = _route_label(scope)
+            http_request_duration_seconds.observe(time.perf_counter() - start, method=method, route=route)
+            http_requests_total.inc(method=method, route=route, status=str(status_holder["status"]))
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels):
+    """Time a block, labelling the observation with outcome=success/error"""
+    start = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, outcome=outcome, **labels)
+
+
+def instrument_async_methods(cls, histogram: Histogram, label: str = "operation") -> None:
+    """
+    Wrap every public coroutine method of a class so its latency is recorded.
+    There is no outcome label: DatabaseManager reports failures as False, None,
+    [] or {"success": False}, which are indistinguishable from real empty
+    results, so a success/error split would be wrong either way.
+    """
+    for name, attribute in list(vars(cls).items()):
+        if name.startswith("_") or not asyncio.iscoroutinefunction(attribute):
+            continue
+
+        def make_wrapper(method, method_name):
+            @functools.wraps(method)
+            async def wrapper(*args, **kwargs):
+                with histogram.time(**{label: method_name}):
+                    return await method(*args, **kwargs)
+            return wrapper
+
+        setattr(cls, name, make_wrapper(attribute, name))
@@ -0,0 +1,218 @@
+"""
+Order Pipeline
+Second phase of order creation. POST /api/orders/create prices the order and
+inserts a light row - no preview image, canvas_data serialized once - so its
+latency no longer grows with the design. The work that does grow with it runs
+here, after the response has gone out:
+
+  1. decode the browser-rendered canvas_image (a base64 data URL), or render a
+     proof from canvas_data when there is none or it does not decode
+  2. store it as a content-addressed blob (/uploads/<sha256>.<ext>), recorded
+     as canvas_image_url - canvas_image kept the data URL of older orders
+  3. store a square JPEG thumbnail of it the same way
+  4. preflight the design's uploaded artwork (cached analyses only)
+  5. merge the URLs, preflight and processing status into order_details
+
+Decoding, rendering and encoding run on a small thread pool
+(ORDER_PROCESSING_WORKERS), so a burst of checkouts queues here instead of
+competing with requests for the CPU. Job status is kept in memory and mirrored
+to order_details.processing. canvas_data is the durable source: an order whose
+job was lost to a restart is re-run from it by the admin route below.
+"""
+
+import asyncio
+import base64
+import binascii
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Dict, Optional, Set
+
+from fastapi import APIRouter, Depends, HTTPException
+from PIL import Image
+
+from .artwork_preflight import preflight_jobs
+from .artwork_storage import artwork_url, store_bytes
+from .auth import require_admin_token
+from .canvas_renderer import render_proof_png
+from .design_session import parse_canvas_data
+from .generate_thumbnails import THUMBNAIL_QUALITY, decode_image_bytes, square_thumbnail
+from .metrics import registry
+from .print_export import order_print_jobs
+
+logger = logging.getLogger(__name__)
+
+ORDER_PROCESSING_WORKERS = int(os.getenv("ORDER_PROCESSING_WORKERS", "2"))
+# Width of the proof rendered for orders that arrive without a usable canvas_image
+ORDER_PROOF_MAX_WIDTH = int(os.getenv("ORDER_PROOF_MAX_WIDTH", "1600"))
+MAX_FINISHED_JOBS = 500
+
+# Pillow format -> extension the preview blob is stored under
+IMAGE_EXTENSIONS = {"PNG": "png", "JPEG": "jpg", "MPO": "jpg", "GIF": "gif", "WEBP": "webp", "BMP": "bmp"}
+
+order_processing_total = registry.counter(
+    "buyprintz_order_processing_total", "Background order processing jobs by outcome", ("result",))
+order_processing_seconds = registry.histogram(
+    "buyprintz_order_processing_seconds", "Time from order creation until its images are processed")
+order_processing_pending = registry.gauge(
+    "buyprintz_order_processing_pending", "Orders queued or running in the order pipeline")
+
+
+def decode_data_url(value: str) -> bytes:
+    """Bytes of a base64 data URL; ValueError for anything else"""
+    header, sep, payload = value.partition(",")
+    if not sep or not header.startswith("data:") or ";base64" not in header:
+        raise ValueError("canvas_image is not a base64 data URL")
+    try:
+        return base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"canvas_image is not valid base64: {e}")
+
+
+def process_order_images(canvas_data: Any, canvas_image: Optional[str]) -> Dict[str, Any]:
+    """Steps 1-3, in a worker thread: store the order's preview and thumbnail, return their URLs"""
+    source, data, img = "client", None, None
+    if canvas_image:
+        try:
+            data = decode_data_url(canvas_image)
+            img = decode_image_bytes(data, "canvas_image.png")
+        except ValueError as e:
+            logger.warning("Order canvas_image unusable, rendering a proof instead: %s", e)
+            img = None
+    if img is None:
+        source = "rendered"
+        data = render_proof_png(canvas_data, 1.0, ORDER_PROOF_MAX_WIDTH)
+        img = Image.open(BytesIO(data))
+    preview = store_bytes(data, IMAGE_EXTENSIONS.get(img.format, "png"))
+
+    buffer = BytesIO()
+    square_thumbnail(img).save(buffer, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+    thumbnail = store_bytes(buffer.getvalue(), "jpg")
+    return {
+        "canvas_image_url": artwork_url(preview["filename"]),
+        "canvas_image_source": source,
+        "canvas_image_bytes": preview["size"],
+        "thumbnail_url": artwork_url(thumbnail["filename"])
+    }
+
+
+class OrderProcessingJob:
+    def __init__(self, order_id: str, user_id: Optional[str]):
+        self.order_id = order_id
+        self.user_id = user_id
+        self.state = "queued"
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def status(self) -> Dict[str, Any]:
+        info = {"order_id": self.order_id, "status": self.state, "created_at": self.created_at}
+        if self.finished_at is not None:
+            info["seconds"] = round(self.finished_at - self.created_at, 3)
+        if self.error:
+            info["error"] = self.error
+        if self.result:
+            info["result"] = self.result
+        return info
+
+
+class OrderPipeline:
+    """Runs the second phase of each order on a thread pool and keeps its status"""
+
+    def __init__(self, workers: int = ORDER_PROCESSING_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.jobs: Dict[str, OrderProcessingJob] = {}
+        # Strong references, so running tasks are not garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="order-pipeline")
+        return self._executor
+
+    def submit(self, order_id: str, user_id: Optional[str], order: Dict[str, Any],
+               canvas_image: Optional[str], db) -> OrderProcessingJob:
+        """
+        Queue an order created without its images. order carries canvas_data,
+        dimensions, print_options and product_type (as stored); db is the
+        DatabaseManager the result is written back through. Call from the event loop.
+        """
+        job = OrderProcessingJob(order_id, user_id)
+        self.jobs[order_id] = job
+        order_processing_pending.inc()
+        job.task = asyncio.get_running_loop().create_task(self._run(job, order, canvas_image, db))
+        self._tasks.add(job.task)
+        job.task.add_done_callback(self._tasks.discard)
+        self._forget_old_jobs()
+        return job
+
+    async def _run(self, job: OrderProcessingJob, order: Dict[str, Any], canvas_image: Optional[str], db) -> None:
+        updates: Dict[str, Any] = {}
+        try:
+            job.state = "running"
+            canvas_data = parse_canvas_data(order.get("canvas_data"))
+            images = await asyncio.get_running_loop().run_in_executor(
+                self.executor, process_order_images, canvas_data, canvas_image)
+            try:
+                preflight = preflight_jobs(order_print_jobs(order), order.get("product_type"))
+            except (TypeError, ValueError) as e:
+                logger.warning("Could not preflight order %s: %s", job.order_id, e)
+                preflight = None
+            updates = {"canvas_image_url": images["canvas_image_url"], "thumbnail_url": images["thumbnail_url"],
+                       "preflight": preflight}
+            job.result = {**images, "preflight_status": preflight["status"] if preflight else None}
+            job.state = "completed"
+        except Exception as e:
+            logger.exception("Processing order %s failed", job.order_id)
+            job.state, job.error = "failed", str(e)
+        finally:
+            job.finished_at = time.time()
+            order_processing_pending.dec()
+            order_processing_total.inc(result=job.state)
+            order_processing_seconds.observe(job.finished_at - job.created_at)
+
+        updates["processing"] = {"status": job.state, "error": job.error, "finished_at": job.finished_at}
+        if not await db.update_order_details(job.order_id, updates):
+            logger.error("Could not save the processing result of order %s", job.order_id)
+
+    def _forget_old_jobs(self) -> None:
+        finished = [job for job in self.jobs.values() if job.finished_at is not None]
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.order_id]
+
+    def status(self, order_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(order_id)
+        return job.status() if job else None
+
+    def stats(self) -> Dict[str, Any]:
+        states = [job.state for job in self.jobs.values()]
+        return {"workers": self.workers, **{state: states.count(state)
+                                            for state in ("queued", "running", "completed", "failed")}}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+order_pipeline = OrderPipeline()
+
+router = APIRouter(prefix="/api/admin/order-processing", tags=["Admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.post("/{order_id}")
+async def reprocess_order(order_id: str):
+    """Re-run the image phase of an order from its stored canvas_data (e.g. after a restart)"""
+    from .database import db_manager
+
+    order = await db_manager.get_order(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    job = order_pipeline.submit(order_id, order.get("user_id"), order, None, db_manager)
+    return {"success": True, "job": job.status()}
@@ -0,0 +1,453 @@
+"""
+Print Export
+Print-resolution production files for orders and business card tins. A 10x20 ft
+banner at 150 DPI is about 18000x36000 pixels - far more than one Pillow image
+should hold - so the canvas is rendered in horizontal bands (canvas_renderer.
+render_band) and each band is compressed and appended to the output as soon as
+it is drawn:
+
+  pdf   one page at the physical size; every band is its own Flate image
+  tiff  baseline RGB TIFF, one Deflate strip per band, 'dpi' resolution tags
+
+Peak memory is a small multiple of one band (EXPORT_BAND_BYTES) - the band,
+the visible parts of its elements and the compressor's copy - whatever the
+banner size. Exports run in a process pool; each
+job writes progress.json (bands done / total) next to its output, which the
+admin routes below report per order.
+"""
+
+import json
+import logging
+import math
+import multiprocessing
+import os
+import struct
+import time
+import uuid
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from .auth import require_admin_token
+from .canvas_renderer import canvas_elements, canvas_size, render_band
+from .design_session import parse_canvas_data
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+PRINT_EXPORT_DIR = os.getenv("PRINT_EXPORT_DIR", "print_exports")
+PRINT_EXPORT_WORKERS = int(os.getenv("PRINT_EXPORT_WORKERS", "1"))
+EXPORT_BAND_BYTES = int(os.getenv("EXPORT_BAND_BYTES", str(64 * 1024 * 1024)))
+EXPORT_MAX_PIXELS = int(os.getenv("EXPORT_MAX_PIXELS", str(3_000_000_000)))
+ORDER_EXPORT_DPI = int(os.getenv("ORDER_EXPORT_DPI", "150"))
+# The editor's tin canvas is 374x225 px for a 3.74x2.25 in sticker
+TIN_CANVAS_PPI = 100
+MAX_FINISHED_JOBS = 200
+COMPRESS_LEVEL = 3  # most of level 6's size at a fraction of the time on photographic bands
+
+FORMATS = {"pdf": "application/pdf", "tiff": "image/tiff"}
+PDF_MAX_PAGE_UNITS = 14400  # Acrobat's page size limit; larger pages use UserUnit
+
+print_exports_total = registry.counter(
+    "buyprintz_print_exports_total", "Print exports by format and outcome", ("format", "result"))
+
+
+class PrintSpec(NamedTuple):
+    width_in: float
+    height_in: float
+    dpi: int = ORDER_EXPORT_DPI
+    fmt: str = "pdf"
+
+    def output_size(self, design_size: Tuple[float, float]) -> Tuple[int, int, float]:
+        """(width px, height px, scale) fitting the design into the physical size at dpi"""
+        design_w, design_h = design_size
+        width_in, height_in = self.width_in, self.height_in
+        # Product sizes are orientation-agnostic ("2x4 ft"); follow the design's orientation
+        if (design_w >= design_h) != (width_in >= height_in):
+            width_in, height_in = height_in, width_in
+        scale = min(width_in * self.dpi / design_w, height_in * self.dpi / design_h)
+        return max(1, round(design_w * scale)), max(1, round(design_h * scale)), scale
+
+
+# ---------------------------------------------------------------- writers
+
+class TiffStripWriter:
+    """Baseline RGB TIFF written one Deflate-compressed strip at a time"""
+
+    def __init__(self, path: str, width: int, height: int, rows_per_strip: int, dpi: int):
+        self.width, self.height, self.rows_per_strip, self.dpi = width, height, rows_per_strip, dpi
+        self.offsets: List[int] = []
+        self.counts: List[int] = []
+        self._file = open(path, "wb")
+        self._file.write(b"II*\x00" + struct.pack("<I", 0))  # IFD offset patched on close
+
+    def write_strip(self, band) -> None:
+        data = zlib.compress(band.tobytes(), COMPRESS_LEVEL)
+        offset = self._file.tell()
+        if offset + len(data) > 0xFFFFFFFF:
+            raise ValueError("TIFF output would exceed 4 GB; export as PDF instead")
+        self.offsets.append(offset)
+        self.counts.append(len(data))
+        self._file.write(data)
+
+    def abort(self) -> None:
+        self._file.close()
+
+    def close(self) -> None:
+        f = self._file
+        if f.tell() % 2:
+            f.write(b"\x00")
+        # Out-of-line values first, then the IFD that points at them
+        extra_offset = f.tell()
+        blobs = [struct.pack("<3H", 8, 8, 8), struct.pack(f"<{len(self.offsets)}I", *self.offsets),
+                 struct.pack(f"<{len(self.counts)}I", *self.counts), struct.pack("<2I", self.dpi, 1)]
+        positions = []
+        for blob in blobs:
+            positions.append(extra_offset)
+            f.write(blob)
+            extra_offset += len(blob)
+        bits, offsets, counts, resolution = positions
+
+        def value(count: int, inline: Optional[int], pointer: int) -> int:
+            return inline if count == 1 and inline is not None else pointer
+
+        n = len(self.offsets)
+        entries = [  # tag, type (3 SHORT, 4 LONG, 5 RATIONAL), count, value or offset
+            (256, 4, 1, self.width),
+            (257, 4, 1, self.height),
+            (258, 3, 3, bits),
+            (259, 3, 1, 8),                      # Adobe Deflate
+            (262, 3, 1, 2),                      # RGB
+            (273, 4, n, value(n, self.offsets[0] if n else None, offsets)),
+            (277, 3, 1, 3),
+            (278, 4, 1, self.rows_per_strip),
+            (279, 4, n, value(n, self.counts[0] if n else None, counts)),
+            (282, 5, 1, resolution),
+            (283, 5, 1, resolution),
+            (284, 3, 1, 1),                      # chunky
+            (296, 3, 1, 2),                      # inches
+        ]
+        ifd_offset = f.tell()
+        f.write(struct.pack("<H", len(entries)))
+        for tag, kind, count, data in entries:
+            f.write(struct.pack("<HHII", tag, kind, count, data))
+        f.write(struct.pack("<I", 0))
+        f.seek(4)
+        f.write(struct.pack("<I", ifd_offset))
+        f.close()
+
+
+class PdfBandWriter:
+    """Single-page PDF whose content is the bands stacked top to bottom, streamed as they arrive"""
+
+    def __init__(self, path: str, width: int, height: int, dpi: int):
+        self.width, self.height, self.dpi = width, height, dpi
+        self._file = open(path, "wb")
+        self._offsets: Dict[int, int] = {}
+        self._bands: List[Tuple[int, int]] = []  # (object number, rows)
+        self._next_object = 5                    # 1-4: catalog, pages, page, contents
+        self._file.write(b"%PDF-1.6\n%\xe2\xe3\xcf\xd3\n")
+
+    def _begin(self, number: int) -> None:
+        self._offsets[number] = self._file.tell()
+        self._file.write(f"{number} 0 obj\n".encode())
+
+    def write_band(self, band) -> None:
+        number, length_number = self._next_object, self._next_object + 1
+        self._next_object += 2
+        self._begin(number)
+        self._file.write((f"<< /Type /XObject /Subtype /Image /Width {band.width} /Height {band.height} "
+                          f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /FlateDecode "
+                          f"/Length {length_number} 0 R >>\nstream\n").encode())
+        data = zlib.compress(band.tobytes(), COMPRESS_LEVEL)
+        self._file.write(data)
+        self._file.write(b"\nendstream\nendobj\n")
+        self._begin(length_number)
+        self._file.write(f"{len(data)}\nendobj\n".encode())
+        self._bands.append((number, band.height))
+
+    def abort(self) -> None:
+        self._file.close()
+
+    def close(self) -> None:
+        points_per_px = 72 / self.dpi
+        page_w, page_h = self.width * points_per_px, self.height * points_per_px
+        user_unit = max(1, math.ceil(max(page_w, page_h) / PDF_MAX_PAGE_UNITS))
+        ops, top = [], 0
+        for i, (_, rows) in enumerate(self._bands):
+            band_h = rows * points_per_px / user_unit
+            y = (self.height - top - rows) * points_per_px / user_unit
+            ops.append(f"q {page_w / user_unit:.4f} 0 0 {band_h:.4f} 0 {y:.4f} cm /B{i} Do Q")
+            top += rows
+        content = "\n".join(ops).encode()
+        xobjects = " ".join(f"/B{i} {number} 0 R" for i, (number, _) in enumerate(self._bands))
+
+        f = self._file
+        self._begin(4)
+        f.write(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream\nendobj\n")
+        self._begin(3)
+        f.write((f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_w / user_unit:.4f} {page_h / user_unit:.4f}] "
+                 + (f"/UserUnit {user_unit} " if user_unit > 1 else "")
+                 + f"/Resources << /XObject << {xobjects} >> >> /Contents 4 0 R >>\nendobj\n").encode())
+        self._begin(2)
+        f.write(b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n")
+        self._begin(1)
+        f.write(b"<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+
+        xref = f.tell()
+        count = self._next_object
+        f.write(f"xref\n0 {count}\n0000000000 65535 f \n".encode())
+        for number in range(1, count):
+            f.write(f"{self._offsets[number]:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+        f.close()
+
+
+# ---------------------------------------------------------------- worker
+
+def _write_progress(path: Optional[str], done: int, total: int) -> None:
+    if not path:
+        return
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"done": done, "total": total, "updated_at": time.time()}, f)
+    os.replace(temp_path, path)
+
+
+def export_canvas(canvas_data: Any, spec: PrintSpec, output_path: str,
+                  progress_path: Optional[str] = None, band_bytes: int = EXPORT_BAND_BYTES) -> Dict[str, Any]:
+    """
+    Render canvas_data at print resolution into output_path, band by band.
+    Blocking; meant for a worker process. Raises ValueError for unusable input.
+    """
+    if spec.fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {', '.join(FORMATS)}")
+    canvas_data = parse_canvas_data(canvas_data)
+    width, height, scale = spec.output_size(canvas_size(canvas_data))
+    if width * height > EXPORT_MAX_PIXELS:
+        raise ValueError(f"Export of {width}x{height} exceeds {EXPORT_MAX_PIXELS} pixels")
+    rows_per_band = max(1, min(height, band_bytes // (width * 4)))
+    total = math.ceil(height / rows_per_band)
+
+    started = time.perf_counter()
+    temp_path = f"{output_path}.part"
+    if spec.fmt == "tiff":
+        writer = TiffStripWriter(temp_path, width, height, rows_per_band, spec.dpi)
+        write = writer.write_strip
+    else:
+        writer = PdfBandWriter(temp_path, width, height, spec.dpi)
+        write = writer.write_band
+    try:
+        _write_progress(progress_path, 0, total)
+        for index in range(total):
+            top = index * rows_per_band
+            write(render_band(canvas_data, scale, top, min(rows_per_band, height - top)))
+            _write_progress(progress_path, index + 1, total)
+        writer.close()
+        os.replace(temp_path, output_path)
+    except BaseException:
+        writer.abort()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return {
+        "path": output_path,
+        "format": spec.fmt,
+        "width": width,
+        "height": height,
+        "dpi": spec.dpi,
+        "bands": total,
+        "bytes": os.path.getsize(output_path),
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+# ---------------------------------------------------------------- sources
+
+def order_print_jobs(order: Dict[str, Any], fmt: str = "pdf", dpi: Optional[int] = None) -> List[Tuple[str, Any, PrintSpec]]:
+    """(label, canvas_data, spec) for a banner order; dimensions are in feet"""
+    canvas_data = parse_canvas_data(order.get("canvas_data"))
+    if not canvas_elements(canvas_data):
+        return []
+    dimensions = order.get("dimensions") or {}
+    if isinstance(dimensions, str):
+        dimensions = json.loads(dimensions or "{}")
+    print_options = order.get("print_options") or {}
+    spec = PrintSpec(width_in=float(dimensions.get("width") or 2) * 12,
+                     height_in=float(dimensions.get("height") or 4) * 12,
+                     dpi=int(dpi or print_options.get("dpi") or ORDER_EXPORT_DPI), fmt=fmt)
+    return [("banner", canvas_data, spec)]
+
+
+def tin_print_jobs(tin: Dict[str, Any], fmt: str = "pdf", dpi: Optional[int] = None) -> List[Tuple[str, Any, PrintSpec]]:
+    """One sticker per designed surface, sized from its canvas at TIN_CANVAS_PPI"""
+    sticker_dpi = int(dpi or (tin.get("sticker_specifications") or {}).get("dpi") or 300)
+    jobs = []
+    for surface, design in sorted((tin.get("surface_designs") or {}).items()):
+        if isinstance(design, list):
+            design = {"elements": design}
+        canvas_data = parse_canvas_data(design.get("canvas_data", design) if isinstance(design, dict) else design)
+        if not canvas_elements(canvas_data):
+            continue
+        if "width" not in canvas_data and "canvasSize" not in canvas_data:
+            canvas_data = {**canvas_data, "width": 374, "height": 225}
+        width, height = canvas_size(canvas_data)
+        jobs.append((surface, canvas_data, PrintSpec(width / TIN_CANVAS_PPI, height / TIN_CANVAS_PPI,
+                                                     dpi=sticker_dpi, fmt=fmt)))
+    return jobs
+
+
+# ---------------------------------------------------------------- jobs
+
+class ExportJob:
+    def __init__(self, job_id: str, order_id: str, label: str, spec: PrintSpec, directory: str):
+        self.job_id = job_id
+        self.order_id = order_id
+        self.label = label
+        self.spec = spec
+        self.directory = directory
+        self.created_at = time.time()
+        self.future: Optional[Future] = None
+
+    @property
+    def output_path(self) -> str:
+        return os.path.join(self.directory, f"{self.order_id}-{self.label}.{self.spec.fmt}")
+
+    @property
+    def progress_path(self) -> str:
+        return os.path.join(self.directory, "progress.json")
+
+    def status(self) -> Dict[str, Any]:
+        try:
+            with open(self.progress_path) as f:
+                progress = json.load(f)
+        except (OSError, ValueError):
+            progress = {"done": 0, "total": None}
+        info = {
+            "job_id": self.job_id,
+            "order_id": self.order_id,
+            "label": self.label,
+            "format": self.spec.fmt,
+            "dpi": self.spec.dpi,
+            "bands_done": progress["done"],
+            "bands_total": progress["total"],
+            "created_at": self.created_at
+        }
+        if self.future is None or not self.future.done():
+            info["status"] = "running" if progress["total"] else "queued"
+        elif self.future.exception() is not None:
+            info["status"] = "failed"
+            info["error"] = str(self.future.exception())
+        else:
+            info["status"] = "completed"
+            info["result"] = {k: v for k, v in self.future.result().items() if k != "path"}
+        return info
+
+
+class PrintExportService:
+    """Runs exports in a process pool and keeps their status for the admin routes"""
+
+    def __init__(self, directory: Optional[str] = None, workers: int = PRINT_EXPORT_WORKERS):
+        self._directory = directory
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.jobs: Dict[str, ExportJob] = {}
+
+    @property
+    def directory(self) -> str:
+        return self._directory or PRINT_EXPORT_DIR
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Started on first export so importing the app does not start workers. Spawned, not
+        # forked: the API process has threads (log listener, to_thread workers) and a fork
+        # would copy their locks and the root log handler whose queue no child drains.
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def submit(self, order_id: str, label: str, canvas_data: Any, spec: PrintSpec) -> ExportJob:
+        job_id = uuid.uuid4().hex
+        job = ExportJob(job_id, order_id, label, spec, os.path.join(self.directory, job_id))
+        os.makedirs(job.directory)
+        pool = self.pool
+        try:
+            job.future = pool.submit(export_canvas, canvas_data, spec, job.output_path, job.progress_path)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); the executor never recovers, so replace it
+            logger.warning("Print export worker pool is broken; starting a new one")
+            if self._pool is pool:
+                self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            job.future = self.pool.submit(export_canvas, canvas_data, spec, job.output_path, job.progress_path)
+        job.future.add_done_callback(lambda f, fmt=spec.fmt: print_exports_total.inc(
+            format=fmt, result="failed" if f.exception() else "completed"))
+        self.jobs[job_id] = job
+        self._forget_old_jobs()
+        logger.info("Print export %s queued for order %s (%s, %s @ %d dpi)", job_id, order_id, label, spec.fmt, spec.dpi)
+        return job
+
+    def _forget_old_jobs(self) -> None:
+        finished = [job for job in self.jobs.values() if job.future is not None and job.future.done()]
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.job_id]
+
+    def for_order(self, order_id: str) -> List[Dict[str, Any]]:
+        return [job.status() for job in self.jobs.values() if job.order_id == order_id]
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+print_export_service = PrintExportService()
+
+router = APIRouter(prefix="/api/admin/print-exports", tags=["Admin"], dependencies=[Depends(require_admin_token)])
+
+
+def _check_format(fmt: str) -> str:
+    fmt = fmt.lower()
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"fmt must be one of {', '.join(FORMATS)}")
+    return fmt
+
+
+@router.post("/orders/{order_id}")
+async def export_order(order_id: str, fmt: str = "pdf", dpi: Optional[int] = None):
+    """Start the production export for an order (its banner, or each sticker of its tin)"""
+    from .database import db_manager
+
+    fmt = _check_format(fmt)
+    order = await db_manager.get_order(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order.get("product_type") == "business_card_tin":
+        tin = await db_manager.get_business_card_tin_by_order(order_id)
+        sources = tin_print_jobs(tin or {}, fmt, dpi)
+    else:
+        sources = order_print_jobs(order, fmt, dpi)
+    if not sources:
+        raise HTTPException(status_code=422, detail="Order has no canvas elements to export")
+    jobs = [print_export_service.submit(order_id, label, canvas, spec) for label, canvas, spec in sources]
+    return {"success": True, "order_id": order_id, "jobs": [job.status() for job in jobs]}
+
+
+@router.get("/orders/{order_id}")
+async def get_order_exports(order_id: str):
+    """Progress of every export started for an order"""
+    return {"success": True, "order_id": order_id, "jobs": print_export_service.for_order(order_id)}
+
+
+@router.get("/{job_id}/file")
+async def download_export(job_id: str):
+    job = print_export_service.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export not found")
+    if job.status()["status"] != "completed":
+        raise HTTPException(status_code=409, detail="Export is not finished")
+    return FileResponse(job.output_path, media_type=FORMATS[job.spec.fmt], filename=os.path.basename(job.output_path))
@@ -0,0 +1,272 @@
+"""
+BuyPrintz Request Profiling
+Opt-in sampling profiler for individual requests. An operator sends
+`X-Profile: store|speedscope|collapsed` (or `?__profile=...`) together with
+`X-Admin-Token`; the event-loop thread is then sampled while that request runs
+and the result is either returned in place of the response or stored for
+download from /api/admin/profiles.
+
+The middleware is only installed when PROFILING_ENABLED=true and
+ADMIN_API_TOKEN is set, so requests pay nothing when profiling is off.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.responses import Response
+
+from .auth import ADMIN_API_TOKEN, is_admin_token, require_admin_token
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000.0
+PROFILE_STORE_DIR = os.getenv("PROFILE_STORE_DIR", "profiles")
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
+PROFILE_MAX_DEPTH = 128
+
+PROFILE_MODES = {"store", "speedscope", "collapsed"}
+_PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+FrameKey = Tuple[str, str, int]
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval from a helper thread"""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack: List[FrameKey] = []
+            while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        """Render samples as a speedscope 'sampled' profile"""
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[FrameKey, int] = {}
+        samples: List[List[int]] = []
+        weights: List[float] = []
+        for stack, count in self.stacks.most_common():
+            indices = []
+            for key in stack:
+                index = frame_index.get(key)
+                if index is None:
+                    index = len(frames)
+                    frame_index[key] = index
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                indices.append(index)
+            samples.append(indices)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "buyprintz-profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.duration,
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+
+
+def speedscope_to_collapsed(profile: Dict[str, Any]) -> str:
+    """Convert a speedscope profile to folded stacks for flamegraph.pl / inferno"""
+    frames = profile["shared"]["frames"]
+    sampled = profile["profiles"][0]
+    interval = PROFILE_SAMPLE_INTERVAL or 0.001
+    lines = []
+    for stack, weight in zip(sampled["samples"], sampled["weights"]):
+        names = [f"{frames[i]['name']} ({os.path.basename(frames[i]['file'])}:{frames[i]['line']})" for i in stack]
+        lines.append(f"{';'.join(names)} {max(1, round(weight / interval))}")
+    return "\n".join(lines) + "\n"
+
+
+class ProfileStore:
+    """Keeps the most recent profiles on disk so any worker can serve them"""
+
+    def __init__(self, directory: str = PROFILE_STORE_DIR, max_stored: int = PROFILE_MAX_STORED):
+        self.directory = directory
+        self.max_stored = max_stored
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.speedscope.json")
+
+    def save(self, profile_id: str, profile: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path(profile_id) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(profile, f)
+        os.replace(tmp_path, self._path(profile_id))
+        self._prune()
+
+    def load(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        if not _PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".speedscope.json"):
+                continue
+            path = os.path.join(self.directory, filename)
+            entries.append({
+                "id": filename.split(".", 1)[0],
+                "created_at": os.path.getmtime(path),
+                "size": os.path.getsize(path)
+            })
+        return sorted(entries, key=lambda entry: entry["created_at"], reverse=True)
+
+    def _prune(self) -> None:
+        for entry in self.list()[self.max_stored:]:
+            try:
+                os.remove(self._path(entry["id"]))
+            except FileNotFoundError:
+                pass
+
+
+profile_store = ProfileStore()
+
+
+def _profile_request(scope: Dict[str, Any]) -> Optional[str]:
+    """Return the requested profile mode if the request is authorised to profile"""
+    headers = dict(scope.get("headers", []))
+    mode = headers.get(b"x-profile", b"").decode("latin-1").lower()
+    if not mode and b"__profile" in scope.get("query_string", b""):
+        mode = parse_qs(scope["query_string"].decode("latin-1")).get("__profile", [""])[0].lower()
+    if not mode:
+        return None
+    if mode in ("1", "true"):
+        mode = "store"
+    if mode not in PROFILE_MODES:
+        return None
+    if not is_admin_token(headers.get(b"x-admin-token", b"").decode("latin-1")):
+        return None
+    return mode
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles requests carrying a valid profiling request.
+
+    One request is profiled at a time: the sampler watches the whole event-loop
+    thread, so overlapping profiles would attribute each other's samples.
+    """
+
+    def __init__(self, app, store: Optional[ProfileStore] = None):
+        self.app = app
+        self.store = store or profile_store
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode = _profile_request(scope)
+        if mode is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        sampler = StackSampler(threading.get_ident())
+
+        async def send_with_profile_header(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        async def discard(message):
+            return None
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_header if mode == "store" else discard)
+        finally:
+            sampler.stop()
+            self._busy.release()
+
+        profile = sampler.to_speedscope(f"{scope.get('method', '')} {scope.get('path', '')}")
+        if mode == "store":
+            self.store.save(profile_id, profile)
+            return
+        if mode == "collapsed":
+            response: Response = PlainTextResponse(speedscope_to_collapsed(profile))
+        else:
+            response = JSONResponse(profile)
+        response.headers["x-profile-id"] = profile_id
+        await response(scope, receive, send)
+
+
+# Admin routes for stored profiles
+router = APIRouter(prefix="/api/admin/profiles", tags=["Admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("")
+async def list_profiles():
+    """List stored request profiles, newest first"""
+    return {"success": True, "profiles": profile_store.list()}
+
+
+@router.get("/{profile_id}")
+async def download_profile(profile_id: str, format: str = "speedscope"):
+    """Download a stored profile as speedscope JSON or collapsed stacks"""
+    profile = profile_store.load(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(speedscope_to_collapsed(profile))
+    return JSONResponse(profile, headers={
+        "Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'
+    })
+
+
+def profiling_available() -> bool:
+    return PROFILING_ENABLED and bool(ADMIN_API_TOKEN)
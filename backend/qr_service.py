@@ -0,0 +1,234 @@
+"""
+QR Service
+Renders QR codes off the event loop and caches them by everything that affects
+the output: data, colours, error correction, module size, border and format.
+PNG rendering goes through qrcode + Pillow in a worker thread; SVG is built
+directly from the module matrix as one path, so it is small and prints sharp
+at any banner size.
+
+Canvas elements can reference a QR code three ways (QR_OUTPUT):
+  png  - inline PNG data URL (what the editor has always received)
+  svg  - inline SVG data URL
+  url  - a GET /api/qr URL whose query string fully describes the code, so it
+         can be re-rendered after a restart and cached forever by browsers
+"""
+
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlencode
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", "256"))
+QR_OUTPUT = os.getenv("QR_OUTPUT", "png").lower()
+# Prefix for QR_OUTPUT=url, e.g. https://api.buyprintz.com (empty = same origin)
+QR_PUBLIC_BASE_URL = os.getenv("QR_PUBLIC_BASE_URL", "").rstrip("/")
+QR_MAX_DATA_LENGTH = 2048
+
+ERROR_CORRECTION_LEVELS = ("L", "M", "Q", "H")
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+_COLOR = re.compile(r"^#(?:[0-9a-fA-F]{3}|[0-9a-fA-F]{6})$")
+
+qr_cache_requests_total = registry.counter(
+    "buyprintz_qr_cache_requests_total", "QR render cache lookups", ("result",))
+qr_render_seconds = registry.histogram(
+    "buyprintz_qr_render_seconds", "QR code render time in the worker thread", ("format",))
+
+
+class QRSpec(NamedTuple):
+    data: str
+    fill_color: str = "#000000"
+    back_color: str = "#ffffff"
+    error_correction: str = "M"
+    box_size: int = 10
+    border: int = 4
+    fmt: str = "png"
+
+    def validate(self) -> "QRSpec":
+        if not self.data or len(self.data) > QR_MAX_DATA_LENGTH:
+            raise ValueError(f"QR data must be 1-{QR_MAX_DATA_LENGTH} characters")
+        if self.fmt not in FORMATS:
+            raise ValueError(f"Unsupported QR format: {self.fmt}")
+        if self.error_correction not in ERROR_CORRECTION_LEVELS:
+            raise ValueError(f"Error correction must be one of {', '.join(ERROR_CORRECTION_LEVELS)}")
+        for color in (self.fill_color, self.back_color):
+            if not _COLOR.match(color):
+                raise ValueError(f"Colors must be hex like #000000, got {color!r}")
+        if not (1 <= self.box_size <= 50 and 0 <= self.border <= 20):
+            raise ValueError("box_size must be 1-50 and border 0-20")
+        return self
+
+    @property
+    def key(self) -> str:
+        return hashlib.sha256(repr(tuple(self)).encode("utf-8")).hexdigest()[:32]
+
+
+class QRImage:
+    """Rendered QR code; the data URL is encoded once and then reused"""
+
+    __slots__ = ("spec", "content", "_data_url")
+
+    def __init__(self, spec: QRSpec, content: bytes):
+        self.spec = spec
+        self.content = content
+        self._data_url: Optional[str] = None
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.spec.fmt]
+
+    @property
+    def data_url(self) -> str:
+        if self._data_url is None:
+            self._data_url = f"data:{self.media_type};base64,{base64.b64encode(self.content).decode()}"
+        return self._data_url
+
+
+def _qr_matrix(spec: QRSpec):
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=getattr(qrcode.constants, f"ERROR_CORRECT_{spec.error_correction}"),
+        box_size=spec.box_size,
+        border=spec.border,
+    )
+    qr.add_data(spec.data)
+    qr.make(fit=True)
+    return qr
+
+
+def render_png(spec: QRSpec) -> bytes:
+    qr = _qr_matrix(spec)
+    image = qr.make_image(fill_color=spec.fill_color, back_color=spec.back_color)
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def render_svg(spec: QRSpec) -> bytes:
+    """One <path> of horizontal runs in module units, scaled by the viewBox"""
+    matrix = _qr_matrix(spec).get_matrix()  # includes the border
+    size = len(matrix)
+    runs = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                runs.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+            else:
+                x += 1
+    pixels = size * spec.box_size
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="{spec.back_color}"/>'
+        f'<path fill="{spec.fill_color}" d="{"".join(runs)}"/></svg>'
+    )
+    return svg.encode("utf-8")
+
+
+_RENDERERS = {"png": render_png, "svg": render_svg}
+
+
+class QRService:
+    """LRU-cached QR rendering; concurrent requests for the same code share one render"""
+
+    def __init__(self, max_entries: int = QR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[QRSpec, QRImage]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[QRSpec, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get_cached(self, spec: QRSpec) -> Optional[QRImage]:
+        with self._lock:
+            image = self._cache.get(spec)
+            if image is not None:
+                self._cache.move_to_end(spec)
+            return image
+
+    def _store(self, image: QRImage) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._cache[image.spec] = image
+            self._cache.move_to_end(image.spec)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    async def render(self, spec: QRSpec) -> QRImage:
+        spec.validate()
+        image = self._get_cached(spec)
+        if image is not None:
+            self.hits += 1
+            qr_cache_requests_total.inc(result="hit")
+            return image
+
+        pending = self._inflight.get(spec)
+        if pending is not None:
+            qr_cache_requests_total.inc(result="coalesced")
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        qr_cache_requests_total.inc(result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[spec] = future
+        try:
+            with qr_render_seconds.time(format=spec.fmt):
+                content = await asyncio.to_thread(_RENDERERS[spec.fmt], spec)
+            image = QRImage(spec, content)
+            self._store(image)
+            future.set_result(image)
+            return image
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(spec, None)
+
+    @staticmethod
+    def image_url(spec: QRSpec) -> str:
+        """Self-describing URL served by GET /api/qr"""
+        params = {"data": spec.data, "fmt": spec.fmt, "fill": spec.fill_color, "back": spec.back_color,
+                  "ec": spec.error_correction, "box_size": spec.box_size, "border": spec.border}
+        return f"{QR_PUBLIC_BASE_URL}/api/qr?{urlencode(params)}"
+
+    async def element_source(self, spec: QRSpec, output: str = QR_OUTPUT) -> str:
+        """What a canvas element stores in imageDataUrl for the configured output mode"""
+        if output == "url":
+            return self.image_url(spec.validate())
+        fmt = "svg" if output == "svg" else "png"
+        return (await self.render(spec._replace(fmt=fmt))).data_url
+
+    def stats(self) -> Dict[str, object]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "output": QR_OUTPUT
+        }
+
+
+qr_service = QRService()
@@ -0,0 +1,310 @@
+"""
+Resumable Uploads
+Chunked upload protocol for large print artwork (hundreds of MB of PDF or
+high-DPI PNG) that survives flaky connections:
+
+  POST   /api/uploads                        initiate: filename, content_type, size
+                                             (+ optional sha256 for the dedupe fast path)
+  PUT    /api/uploads/{id}/chunks/{index}    raw chunk bytes; chunks may be sent in
+                                             parallel and re-sent safely
+  GET    /api/uploads/{id}                   which chunks are done / still missing
+  POST   /api/uploads/{id}/complete          assemble in order, hash, store
+  DELETE /api/uploads/{id}                   abort
+
+Chunks are written to their own files in a per-session directory (outside the
+public /uploads mount), so parallel chunks never contend and a retried chunk
+simply replaces its file. Completing streams the chunks into one file while
+hashing it and hands it to artwork_storage, so the result is content-addressed
+and deduplicated like a regular upload. Sessions idle for longer than
+UPLOAD_SESSION_TTL are deleted.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import aiofiles
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import BaseModel
+
+from . import artwork_storage
+from .artwork_preflight import preflight_service
+from .artwork_storage import ARTWORK_TYPES, artwork_url, commit_part, find_artwork
+from .auth import get_current_user
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", "upload_sessions")
+UPLOAD_SESSION_TTL = float(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+RESUMABLE_MAX_BYTES = int(os.getenv("RESUMABLE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+CLEANUP_INTERVAL = 600
+
+router = APIRouter(prefix="/api/uploads", tags=["Uploads"])
+
+
+class UploadInitRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: int
+    chunk_size: Optional[int] = None
+    sha256: Optional[str] = None
+
+
+class UploadSession:
+    """On-disk state of one resumable upload: session.json plus one file per chunk"""
+
+    def __init__(self, directory: str, meta: Dict[str, Any]):
+        self.directory = directory
+        self.meta = meta
+
+    @property
+    def upload_id(self) -> str:
+        return self.meta["upload_id"]
+
+    @property
+    def total_chunks(self) -> int:
+        return max(1, -(-self.meta["size"] // self.meta["chunk_size"]))
+
+    def chunk_length(self, index: int) -> int:
+        if index == self.total_chunks - 1:
+            return self.meta["size"] - index * self.meta["chunk_size"]
+        return self.meta["chunk_size"]
+
+    def chunk_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"{index:06d}.chunk")
+
+    def received(self) -> List[int]:
+        return sorted(int(name.split(".")[0]) for name in os.listdir(self.directory) if name.endswith(".chunk"))
+
+    def touch(self) -> None:
+        os.utime(os.path.join(self.directory, "session.json"))
+
+    def status(self) -> Dict[str, Any]:
+        received = self.received()
+        done = set(received)
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.meta["filename"],
+            "size": self.meta["size"],
+            "chunk_size": self.meta["chunk_size"],
+            "total_chunks": self.total_chunks,
+            "received": received,
+            "missing": [i for i in range(self.total_chunks) if i not in done],
+            "bytes_received": sum(self.chunk_length(i) for i in received)
+        }
+
+
+class ResumableUploadStore:
+    def __init__(self, directory: Optional[str] = None, ttl: float = UPLOAD_SESSION_TTL):
+        self._directory = directory
+        self.ttl = ttl
+        self._complete_locks: Dict[str, asyncio.Lock] = {}
+        self._last_cleanup = 0.0
+
+    @property
+    def directory(self) -> str:
+        return self._directory or UPLOAD_SESSION_DIR
+
+    def _session_dir(self, upload_id: str) -> str:
+        return os.path.join(self.directory, upload_id)
+
+    def create(self, user_id: str, request: UploadInitRequest) -> UploadSession:
+        chunk_size = min(max(request.chunk_size or DEFAULT_CHUNK_SIZE, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+        upload_id = uuid.uuid4().hex
+        directory = self._session_dir(upload_id)
+        os.makedirs(directory)
+        meta = {
+            "upload_id": upload_id,
+            "user_id": user_id,
+            "filename": request.filename,
+            "content_type": request.content_type,
+            "extension": ARTWORK_TYPES[request.content_type],
+            "size": request.size,
+            "chunk_size": chunk_size,
+            "sha256": request.sha256.lower() if request.sha256 else None,
+            "created_at": time.time()
+        }
+        with open(os.path.join(directory, "session.json"), "w") as f:
+            json.dump(meta, f)
+        return UploadSession(directory, meta)
+
+    def get(self, upload_id: str, user_id: str) -> UploadSession:
+        """The caller's session, or 404 (other users' sessions look the same as missing ones)"""
+        directory = self._session_dir(upload_id)
+        if not upload_id.isalnum() or not os.path.isdir(directory):
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        try:
+            with open(os.path.join(directory, "session.json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            # Deleted by a concurrent complete/abort or the cleanup sweep
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        if meta["user_id"] != user_id:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        return UploadSession(directory, meta)
+
+    def delete(self, session: UploadSession) -> None:
+        shutil.rmtree(session.directory, ignore_errors=True)
+        self._complete_locks.pop(session.upload_id, None)
+
+    def complete_lock(self, upload_id: str) -> asyncio.Lock:
+        return self._complete_locks.setdefault(upload_id, asyncio.Lock())
+
+    def cleanup_abandoned(self, now: Optional[float] = None) -> int:
+        """Delete sessions with no activity for ttl seconds; returns how many"""
+        now = now or time.time()
+        removed = 0
+        if not os.path.isdir(self.directory):
+            return 0
+        for upload_id in os.listdir(self.directory):
+            session_file = os.path.join(self._session_dir(upload_id), "session.json")
+            try:
+                idle = now - os.path.getmtime(session_file)
+            except OSError:
+                idle = self.ttl + 1  # half-created session
+            if idle > self.ttl:
+                shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+                self._complete_locks.pop(upload_id, None)
+                removed += 1
+        if removed:
+            logger.info("Removed %d abandoned upload sessions", removed)
+        return removed
+
+    def maybe_cleanup(self) -> None:
+        if time.time() - self._last_cleanup > CLEANUP_INTERVAL:
+            self._last_cleanup = time.time()
+            self.cleanup_abandoned()
+
+
+upload_store = ResumableUploadStore()
+
+
+def _assemble(session: UploadSession) -> dict:
+    """Concatenate chunks into one .part file in the uploads directory while hashing. Blocking."""
+    upload_dir = artwork_storage.UPLOAD_DIR
+    os.makedirs(upload_dir, exist_ok=True)
+    part_path = os.path.join(upload_dir, f"{session.upload_id}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(part_path, "wb") as out:
+            for index in range(session.total_chunks):
+                with open(session.chunk_path(index), "rb") as chunk:
+                    while True:
+                        block = chunk.read(1024 * 1024)
+                        if not block:
+                            break
+                        digest.update(block)
+                        out.write(block)
+                        size += len(block)
+        sha256 = digest.hexdigest()
+        expected = session.meta.get("sha256")
+        if expected and expected != sha256:
+            raise ValueError(f"SHA-256 mismatch: expected {expected}, got {sha256}")
+        return commit_part(part_path, sha256, size, session.meta["extension"], upload_dir)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+
+def _artwork_response(stored: dict, original_name: str, content_type: str) -> Dict[str, Any]:
+    return {
+        "complete": True,
+        "file_id": stored["sha256"],
+        "filename": stored["filename"],
+        "original_name": original_name,
+        "file_url": artwork_url(stored["filename"]),
+        "size": stored["size"],
+        "content_type": content_type,
+        "sha256": stored["sha256"],
+        "deduplicated": stored["deduplicated"],
+        "preflight_url": f"/api/upload-artwork/{stored['sha256']}/preflight"
+    }
+
+
+@router.post("")
+async def initiate_upload(request: UploadInitRequest, current_user: dict = Depends(get_current_user)):
+    """Start a resumable upload (or finish at once if this artwork is already stored)"""
+    if request.content_type not in ARTWORK_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid file type")
+    if request.size <= 0 or request.size > RESUMABLE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Size must be 1 byte to {RESUMABLE_MAX_BYTES // (1024 * 1024)} MB")
+
+    if request.sha256:
+        stored = find_artwork(request.sha256)
+        if stored is not None and stored["filename"].endswith(f".{ARTWORK_TYPES[request.content_type]}"):
+            return _artwork_response(stored, request.filename, request.content_type)
+
+    upload_store.maybe_cleanup()
+    session = upload_store.create(current_user["user_id"], request)
+    return {"complete": False, **session.status()}
+
+
+@router.put("/{upload_id}/chunks/{index}")
+async def upload_chunk(upload_id: str, index: int, request: Request, current_user: dict = Depends(get_current_user)):
+    """Store one chunk, streamed straight to its own file; re-sending a chunk replaces it"""
+    session = upload_store.get(upload_id, current_user["user_id"])
+    if not 0 <= index < session.total_chunks:
+        raise HTTPException(status_code=400, detail=f"Chunk index must be 0-{session.total_chunks - 1}")
+    expected = session.chunk_length(index)
+
+    temp_path = f"{session.chunk_path(index)}.{uuid.uuid4().hex}.tmp"
+    received = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            async for piece in request.stream():
+                received += len(piece)
+                if received > expected:
+                    raise HTTPException(status_code=413, detail=f"Chunk {index} must be {expected} bytes")
+                await out.write(piece)
+        if received != expected:
+            raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected} bytes, got {received}")
+        os.replace(temp_path, session.chunk_path(index))
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    session.touch()
+    return {"upload_id": upload_id, "index": index, "size": received}
+
+
+@router.get("/{upload_id}")
+async def get_upload_status(upload_id: str, current_user: dict = Depends(get_current_user)):
+    """Which chunks have arrived, so a client can resume with only the missing ones"""
+    return {"complete": False, **upload_store.get(upload_id, current_user["user_id"]).status()}
+
+
+@router.post("/{upload_id}/complete")
+async def complete_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    """Assemble the chunks in order, verify the hash and store the artwork"""
+    session = upload_store.get(upload_id, current_user["user_id"])
+    async with upload_store.complete_lock(upload_id):
+        if not os.path.isdir(session.directory):
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        missing = session.status()["missing"]
+        if missing:
+            raise HTTPException(status_code=409, detail={"error": "Upload is missing chunks", "missing": missing})
+        try:
+            stored = await asyncio.to_thread(_assemble, session)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        upload_store.delete(session)
+    preflight_service.schedule_stored(stored)
+    return _artwork_response(stored, session.meta["filename"], session.meta["content_type"])
+
+
+@router.delete("/{upload_id}")
+async def abort_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    """Discard an upload session and its chunks"""
+    upload_store.delete(upload_store.get(upload_id, current_user["user_id"]))
+    return {"success": True, "upload_id": upload_id}
@@ -13,6 +13,7 @@ import asyncio
 from datetime import datetime
 
 from backend.b2sign_playwright_integration import B2SignPlaywrightIntegration
+from backend.metrics import b2sign_step_duration_seconds, timed
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -80,11 +81,13 @@ async def get_shipping_costs(request: ShippingCostsRequest):
         
         # Initialize B2Sign integration
         integration = B2SignPlaywrightIntegration()
-        init_success = await integration.initialize()
+        with timed(b2sign_step_duration_seconds, step="launch_browser"):
+            init_success = await integration.initialize()
         if not init_success:
             raise HTTPException(status_code=500, detail="Failed to initialize browser for B2Sign integration")
         
-        login_success = await integration.login()
+        with timed(b2sign_step_duration_seconds, step="login"):
+            login_success = await integration.login()
         if not login_success:
             raise HTTPException(status_code=500, detail="Failed to login to B2Sign")
         
@@ -0,0 +1,188 @@
+"""
+Thumbnail Batch Engine
+Generates thumbnails for many images across a process pool sized to the
+machine's cores. JPEGs are decoded at near-thumbnail scale with draft() and
+other formats are box-reduced before the LANCZOS pass, so huge marketplace
+assets never go through a full-resolution resize.
+
+A JSON manifest next to the thumbnails records each source's mtime, size and
+SHA-256. On later runs a source whose mtime and size are unchanged is skipped
+without being read; one that was touched but has the same content is skipped
+after hashing. Re-thumbnailing the whole marketplace therefore only does work
+for new or changed images.
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from PIL import Image
+
+from .generate_thumbnails import (MAX_UPLOAD_PIXELS, SUPPORTED_FORMATS, THUMBNAIL_QUALITY, draft_for_thumbnail,
+                                  square_thumbnail)
+
+MANIFEST_NAME = ".thumbnail_manifest.json"
+
+
+class ThumbnailJob(NamedTuple):
+    source_path: str
+    thumbnail_path: str
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def thumbnail_name(source_path: str) -> str:
+    """Same web-safe name generate_thumbnails has always produced"""
+    name, _ = os.path.splitext(os.path.basename(source_path))
+    name = name.replace(' ', '_').replace('(', '').replace(')', '').replace('-', '_')
+    return f"{name}_thumb.jpg"
+
+
+def collect_images(directory: str, output_dir: str) -> List[ThumbnailJob]:
+    jobs = []
+    for filename in sorted(os.listdir(directory)):
+        _, ext = os.path.splitext(filename.lower())
+        if ext in SUPPORTED_FORMATS:
+            source_path = os.path.join(directory, filename)
+            jobs.append(ThumbnailJob(source_path, os.path.join(output_dir, thumbnail_name(source_path))))
+    return jobs
+
+
+def render_thumbnail(job: ThumbnailJob) -> Dict[str, Any]:
+    """Worker: decode at reduced scale, thumbnail, write. Runs in a pool process."""
+    started = time.perf_counter()
+    temp_path = f"{job.thumbnail_path}.{os.getpid()}.tmp"
+    try:
+        stat = os.stat(job.source_path)
+        # One read serves both the content hash and the decode
+        with open(job.source_path, "rb") as f:
+            data = f.read()
+        with Image.open(BytesIO(data)) as img:
+            if img.width * img.height > MAX_UPLOAD_PIXELS:
+                raise ValueError(f"Image too large: {img.width}x{img.height}")
+            draft_for_thumbnail(img)
+            thumbnail = square_thumbnail(img)
+        thumbnail.save(temp_path, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+        os.replace(temp_path, job.thumbnail_path)
+        return {
+            "success": True,
+            "source_path": job.source_path,
+            "thumbnail_path": job.thumbnail_path,
+            "thumbnail_size": os.path.getsize(job.thumbnail_path),
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "seconds": round(time.perf_counter() - started, 4)
+        }
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return {"success": False, "source_path": job.source_path, "error": str(e)}
+
+
+class ThumbnailManifest:
+    """source path -> {mtime, size, sha256, thumbnail}; written atomically"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    @staticmethod
+    def _key(source_path: str) -> str:
+        return os.path.abspath(source_path)
+
+    def is_current(self, job: ThumbnailJob) -> bool:
+        entry = self.entries.get(self._key(job.source_path))
+        if not entry or entry.get("thumbnail") != job.thumbnail_path or not os.path.exists(job.thumbnail_path):
+            return False
+        stat = os.stat(job.source_path)
+        if entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size:
+            return True
+        # Touched (e.g. re-copied) but possibly unchanged: compare content
+        if entry.get("size") == stat.st_size and entry.get("sha256") == file_sha256(job.source_path):
+            entry["mtime"] = stat.st_mtime
+            return True
+        return False
+
+    def record(self, result: Dict[str, Any]) -> None:
+        self.entries[self._key(result["source_path"])] = {
+            "mtime": result["mtime"],
+            "size": result["size"],
+            "sha256": result["sha256"],
+            "thumbnail": result["thumbnail_path"],
+            "thumbnail_size": result["thumbnail_size"]
+        }
+
+    def save(self) -> None:
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+def run_batch(jobs: List[ThumbnailJob], output_dir: str, workers: Optional[int] = None, force: bool = False,
+              progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Thumbnail every job that is not already up to date. progress(done, total, result)
+    is called in this process as each image finishes (skipped ones included).
+    Returns counts plus per-image results.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = ThumbnailManifest(os.path.join(output_dir, MANIFEST_NAME))
+    summary = {"success": 0, "skipped": 0, "failed": 0, "errors": [], "results": []}
+    total = len(jobs)
+    done = 0
+
+    def finish(result: Dict[str, Any]) -> None:
+        nonlocal done
+        done += 1
+        summary["results"].append(result)
+        if result.get("skipped"):
+            summary["skipped"] += 1
+        elif result["success"]:
+            summary["success"] += 1
+            manifest.record(result)
+        else:
+            summary["failed"] += 1
+            summary["errors"].append(f"{os.path.basename(result['source_path'])}: {result['error']}")
+        if progress:
+            progress(done, total, result)
+
+    pending = []
+    for job in jobs:
+        if not force and manifest.is_current(job):
+            finish({"success": True, "skipped": True, "source_path": job.source_path,
+                    "thumbnail_path": job.thumbnail_path})
+        else:
+            pending.append(job)
+
+    started = time.perf_counter()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending)))
+    if workers == 1:
+        for job in pending:
+            finish(render_thumbnail(job))
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for future in as_completed([pool.submit(render_thumbnail, job) for job in pending]):
+                finish(future.result())
+
+    manifest.save()
+    summary["workers"] = workers
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
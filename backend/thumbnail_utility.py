@@ -8,7 +8,8 @@ Can be used via command line or imported as a module
 import os
 import sys
 import argparse
-from generate_thumbnails import process_single_image, validate_image_file, THUMBNAIL_SIZE, SUPPORTED_FORMATS
+from .generate_thumbnails import process_single_image, validate_image_file, THUMBNAIL_SIZE, THUMBNAIL_DIR, SUPPORTED_FORMATS
+from .thumbnail_batch import collect_images, run_batch
 
 def format_file_size(size_bytes: int) -> str:
     """Format file size in human readable format"""
@@ -51,51 +52,45 @@ def process_image_cli(image_path: str, output_dir: str = None, verbose: bool = F
         print(f"❌ Failed to generate thumbnail: {result['error']}")
         return False
 
-def batch_process_directory(directory_path: str, output_dir: str = None, verbose: bool = False) -> dict:
-    """Process all images in a directory"""
+def batch_process_directory(directory_path: str, output_dir: str = None, verbose: bool = False,
+                            workers: int = None, force: bool = False) -> dict:
+    """Process all images in a directory across a process pool, skipping ones already up to date"""
     print(f"📁 Processing directory: {directory_path}")
     print("=" * 50)
     
     if not os.path.exists(directory_path):
         print(f"❌ Directory not found: {directory_path}")
-        return {'success': 0, 'failed': 0, 'errors': []}
+        return {'success': 0, 'skipped': 0, 'failed': 0, 'errors': []}
     
-    results = {'success': 0, 'failed': 0, 'errors': []}
+    output_dir = output_dir or THUMBNAIL_DIR
+    jobs = collect_images(directory_path, output_dir)
     
-    # Find all image files
-    image_files = []
-    for file in os.listdir(directory_path):
-        _, ext = os.path.splitext(file.lower())
-        if ext in SUPPORTED_FORMATS:
-            image_files.append(os.path.join(directory_path, file))
-    
-    if not image_files:
+    if not jobs:
         print(f"⚠️  No supported image files found in directory")
         print(f"   Supported formats: {', '.join(SUPPORTED_FORMATS)}")
-        return results
+        return {'success': 0, 'skipped': 0, 'failed': 0, 'errors': []}
     
-    print(f"📊 Found {len(image_files)} image files to process")
+    print(f"📊 Found {len(jobs)} image files to process")
     print()
     
-    # Process each image
-    for i, image_path in enumerate(image_files, 1):
-        filename = os.path.basename(image_path)
-        print(f"[{i:2d}/{len(image_files)}] Processing: {filename}")
-        
-        result = process_single_image(image_path, output_dir)
-        
-        if result['success']:
-            print(f"    ✅ Success: {result['thumbnail_url']}")
-            results['success'] += 1
+    def report(done, total, result):
+        filename = os.path.basename(result['source_path'])
+        if result.get('skipped'):
+            if verbose:
+                print(f"[{done:2d}/{total}] ⏭️  Up to date: {filename}")
+        elif result['success']:
+            print(f"[{done:2d}/{total}] ✅ {filename} ({format_file_size(result['thumbnail_size'])}, {result['seconds']:.2f}s)")
         else:
-            print(f"    ❌ Failed: {result['error']}")
-            results['failed'] += 1
-            results['errors'].append(f"{filename}: {result['error']}")
+            print(f"[{done:2d}/{total}] ❌ {filename}: {result['error']}")
+    
+    results = run_batch(jobs, output_dir, workers=workers, force=force, progress=report)
     
     print("\n" + "=" * 50)
     print(f"📊 Batch Processing Summary:")
     print(f"✅ Successful: {results['success']} thumbnails")
+    print(f"⏭️  Up to date: {results['skipped']} thumbnails")
     print(f"❌ Failed: {results['failed']} thumbnails")
+    print(f"⚙️  {results['workers']} worker(s), {results['seconds']:.1f}s")
     
     if results['errors'] and verbose:
         print("\n❌ Errors:")
@@ -112,16 +107,19 @@ def main():
         epilog="""
 Examples:
   # Generate thumbnail for a single image
-  python thumbnail_utility.py image.png
+  python -m backend.thumbnail_utility image.png
   
   # Generate thumbnail with custom output directory
-  python thumbnail_utility.py image.png --output ./thumbnails
+  python -m backend.thumbnail_utility image.png --output ./thumbnails
   
   # Process all images in a directory
-  python thumbnail_utility.py --batch ./images
+  python -m backend.thumbnail_utility --batch ./images
+  
+  # Re-thumbnail everything, ignoring the manifest, on 4 processes
+  python -m backend.thumbnail_utility --batch ./images --force --workers 4
   
   # Verbose output with file size information
-  python thumbnail_utility.py image.png --verbose
+  python -m backend.thumbnail_utility image.png --verbose
         """
     )
     
@@ -129,6 +127,8 @@ Examples:
     parser.add_argument('--output', '-o', help='Output directory for thumbnails (default: marketplace thumbnails)')
     parser.add_argument('--batch', '-b', action='store_true', help='Process all images in the input directory')
     parser.add_argument('--verbose', '-v', action='store_true', help='Show detailed information')
+    parser.add_argument('--workers', '-w', type=int, help='Worker processes for batch mode (default: CPU count)')
+    parser.add_argument('--force', '-f', action='store_true', help='Regenerate thumbnails even if up to date')
     
     args = parser.parse_args()
     
@@ -137,8 +137,8 @@ Examples:
     
     if args.batch:
         # Batch processing
-        results = batch_process_directory(args.input, args.output, args.verbose)
-        success = results['success'] > 0
+        results = batch_process_directory(args.input, args.output, args.verbose, args.workers, args.force)
+        success = (results['success'] + results['skipped']) > 0
     else:
         # Single image processing
         success = process_image_cli(args.input, args.output, args.verbose)
@@ -89,6 +89,8 @@ const Marketplace = () => {
           queryParams.append(key, value)
         }
       })
+      // Cards are at most ~320px wide; 640 covers 2x displays
+      queryParams.append('image_width', 640)
       
       // Use the same API URL as authService but without authentication
       const apiUrl = import.meta.env.VITE_API_URL || 'https://buy-printz-production.up.railway.app'
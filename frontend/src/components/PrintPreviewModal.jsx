@@ -18,6 +18,7 @@ import {
 import { Download, Eye, FileText, Check, X, Printer, CheckCircle, AlertTriangle } from 'lucide-react'
 import jsPDF from 'jspdf'
 import SurfaceThumbnailViewer from './SurfaceThumbnailViewer'
+import { isOrderImagePending, loadOrderImage } from '../utils/orderImage'
 
 const PrintPreviewModal = ({ 
   isOpen, 
@@ -441,7 +442,11 @@ const PrintPreviewModal = ({
         
         // Get images from orderDetails (where they're actually stored after capture)
         const surfaceImages = orderDetails?.surface_images || canvasData?.surface_images
-        const canvasImage = orderDetails?.canvas_image || canvasData?.canvas_image
+        // Orders keep the preview on the API server; null while the order pipeline is still rendering it
+        const canvasImage = (await loadOrderImage(orderDetails)) || canvasData?.canvas_image
+        if (!canvasImage && isOrderImagePending(orderDetails)) {
+          console.log('🎨 Order preview still processing, rendering from canvas data instead')
+        }
         
         console.log('🎨 Debug - orderDetails.surface_images:', orderDetails?.surface_images)
         console.log('🎨 Debug - canvasData.surface_images:', canvasData?.surface_images)
@@ -530,7 +535,7 @@ const PrintPreviewModal = ({
       setIsGenerating(true)
       
       // Get canvas image from canvasData first, fallback to orderDetails
-      let canvasImage = canvasData?.canvas_image || orderDetails?.canvas_image
+      let canvasImage = canvasData?.canvas_image || await loadOrderImage(orderDetails)
       
       // If no canvas image available, generate one from canvas data
       if (!canvasImage) {
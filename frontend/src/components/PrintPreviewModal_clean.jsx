@@ -17,6 +17,7 @@ import {
 } from './ui/index.jsx'
 import { Download, Eye, FileText, Check, X, Printer, CheckCircle, AlertTriangle } from 'lucide-react'
 import jsPDF from 'jspdf'
+import { isOrderImagePending, loadOrderImage } from '../utils/orderImage'
 
 const PrintPreviewModal = ({ 
   isOpen, 
@@ -34,7 +35,7 @@ const PrintPreviewModal = ({
 
   // Generate PDF when modal opens
   useEffect(() => {
-    if (isOpen && (canvasData || orderDetails?.canvas_image)) {
+    if (isOpen && (canvasData || orderDetails?.canvas_image || orderDetails?.canvas_image_url)) {
       generatePDF()
     }
     return () => {
@@ -48,15 +49,16 @@ const PrintPreviewModal = ({
     try {
       setIsGenerating(true)
       
-      // Check if we have a perfect canvas image from the editor
-      if (orderDetails?.canvas_image) {
+      // Check if we have a perfect canvas image from the editor (fetched from the API for stored orders)
+      const canvasImage = await loadOrderImage(orderDetails)
+      if (canvasImage) {
         console.log('Using perfect canvas image for preview!')
         
         // Use the exported canvas image directly
-        setPreviewImage(orderDetails.canvas_image)
+        setPreviewImage(canvasImage)
         
         // Create PDF with the canvas image
-        await createPDFFromImage(orderDetails.canvas_image)
+        await createPDFFromImage(canvasImage)
         return
       }
 
@@ -188,7 +190,9 @@ const PrintPreviewModal = ({
                   <div className="flex items-center justify-center p-12">
                     <div className="text-center space-y-2">
                       <AlertTriangle className="h-8 w-8 text-amber-500 mx-auto" />
-                      <p className="text-sm text-gray-600">No preview available</p>
+                      <p className="text-sm text-gray-600">
+                        {isOrderImagePending(orderDetails) ? 'Your preview is still being prepared...' : 'No preview available'}
+                      </p>
                     </div>
                   </div>
                 )}
@@ -0,0 +1,47 @@
+// Order preview image helpers
+// The order pipeline stores an order's rendered design as a blob on the API
+// server and records its path in order_details.canvas_image_url
+// (/uploads/<sha256>.png). Older orders carry a data URL in canvas_image instead.
+
+const apiUrl = import.meta.env.VITE_API_URL || 'https://buy-printz-production.up.railway.app'
+
+// Absolute URL for a path served by the API (the frontend runs on another origin)
+export const resolveApiUrl = (path) => {
+  if (!path || /^(https?:|data:|blob:)/.test(path)) {
+    return path
+  }
+  return `${apiUrl.replace(/\/$/, '')}${path.startsWith('/') ? '' : '/'}${path}`
+}
+
+// True while the order pipeline has not stored the preview yet
+export const isOrderImagePending = (orderDetails) =>
+  !orderDetails?.canvas_image_url && ['queued', 'running'].includes(orderDetails?.processing?.status)
+
+const blobToDataURL = (blob) => new Promise((resolve, reject) => {
+  const reader = new FileReader()
+  reader.onload = () => resolve(reader.result)
+  reader.onerror = () => reject(reader.error)
+  reader.readAsDataURL(blob)
+})
+
+// The order's preview as a data URL (jsPDF.addImage needs the bytes, not a URL).
+// null when there is none yet (pending) or it could not be fetched.
+export const loadOrderImage = async (orderDetails) => {
+  const source = orderDetails?.canvas_image_url || orderDetails?.canvas_image
+  if (typeof source !== 'string' || !source) {
+    return null
+  }
+  if (source.startsWith('data:')) {
+    return source
+  }
+  try {
+    const response = await fetch(resolveApiUrl(source))
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}`)
+    }
+    return await blobToDataURL(await response.blob())
+  } catch (error) {
+    console.warn('Could not load the order preview image:', error)
+    return null
+  }
+}
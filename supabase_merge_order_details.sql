@@ -0,0 +1,32 @@
+-- Atomic merge into orders.order_details
+-- Run this SQL in your Supabase SQL Editor
+
+-- The order pipeline and status/admin updates each write a few keys of
+-- order_details. A read-modify-write from the API loses whichever update lands
+-- second, so the merge happens in one UPDATE with jsonb ||.
+-- Older rows hold order_details as a JSON-encoded string; those are decoded first.
+CREATE OR REPLACE FUNCTION merge_order_details(order_uuid UUID, updates JSONB)
+RETURNS BOOLEAN AS $$
+DECLARE
+    merged_rows INTEGER;
+BEGIN
+    UPDATE orders
+    SET order_details = (
+            CASE
+                WHEN order_details IS NULL THEN '{}'::jsonb
+                WHEN jsonb_typeof(order_details) = 'string' THEN (order_details #>> '{}')::jsonb
+                ELSE order_details
+            END
+        ) || updates,
+        updated_at = NOW()
+    WHERE id = order_uuid;
+
+    GET DIAGNOSTICS merged_rows = ROW_COUNT;
+    RETURN merged_rows > 0;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION merge_order_details(UUID, JSONB) IS 'Merges keys into orders.order_details in a single statement, so concurrent partial updates are not lost';
+
+-- Example usage (commented out):
+-- SELECT merge_order_details('order-uuid-here', '{"processing": {"status": "completed"}}');
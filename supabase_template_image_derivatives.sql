@@ -0,0 +1,20 @@
+-- Responsive image derivatives for marketplace templates
+-- Run this SQL in your Supabase SQL Editor
+
+-- Manifest written by backend/image_derivatives.py
+ALTER TABLE creator_templates ADD COLUMN IF NOT EXISTS image_derivatives JSONB;
+
+-- Comment explaining the purpose
+COMMENT ON COLUMN creator_templates.image_derivatives IS 'WebP/AVIF derivatives at several widths plus a blur placeholder, so listings load only the size they display';
+
+-- Example structure of image_derivatives:
+-- {
+--   "version": 1,
+--   "sha256": "<source image hash>",
+--   "width": 3000, "height": 2000,
+--   "placeholder": "data:image/webp;base64,...",
+--   "formats": ["avif", "webp"],
+--   "variants": [
+--     {"width": 640, "height": 427, "format": "webp", "url": "/assets/images/Marketplace/derivatives/<id>/640.webp", "bytes": 31244}
+--   ]
+-- }
@@ -102,3 +102,10 @@ def setup_test_environment():
     os.environ.setdefault("SUPABASE_KEY", "test-key")
     os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_123")
     os.environ.setdefault("JWT_SECRET", "test-secret-key")
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Test clients share one address, so give every test fresh per-caller token buckets"""
+    from backend.admission_control import admission_controller
+    admission_controller._buckets.clear()
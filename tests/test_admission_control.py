@@ -0,0 +1,153 @@
+"""
+Tests for admission control (concurrency limits, queues and token buckets)
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import auth, main
+from backend.admission_control import (
+    AdmissionControlMiddleware,
+    AdmissionController,
+    AdmissionRejected,
+    ConcurrencyLimiter,
+    RouteClassConfig,
+    _user_key,
+    classify_path,
+    client_address,
+    default_route_classes,
+    parse_networks,
+)
+
+
+def _config(**overrides) -> RouteClassConfig:
+    values = dict(name="ai", concurrency=1, queue_size=1, queue_timeout=0.2, rate_per_second=100.0, burst=100)
+    values.update(overrides)
+    return RouteClassConfig(**values)
+
+
+def _controller(**overrides) -> AdmissionController:
+    return AdmissionController({
+        "ai": _config(**overrides),
+        "default": _config(name="default", concurrency=10, queue_size=10)
+    })
+
+
+class TestRouteClassification:
+    def test_expensive_routes(self):
+        assert classify_path("/api/ai/chat") == "ai"
+        assert classify_path("/api/shipping-costs/get") == "shipping"
+        assert classify_path("/api/upload-artwork") == "uploads"
+        assert classify_path("/api/uploads/abc/chunks/3") == "upload_chunks"
+        assert classify_path("/api/orders") == "default"
+
+
+class TestConcurrencyLimiter:
+    def test_queue_full_rejects_immediately(self):
+        async def scenario():
+            limiter = ConcurrencyLimiter(_config())
+            await limiter.acquire()
+            queued = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            with pytest.raises(AdmissionRejected) as exc:
+                await limiter.acquire()
+            assert exc.value.status_code == 503
+            limiter.release()
+            await queued
+            assert limiter.in_flight == 1
+            limiter.release()
+            assert limiter.in_flight == 0
+
+        asyncio.run(scenario())
+
+    def test_queue_timeout(self):
+        async def scenario():
+            limiter = ConcurrencyLimiter(_config(queue_timeout=0.05))
+            await limiter.acquire()
+            with pytest.raises(AdmissionRejected):
+                await limiter.acquire()
+            assert limiter.stats()["rejected_queue_timeout"] == 1
+            assert limiter.queue_depth == 0
+            limiter.release()
+            assert limiter.in_flight == 0
+
+        asyncio.run(scenario())
+
+
+class TestTokenBuckets:
+    def test_rate_limit_per_user(self):
+        controller = _controller(rate_per_second=0.01, burst=2)
+        controller.check_rate("ai", "user-a")
+        controller.check_rate("ai", "user-a")
+        with pytest.raises(AdmissionRejected) as exc:
+            controller.check_rate("ai", "user-a")
+        assert exc.value.status_code == 429
+        assert exc.value.retry_after > 0
+        # Other users have their own bucket
+        controller.check_rate("ai", "user-b")
+
+    def test_default_class_has_no_rate_limit(self):
+        controller = AdmissionController(default_route_classes())
+        for _ in range(500):
+            controller.check_rate("default", "ip:203.0.113.9")
+        assert controller.rate_limited["default"] == 0 and not controller._buckets
+
+
+class TestMiddleware:
+    def test_rejections_carry_retry_after(self):
+        app = FastAPI()
+
+        @app.post("/api/ai/chat")
+        async def chat():
+            return {"ok": True}
+
+        app.add_middleware(AdmissionControlMiddleware, controller=_controller(rate_per_second=0.01, burst=1))
+        client = TestClient(app)
+        headers = {"Authorization": "Bearer abc"}
+
+        assert client.post("/api/ai/chat", headers=headers).status_code == 200
+        response = client.post("/api/ai/chat", headers=headers)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+    def test_only_verified_tokens_get_their_own_bucket(self, monkeypatch):
+        cache = auth.TokenCache()
+        monkeypatch.setattr(auth.auth_manager, "token_cache", cache)
+        cache.set_valid(cache.key_for("good"), {"user_id": "u1"}, time.time() + 60)
+
+        def scope(token):
+            return {"headers": [(b"authorization", f"Bearer {token}".encode())], "client": ("10.0.0.1", 5000)}
+
+        assert _user_key(scope("good")) == "u:u1"
+        # Made-up tokens all land in the caller's address bucket
+        assert _user_key(scope("random-1")) == _user_key(scope("random-2")) == "ip:10.0.0.1"
+        assert cache.stats()["hits"] == 0
+
+    def test_forwarded_for_is_read_only_from_trusted_proxies(self):
+        trusted = parse_networks("10.0.0.0/8, not-a-network")
+
+        def scope(peer, forwarded=None):
+            headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+            return {"headers": headers, "client": (peer, 5000)}
+
+        # Behind the proxy, each visitor is told apart by the hop the proxy appended
+        assert client_address(scope("10.1.2.3", "198.51.100.7"), trusted) == "198.51.100.7"
+        assert client_address(scope("10.1.2.3", "1.1.1.1, 198.51.100.7, 10.0.0.5"), trusted) == "198.51.100.7"
+        assert client_address(scope("10.1.2.3"), trusted) == "10.1.2.3"
+        # A client connecting directly cannot choose its own address
+        assert client_address(scope("203.0.113.9", "198.51.100.7"), trusted) == "203.0.113.9"
+
+    def test_stats_require_the_admin_token(self, monkeypatch):
+        monkeypatch.setattr(auth, "ADMIN_API_TOKEN", "operator-token")
+        client = TestClient(main.app)
+        assert client.get("/api/admission/stats").status_code == 403
+        response = client.get("/api/admission/stats", headers={"X-Admin-Token": "operator-token"})
+        assert response.status_code == 200 and "ai" in response.json()["route_classes"]
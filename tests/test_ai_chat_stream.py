@@ -0,0 +1,89 @@
+"""
+Tests for the streaming (SSE) AI chat variant
+"""
+
+import asyncio
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ai_agent_adapter import AIAgentAdapter
+from backend.main import format_sse_event
+
+
+def _chunk(content=None, tool_calls=None):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content, tool_calls=tool_calls))])
+
+
+def _tool_fragment(index, call_id=None, name=None, arguments=None):
+    return SimpleNamespace(index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+class FakeStreamingClient:
+    """Mimics AsyncOpenAI chat.completions.create(stream=True)"""
+
+    def __init__(self, turns):
+        self.turns = list(turns)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        chunks = self.turns.pop(0)
+
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+
+        return stream()
+
+
+def _collect(adapter, query):
+    async def run():
+        return [event async for event in adapter.chat_with_ai_stream(query, {})]
+    return asyncio.run(run())
+
+
+def _adapter(turns):
+    adapter = AIAgentAdapter()
+    adapter.openai_client = FakeStreamingClient(turns)
+    adapter._initialized = True
+    return adapter
+
+
+class TestChatStream:
+    def test_plain_reply_streams_tokens(self):
+        adapter = _adapter([[_chunk("Hel"), _chunk("lo")]])
+        events = _collect(adapter, "hi")
+
+        assert [e["event"] for e in events] == ["token", "token", "done"]
+        assert events[-1]["data"]["response"] == "Hello"
+        assert adapter.openai_client.requests[0]["stream"] is True
+
+    def test_tool_calls_emit_progress_and_canvas(self):
+        # Tool call arguments arrive split across chunks
+        adapter = _adapter([
+            [
+                _chunk(tool_calls=[_tool_fragment(0, "call_1", "add_text", '{"text": "Sa')]),
+                _chunk(tool_calls=[_tool_fragment(0, arguments='le!", "x": 10, "y": 20}')]),
+            ],
+            [_chunk("Added "), _chunk("your text.")],
+        ])
+        events = _collect(adapter, "add sale text")
+        names = [e["event"] for e in events]
+
+        assert names == ["tool_start", "tool_result", "canvas", "token", "token", "done"]
+        assert events[1]["data"]["success"] is True
+        canvas = events[2]["data"]["design_data"]["canvas_data"]
+        assert canvas["objects"][0]["text"] == "Sale!"
+        done = events[-1]["data"]
+        assert done["response"] == "Added your text."
+        assert done["design_modified"] is True
+
+    def test_sse_frame_format(self):
+        frame = format_sse_event("token", {"text": "hi"})
+        assert frame == 'event: token\ndata: {"text": "hi"}\n\n'
+        assert json.loads(frame.split("data: ")[1]) == {"text": "hi"}
@@ -0,0 +1,118 @@
+"""
+Tests for probe-free AI client setup and the provider circuit breaker
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import ai_provider
+from backend.ai_agent_adapter import AIAgentAdapter
+from backend.ai_provider import CircuitBreaker, CircuitOpenError
+
+
+def _connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+
+class TestCircuitBreaker:
+    def test_opens_after_failures_and_recovers_via_trial(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(ai_provider.time, "time", lambda: now[0])
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+        breaker.record(_connection_error())
+        breaker.before_call()
+        breaker.record(_connection_error())
+        assert breaker.state == "open"
+        try:
+            breaker.before_call()
+            assert False, "open circuit should reject"
+        except CircuitOpenError:
+            pass
+
+        now[0] += 31
+        breaker.before_call()  # the single half-open trial
+        try:
+            breaker.before_call()
+            assert False, "only one trial call is allowed"
+        except CircuitOpenError:
+            pass
+        breaker.record(None)
+        assert breaker.state == "closed" and breaker.consecutive_failures == 0
+
+    def test_cancelled_or_lost_trial_is_released(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(ai_provider.time, "time", lambda: now[0])
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record(_connection_error())
+        now[0] += 31
+
+        async def hang(**kwargs):
+            await asyncio.sleep(60)
+
+        adapter = AIAgentAdapter()
+        adapter.circuit_breaker = breaker
+        adapter.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=hang)))
+
+        async def cancelled_trial():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(adapter._create_chat_completion("chat", model="m"), 0.01)
+
+        asyncio.run(cancelled_trial())
+        breaker.before_call()  # the next call is the trial again
+        assert breaker.state == "half_open"
+
+        # A trial that never reports back expires after the cooldown
+        now[0] += 31
+        breaker.before_call()
+
+    def test_client_errors_do_not_trip(self):
+        breaker = CircuitBreaker(failure_threshold=1)
+        bad_request = openai.BadRequestError(
+            "bad", response=httpx.Response(400, request=httpx.Request("POST", "https://x")), body=None)
+        breaker.record(bad_request)
+        assert breaker.state == "closed"
+
+
+class TestAdapterInitialization:
+    def test_initialize_makes_no_request(self, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        adapter = AIAgentAdapter()
+
+        async def run():
+            assert await adapter.initialize()
+            client = adapter.openai_client
+            assert await adapter.initialize()
+            assert adapter.openai_client is client
+            await adapter.cleanup()
+
+        # Any network access would fail here; initialize must not call the API
+        asyncio.run(run())
+
+    def test_open_circuit_fails_fast(self):
+        calls = []
+
+        async def create(**kwargs):
+            calls.append(kwargs)
+            raise _connection_error()
+
+        adapter = AIAgentAdapter()
+        adapter.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        adapter.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        adapter._initialized = True
+
+        first = asyncio.run(adapter.chat_with_ai("hi", {}))
+        second = asyncio.run(adapter.chat_with_ai("hi", {}))
+        assert first["success"] is False and second["success"] is False
+        assert "AI provider unavailable" in second["error"]
+        assert len(calls) == 1
+        health = asyncio.run(adapter.get_health())
+        assert health["status"] in ("degraded", "unhealthy") and health["provider"]["circuit"] == "open"
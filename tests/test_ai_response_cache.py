@@ -0,0 +1,86 @@
+"""
+Tests for the semantic-key AI response cache
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ai_agent_adapter import AIAgentAdapter
+from backend.ai_response_cache import ResponseCache, cache_key
+
+
+class TestCacheKey:
+    def test_equivalent_requests_share_a_key(self):
+        a = cache_key("recs", {"use_case": "Trade Show Booth!", "dimensions": {"width": 4.0, "height": 8}, "budget": None},
+                      "model", "1")
+        b = cache_key("recs", {"dimensions": {"height": 8, "width": 4}, "use_case": "  trade show   booth "},
+                      "model", "1")
+        assert a == b
+
+    def test_model_and_prompt_version_change_the_key(self):
+        request = {"use_case": "yard sale"}
+        assert cache_key("recs", request, "model", "1") != cache_key("recs", request, "model", "2")
+        assert cache_key("recs", request, "model", "1") != cache_key("recs", request, "other-model", "1")
+
+
+class TestResponseCache:
+    def test_ttl_and_lru(self, monkeypatch):
+        cache = ResponseCache(ttl=10, max_entries=2, cache_dir="")
+        now = [1000.0]
+        monkeypatch.setattr("backend.ai_response_cache.time.time", lambda: now[0])
+
+        cache.set("a", {"v": 1})
+        cache.set("b", {"v": 2})
+        assert cache.get("a") == {"v": 1}
+        cache.set("c", {"v": 3})  # evicts b, the least recently used
+        assert cache.get("b") is None
+        now[0] += 11
+        assert cache.get("a") is None
+
+    def test_persists_to_disk(self, tmp_path):
+        ResponseCache(ttl=60, max_entries=4, cache_dir=str(tmp_path)).set("k", {"response": "hi"})
+        assert ResponseCache(ttl=60, max_entries=4, cache_dir=str(tmp_path)).get("k") == {"response": "hi"}
+
+    def test_recommendations_hit_the_cache(self):
+        adapter = AIAgentAdapter()
+        adapter.response_cache = ResponseCache(ttl=60, max_entries=8, cache_dir="")
+        calls = []
+
+        async def fake_chat(query, context):
+            calls.append(query)
+            await asyncio.sleep(0.01)
+            return {"success": True, "response": "Use 13oz vinyl"}
+
+        adapter.chat_with_ai = fake_chat
+
+        async def run():
+            # Concurrent identical misses share one upstream call
+            first = await asyncio.gather(
+                adapter.get_banner_recommendations("Yard sale", {"width": 3, "height": 6}, 50),
+                adapter.get_banner_recommendations("yard sale", {"width": 3, "height": 6}, 50.0),
+            )
+            again = await adapter.get_banner_recommendations("YARD SALE.", {"height": 6, "width": 3}, 50)
+            return first, again
+
+        first, again = asyncio.run(run())
+        assert len(calls) == 1
+        assert first[0]["response"] == first[1]["response"] == "Use 13oz vinyl"
+        assert again["cached"] is True
+        assert adapter.response_cache.stats()["hits"] == 1
+
+    def test_failures_are_not_cached(self):
+        adapter = AIAgentAdapter()
+        adapter.response_cache = ResponseCache(ttl=60, max_entries=8, cache_dir="")
+        calls = []
+
+        async def failing_chat(query, context):
+            calls.append(query)
+            return {"success": False, "error": "rate limited"}
+
+        adapter.chat_with_ai = failing_chat
+        asyncio.run(adapter.get_design_assistance("retail", {"text": "Sale"}))
+        asyncio.run(adapter.get_design_assistance("retail", {"text": "Sale"}))
+        assert len(calls) == 2
@@ -0,0 +1,61 @@
+"""
+Tests for decorator-registered AI tools and table dispatch
+"""
+
+import asyncio
+import os
+import sys
+from typing import Any, Dict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ai_agent_adapter import SYSTEM_PROMPT, AIAgentAdapter, sidebar_tools
+from backend.ai_tool_registry import ToolRegistry
+
+
+class TestToolRegistry:
+    def test_schema_from_signature(self):
+        registry = ToolRegistry()
+
+        @registry.tool(params={"align": {"enum": ["left", "right"], "description": "Text alignment"}})
+        async def _add_label(self, user_id: str, text: str, size: int = 12, align: str = "left",
+                             meta: Dict[str, Any] = None) -> Dict[str, Any]:
+            """Add a label
+
+            Longer notes that are not part of the tool description.
+            """
+            return {"success": True, "text": text, "size": size}
+
+        schema = registry.schemas()[0]["function"]
+        assert schema["name"] == "add_label"
+        assert schema["description"] == "Add a label"
+        props = schema["parameters"]["properties"]
+        assert props["user_id"] == {"type": "string", "description": "User ID"}
+        assert props["size"] == {"type": "number"}
+        assert props["align"] == {"type": "string", "enum": ["left", "right"], "description": "Text alignment"}
+        assert props["meta"]["type"] == "object"
+        assert schema["parameters"]["required"] == ["user_id", "text"]
+        # Built once and reused
+        assert registry.schemas() is registry.schemas()
+
+        # Omitted optional arguments fall back to the handler defaults; unknown ones are dropped
+        result = asyncio.run(registry.dispatch(None, "add_label", {"user_id": "u", "text": "Hi", "size": None, "bogus": 1}))
+        assert result == {"success": True, "text": "Hi", "size": 12}
+        assert asyncio.run(registry.dispatch(None, "nope", {})) == {"error": "Unknown function: nope"}
+
+    def test_adapter_tools_are_registered(self):
+        adapter = AIAgentAdapter()
+        names = {tool["function"]["name"] for tool in adapter.available_tools}
+        assert {"add_text", "add_qr_code", "move_element", "generate_banner_from_prompt",
+                "get_design_recommendations"} <= names
+        assert "generate_qr_code" not in names and "generate_qr_code" in sidebar_tools
+
+        result = asyncio.run(adapter._execute_tool_function("get_banner_products", {}, {}))
+        assert result["products"][0]["id"] == "banner"
+
+    def test_system_prompt_prefix_is_stable(self):
+        adapter = AIAgentAdapter()
+        message = adapter._build_system_message({"user_id": "u1"})
+        assert message.startswith(SYSTEM_PROMPT)
+        assert message.endswith('{"user_id":"u1"}')
+        assert adapter._build_system_message({}) == SYSTEM_PROMPT
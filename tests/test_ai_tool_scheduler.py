@@ -0,0 +1,124 @@
+"""
+Tests for concurrent AI tool execution with per-design ordering
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ai_tool_scheduler import ToolScheduler, ai_tool_duration_seconds
+from backend.design_session import current_design_session, design_session
+
+
+class FakeDB:
+    def __init__(self):
+        self.updates = []
+
+    async def get_design(self, design_id):
+        return {"id": design_id, "canvas_data": {"objects": [{"id": "text_1", "type": "text", "text": "Hello"}]}}
+
+    async def update_design(self, design_id, update_data):
+        self.updates.append((design_id, update_data))
+        return {"success": True}
+
+
+def _call(call_id: str, name: str, **args):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+
+
+class TestToolScheduler:
+    def test_independent_calls_run_concurrently(self):
+        async def executor(name, args, context):
+            await asyncio.sleep(0.1)
+            return {"success": True, "tool": name}
+
+        calls = [_call(str(i), "add_icon", design_id=f"design-{i}") for i in range(5)]
+        start = time.perf_counter()
+        results = asyncio.run(ToolScheduler(executor).run(calls, {}))
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.3
+        assert [r["tool_call_id"] for r in results] == ["0", "1", "2", "3", "4"]
+        assert all(r["duration"] >= 0.09 for r in results)
+
+    def test_same_design_calls_keep_order(self):
+        order = []
+
+        async def executor(name, args, context):
+            # Later calls are faster, so they would finish first if run concurrently
+            await asyncio.sleep(0.05 if name == "add_text" else 0.01)
+            order.append(name)
+            return {"success": True}
+
+        calls = [
+            _call("a", "add_text", design_id="d1"),
+            _call("b", "move_element", design_id="d1"),
+            _call("c", "list_available_icons"),
+        ]
+        asyncio.run(ToolScheduler(executor).run(calls, {}))
+        assert order.index("add_text") < order.index("move_element")
+        assert order[0] == "list_available_icons"
+
+    def test_errors_are_isolated(self):
+        async def executor(name, args, context):
+            if name == "explode":
+                raise RuntimeError("boom")
+            if name == "slow":
+                await asyncio.sleep(1)
+            return {"success": True}
+
+        calls = [
+            _call("1", "explode", design_id="d1"),
+            _call("2", "add_text", design_id="d1"),
+            _call("3", "slow"),
+            SimpleNamespace(id="4", function=SimpleNamespace(name="add_circle", arguments="{not json")),
+        ]
+        results = asyncio.run(ToolScheduler(executor, timeout=0.05).run(calls, {}))
+
+        assert results[0]["result"] == {"success": False, "error": "boom"}
+        assert results[1]["result"] == {"success": True}
+        assert "timed out" in results[2]["result"]["error"]
+        assert "Invalid arguments" in results[3]["result"]["error"]
+
+    def test_unregistered_tool_names_are_labelled_unknown(self):
+        async def executor(name, args, context):
+            return {"success": False, "error": f"Unknown function: {name}"}
+
+        calls = [_call("1", "made_up_tool_8f3a"), _call("2", "add_text")]
+        asyncio.run(ToolScheduler(executor, known_tools={"add_text"}).run(calls, {}))
+
+        assert ai_tool_duration_seconds.quantile(0.5, tool="unknown", outcome="failed") is not None
+        assert ai_tool_duration_seconds.quantile(0.5, tool="made_up_tool_8f3a", outcome="failed") is None
+        assert ai_tool_duration_seconds.quantile(0.5, tool="add_text", outcome="failed") is not None
+
+    def test_timed_out_edit_is_rolled_back(self):
+        db = FakeDB()
+
+        async def executor(name, args, context):
+            design = await current_design_session().get(args["design_id"])
+            if name == "slow_edit":
+                design.add({"id": "partial_1", "type": "rect"})
+                await asyncio.sleep(1)
+            else:
+                design.update(design.find("text_1"), text="Edited")
+            return {"success": True}
+
+        calls = [_call("1", "edit_text", design_id="d1"), _call("2", "slow_edit", design_id="d1"),
+                 _call("3", "slow_edit", design_id="d2")]
+
+        async def turn():
+            async with design_session(db):
+                return await ToolScheduler(executor, timeout=0.05).run(calls, {})
+
+        results = asyncio.run(turn())
+
+        assert "timed out" in results[1]["result"]["error"]
+        # d1 keeps the completed edit but not the partial one; d2 was only touched by the timed-out call
+        assert [design_id for design_id, _ in db.updates] == ["d1"]
+        objects = db.updates[0][1]["canvas_data"]["objects"]
+        assert objects == [{"id": "text_1", "type": "text", "text": "Edited"}]
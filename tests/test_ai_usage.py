@@ -0,0 +1,113 @@
+"""
+Tests for AI token/cost accounting and per-user budgets
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import ai_usage
+from backend.ai_agent_adapter import AIAgentAdapter
+from backend.ai_usage import UsageTracker, current_ai_user, estimate_cost, require_ai_budget
+from backend.auth import get_current_user
+
+
+def _usage(prompt, completion, cached=0):
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion,
+                           prompt_tokens_details=SimpleNamespace(cached_tokens=cached))
+
+
+class TestUsageTracker:
+    def test_aggregates_per_user_tool_and_operation(self):
+        tracker = UsageTracker(budget_usd=0)
+        tracker.record("chat", "m", _usage(1000, 200, cached=800), 0.5, user_id="u1")
+        tracker.record("chat_followup", "m", {"prompt_tokens": 400, "completion_tokens": 100}, 0.2,
+                       user_id="u1", tools=["add_text", "add_icon"])
+
+        snapshot = tracker.snapshot()
+        user = snapshot["users"][0]
+        assert user["user_id"] == "u1"
+        assert user["prompt_tokens"] == 1400 and user["cached_tokens"] == 800 and user["calls"] == 2
+        assert snapshot["tools"]["add_text"]["completion_tokens"] == 50
+        assert snapshot["operations"]["chat"]["mean_latency"] == 0.5
+        # Cached prompt tokens are billed at the discounted rate
+        assert estimate_cost(1000, 0, 800) < estimate_cost(1000, 0, 0)
+
+    def test_rolling_budget(self, monkeypatch):
+        tracker = UsageTracker(budget_usd=0.001, window=60)
+        now = [1000.0]
+        monkeypatch.setattr(ai_usage.time, "time", lambda: now[0])
+
+        tracker.record("chat", "m", _usage(0, 600), 0.1, user_id="u1")  # $0.0012 at default prices
+        assert tracker.over_budget("u1")
+        assert not tracker.over_budget("u2")
+        now[0] += 61
+        assert not tracker.over_budget("u1")
+
+    def test_per_user_state_is_bounded(self, monkeypatch):
+        tracker = UsageTracker(budget_usd=0, window=60, max_users=2)
+        now = [1000.0]
+        monkeypatch.setattr(ai_usage.time, "time", lambda: now[0])
+
+        for user_id in ("u1", "u2", "u1", "u3"):
+            tracker.record("chat", "m", _usage(100, 10), 0.1, user_id=user_id)
+        # u2 was the least recently active user
+        assert [user["user_id"] for user in tracker.snapshot()["users"]] == ["u1", "u3"]
+        assert set(tracker._recent) == {"u1", "u2", "u3"}
+
+        # Once the window rolls over, idle users' windows are dropped
+        now[0] += 61
+        tracker.record("chat", "m", _usage(100, 10), 0.1, user_id="u4")
+        assert set(tracker._recent) == {"u4"}
+
+
+class TestBudgetDependency:
+    def test_over_budget_user_gets_429(self, monkeypatch):
+        tracker = UsageTracker(budget_usd=0.001, window=3600)
+        tracker.record("chat", "m", _usage(0, 1000), 0.1, user_id="spender")
+        monkeypatch.setattr(ai_usage, "usage_tracker", tracker)
+
+        app = FastAPI()
+        user = {"user_id": "spender"}
+        app.dependency_overrides[get_current_user] = lambda: user
+
+        @app.get("/ai")
+        async def ai(current_user: dict = Depends(require_ai_budget)):
+            return {"billed_to": current_ai_user.get()}
+
+        client = TestClient(app)
+        response = client.get("/ai")
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) > 0
+
+        user["user_id"] = "someone_else"
+        assert client.get("/ai").json() == {"billed_to": "someone_else"}
+
+
+class TestAdapterAccounting:
+    def test_chat_records_usage_for_current_user(self, monkeypatch):
+        tracker = UsageTracker(budget_usd=0)
+        monkeypatch.setattr("backend.ai_agent_adapter.usage_tracker", tracker)
+
+        async def create(**kwargs):
+            message = SimpleNamespace(content="Hi there", tool_calls=None)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=_usage(120, 30, cached=100))
+
+        adapter = AIAgentAdapter()
+        adapter.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        adapter._initialized = True
+
+        async def run():
+            current_ai_user.set("u42")
+            return await adapter.chat_with_ai("hello", {})
+
+        assert asyncio.run(run())["response"] == "Hi there"
+        user = tracker.snapshot()["users"][0]
+        assert user["user_id"] == "u42"
+        assert (user["prompt_tokens"], user["completion_tokens"], user["cached_tokens"]) == (120, 30, 100)
@@ -0,0 +1,195 @@
+"""
+Tests for print-readiness preflight of uploaded artwork
+"""
+
+import hashlib
+import os
+import sys
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import artwork_preflight, artwork_storage, main
+from backend.artwork_preflight import (ArtworkPreflightService, analyze_artwork, evaluate_artwork, parse_print_size,
+                                       preflight_jobs)
+from backend.auth import get_current_user
+from backend.print_export import PrintSpec, order_print_jobs, tin_print_jobs
+
+
+def _png(size, color, mode="RGB"):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _checks(report):
+    return {check["check"]: check["status"] for check in report["checks"]}
+
+
+class TestAnalyzeArtwork:
+    def test_raster_facts(self, tmp_path):
+        Image.new("CMYK", (600, 300), (0, 0, 0, 255)).save(tmp_path / "cmyk.jpg", dpi=(300, 300))
+        cmyk = analyze_artwork(str(tmp_path / "cmyk.jpg"))
+        assert (cmyk["valid"], cmyk["format"], cmyk["color_mode"]) == (True, "JPEG", "CMYK")
+        assert (cmyk["width"], cmyk["height"], cmyk["embedded_dpi"]) == (600, 300, [300.0, 300.0])
+        assert cmyk["transparent"] is False
+
+        opaque = Image.new("RGBA", (50, 50), (255, 0, 0, 255))
+        opaque.save(tmp_path / "opaque.png")
+        assert analyze_artwork(str(tmp_path / "opaque.png"))["transparent"] is False
+        opaque.putpixel((3, 3), (0, 0, 0, 0))
+        opaque.save(tmp_path / "cutout.png")
+        cutout = analyze_artwork(str(tmp_path / "cutout.png"))
+        assert cutout["has_alpha"] and cutout["transparent"] and cutout["color_mode"] == "RGB"
+
+        (tmp_path / "broken.png").write_bytes(b"not an image")
+        broken = analyze_artwork(str(tmp_path / "broken.png"))
+        assert broken["valid"] is False and "Invalid image" in broken["error"]
+
+    def test_pdf_page_size_and_colour(self, tmp_path):
+        (tmp_path / "art.pdf").write_bytes(
+            b"%PDF-1.4\n1 0 obj << /Type /Pages /Kids [2 0 R] >> endobj\n"
+            b"2 0 obj << /Type /Page /MediaBox [0 0 1728 3456] /Resources << /ColorSpace /DeviceCMYK >> >> endobj\n")
+        pdf = analyze_artwork(str(tmp_path / "art.pdf"))
+        assert pdf["vector"] and pdf["pages"] == 1 and pdf["color_mode"] == "CMYK"
+        assert (pdf["width_in"], pdf["height_in"]) == (24.0, 48.0)
+
+
+class TestEvaluate:
+    def test_resolution_follows_print_size_and_orientation(self):
+        analysis = {"valid": True, "vector": False, "width": 7200, "height": 3600, "color_mode": "RGB"}
+        # A 2x4 ft banner printed landscape to match the artwork
+        report = evaluate_artwork(analysis, 24, 48)
+        assert report["effective_dpi"] == 150 and report["status"] == "pass"
+        assert (report["width_in"], report["height_in"]) == (48, 24)
+
+        low = evaluate_artwork({**analysis, "width": 2400, "height": 1200}, 24, 48)
+        assert low["status"] == "fail" and low["ready"] is False and low["effective_dpi"] == 50
+
+        square = evaluate_artwork({**analysis, "height": 7200}, 24, 48)
+        assert _checks(square)["bleed"] == "warn" and "top and bottom" in square["checks"][-1]["message"]
+
+    def test_tin_requirements(self):
+        analysis = {"valid": True, "vector": False, "width": 1200, "height": 720, "color_mode": "RGB",
+                    "transparent": True}
+        report = evaluate_artwork(analysis, 3.74, 2.25, product_type="business_card_tin", dpi=300)
+        assert _checks(report) == {"resolution": "pass", "color_mode": "warn", "transparency": "warn", "bleed": "pass"}
+        assert evaluate_artwork({"valid": False, "error": "bad"}, 1, 1)["status"] == "fail"
+
+    def test_parse_print_size(self):
+        assert parse_print_size("2x4") == (24, 48)
+        assert parse_print_size("24x36in") == (24, 36)
+        assert parse_print_size("800x400px (landscape)") is None and parse_print_size(None) is None
+        assert parse_print_size("0x4") is None
+
+
+class TestPreflightJobs:
+    def test_placed_artwork_reads_the_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(artwork_storage, "UPLOAD_DIR", str(tmp_path / "uploads"))
+        os.makedirs(tmp_path / "uploads")
+        artwork = _png((600, 300), (0, 128, 255))
+        sha256 = hashlib.sha256(artwork).hexdigest()
+        (tmp_path / "uploads" / f"{sha256}.png").write_bytes(artwork)
+
+        canvas = {"width": 400, "height": 200, "objects": [
+            {"id": "photo", "type": "image", "x": 100, "y": 50, "width": 200, "height": 100,
+             "image": f"/uploads/{sha256}.png"},
+            {"id": "gone", "type": "image", "x": 0, "y": 0, "width": 400, "height": 200,
+             "image": f"/uploads/{'f' * 64}.png"},
+            {"type": "image", "image": "https://example.com/remote.png"},
+        ]}
+        jobs = order_print_jobs({"canvas_data": canvas, "dimensions": {"width": 1, "height": 2}})
+        service = ArtworkPreflightService(str(tmp_path / "preflight"), workers=1)
+        try:
+            pending = preflight_jobs(jobs, service=service)
+            assert [item["status"] for item in pending["items"]] == ["pending", "fail"]
+            service._inflight[sha256].result(timeout=60)
+            assert os.path.exists(tmp_path / "preflight" / f"{sha256}.json")
+
+            # A fresh service (after a restart) finds the analysis on disk
+            report = preflight_jobs(jobs, service=ArtworkPreflightService(str(tmp_path / "preflight")))
+            photo = report["items"][0]
+            # 200 of 400 design units on a 24 in wide print: 12 in for 600 px
+            assert photo["element_id"] == "photo" and photo["effective_dpi"] == 50
+            assert _checks(photo) == {"resolution": "fail", "color_mode": "pass", "transparency": "pass",
+                                      "bleed": "pass"}
+            assert report["status"] == "fail" and report["items"][1]["checks"][0]["message"] == "Artwork file is missing"
+        finally:
+            service.shutdown()
+
+    def test_broken_worker_pool_is_replaced(self, tmp_path):
+        (tmp_path / "art.png").write_bytes(_png((20, 10), (255, 0, 0)))
+        service = ArtworkPreflightService(str(tmp_path / "preflight"), workers=1)
+        try:
+            broken = service.pool
+            assert broken._mp_context.get_start_method() == "spawn"
+            broken.submit(os._exit, 1).exception(timeout=60)
+            future = service.schedule("b" * 64, str(tmp_path / "art.png"))
+            assert future.result(timeout=60)["width"] == 20 and service.pool is not broken
+        finally:
+            service.shutdown()
+
+    def test_failed_analysis_is_reported_not_raised(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(main, "preflight_service", ArtworkPreflightService(str(tmp_path / "preflight")))
+        sha256 = "c" * 64
+        failed: Future = Future()
+        failed.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        main.preflight_service._inflight[sha256] = failed
+        main.app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+        try:
+            response = TestClient(main.app).get(f"/api/upload-artwork/{sha256}/preflight",
+                                                params={"banner_size": "2x4"})
+            assert response.status_code == 200
+            body = response.json()
+            assert body["analysis"] == {"valid": False,
+                                        "error": "Artwork could not be analysed: A child process terminated abruptly"}
+            assert body["preflight"]["status"] == "fail"
+        finally:
+            main.app.dependency_overrides.clear()
+
+    def test_tin_surfaces_use_sticker_size(self, tmp_path):
+        service = ArtworkPreflightService(str(tmp_path))
+        sha256 = "a" * 64
+        service._store(sha256, {"valid": True, "vector": False, "width": 1122, "height": 675, "color_mode": "CMYK",
+                                "transparent": False, "version": artwork_preflight.ANALYSIS_VERSION})
+        tin = {"surface_designs": {"front": {"elements": [
+            {"type": "image", "x": 0, "y": 0, "width": 374, "height": 225, "image": f"/uploads/{sha256}.jpg"}]}}}
+        [item] = preflight_jobs(tin_print_jobs(tin), "business_card_tin", service=service)["items"]
+        assert item["label"] == "front" and item["effective_dpi"] == 300
+        bleed = item["checks"][-1]
+        assert bleed["status"] == "warn" and set(bleed["edges"]) == {"left", "top", "right", "bottom"}
+        assert PrintSpec(3.74, 2.25, 300).output_size((374, 225))[:2] == (1122, 675)
+
+
+class TestPreflightEndpoints:
+    def test_upload_then_preflight(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(artwork_storage, "UPLOAD_DIR", str(tmp_path / "uploads"))
+        monkeypatch.setattr(artwork_preflight, "PREFLIGHT_CACHE_DIR", str(tmp_path / "preflight"))
+        main.app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+        try:
+            client = TestClient(main.app)
+            artwork = _png((3600, 1800), (255, 255, 255))
+            uploaded = client.post("/api/upload-artwork", files={"file": ("art.png", artwork, "image/png")}).json()
+            sha256 = uploaded["sha256"]
+            assert uploaded["preflight_url"] == f"/api/upload-artwork/{sha256}/preflight"
+
+            result = client.get(uploaded["preflight_url"], params={"banner_size": "2x4"}).json()
+            assert result["analysis"]["width"] == 3600 and result["preflight"]["effective_dpi"] == 75
+            for params in ({"banner_size": "800x400px"}, {"banner_size": "0x4"}, {"width_in": 0, "height_in": 24},
+                           {"width_in": -24, "height_in": 24}, {"width_in": 24}):
+                assert client.get(uploaded["preflight_url"], params=params).status_code == 400
+            assert client.get(f"/api/upload-artwork/{'0' * 64}/preflight").status_code == 404
+
+            checkout = client.post("/api/orders/preflight", json={
+                "canvas_data": {"width": 800, "height": 400, "objects": [
+                    {"type": "image", "x": 0, "y": 0, "width": 800, "height": 400, "image": uploaded["file_url"]}]},
+                "dimensions": {"width": 2, "height": 4}}).json()["preflight"]
+            assert checkout["items"][0]["effective_dpi"] == 75 and checkout["status"] == "fail"
+        finally:
+            main.app.dependency_overrides.clear()
+            artwork_preflight.preflight_service.shutdown()
@@ -0,0 +1,48 @@
+"""
+Tests for streamed, content-addressed artwork uploads
+"""
+
+import hashlib
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import artwork_preflight, artwork_storage, main
+from backend.auth import get_current_user
+
+
+class TestUploadArtwork:
+    def test_dedupe_fast_path_and_size_limit(self, tmp_path, tmp_path_factory, monkeypatch):
+        monkeypatch.setattr(artwork_storage, "UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(artwork_preflight, "PREFLIGHT_CACHE_DIR", str(tmp_path_factory.mktemp("preflight")))
+        monkeypatch.setattr(artwork_storage, "UPLOAD_CHUNK_SIZE", 1024)
+        monkeypatch.setattr(artwork_storage, "MAX_FILE_SIZE", 10_000)
+        main.app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+        try:
+            client = TestClient(main.app)
+            logo = os.urandom(5000)
+            sha256 = hashlib.sha256(logo).hexdigest()
+
+            assert client.get(f"/api/upload-artwork/{sha256}").status_code == 404
+
+            first = client.post("/api/upload-artwork", files={"file": ("logo.png", logo, "image/png")}).json()
+            again = client.post("/api/upload-artwork", files={"file": ("copy.png", logo, "image/png")}).json()
+            assert first["sha256"] == sha256 and first["file_url"] == f"/uploads/{sha256}.png"
+            assert (first["deduplicated"], again["deduplicated"]) == (False, True)
+            assert again["file_url"] == first["file_url"] and again["original_name"] == "copy.png"
+            assert os.listdir(tmp_path) == [f"{sha256}.png"]
+
+            known = client.get(f"/api/upload-artwork/{sha256}").json()
+            assert known["file_url"] == first["file_url"] and known["size"] == 5000
+
+            too_big = client.post("/api/upload-artwork", files={"file": ("big.png", b"x" * 10_001, "image/png")})
+            assert too_big.status_code == 413
+            wrong_type = client.post("/api/upload-artwork", files={"file": ("a.exe", b"x", "application/x-msdownload")})
+            assert wrong_type.status_code == 400
+            # Neither the rejected upload nor a partial file is left behind
+            assert os.listdir(tmp_path) == [f"{sha256}.png"]
+        finally:
+            main.app.dependency_overrides.pop(get_current_user, None)
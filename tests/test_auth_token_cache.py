@@ -0,0 +1,108 @@
+"""
+Tests for the verified-token cache in backend.auth
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import auth
+from backend.auth import AuthManager, TokenCache
+
+TEST_SECRET = "test-secret-key"
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(auth, "SECRET_KEY", TEST_SECRET)
+    return AuthManager()
+
+
+def _credentials(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def _get_user(manager: AuthManager, token: str) -> dict:
+    return asyncio.run(manager.get_current_user(_credentials(token)))
+
+
+class TestTokenVerification:
+    """Single-pass verification of our own and Supabase tokens"""
+
+    def test_own_jwt(self, manager):
+        token = jwt.encode({"sub": "user-1", "exp": int(time.time()) + 60}, TEST_SECRET, algorithm="HS256")
+        assert _get_user(manager, token) == {"user_id": "user-1", "token_type": "jwt"}
+
+    def test_supabase_token_with_audience(self, manager):
+        token = jwt.encode(
+            {"sub": "user-2", "aud": "authenticated", "exp": int(time.time()) + 60},
+            TEST_SECRET,
+            algorithm="HS256"
+        )
+        assert _get_user(manager, token) == {"user_id": "user-2", "token_type": "supabase_verified"}
+
+    def test_wrong_secret_rejected(self, manager):
+        token = jwt.encode({"sub": "user-3", "exp": int(time.time()) + 60}, "other-secret", algorithm="HS256")
+        with pytest.raises(HTTPException) as exc:
+            _get_user(manager, token)
+        assert exc.value.status_code == 401
+
+    def test_unexpected_algorithm_rejected(self, manager):
+        token = jwt.encode({"sub": "user-4", "exp": int(time.time()) + 60}, TEST_SECRET, algorithm="HS512")
+        with pytest.raises(HTTPException):
+            _get_user(manager, token)
+
+
+class TestTokenCache:
+    """Positive and negative caching of verification results"""
+
+    def test_valid_token_is_cached(self, manager, monkeypatch):
+        token = jwt.encode({"sub": "user-1", "exp": int(time.time()) + 60}, TEST_SECRET, algorithm="HS256")
+        _get_user(manager, token)
+
+        def fail_decode(*args, **kwargs):
+            raise AssertionError("token should be served from cache")
+
+        monkeypatch.setattr(auth.jwt, "decode", fail_decode)
+        assert _get_user(manager, token)["user_id"] == "user-1"
+        assert manager.token_cache.stats()["hits"] == 1
+
+    def test_cached_user_is_a_copy(self, manager):
+        token = jwt.encode({"sub": "user-1", "exp": int(time.time()) + 60}, TEST_SECRET, algorithm="HS256")
+        _get_user(manager, token)["user_id"] = "tampered"
+        assert _get_user(manager, token)["user_id"] == "user-1"
+
+    def test_invalid_token_is_cached_negatively(self, manager):
+        with pytest.raises(HTTPException) as first:
+            _get_user(manager, "not-a-jwt")
+        with pytest.raises(HTTPException) as cached:
+            _get_user(manager, "not-a-jwt")
+        assert manager.token_cache.stats()["hits"] == 1
+        # A repeated bad token gets the same response as the first one
+        assert (cached.value.status_code, cached.value.detail, cached.value.headers) == (
+            401, "Invalid token", {"WWW-Authenticate": "Bearer"})
+        assert (first.value.detail, first.value.headers) == (cached.value.detail, cached.value.headers)
+
+    def test_entry_expires_with_token(self):
+        cache = TokenCache(max_size=4)
+        cache.set_valid("k", {"user_id": "u"}, time.time() - 1)
+        assert cache.get("k") is None
+
+    def test_lru_bound(self):
+        cache = TokenCache(max_size=2)
+        future = time.time() + 60
+        cache.set_valid("a", {"user_id": "a"}, future)
+        cache.set_valid("b", {"user_id": "b"}, future)
+        cache.get("a")
+        cache.set_valid("c", {"user_id": "c"}, future)
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
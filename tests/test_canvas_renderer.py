@@ -0,0 +1,137 @@
+"""
+Tests for the server-side canvas-to-PNG proof renderer
+"""
+
+import base64
+import os
+import sys
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import artwork_storage, canvas_renderer
+from backend.canvas_renderer import (DecodedImageCache, load_font, parse_color, proof_data_url, render_canvas,
+                                     render_proof_png, wrap_text)
+
+
+def _canvas(*objects, **extra):
+    return {"width": 400, "height": 200, "background": "#ffffff", "objects": list(objects), **extra}
+
+
+class TestRenderCanvas:
+    def test_shapes_follow_konva_geometry(self):
+        image = render_canvas(_canvas(
+            {"type": "rect", "x": 10, "y": 10, "width": 40, "height": 20, "fill": "#ff0000", "strokeWidth": 0},
+            {"type": "circle", "x": 200, "y": 100, "radius": 30, "fill": "#00ff00", "strokeWidth": 0},
+            {"type": "hexagon", "x": 340, "y": 100, "radius": 40, "fill": "#0000ff", "strokeWidth": 0},
+            {"type": "star", "x": 100, "y": 150, "outerRadius": 30, "innerRadius": 15, "fill": "#000000"},
+            {"type": "unknown-type"},
+        ), scale=2)
+        assert image.size == (800, 400) and image.mode == "RGB"
+        assert image.getpixel((60, 40)) == (255, 0, 0)          # rect from its top-left corner
+        assert image.getpixel((120, 40)) == (255, 255, 255)
+        assert image.getpixel((400, 200)) == (0, 255, 0)        # circle centred on x/y
+        assert image.getpixel((680, 200)) == (0, 0, 255)
+        assert image.getpixel((200, 300)) == (0, 0, 0)          # star centre
+
+    def test_rotation_and_editor_saved_format(self):
+        # Editor-saved canvases use elements/canvasSize/backgroundColor
+        image = render_canvas({
+            "canvasSize": {"width": 100, "height": 100}, "backgroundColor": "#000000",
+            "elements": [{"type": "rect", "x": 50, "y": 0, "width": 60, "height": 10, "rotation": 90,
+                          "fill": "#ffffff", "strokeWidth": 0}]
+        })
+        # Rotated 90 degrees clockwise around its top-left corner: now runs down, left of x=50
+        assert image.getpixel((45, 30)) == (255, 255, 255)
+        assert image.getpixel((70, 5)) == (0, 0, 0)
+
+    def test_rotated_elements_only_rasterize_what_is_visible(self, monkeypatch):
+        regions = []
+        place = canvas_renderer._place
+
+        def recording_place(canvas, w, h, x, y, rotation, opacity, render_region):
+            def record(left, top, width, height):
+                regions.append(width * height)
+                return render_region(left, top, width, height)
+            place(canvas, w, h, x, y, rotation, opacity, record)
+
+        monkeypatch.setattr(canvas_renderer, "_place", recording_place)
+        # A million-unit placeholder and a huge wrapped text box, both slightly rotated
+        image = render_canvas(_canvas(
+            {"type": "image", "x": -1000, "y": -1000, "width": 1000000, "height": 1000000,
+             "image": "https://example.com/a.png", "rotation": 0.5},
+            {"type": "text", "x": 0, "y": 150, "width": 100000, "text": "wide", "fontSize": 20, "rotation": 1}))
+        assert image.getpixel((200, 100)) == canvas_renderer.PLACEHOLDER_FILL[:3]
+        assert max(regions) <= 2 * 400 * 400
+
+        # An unwrapped line is cut to the glyphs that can reach the canvas before Pillow rasterizes it
+        font = load_font("Arial", False, False, 40)
+
+        def centred_bar(text):
+            return render_canvas(_canvas({"type": "text", "x": 200 - font.getlength(text[:text.index("|")]), "y": 0,
+                                          "text": text, "fontSize": 40, "fill": "#000000"}))
+
+        text = "W" * 5000 + "  |  " + "W" * 5000
+        assert centred_bar(text).tobytes() == centred_bar(text[4990:5010]).tobytes()
+
+    def test_text_wraps_and_aligns(self):
+        font = load_font("Arial", True, False, 20)
+        assert load_font("Arial", True, False, 20) is font
+        lines = wrap_text("one two three four", font, font.getlength("three four") + 1)
+        assert lines == ["one two", "three four"]
+
+        image = render_canvas(_canvas({"type": "text", "x": 0, "y": 0, "width": 400, "text": "HI", "fontSize": 40,
+                                       "fill": "#000000", "align": "right"}))
+        dark = [x for x in range(400) if image.getpixel((x, 24))[0] < 128]
+        assert dark and min(dark) > 300
+
+    def test_qr_elements_and_placeholders(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(artwork_storage, "UPLOAD_DIR", str(tmp_path))
+        Image.new("RGB", (10, 10), (255, 0, 255)).save(tmp_path / "art.png")
+        image = render_canvas(_canvas(
+            {"type": "image", "x": 0, "y": 0, "width": 100, "height": 100,
+             "qrData": {"url": "https://buyprintz.com", "color": "#000000", "backgroundColor": "#ffffff"}},
+            {"type": "image", "x": 150, "y": 0, "width": 50, "height": 50, "image": "/uploads/art.png"},
+            {"type": "image", "x": 250, "y": 0, "width": 50, "height": 50, "image": "https://example.com/a.png"},
+            {"type": "image", "x": 250, "y": 100, "width": 50, "height": 50, "image": "/uploads/../../etc/passwd"},
+        ))
+        qr_colors = {image.getpixel((x, y)) for x in range(100) for y in range(100)}
+        assert qr_colors == {(0, 0, 0), (255, 255, 255)}        # nearest-neighbour, no grey
+        assert image.getpixel((175, 25)) == (255, 0, 255)
+        assert image.getpixel((275, 25)) == canvas_renderer.PLACEHOLDER_FILL[:3]
+        assert image.getpixel((275, 125)) == canvas_renderer.PLACEHOLDER_FILL[:3]
+
+    def test_limits_and_output(self):
+        with pytest.raises(ValueError):
+            render_canvas(_canvas(), scale=0)
+        with pytest.raises(ValueError):
+            render_canvas({"width": 100000, "height": 100000})
+        with pytest.raises(ValueError):
+            render_canvas(_canvas({"type": "text", "text": "A", "fontSize": 1000}), scale=4)
+        # Malformed values fall back to the editor defaults instead of failing the proof
+        png = render_proof_png(_canvas({"type": "rect", "x": "left", "width": None, "fill": "#123456"}), max_width=200)
+        assert Image.open(BytesIO(png)).size == (200, 100)
+        assert base64.b64decode(proof_data_url('{"width": 10, "height": 10}').split(",", 1)[1])[:4] == b"\x89PNG"
+
+
+class TestHelpers:
+    def test_parse_color(self):
+        assert parse_color("#f00") == (255, 0, 0, 255)
+        assert parse_color("rgba(0, 0, 255, 0.5)") == (0, 0, 255, 128)
+        assert parse_color("red", opacity=0.5) == (255, 0, 0, 128)
+        assert parse_color("transparent") is None and parse_color(None) is None and parse_color("nope") is None
+
+    def test_decoded_image_cache_is_lru_and_bounded(self):
+        cache = DecodedImageCache(max_bytes=2 * 10 * 10 * 4)
+        loads = []
+
+        def loader(name):
+            return lambda: loads.append(name) or Image.new("RGBA", (10, 10))
+
+        for name in ("a", "b", "a", "c", "a", "b"):
+            cache.get_or_load(name, loader(name))
+        assert loads == ["a", "b", "c", "b"]
+        assert cache.stats()["entries"] == 2 and cache.stats()["hits"] == 2
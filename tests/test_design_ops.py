@@ -0,0 +1,124 @@
+"""
+Tests for batched design operations
+"""
+
+import json
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import main
+from backend.auth import get_current_user
+from backend.design_ops import DesignOperationError, apply_operations
+from backend.design_session import SessionDesign
+
+
+def _canvas():
+    return {"width": 800, "height": 400, "objects": [
+        {"id": "rect_1", "type": "rect", "x": 0, "y": 0, "width": 100, "height": 50, "fill": "#000000"},
+        {"id": "text_1", "type": "text", "text": "Hello", "x": 10, "y": 10},
+        {"id": "circle_1", "type": "circle", "x": 200, "y": 100, "radius": 20},
+    ]}
+
+
+class FakeDB:
+    def __init__(self, record):
+        self.record = record
+        self.updates = []
+
+    async def get_design(self, design_id):
+        return self.record if design_id == self.record["id"] else None
+
+    async def update_design(self, design_id, update_data, expected_version=None):
+        # Conditional like the real update: no row matches once updated_at has moved on
+        if expected_version is not None and expected_version != self.record["updated_at"]:
+            return {"success": False, "conflict": True, "error": "Design was modified since it was read"}
+        self.updates.append(update_data)
+        return {"success": True, "design_id": design_id, "updated_data": {"updated_at": "2026-01-02T00:00:00"}}
+
+
+class TestApplyOperations:
+    def test_ops_apply_in_order(self):
+        design = SessionDesign("d1", None, _canvas(), persisted=True)
+        results = apply_operations(design, [
+            {"op": "move", "element_id": "rect_1", "x": 40, "dy": 5},
+            {"op": "resize", "element_id": "circle_1", "radius": 35},
+            {"op": "recolor", "element_id": "rect_1", "fill": "#ff0000", "stroke": "#00ff00"},
+            {"op": "duplicate", "element_id": "text_1", "x_offset": 5, "y_offset": 0},
+            {"op": "add", "element": {"type": "star", "x": 1, "y": 2}, "index": 0},
+            {"op": "reorder", "element_id": "rect_1", "position": "front"},
+            {"op": "delete", "element_id": "circle_1"},
+        ])
+
+        copy_id, star_id = results[3]["element_id"], results[4]["element_id"]
+        assert [obj["id"] for obj in design.objects] == [star_id, "text_1", copy_id, "rect_1"]
+        rect = design.find("rect_1")
+        assert (rect["x"], rect["y"], rect["fill"], rect["stroke"]) == (40, 5, "#ff0000", "#00ff00")
+        assert design.find(copy_id)["x"] == 15 and design.find(copy_id)["text"] == "Hello"
+        assert design.find("circle_1") is None and design.dirty
+
+    def test_failed_batch_leaves_design_untouched(self):
+        design = SessionDesign("d1", None, _canvas(), persisted=True)
+        try:
+            apply_operations(design, [
+                {"op": "move", "element_id": "rect_1", "x": 99},
+                {"op": "delete", "element_id": "missing"},
+            ])
+            assert False, "batch should fail"
+        except DesignOperationError as e:
+            assert e.index == 1
+        assert design.find("rect_1")["x"] == 0 and not design.dirty
+
+
+class TestOperationsEndpoint:
+    def test_applies_batch_with_one_write(self, monkeypatch):
+        db = FakeDB({"id": "d1", "user_id": "u1", "updated_at": "2026-01-01T00:00:00",
+                     "canvas_data": json.dumps(_canvas())})
+        monkeypatch.setattr(main, "db_manager", db)
+        main.app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+        try:
+            client = TestClient(main.app)
+            ops = [{"op": "move", "element_id": "text_1", "x": 300}, {"op": "delete", "element_id": "rect_1"}]
+
+            stale = client.post("/api/designs/d1/ops", json={"operations": ops, "base_version": "old"})
+            assert stale.status_code == 409
+
+            bad = client.post("/api/designs/d1/ops", json={"operations": [{"op": "spin", "element_id": "rect_1"}]})
+            assert bad.status_code == 400 and bad.json()["detail"]["index"] == 0
+
+            response = client.post("/api/designs/d1/ops",
+                                   json={"operations": ops, "base_version": "2026-01-01T00:00:00"})
+            assert response.status_code == 200
+            body = response.json()
+            assert body["version"] == "2026-01-02T00:00:00"
+            assert [obj["id"] for obj in body["canvas_data"]["objects"]] == ["text_1", "circle_1"]
+            assert len(db.updates) == 1
+
+            main.app.dependency_overrides[get_current_user] = lambda: {"user_id": "someone_else"}
+            assert client.post("/api/designs/d1/ops", json={"operations": ops}).status_code == 404
+        finally:
+            main.app.dependency_overrides.pop(get_current_user, None)
+
+    def test_concurrent_batches_cannot_both_write(self, monkeypatch):
+        db = FakeDB({"id": "d1", "user_id": "u1", "updated_at": "2026-01-01T00:00:00",
+                     "canvas_data": json.dumps(_canvas())})
+        real_update = db.update_design
+
+        async def update_after_another_batch(design_id, update_data, expected_version=None):
+            # Another batch with the same base_version commits between our check and our write
+            db.record = {**db.record, "updated_at": "2026-01-01T00:00:05"}
+            return await real_update(design_id, update_data, expected_version=expected_version)
+
+        monkeypatch.setattr(db, "update_design", update_after_another_batch)
+        monkeypatch.setattr(main, "db_manager", db)
+        main.app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+        try:
+            response = TestClient(main.app).post("/api/designs/d1/ops", json={
+                "operations": [{"op": "move", "element_id": "text_1", "x": 300}],
+                "base_version": "2026-01-01T00:00:00"})
+            assert response.status_code == 409 and db.updates == []
+        finally:
+            main.app.dependency_overrides.pop(get_current_user, None)
@@ -0,0 +1,129 @@
+"""
+Tests for the per-turn design session used by the AI canvas tools
+"""
+
+import asyncio
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import ai_agent_adapter as adapter_module
+from backend import design_session as design_session_module
+from backend.design_session import DesignSession, design_session
+
+
+class FakeDB:
+    def __init__(self, designs):
+        self.designs = designs
+        self.get_calls = 0
+        self.updates = []
+
+    async def get_design(self, design_id):
+        self.get_calls += 1
+        return self.designs.get(design_id)
+
+    async def update_design(self, design_id, update_data):
+        self.updates.append((design_id, update_data))
+        return {"success": True, "design_id": design_id}
+
+
+class FailingDB(FakeDB):
+    async def update_design(self, design_id, update_data):
+        self.updates.append((design_id, update_data))
+        return {"success": False, "error": "connection reset"}
+
+
+def _stored_design():
+    canvas = {"width": 800, "height": 400, "background": "#fff", "objects": [
+        {"id": "rect_1", "type": "rect", "x": 0, "y": 0},
+        {"id": "text_1", "type": "text", "text": "Hello", "x": 10, "y": 10},
+    ]}
+    # canvas_data comes back from the database as a JSON string
+    return {"id": "d1", "name": "Banner", "canvas_data": json.dumps(canvas)}
+
+
+class TestDesignSession:
+    def test_tools_share_one_load_and_one_write(self):
+        db = FakeDB({"d1": _stored_design()})
+        adapter = adapter_module.ai_agent_adapter
+
+        async def turn():
+            async with design_session(db):
+                added = await adapter._add_text(None, "d1", "Sale!")
+                new_id = added["element"]["id"]
+                await adapter._move_element(None, "d1", new_id, 50, 60)
+                await adapter._change_element_color(None, "d1", "rect_1", fill_color="#ff0000")
+                await adapter._bring_to_front(None, "d1", "rect_1")
+                await adapter._delete_element(None, "d1", "text_1")
+                return new_id
+
+        new_id = asyncio.run(turn())
+
+        assert db.get_calls == 1
+        assert len(db.updates) == 1
+        objects = db.updates[0][1]["canvas_data"]
+        objects = json.loads(objects)["objects"] if isinstance(objects, str) else objects["objects"]
+        assert [obj["id"] for obj in objects] == [new_id, "rect_1"]
+        assert objects[0]["x"] == 50 and objects[0]["y"] == 60
+        assert objects[1]["fill"] == "#ff0000"
+
+    def test_missing_element_and_design(self):
+        db = FakeDB({"d1": _stored_design()})
+        adapter = adapter_module.ai_agent_adapter
+
+        async def turn():
+            async with design_session(db):
+                missing_element = await adapter._resize_element(None, "d1", "nope", 10, 10)
+                missing_design = await adapter._add_circle(None, "other", radius=5)
+                wrong_type = await adapter._modify_text(None, "d1", "rect_1", text="x")
+                return missing_element, missing_design, wrong_type
+
+        missing_element, missing_design, wrong_type = asyncio.run(turn())
+        assert missing_element["error"] == "Element not found"
+        assert missing_design["error"] == "Design not found"
+        assert wrong_type["error"] == "Text element not found"
+        assert db.updates == []
+
+    def test_new_element_ids_are_unique(self):
+        session = DesignSession(FakeDB({}))
+        scratch = session.scratch()
+        scratch.add({"id": "placeholder", "type": "rect"})
+        first = scratch.add({"id": scratch.new_element_id("text"), "type": "text"})
+        # Deleting shrinks the object count, which used to make the next id collide
+        scratch.remove("placeholder")
+        second = scratch.add({"id": scratch.new_element_id("text"), "type": "text"})
+        assert first["id"] != second["id"]
+        # Scratch canvases are never written to the database
+        assert asyncio.run(session.commit()) == {}
+
+    def test_failed_commit_fails_a_standalone_tool(self, monkeypatch):
+        db = FailingDB({"d1": _stored_design()})
+        monkeypatch.setattr(design_session_module, "DesignSession", lambda: DesignSession(db))
+        result = asyncio.run(adapter_module.ai_agent_adapter._move_element(None, "d1", "rect_1", 5, 5))
+        assert result["success"] is False and "connection reset" in result["error"]
+        assert len(db.updates) == 1
+
+    def test_failed_commit_fails_the_chat_turn(self, monkeypatch):
+        db = FailingDB({"d1": _stored_design()})
+        adapter = adapter_module.AIAgentAdapter()
+        followups = []
+
+        async def create(operation, **kwargs):
+            followups.append(kwargs["messages"])
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Moved it."))])
+
+        monkeypatch.setattr(adapter, "_create_chat_completion", create)
+        real_session = design_session_module.design_session
+        monkeypatch.setattr(adapter_module, "design_session", lambda: real_session(db))
+        call = SimpleNamespace(id="call_1", type="function", function=SimpleNamespace(
+            name="move_element", arguments=json.dumps({"design_id": "d1", "element_id": "rect_1", "x": 5, "y": 5})))
+        response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="", tool_calls=[call]))])
+
+        result = asyncio.run(adapter._process_ai_response(response, {}, "system"))
+        assert "connection reset" in result["error"] and result["design_modified"] is False
+        # The follow-up completion is told the edit was not saved
+        tool_message = followups[0][-1]
+        assert json.loads(tool_message["content"])["success"] is False
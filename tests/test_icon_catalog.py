@@ -0,0 +1,33 @@
+"""
+Tests for the indexed icon catalog and fuzzy icon lookup
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.icon_catalog import ICON_LIBRARY, IconCatalog, icon_catalog, normalize
+
+
+class TestIconCatalog:
+    def test_exact_and_loose_names(self):
+        assert icon_catalog.find("Stethoscope")["name"] == "Stethoscope"
+        assert icon_catalog.find("stethoscope icon")["name"] == "Stethoscope"
+        assert icon_catalog.find("fb logo")["name"] == "Meta (Facebook)"
+        # The asset file name is searchable too
+        assert icon_catalog.find("phonendoscope")["name"] == "Stethoscope"
+
+    def test_fuzzy_match_and_misses(self):
+        assert icon_catalog.find("twiter")["name"] == "Twitter"
+        assert icon_catalog.find("pizza slice")["name"] == "Pizza"
+        assert icon_catalog.find("zzqx") is None
+        assert icon_catalog.find("pizza", category="medical") is None
+
+    def test_indexes_cover_library(self):
+        catalog = IconCatalog(ICON_LIBRARY)
+        assert sum(len(icons) for icons in catalog.categories().values()) == len(ICON_LIBRARY)
+        assert all(icon["category"] == "food" for icon in catalog.by_category("food"))
+        assert normalize("  The YT Logo! ") == "youtube"
+        results = catalog.search("sushi")
+        assert results[0][0]["name"] == "Sushi" and results[0][1] == 1.0
@@ -0,0 +1,55 @@
+"""
+Tests for responsive marketplace image derivatives
+"""
+
+import json
+import os
+import sys
+
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.image_derivatives import available_formats, build_derivatives, choose_variant, responsive_image
+
+
+class TestBuildDerivatives:
+    def test_widths_formats_and_placeholder(self, tmp_path):
+        source = tmp_path / "art.jpg"
+        Image.new("RGB", (1000, 500), (30, 60, 90)).save(source, quality=90)
+        manifest = build_derivatives(str(source), str(tmp_path / "out"), "/d/t1")
+
+        # 1280 would upscale, so it is skipped
+        widths = sorted({v["width"] for v in manifest["variants"]})
+        assert widths == [160, 320, 640]
+        assert {v["format"] for v in manifest["variants"]} == set(available_formats())
+        for variant in manifest["variants"]:
+            assert variant["height"] == variant["width"] // 2
+            path = tmp_path / "out" / os.path.basename(variant["url"])
+            assert path.stat().st_size == variant["bytes"]
+        assert manifest["placeholder"].startswith("data:image/webp;base64,") and len(manifest["placeholder"]) < 1000
+        assert json.loads((tmp_path / "out" / "manifest.json").read_text())["sha256"] == manifest["sha256"]
+
+        assert choose_variant(manifest, 300)["width"] == 320
+        assert choose_variant(manifest, 5000)["width"] == 640
+
+    def test_transparency_is_kept(self, tmp_path):
+        source = tmp_path / "logo.png"
+        Image.new("RGBA", (400, 400), (255, 0, 0, 0)).save(source)
+        manifest = build_derivatives(str(source), str(tmp_path / "out"), "/d/t2", widths=(160,))
+        with Image.open(tmp_path / "out" / "160.webp") as img:
+            assert img.mode == "RGBA"
+        assert [v["width"] for v in manifest["variants"]] == [160] * len(available_formats())
+
+
+class TestResponsiveImage:
+    def test_listing_payload(self):
+        manifest = {"version": 1, "formats": ["webp"], "placeholder": "data:x", "variants": [
+            {"width": 320, "height": 160, "format": "webp", "url": "/a/320.webp", "bytes": 1},
+            {"width": 640, "height": 320, "format": "webp", "url": "/a/640.webp", "bytes": 2},
+        ]}
+        image = responsive_image(manifest, 400)
+        assert image["src"] == "/a/640.webp" and image["placeholder"] == "data:x"
+        assert image["srcset"]["webp"] == "/a/320.webp 320w, /a/640.webp 640w"
+        assert responsive_image(None, 400) is None
+        assert responsive_image({**manifest, "version": 0}, 400) is None
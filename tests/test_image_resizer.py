@@ -0,0 +1,96 @@
+"""
+Tests for on-demand image resizing and its disk cache
+"""
+
+import asyncio
+import os
+import sys
+from io import BytesIO
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import image_resizer as resizer_module
+from backend import main
+from backend.image_resizer import DiskLRUCache, ImageNotFound, ImageResizer, snap_width
+
+
+def _setup(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    Image.new("RGBA", (1200, 600), (0, 128, 255, 200)).save(uploads / "art.png")
+    monkeypatch.setitem(resizer_module.ASSET_ROOTS, "uploads", str(uploads))
+    return uploads
+
+
+class TestImageResizer:
+    def test_concurrent_first_requests_render_once(self, tmp_path, monkeypatch):
+        _setup(tmp_path, monkeypatch)
+        renders = []
+        real_render = resizer_module.render_derivative
+        monkeypatch.setattr(resizer_module, "render_derivative", lambda d: renders.append(d) or real_render(d))
+        resizer = ImageResizer(DiskLRUCache(str(tmp_path / "cache"), max_bytes=10_000_000))
+
+        async def run():
+            first = await asyncio.gather(*(resizer.get("uploads/art.png", 300, "webp") for _ in range(5)))
+            again = await resizer.get("uploads/art.png", 310, "webp")
+            return first, again
+
+        first, again = asyncio.run(run())
+        assert len(renders) == 1 and len({content for content, _, _ in first}) == 1
+        assert again[0] == first[0][0]  # 300 and 310 both snap to 320
+        with Image.open(BytesIO(first[0][0])) as img:
+            assert img.size == (320, 160) and img.format == "WEBP"
+
+        # A derivative evicted by a concurrent put is rendered again instead of failing
+        cached = os.listdir(tmp_path / "cache")
+        os.remove(tmp_path / "cache" / cached[0])
+        assert asyncio.run(resizer.get("uploads/art.png", 300, "webp"))[0] == first[0][0]
+        assert len(renders) == 2 and resizer.cache.stats()["entries"] == 1
+
+    def test_lru_eviction_and_bad_requests(self, tmp_path, monkeypatch):
+        _setup(tmp_path, monkeypatch)
+        cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=25)
+        cache.put("a", b"x" * 10)
+        cache.put("b", b"x" * 10)
+        cache.get("a")
+        cache.put("c", b"x" * 10)
+        assert sorted(os.listdir(tmp_path / "cache")) == ["a", "c"] and cache.total_bytes == 20
+
+        resizer = ImageResizer(cache)
+        for asset in ("uploads/../secret.png", "uploads/missing.png", "elsewhere/art.png"):
+            try:
+                asyncio.run(resizer.get(asset, 100))
+                assert False, asset
+            except ImageNotFound:
+                pass
+        assert snap_width(1) == 64 and snap_width(10_000) == 2560
+
+
+class TestImagesEndpoint:
+    def test_only_content_addressed_uploads_are_immutable(self, tmp_path, monkeypatch):
+        uploads = _setup(tmp_path, monkeypatch)
+        sha256 = "ab" * 32
+        Image.new("RGB", (400, 200), (255, 0, 0)).save(uploads / f"{sha256}.png")
+        monkeypatch.setattr(main, "image_resizer", ImageResizer(DiskLRUCache(str(tmp_path / "cache"))))
+        client = TestClient(main.app)
+
+        response = client.get("/api/images/uploads/art.png?w=100&fmt=jpeg")
+        assert response.status_code == 200 and response.headers["content-type"] == "image/jpeg"
+        # art.png keeps its URL when edited: revalidate against the ETag instead of caching for a year
+        assert response.headers["cache-control"] == "public, no-cache"
+        immutable = client.get(f"/api/images/uploads/{sha256}.png?w=100")
+        assert immutable.status_code == 200 and "immutable" in immutable.headers["cache-control"]
+        not_modified = client.get("/api/images/uploads/art.png?w=100&fmt=jpeg",
+                                  headers={"If-None-Match": response.headers["etag"]})
+        assert not_modified.status_code == 304
+
+        assert client.get("/api/images/uploads/art.png?w=100&fmt=tiff").status_code == 400
+        assert client.get("/api/images/uploads/nope.png?w=100").status_code == 404
+
+        # Pillow's decompression-bomb refusal is a bad request, not a server error
+        monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1000)
+        bomb = client.get("/api/images/uploads/art.png?w=200")
+        assert bomb.status_code == 400 and "Image too large" in bomb.json()["detail"]
@@ -0,0 +1,112 @@
+"""
+Tests for the queue-based structured logging setup
+"""
+
+import logging
+import os
+import queue
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.logging_config import (
+    NonBlockingQueueHandler,
+    RequestIdFilter,
+    RequestIdMiddleware,
+    Truncated,
+    log_records_dropped,
+    parse_module_levels,
+    truncate,
+)
+
+
+def _queue_logger(name: str, maxsize: int = 100, max_message_chars: int = 2000):
+    log_queue = queue.Queue(maxsize=maxsize)
+    handler = NonBlockingQueueHandler(log_queue, max_message_chars=max_message_chars)
+    handler.addFilter(RequestIdFilter())
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger, log_queue
+
+
+class TestPayloadTruncation:
+    def test_truncate_is_lazy(self):
+        class Explodes:
+            def __repr__(self):
+                raise AssertionError("payload should not be rendered")
+
+        logger, log_queue = _queue_logger("test.lazy")
+        logger.debug("payload %s", truncate(Explodes()))
+        assert log_queue.empty()
+
+    def test_truncated_repr(self):
+        text = str(Truncated({"canvas": "x" * 100}, limit=20))
+        assert text.startswith("{'canvas': 'xxxxxxxx")
+        assert "more chars" in text
+
+    def test_handler_caps_message_length(self):
+        logger, log_queue = _queue_logger("test.cap", max_message_chars=10)
+        logger.info("%s", "y" * 50)
+        record = log_queue.get_nowait()
+        assert record.msg.startswith("y" * 10)
+        assert "truncated 40 chars" in record.msg
+        assert record.args is None
+
+
+class TestQueueHandler:
+    def test_full_queue_drops_instead_of_blocking(self):
+        logger, log_queue = _queue_logger("test.full", maxsize=1)
+        before = log_records_dropped.value()
+        logger.info("first")
+        logger.info("second")
+        assert log_queue.qsize() == 1
+        assert log_records_dropped.value() == before + 1
+
+    def test_module_levels(self):
+        assert parse_module_levels("backend.database=debug, httpx=WARNING,bad") == {
+            "backend.database": "DEBUG",
+            "httpx": "WARNING"
+        }
+
+
+class TestRequestIdMiddleware:
+    def test_request_id_is_propagated_to_logs_and_response(self):
+        logger, log_queue = _queue_logger("test.request_id")
+        app = FastAPI()
+
+        @app.get("/ping")
+        async def ping():
+            logger.info("handling ping")
+            return {"ok": True}
+
+        app.add_middleware(RequestIdMiddleware)
+        client = TestClient(app)
+
+        response = client.get("/ping", headers={"X-Request-ID": "abc-123"})
+        assert response.headers["x-request-id"] == "abc-123"
+        assert log_queue.get_nowait().request_id == "abc-123"
+
+        response = client.get("/ping", headers={"X-Request-ID": "not valid!"})
+        generated = response.headers["x-request-id"]
+        assert generated != "not valid!"
+        assert log_queue.get_nowait().request_id == generated
+
+    def test_app_configures_logging_before_backend_imports(self):
+        from backend import logging_config, main
+
+        # Installed while main imports, so import-time records are not lost
+        assert logging_config._listener is not None
+        assert any(isinstance(handler, NonBlockingQueueHandler) for handler in logging.getLogger().handlers)
+
+    def test_app_configures_logging_at_startup(self, monkeypatch):
+        from backend import main
+
+        calls = []
+        monkeypatch.setattr(main, "configure_logging", lambda: calls.append(1))
+        with TestClient(main.app):
+            assert calls == [1]
@@ -0,0 +1,133 @@
+"""
+Tests for the in-process metrics registry and request metrics middleware
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import auth, main
+from backend.metrics import (
+    MetricsMiddleware,
+    MetricsRegistry,
+    http_request_duration_seconds,
+    http_requests_total,
+    instrument_async_methods,
+    timed,
+)
+
+
+class TestRegistry:
+    """Prometheus text rendering and quantile estimates"""
+
+    def test_counter_and_gauge_render(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("test_total", "A counter", ("kind",))
+        gauge = registry.gauge("test_depth", "A gauge")
+        counter.inc(kind="a")
+        counter.inc(2, kind="a")
+        gauge.set(7)
+
+        text = registry.render()
+        assert "# TYPE test_total counter" in text
+        assert 'test_total{kind="a"} 3' in text
+        assert "test_depth 7" in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_seconds", "A histogram", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+
+        text = registry.render()
+        assert 'test_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_seconds_bucket{le="1"} 2' in text
+        assert 'test_seconds_bucket{le="+Inf"} 3' in text
+        assert "test_seconds_count 3" in text
+
+    def test_quantiles_interpolate_within_buckets(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_q_seconds", "Quantiles", buckets=(1.0, 2.0))
+        for _ in range(50):
+            histogram.observe(0.5)
+        for _ in range(50):
+            histogram.observe(1.5)
+
+        assert histogram.quantile(0.5) == pytest.approx(1.0)
+        assert histogram.quantile(0.99) == pytest.approx(1.98)
+        row = histogram.summary()[0]
+        assert row["count"] == 100
+        assert row["p95"] == pytest.approx(1.9)
+
+    def test_broken_collector_does_not_break_scrape(self):
+        registry = MetricsRegistry()
+        registry.gauge("test_ok", "Still rendered").set(1)
+
+        def broken():
+            raise RuntimeError("boom")
+
+        registry.add_collector(broken)
+        assert "test_ok 1" in registry.render()
+
+
+class TestTimingHelpers:
+    def test_timed_records_outcome(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_step_seconds", "Steps", ("step", "outcome"))
+        with timed(histogram, step="ok"):
+            pass
+        with pytest.raises(ValueError):
+            with timed(histogram, step="bad"):
+                raise ValueError("step failed")
+
+        assert histogram.summary()[0]["outcome"] == "error"
+        assert histogram.quantile(0.5, step="ok", outcome="success") is not None
+
+    def test_instrument_async_methods(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_db_seconds", "DB", ("operation",))
+
+        class Repository:
+            async def get_thing(self, thing_id):
+                return {"id": thing_id}
+
+            async def _private(self):
+                return None
+
+        instrument_async_methods(Repository, histogram)
+        assert asyncio.run(Repository().get_thing("x")) == {"id": "x"}
+        assert [row["operation"] for row in histogram.summary()] == ["get_thing"]
+        assert Repository.get_thing.__name__ == "get_thing"
+        assert "outcome" not in histogram.summary()[0]
+
+
+class TestMetricsMiddleware:
+    def test_records_route_template_and_status(self):
+        app = FastAPI()
+
+        @app.get("/api/things/{thing_id}")
+        async def get_thing(thing_id: str):
+            return {"id": thing_id}
+
+        app.add_middleware(MetricsMiddleware)
+        client = TestClient(app)
+        client.get("/api/things/1")
+        client.get("/api/things/2")
+        client.get("/does-not-exist")
+
+        assert http_requests_total.value(method="GET", route="/api/things/{thing_id}", status="200") >= 2
+        assert http_requests_total.value(method="GET", route="unmatched", status="404") >= 1
+        assert http_request_duration_seconds.quantile(0.5, method="GET", route="/api/things/{thing_id}") is not None
+
+    def test_metrics_endpoints_require_the_admin_token(self, monkeypatch):
+        monkeypatch.setattr(auth, "ADMIN_API_TOKEN", "operator-token")
+        client = TestClient(main.app)
+        for path in ("/metrics", "/api/metrics/latency"):
+            assert client.get(path).status_code == 403
+            assert client.get(path, headers={"X-Admin-Token": "operator-token"}).status_code == 200
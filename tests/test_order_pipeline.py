@@ -0,0 +1,159 @@
+"""
+Tests for two-phase order creation and the background order pipeline
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import sys
+from io import BytesIO
+from unittest.mock import Mock
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import artwork_preflight, artwork_storage, main, order_pipeline
+from backend.auth import get_current_user
+from backend.database import DatabaseManager
+from backend.order_pipeline import OrderPipeline, decode_data_url, process_order_images
+
+CANVAS = {"width": 400, "height": 200, "background": "#ffffff", "objects": [
+    {"type": "rect", "x": 0, "y": 0, "width": 200, "height": 200, "fill": "#ff0000", "strokeWidth": 0}]}
+
+
+def _data_url(size=(400, 200), color=(0, 0, 255)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode(), buffer.getvalue()
+
+
+class FakeDB:
+    def __init__(self):
+        self.orders = {}
+
+    async def create_order(self, user_id, order_data):
+        order_id = f"order-{len(self.orders) + 1}"
+        details = {k: order_data.get(k) for k in ("banner_size", "dimensions", "processing")}
+        self.orders[order_id] = {"id": order_id, "user_id": user_id, "canvas_data": json.dumps(order_data["canvas_data"]),
+                                 "dimensions": json.dumps(order_data["dimensions"]),
+                                 "order_details": json.dumps(details)}
+        return {"success": True, "order_id": order_id}
+
+    async def get_order(self, order_id):
+        return self.orders.get(order_id)
+
+    async def update_order_details(self, order_id, updates):
+        details = json.loads(self.orders[order_id]["order_details"])
+        details.update(updates)
+        self.orders[order_id]["order_details"] = json.dumps(details)
+        return True
+
+
+async def _finished(order_id):
+    await main.order_pipeline.jobs[order_id].task
+
+
+def _stored(tmp_path, url):
+    return (tmp_path / url[len("/uploads/"):]).read_bytes()
+
+
+class TestProcessOrderImages:
+    def test_client_image_is_stored_as_a_blob(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(artwork_storage, "UPLOAD_DIR", str(tmp_path))
+        data_url, png = _data_url()
+        result = process_order_images(CANVAS, data_url)
+        assert result["canvas_image_source"] == "client"
+        assert result["canvas_image_url"] == f"/uploads/{hashlib.sha256(png).hexdigest()}.png"
+        assert _stored(tmp_path, result["canvas_image_url"]) == png
+        with Image.open(BytesIO(_stored(tmp_path, result["thumbnail_url"]))) as thumbnail:
+            assert thumbnail.format == "JPEG" and thumbnail.size == (300, 300)
+
+    def test_missing_or_broken_image_falls_back_to_a_proof(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(artwork_storage, "UPLOAD_DIR", str(tmp_path))
+        for canvas_image in (None, "data:image/png;base64,bm90IGEgcG5n", "https://example.com/a.png"):
+            result = process_order_images(CANVAS, canvas_image)
+            assert result["canvas_image_source"] == "rendered"
+            with Image.open(BytesIO(_stored(tmp_path, result["canvas_image_url"]))) as proof:
+                assert proof.size == (400, 200) and proof.getpixel((50, 50))[:3] == (255, 0, 0)
+
+        with pytest.raises(ValueError):
+            decode_data_url("data:image/png;base64,***")
+
+
+class TestPipeline:
+    def test_failures_are_recorded_on_the_order(self, tmp_path, monkeypatch):
+        def out_of_disk(canvas_data, canvas_image):
+            raise OSError("No space left on device")
+
+        monkeypatch.setattr(order_pipeline, "process_order_images", out_of_disk)
+        db, pipeline = FakeDB(), OrderPipeline(workers=1)
+
+        async def run():
+            await db.create_order("u1", {"canvas_data": CANVAS, "dimensions": {"width": 2, "height": 4}})
+            job = pipeline.submit("order-1", "u1", {"canvas_data": CANVAS}, None, db)
+            await job.task
+            return job
+
+        try:
+            job = asyncio.run(run())
+        finally:
+            pipeline.shutdown()
+        assert job.status()["status"] == "failed" and job.error == "No space left on device"
+        assert json.loads(db.orders["order-1"]["order_details"])["processing"]["status"] == "failed"
+        assert pipeline.stats()["failed"] == 1
+
+
+class TestUpdateOrderDetails:
+    def test_merges_in_one_server_side_update(self):
+        db = object.__new__(DatabaseManager)
+        db.supabase = Mock()
+        db.supabase.rpc.return_value.execute.return_value = Mock(data=True)
+        updates = {"processing": {"status": "completed"}, "canvas_image_url": "/uploads/a.png"}
+        assert asyncio.run(db.update_order_details("order-1", updates)) is True
+        db.supabase.rpc.assert_called_once_with("merge_order_details", {"order_uuid": "order-1", "updates": updates})
+        # No read-modify-write of the row from the API
+        db.supabase.table.assert_not_called()
+
+        db.supabase.rpc.return_value.execute.return_value = Mock(data=False)
+        assert asyncio.run(db.update_order_details("missing", updates)) is False
+
+
+class TestCreateOrderEndpoint:
+    def test_light_row_then_background_images(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(artwork_storage, "UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(artwork_preflight, "PREFLIGHT_CACHE_DIR", str(tmp_path / "preflight"))
+        db = FakeDB()
+        monkeypatch.setattr(main, "db_manager", db)
+        main.app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+        data_url, png = _data_url()
+        try:
+            with TestClient(main.app) as client:
+                response = client.post("/api/orders/create", json={
+                    "canvas_data": CANVAS, "canvas_image": data_url, "product_type": "banner", "quantity": 2,
+                    "dimensions": {"width": 2, "height": 4}, "marketplace_templates": [{"price": 5}]}).json()
+                assert response["success"] and response["total_amount"] == 55.0
+                order_id = response["order_id"]
+                assert response["processing_url"] == f"/api/orders/{order_id}/processing"
+                assert "canvas_data" not in response["order_details"]
+                assert "canvas_image" not in response["order_details"]
+
+                # The inserted row carries neither the image nor a second copy of the design
+                row = db.orders[order_id]
+                assert data_url not in json.dumps(row) and json.loads(row["canvas_data"]) == CANVAS
+
+                # Wait for the background job on the app's event loop
+                client.portal.call(_finished, order_id)
+                status = client.get(response["processing_url"]).json()
+                assert status["processing"]["status"] == "completed"
+                assert status["canvas_image_url"] == f"/uploads/{hashlib.sha256(png).hexdigest()}.png"
+                assert status["thumbnail_url"].endswith(".jpg") and status["preflight"]["items"] == []
+
+                main.app.dependency_overrides[get_current_user] = lambda: {"user_id": "someone-else"}
+                assert client.get(f"/api/orders/{order_id}/processing").status_code == 404
+        finally:
+            main.app.dependency_overrides.clear()
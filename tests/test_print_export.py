@@ -0,0 +1,119 @@
+"""
+Tests for banded, memory-bounded print exports
+"""
+
+import json
+import os
+import re
+import sys
+import zlib
+
+from PIL import Image, ImageChops, ImageStat
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.canvas_renderer import render_canvas
+from backend.print_export import (PdfBandWriter, PrintExportService, PrintSpec, export_canvas, order_print_jobs,
+                                  tin_print_jobs)
+
+CANVAS = {"width": 200, "height": 100, "background": "#ffffff", "objects": [
+    {"type": "rect", "x": 10, "y": 10, "width": 120, "height": 60, "fill": "#ff0000", "rotation": 10},
+    {"type": "circle", "x": 150, "y": 50, "radius": 40, "fill": "#0000ff"},
+    {"type": "text", "x": 5, "y": 40, "width": 190, "text": "Banded export", "fontSize": 22, "fill": "#000000"},
+    {"type": "image", "x": 160, "y": 60, "width": 30, "height": 30, "qrData": {"url": "https://buyprintz.com"}},
+    {"type": "image", "x": 20, "y": 5, "width": 60, "height": 30, "image": "https://example.com/a.png", "rotation": 30},
+    {"type": "text", "x": 100, "y": 5, "text": "Tilted", "fontSize": 18, "fill": "#008000", "rotation": -15},
+]}
+
+
+def _pdf_bands(data: bytes):
+    """Decoded band images of a PDF written by PdfBandWriter, checking its xref on the way"""
+    xref = int(re.search(rb"startxref\n(\d+)", data).group(1))
+    entries = re.findall(rb"(\d{10}) 00000 n ", data[xref:])
+    for number, offset in enumerate(entries, 1):
+        assert data[int(offset):].startswith(f"{number} 0 obj".encode())
+    bands = []
+    for match in re.finditer(rb"/Width (\d+) /Height (\d+) .*?/Length (\d+) 0 R >>\nstream\n", data):
+        width, height, length_obj = map(int, match.groups())
+        length = int(re.search(rf"\n{length_obj} 0 obj\n(\d+)".encode(), data).group(1))
+        raw = zlib.decompress(data[match.end():match.end() + length])
+        bands.append(Image.frombytes("RGB", (width, height), raw))
+    return bands
+
+
+class TestExportCanvas:
+    def test_tiff_strips_match_a_single_render(self, tmp_path):
+        spec = PrintSpec(width_in=4, height_in=2, dpi=100, fmt="tiff")
+        progress = tmp_path / "progress.json"
+        result = export_canvas(CANVAS, spec, str(tmp_path / "out.tiff"), str(progress), band_bytes=400 * 4 * 30)
+        assert (result["width"], result["height"], result["bands"]) == (400, 200, 7)
+        assert json.loads(progress.read_text())["done"] == 7
+        assert not os.path.exists(tmp_path / "out.tiff.part")
+
+        with Image.open(tmp_path / "out.tiff") as tiff:
+            assert tiff.size == (400, 200) and tiff.info["dpi"] == (100, 100)
+            exported = tiff.convert("RGB")
+        whole = render_canvas(CANVAS, scale=2)
+        diff = ImageStat.Stat(ImageChops.difference(exported, whole)).mean
+        assert max(diff) < 1.0
+
+    def test_pdf_is_one_page_of_stacked_bands(self, tmp_path):
+        spec = PrintSpec(width_in=2, height_in=4, dpi=100)  # orientation follows the design
+        result = export_canvas(CANVAS, spec, str(tmp_path / "out.pdf"), band_bytes=400 * 4 * 64)
+        data = (tmp_path / "out.pdf").read_bytes()
+        assert data.startswith(b"%PDF-1.6") and data.rstrip().endswith(b"%%EOF")
+        assert b"/MediaBox [0 0 288.0000 144.0000]" in data
+
+        bands = _pdf_bands(data)
+        assert [b.height for b in bands] == [64, 64, 64, 8] and result["bands"] == 4
+        stacked = Image.new("RGB", (400, 200))
+        top = 0
+        for band in bands:
+            stacked.paste(band, (0, top))
+            top += band.height
+        assert max(ImageStat.Stat(ImageChops.difference(stacked, render_canvas(CANVAS, scale=2))).mean) < 1.0
+
+    def test_oversized_pages_use_user_unit(self, tmp_path):
+        writer = PdfBandWriter(str(tmp_path / "big.pdf"), 36000, 18000, 150)
+        writer.write_band(Image.new("RGB", (36000, 1)))
+        writer.close()
+        data = (tmp_path / "big.pdf").read_bytes()
+        assert b"/UserUnit 2 " in data and b"/MediaBox [0 0 8640.0000 4320.0000]" in data
+
+
+class TestPrintJobs:
+    def test_order_and_tin_sources(self):
+        order = {"canvas_data": json.dumps(CANVAS), "dimensions": {"width": 2, "height": 4}, "print_options": {}}
+        [(label, canvas, spec)] = order_print_jobs(order, "tiff")
+        assert label == "banner" and spec == PrintSpec(24, 48, 150, "tiff")
+        assert spec.output_size((200, 100)) == (7200, 3600, 36.0)
+        assert order_print_jobs({"canvas_data": {"objects": []}}) == []
+
+        tin = {"sticker_specifications": {"dpi": 300},
+               "surface_designs": {"front": {"elements": CANVAS["objects"]}, "back": {"elements": []}}}
+        [(surface, canvas, spec)] = tin_print_jobs(tin)
+        assert surface == "front" and (spec.width_in, spec.height_in, spec.dpi) == (3.74, 2.25, 300)
+
+    def test_service_runs_exports_in_worker_processes(self, tmp_path):
+        service = PrintExportService(str(tmp_path), workers=1)
+        try:
+            job = service.submit("order-1", "banner", CANVAS, PrintSpec(2, 1, 50, "tiff"))
+            job.future.result(timeout=60)
+            [status] = service.for_order("order-1")
+            assert status["status"] == "completed" and status["bands_done"] == status["bands_total"] == 1
+            assert status["result"]["width"] == 100 and os.path.exists(job.output_path)
+
+            failing = service.submit("order-1", "bad", CANVAS, PrintSpec(2, 1, 50, "gif"))
+            assert failing.future.exception(timeout=60) is not None
+            assert failing.status()["status"] == "failed"
+
+            # Workers are spawned, so they do not inherit the server's threads or log handlers
+            assert service.pool._mp_context.get_start_method() == "spawn"
+
+            # A worker that dies breaks the executor for good; the next export gets a new pool
+            broken = service.pool
+            broken.submit(os._exit, 1).exception(timeout=60)
+            job = service.submit("order-2", "banner", CANVAS, PrintSpec(2, 1, 50, "tiff"))
+            assert job.future.result(timeout=60)["width"] == 100 and service.pool is not broken
+        finally:
+            service.shutdown()
@@ -0,0 +1,67 @@
+"""
+Tests for the opt-in request profiling middleware
+"""
+
+import os
+import sys
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import auth
+from backend.profiling import ProfileStore, ProfilingMiddleware, speedscope_to_collapsed
+
+ADMIN_TOKEN = "operator-token"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(auth, "ADMIN_API_TOKEN", ADMIN_TOKEN)
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        # Busy loop so the sampler sees this frame on the event-loop thread
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        return {"ok": True}
+
+    store = ProfileStore(directory=str(tmp_path), max_stored=2)
+    app.add_middleware(ProfilingMiddleware, store=store)
+    test_client = TestClient(app)
+    test_client.store = store
+    return test_client
+
+
+class TestProfilingMiddleware:
+    def test_requests_without_token_are_not_profiled(self, client):
+        response = client.get("/slow", headers={"X-Profile": "speedscope"})
+        assert response.json() == {"ok": True}
+        assert "x-profile-id" not in response.headers
+
+    def test_speedscope_profile_replaces_response(self, client):
+        response = client.get("/slow", headers={"X-Profile": "speedscope", "X-Admin-Token": ADMIN_TOKEN})
+        profile = response.json()
+        assert profile["profiles"][0]["type"] == "sampled"
+        frame_names = {frame["name"] for frame in profile["shared"]["frames"]}
+        assert "slow" in frame_names
+        assert "slow" in speedscope_to_collapsed(profile)
+
+    def test_store_mode_keeps_response_and_saves_profile(self, client):
+        response = client.get("/slow?__profile=store", headers={"X-Admin-Token": ADMIN_TOKEN})
+        assert response.json() == {"ok": True}
+        profile_id = response.headers["x-profile-id"]
+        assert client.store.load(profile_id) is not None
+
+    def test_store_is_bounded(self, client):
+        for _ in range(3):
+            client.get("/slow", headers={"X-Profile": "store", "X-Admin-Token": ADMIN_TOKEN})
+        assert len(client.store.list()) == 2
+
+    def test_store_rejects_path_like_ids(self, client):
+        assert client.store.load("../../etc/passwd") is None
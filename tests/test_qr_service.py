@@ -0,0 +1,56 @@
+"""
+Tests for cached, off-loop QR rendering
+"""
+
+import asyncio
+import os
+import sys
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import ai_agent_adapter as adapter_module
+from backend.qr_service import QRService, QRSpec
+
+
+class TestQRService:
+    def test_repeat_requests_hit_the_cache(self):
+        service = QRService(max_entries=8)
+
+        async def run():
+            spec = QRSpec(data="https://buyprintz.com", fill_color="#112233")
+            first, second = await asyncio.gather(service.render(spec), service.render(spec))
+            third = await service.render(spec)
+            return first, second, third
+
+        first, second, third = asyncio.run(run())
+        assert first is second is third
+        assert first.content.startswith(b"\x89PNG")
+        assert first.data_url.startswith("data:image/png;base64,")
+        assert service.misses == 1 and service.hits == 1
+
+    def test_svg_and_url_output(self):
+        service = QRService()
+        spec = QRSpec(data="hello", fill_color="#ff0000", fmt="svg")
+        svg = asyncio.run(service.render(spec)).content.decode()
+        assert svg.startswith("<svg") and 'fill="#ff0000"' in svg
+
+        url = asyncio.run(service.element_source(QRSpec(data="hello world"), output="url"))
+        params = parse_qs(urlparse(url).query)
+        assert urlparse(url).path == "/api/qr" and params["data"] == ["hello world"]
+
+    def test_invalid_spec_is_rejected(self):
+        for spec in (QRSpec(data=""), QRSpec(data="x", fill_color="red"), QRSpec(data="x", fmt="gif")):
+            try:
+                asyncio.run(QRService().render(spec))
+                assert False, f"{spec} should be rejected"
+            except ValueError:
+                pass
+
+    def test_add_qr_code_tool_without_design(self):
+        adapter = adapter_module.ai_agent_adapter
+        result = asyncio.run(adapter._add_qr_code(None, None, "https://buyprintz.com", width=100, height=100))
+        assert result["success"] is True
+        element = result["element"]
+        assert element["imageDataUrl"].startswith("data:image/")
+        assert element["x"] == 350 and element["qrData"]["url"] == "https://buyprintz.com"
@@ -0,0 +1,109 @@
+"""
+Tests for resumable, chunked artwork uploads
+"""
+
+import hashlib
+import os
+import sys
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import artwork_preflight, artwork_storage, main, resumable_uploads
+from backend.auth import get_current_user
+from backend.resumable_uploads import MIN_CHUNK_SIZE, ResumableUploadStore
+
+
+def _client(tmp_path, monkeypatch, user_id="u1"):
+    monkeypatch.setattr(artwork_storage, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(artwork_preflight, "PREFLIGHT_CACHE_DIR", str(tmp_path / "preflight"))
+    monkeypatch.setattr(resumable_uploads, "upload_store", ResumableUploadStore(str(tmp_path / "sessions")))
+    main.app.dependency_overrides[get_current_user] = lambda: {"user_id": user_id}
+    return TestClient(main.app)
+
+
+class TestResumableUpload:
+    def test_out_of_order_chunks_resume_and_complete(self, tmp_path, monkeypatch):
+        try:
+            client = _client(tmp_path, monkeypatch)
+            artwork = os.urandom(MIN_CHUNK_SIZE * 2 + 1000)
+            sha256 = hashlib.sha256(artwork).hexdigest()
+            session = client.post("/api/uploads", json={
+                "filename": "banner.pdf", "content_type": "application/pdf", "size": len(artwork),
+                "chunk_size": 1, "sha256": sha256}).json()
+            assert session["complete"] is False
+            assert (session["chunk_size"], session["total_chunks"]) == (MIN_CHUNK_SIZE, 3)
+            upload_id = session["upload_id"]
+
+            def chunk(i):
+                return artwork[i * MIN_CHUNK_SIZE:(i + 1) * MIN_CHUNK_SIZE]
+
+            assert client.put(f"/api/uploads/{upload_id}/chunks/2", content=chunk(2)).json()["size"] == 1000
+            assert client.put(f"/api/uploads/{upload_id}/chunks/0", content=chunk(0)[:-1]).status_code == 400
+            assert client.put(f"/api/uploads/{upload_id}/chunks/0", content=chunk(0)).status_code == 200
+            assert client.put(f"/api/uploads/{upload_id}/chunks/3", content=b"x").status_code == 400
+
+            status = client.get(f"/api/uploads/{upload_id}").json()
+            assert (status["received"], status["missing"]) == ([0, 2], [1])
+            assert status["bytes_received"] == MIN_CHUNK_SIZE + 1000
+            incomplete = client.post(f"/api/uploads/{upload_id}/complete")
+            assert incomplete.status_code == 409 and incomplete.json()["detail"]["missing"] == [1]
+
+            client.put(f"/api/uploads/{upload_id}/chunks/1", content=chunk(1))
+            done = client.post(f"/api/uploads/{upload_id}/complete").json()
+            assert done["complete"] and done["sha256"] == sha256 and done["deduplicated"] is False
+            assert done["file_url"] == f"/uploads/{sha256}.pdf" and done["original_name"] == "banner.pdf"
+            assert (tmp_path / "uploads" / f"{sha256}.pdf").read_bytes() == artwork
+            assert os.listdir(tmp_path / "sessions") == []
+            assert client.get(f"/api/uploads/{upload_id}").status_code == 404
+
+            # Re-initiating the same artwork finishes without sending any chunks
+            again = client.post("/api/uploads", json={
+                "filename": "copy.pdf", "content_type": "application/pdf", "size": len(artwork), "sha256": sha256}).json()
+            assert again["complete"] and again["deduplicated"] and again["file_url"] == done["file_url"]
+        finally:
+            main.app.dependency_overrides.clear()
+
+    def test_hash_mismatch_ownership_and_abort(self, tmp_path, monkeypatch):
+        try:
+            client = _client(tmp_path, monkeypatch)
+            init = {"filename": "a.png", "content_type": "image/png", "size": 10, "sha256": "0" * 64}
+            upload_id = client.post("/api/uploads", json=init).json()["upload_id"]
+            client.put(f"/api/uploads/{upload_id}/chunks/0", content=b"0123456789")
+            mismatch = client.post(f"/api/uploads/{upload_id}/complete")
+            assert mismatch.status_code == 422 and "mismatch" in mismatch.json()["detail"]
+            assert not os.path.exists(tmp_path / "uploads") or os.listdir(tmp_path / "uploads") == []
+
+            main.app.dependency_overrides[get_current_user] = lambda: {"user_id": "someone-else"}
+            assert client.get(f"/api/uploads/{upload_id}").status_code == 404
+            assert client.delete(f"/api/uploads/{upload_id}").status_code == 404
+
+            main.app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+            assert client.delete(f"/api/uploads/{upload_id}").json()["success"]
+            assert os.listdir(tmp_path / "sessions") == []
+
+            assert client.post("/api/uploads", json={**init, "content_type": "text/html"}).status_code == 400
+            assert client.post("/api/uploads", json={**init, "size": 0}).status_code == 413
+        finally:
+            main.app.dependency_overrides.clear()
+
+
+class TestCleanup:
+    def test_abandoned_sessions_are_removed(self, tmp_path):
+        store = ResumableUploadStore(str(tmp_path), ttl=60)
+        request = resumable_uploads.UploadInitRequest(filename="a.pdf", content_type="application/pdf", size=5)
+        stale, fresh = store.create("u1", request), store.create("u1", request)
+        old = time.time() - 120
+        os.utime(os.path.join(stale.directory, "session.json"), (old, old))
+        (tmp_path / "halfcreated").mkdir()
+
+        with pytest.raises(HTTPException) as missing:
+            store.get("halfcreated", "u1")
+        assert missing.value.status_code == 404
+
+        assert store.cleanup_abandoned() == 2
+        assert os.listdir(tmp_path) == [fresh.upload_id]
@@ -0,0 +1,70 @@
+"""
+Tests for the incremental, process-pool thumbnail batch engine
+"""
+
+import json
+import os
+import sys
+
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.generate_thumbnails import THUMBNAIL_SIZE, reduce_for_thumbnail
+from backend import thumbnail_batch
+from backend.thumbnail_batch import MANIFEST_NAME, ThumbnailJob, collect_images, render_thumbnail, run_batch
+
+
+def _write_images(directory):
+    Image.new("RGB", (2400, 1600), (10, 120, 200)).save(directory / "Big Photo (1).jpg", quality=90)
+    Image.new("RGBA", (1500, 700), (255, 0, 0, 128)).save(directory / "logo.png")
+    (directory / "broken.png").write_bytes(b"not really a png")
+    (directory / "notes.txt").write_text("ignored")
+
+
+class TestRunBatch:
+    def test_generates_then_skips_unchanged(self, tmp_path):
+        source, output = tmp_path / "src", tmp_path / "thumbs"
+        source.mkdir()
+        _write_images(source)
+        jobs = collect_images(str(source), str(output))
+        assert [os.path.basename(job.thumbnail_path) for job in jobs] == [
+            "Big_Photo_1_thumb.jpg", "broken_thumb.jpg", "logo_thumb.jpg"]
+
+        progress = []
+        first = run_batch(jobs, str(output), workers=2, progress=lambda done, total, _: progress.append((done, total)))
+        assert (first["success"], first["skipped"], first["failed"]) == (2, 0, 1)
+        assert progress == [(1, 3), (2, 3), (3, 3)]
+        with Image.open(output / "Big_Photo_1_thumb.jpg") as thumb:
+            assert thumb.size == THUMBNAIL_SIZE
+        manifest = json.loads((output / MANIFEST_NAME).read_text())
+        assert len(manifest) == 2 and all(len(entry["sha256"]) == 64 for entry in manifest.values())
+
+        second = run_batch(jobs, str(output), workers=2)
+        assert (second["success"], second["skipped"], second["failed"]) == (0, 2, 1)
+
+        # Touched but identical content is still up to date; changed content is redone
+        photo, logo = source / "Big Photo (1).jpg", source / "logo.png"
+        os.utime(photo, (1, 1))
+        Image.new("RGBA", (1500, 700), (0, 255, 0, 255)).save(logo)
+        third = run_batch(jobs, str(output), workers=1)
+        redone = [os.path.basename(r["source_path"]) for r in third["results"] if r["success"] and not r.get("skipped")]
+        assert redone == ["logo.png"] and third["skipped"] == 1
+
+        assert run_batch(jobs, str(output), workers=1, force=True)["success"] == 2
+
+
+class TestReduce:
+    def test_large_images_are_box_reduced_before_resampling(self):
+        reduced = reduce_for_thumbnail(Image.new("P", (3000, 3000)))
+        assert reduced.size == (600, 600) and reduced.mode == "RGBA"
+        small = Image.new("RGB", (700, 700))
+        assert reduce_for_thumbnail(small) is small
+
+    def test_pixel_ceiling_is_checked_locally(self, tmp_path, monkeypatch):
+        # Importing the thumbnail code leaves Pillow's process-wide limit alone
+        assert Image.MAX_IMAGE_PIXELS == int(1024 * 1024 * 1024 // 4 // 3)
+        Image.new("RGB", (200, 100)).save(tmp_path / "wide.png")
+        monkeypatch.setattr(thumbnail_batch, "MAX_UPLOAD_PIXELS", 10_000)
+        result = render_thumbnail(ThumbnailJob(str(tmp_path / "wide.png"), str(tmp_path / "wide_thumb.jpg")))
+        assert result["success"] is False and result["error"] == "Image too large: 200x100"
@@ -0,0 +1,66 @@
+"""
+Tests for the in-memory marketplace thumbnail pipeline
+"""
+
+import os
+import sys
+from io import BytesIO
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import generate_thumbnails
+from backend.auth import get_current_user
+from backend.creator_marketplace import router
+from backend.generate_thumbnails import THUMBNAIL_SIZE, process_image_bytes, validate_image_bytes
+
+
+def _image_bytes(size, mode="RGB", fmt="JPEG", color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class TestProcessImageBytes:
+    def test_jpeg_and_transparent_png(self, tmp_path):
+        for data, filename in ((_image_bytes((1600, 900)), "Big Photo (1).jpg"),
+                               (_image_bytes((400, 800), "RGBA", "PNG", (0, 0, 255, 0)), "logo.png")):
+            result = process_image_bytes(data, filename, str(tmp_path))
+            assert result["success"] and result["valid"], result["error"]
+            assert result["file_size"] == len(data)
+            with Image.open(result["thumbnail_path"]) as thumb:
+                assert thumb.size == THUMBNAIL_SIZE and thumb.mode == "RGB"
+            assert os.path.getsize(result["thumbnail_path"]) == result["thumbnail_size"]
+            assert " " not in os.path.basename(result["thumbnail_path"])
+        # Only the thumbnails are written
+        assert len(os.listdir(tmp_path)) == 2
+
+    def test_rejects_bad_uploads(self, tmp_path):
+        assert validate_image_bytes(_image_bytes((10, 10)), "a.jpg") == (True, "Valid image file")
+        assert not validate_image_bytes(b"not an image", "a.jpg")[0]
+        assert "Unsupported format" in validate_image_bytes(_image_bytes((10, 10)), "a.tiff")[1]
+        truncated = _image_bytes((500, 500))[:300]
+        result = process_image_bytes(truncated, "a.jpg", str(tmp_path))
+        assert not result["success"] and not result["valid"]
+        assert os.listdir(tmp_path) == []
+
+
+class TestThumbnailEndpoint:
+    def test_upload_leaves_no_temp_files(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(generate_thumbnails, "THUMBNAIL_DIR", str(tmp_path / "thumbs"))
+        monkeypatch.chdir(tmp_path)
+        app = FastAPI()
+        app.include_router(router)
+        app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+        client = TestClient(app)
+        url = next(route.path for route in router.routes if route.path.endswith("/generate-thumbnail"))
+
+        response = client.post(url, files={"file": ("art.jpg", _image_bytes((800, 600)), "image/jpeg")})
+        assert response.status_code == 200 and response.json()["thumbnail_size"] > 0
+
+        corrupt = client.post(url, files={"file": ("art.jpg", b"garbage", "image/jpeg")})
+        assert corrupt.status_code == 400
+        assert sorted(os.listdir(tmp_path)) == ["thumbs"]